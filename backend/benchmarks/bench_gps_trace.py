@@ -0,0 +1,52 @@
+#!/usr/bin/env python3
+"""
+GPS 궤적 분석 벤치마크
+
+실행: python -m backend.benchmarks.bench_gps_trace
+"""
+import time
+
+import numpy as np
+
+from backend.services.gps_trace import analyze_trace, split_legs
+
+N_POINTS = 10_000
+REPEAT = 20
+
+
+def build_trace(n: int = N_POINTS, seed: int = 0):
+    """도보 → 버스 → 도보 → 자전거 순서의 1초 간격 가상 궤적 (속도에 잡음 포함)"""
+    rng = np.random.default_rng(seed)
+    plan = np.repeat([5.0, 25.0, 5.0, 15.0], n // 4)
+    speed = np.clip(plan + rng.normal(0, 0.15, plan.size) * plan, 0, None)
+    ts = 1.7e9 + np.arange(plan.size, dtype=np.float64)
+    heading = np.cumsum(rng.normal(0, 0.05, plan.size))
+    step_km = speed / 3600
+    lat = 37.5 + np.cumsum(step_km * np.cos(heading)) / 111.2
+    lon = 127.0 + np.cumsum(step_km * np.sin(heading)) / (111.2 * np.cos(np.radians(37.5)))
+    return lat, lon, ts
+
+
+def main():
+    lat, lon, ts = build_trace()
+
+    start = time.perf_counter()
+    for _ in range(REPEAT):
+        profile = analyze_trace(lat, lon, ts)
+    analyze_ms = (time.perf_counter() - start) / REPEAT * 1000
+
+    start = time.perf_counter()
+    for _ in range(REPEAT):
+        legs = split_legs(profile)
+    split_ms = (time.perf_counter() - start) / REPEAT * 1000
+
+    print(f"📊 GPS 궤적: 점 {lat.size}개")
+    print(f"  거리/속도 프로파일   {analyze_ms:8.2f} ms")
+    print(f"  정지/교통수단 분할   {split_ms:8.2f} ms")
+    for leg in legs:
+        minutes = (leg.ended_at - leg.started_at) / 60
+        print(f"  - {leg.mode.value:6s} {leg.distance_km:7.3f} km {minutes:6.1f} min (p85 {leg.p85_speed_kmh:.1f} km/h)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+"""
+리더보드 틱 비용 벤치마크 (DB 없이 가상 순위, 가상 구독자)
+
+구독자 수를 늘려도 틱당 직렬화 횟수는 그대로이고, 구독자당 비용은 큐 적재뿐인지 확인합니다.
+
+실행: python -m backend.benchmarks.bench_leaderboard_ticker
+"""
+import asyncio
+import json
+import random
+import time
+
+from backend.services import leaderboard_ticker, ws_hub
+
+TICKS = 20
+
+
+class NullWebSocket:
+    async def accept(self):
+        pass
+
+    async def send_text(self, message: str):
+        pass
+
+    async def close(self):
+        pass
+
+
+def ranking(points):
+    order = sorted(points.items(), key=lambda kv: (-kv[1], -kv[0]))[:leaderboard_ticker.TOP_N]
+    return [(rank, uid, f"user{uid}", p, round(p / 100, 2)) for rank, (uid, p) in enumerate(order, 1)]
+
+
+async def run(n_subscribers: int):
+    rng = random.Random(0)
+    hub = ws_hub.ConnectionManager()
+    ticker = leaderboard_ticker.LeaderboardTicker()
+    for _ in range(n_subscribers):
+        ticker.subscribe(await hub.connect(NullWebSocket()))
+
+    dumps_calls = 0
+    real_dumps = json.dumps
+
+    def counting_dumps(*args, **kwargs):
+        nonlocal dumps_calls
+        dumps_calls += 1
+        return real_dumps(*args, **kwargs)
+
+    leaderboard_ticker.json.dumps = counting_dumps
+    points = {uid: rng.randint(0, 5000) for uid in range(1, 2001)}
+    elapsed = 0.0
+    try:
+        for _ in range(TICKS):
+            for uid in rng.sample(sorted(points), 20):
+                points[uid] += rng.randint(0, 300)
+            entries = ranking(points)
+            start = time.perf_counter()
+            ticker.apply(entries)
+            elapsed += time.perf_counter() - start
+            await asyncio.sleep(0)  # writer 들이 큐를 비우도록
+    finally:
+        leaderboard_ticker.json.dumps = real_dumps
+        for ws in list(hub.connections):
+            hub.disconnect(ws)
+    return elapsed / TICKS, dumps_calls / TICKS
+
+
+def main():
+    print(f"📊 리더보드 틱 (상위 {leaderboard_ticker.TOP_N}, 틱 {TICKS}회 평균)")
+    for n in (100, 1000, 10000):
+        per_tick, dumps = asyncio.run(run(n))
+        print(f"  구독자 {n:6d}: 틱당 {per_tick * 1000:8.2f} ms, 직렬화 {dumps:.1f} 회, 구독자당 {per_tick / n * 1e6:.2f} µs")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,41 @@
+#!/usr/bin/env python3
+"""
+실시간 이동 추적 상태 갱신 벤치마크 (DB 없이 메모리 상태만)
+
+실행: python -m backend.benchmarks.bench_live_trip
+"""
+import sys
+import time
+
+from backend.services.live_trip import LiveTripRegistry
+
+N_TRIPS = 10_000
+POINTS_PER_TRIP = 60
+
+
+def main():
+    registry = LiveTripRegistry()
+    t0 = 1.75e9
+
+    start = time.perf_counter()
+    # 1초 간격으로 모든 이동에 점이 하나씩 들어오는 상황
+    for k in range(POINTS_PER_TRIP):
+        for user_id in range(N_TRIPS):
+            registry.add_points(user_id, ((37.5 + k * 0.00005 + user_id * 1e-6, 127.0, t0 + k),))
+    elapsed = time.perf_counter() - start
+    total = N_TRIPS * POINTS_PER_TRIP
+
+    start = time.perf_counter()
+    states = [trip.to_state() for trip in registry.take_dirty()]
+    snapshot_ms = (time.perf_counter() - start) * 1000
+
+    trip = registry.get(0)
+    per_trip = sys.getsizeof(trip) + sys.getsizeof(trip.speed_s)
+    print(f"📊 동시 추적 이동 {N_TRIPS}개 × 점 {POINTS_PER_TRIP}개")
+    print(f"  점 반영              {total / elapsed:10.0f} points/s ({elapsed / total * 1e6:.2f} µs/point)")
+    print(f"  체크포인트 스냅샷    {snapshot_ms:10.2f} ms ({len(states)} trips)")
+    print(f"  이동당 메모리        {per_trip:10d} bytes (+ 숫자 객체)")
+
+
+if __name__ == "__main__":
+    main()
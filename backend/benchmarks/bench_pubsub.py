@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""
+워커 간 메시지 버스 지연/처리량 벤치마크
+
+- local: 같은 프로세스 전달
+- redis: resp_standin 을 별도 프로세스로 띄우고, 워커 두 개(버스·연결 관리자 각각)를 흉내 내어
+  워커 A 에서 발행 → 브로커 → 워커 B 에 연결된 가상 소켓 도착까지 측정
+지연은 한 개씩 발행하고 도착을 기다린 왕복, 처리량은 연속 발행 후 모두 도착할 때까지입니다.
+
+실행: python -m backend.benchmarks.bench_pubsub [--messages 20000]
+"""
+import argparse
+import asyncio
+import socket
+import statistics
+import subprocess
+import sys
+import time
+
+from backend.services import pubsub, ws_hub
+
+LATENCY_SAMPLES = 2000
+
+
+class TimingWebSocket:
+    def __init__(self):
+        self.received = 0
+        self.latencies = []
+        self.arrived = asyncio.Event()
+        self.target = 0
+
+    async def accept(self):
+        pass
+
+    async def send_text(self, message: str):
+        self.latencies.append(time.perf_counter() - float(message))
+        self.received += 1
+        if self.received >= self.target:
+            self.arrived.set()
+
+    async def close(self):
+        pass
+
+
+async def measure(publisher: pubsub.Bus, receiver_hub: ws_hub.ConnectionManager, n_messages: int):
+    ws = TimingWebSocket()
+    await receiver_hub.connect(ws, user_id=1)
+    await asyncio.sleep(0.2)  # 구독 반영
+
+    for _ in range(LATENCY_SAMPLES):
+        ws.target = ws.received + 1
+        ws.arrived.clear()
+        publisher.publish_user(1, repr(time.perf_counter()))
+        await ws.arrived.wait()
+    latencies = sorted(ws.latencies)
+
+    ws.target = ws.received + n_messages
+    ws.arrived.clear()
+    start = time.perf_counter()
+    for i in range(n_messages):
+        publisher.publish_user(1, repr(time.perf_counter()))
+        if i % 1000 == 999:
+            await asyncio.sleep(0)  # 발행 버퍼가 나가도록
+    await ws.arrived.wait()
+    elapsed = time.perf_counter() - start
+    receiver_hub.disconnect(ws)
+    return (
+        statistics.median(latencies) * 1e6,
+        latencies[int(len(latencies) * 0.99)] * 1e6,
+        n_messages / elapsed,
+    )
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+async def run(n_messages: int):
+    results = {}
+
+    hub = ws_hub.ConnectionManager(max_queue=n_messages + LATENCY_SAMPLES)
+    local = pubsub.LocalBus(hub)
+    local.start()
+    results["local"] = await measure(local, hub, n_messages)
+
+    port = free_port()
+    broker = subprocess.Popen([sys.executable, "-m", "backend.services.resp_standin", "--port", str(port)],
+                              stdout=subprocess.DEVNULL)
+    try:
+        for _ in range(100):
+            try:
+                socket.create_connection(("127.0.0.1", port), timeout=0.1).close()
+                break
+            except OSError:
+                await asyncio.sleep(0.05)
+        url = f"redis://127.0.0.1:{port}/0"
+        hub_a, hub_b = ws_hub.ConnectionManager(), ws_hub.ConnectionManager(max_queue=n_messages + LATENCY_SAMPLES)
+        bus_a, bus_b = pubsub.RedisBus(url, hub_a), pubsub.RedisBus(url, hub_b)
+        bus_a.start()
+        bus_b.start()
+        await asyncio.sleep(0.2)
+        results["redis (워커 A→B)"] = await measure(bus_a, hub_b, n_messages)
+        bus_a.stop()
+        bus_b.stop()
+    finally:
+        broker.terminate()
+        broker.wait()
+
+    print(f"📊 사용자 채널 메시지 (지연 {LATENCY_SAMPLES}회, 처리량 {n_messages}개)")
+    print(f"  {'bus':<18}{'p50 µs':>10}{'p99 µs':>10}{'msg/s':>12}")
+    for name, (p50, p99, rate) in results.items():
+        print(f"  {name:<18}{p50:10.1f}{p99:10.1f}{rate:12.0f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="워커 간 메시지 버스 벤치마크")
+    parser.add_argument("--messages", type=int, default=20000)
+    args = parser.parse_args()
+    asyncio.run(run(args.messages))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+"""
+탄소 절감량 / 포인트 계산 엔진 마이크로 벤치마크
+
+실행: python -m backend.benchmarks.bench_scoring
+"""
+import time
+from datetime import datetime
+
+import numpy as np
+
+from backend.services import scoring
+
+N_TRIPS = 1_000_000
+REPEAT = 5
+
+
+def best_of(fn, repeat: int = REPEAT) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    rng = np.random.default_rng(42)
+    codes = rng.integers(0, len(scoring.MODES) - 1, N_TRIPS).astype(np.int8)
+    distances = rng.uniform(0.1, 30.0, N_TRIPS)
+    timestamps = rng.integers(1_700_000_000, 1_760_000_000, N_TRIPS)
+    mode_names = np.array([m.value for m in scoring.MODES[:-1]])[codes]
+
+    # 유효기간이 있는 계수 테이블 (기간 분기 비용 포함)
+    table = scoring.FactorTable([
+        ("BUS", 110.0, datetime(2023, 1, 1), datetime(2024, 12, 31)),
+        ("BUS", 95.0, datetime(2025, 1, 1), None),
+        ("SUBWAY", 45.0, datetime(2023, 1, 1), None),
+        ("CAR", 175.0, datetime(2023, 1, 1), None),
+    ])
+
+    cases = {
+        "batch (int codes, default factors)": lambda: scoring.score_batch(codes, distances),
+        "batch (int codes, dated factors)": lambda: scoring.score_batch(codes, distances, timestamps, table=table),
+        "batch (string modes, dated factors)": lambda: scoring.score_batch(mode_names, distances, timestamps, table=table),
+    }
+
+    print(f"📊 {N_TRIPS:,}건 일괄 계산 (best of {REPEAT})")
+    for name, fn in cases.items():
+        elapsed = best_of(fn)
+        print(f"  {name:<40} {elapsed * 1000:8.1f} ms  ({N_TRIPS / elapsed / 1e6:.1f}M trips/s)")
+
+    # 스칼라 경로 비교 (10만 건)
+    n_scalar = 100_000
+    modes = [scoring.MODES[c] for c in codes[:n_scalar]]
+    dist_list = distances[:n_scalar].tolist()
+
+    def scalar_loop():
+        for mode, distance in zip(modes, dist_list):
+            scoring.score_trip(mode, distance, table=table)
+
+    elapsed = best_of(scalar_loop, repeat=1)
+    print(f"  {'scalar loop (100k)':<40} {elapsed * 1000:8.1f} ms  ({n_scalar / elapsed / 1e6:.2f}M trips/s)")
+
+    # 스칼라/배치 결과 일치 확인
+    batch = scoring.score_batch(codes[:1000], distances[:1000], table=table)
+    scalar_points = [scoring.score_trip(scoring.MODES[c], d, table=table).points for c, d in zip(codes[:1000], distances[:1000])]
+    assert batch.points.tolist() == scalar_points, "scalar/batch mismatch"
+    print("✅ 스칼라/배치 결과 일치")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""
+세션 백엔드별 초당 처리량 벤치마크 (memory / sqlite / redis 대체 서버, 캐시 유무)
+
+- redis 는 services/resp_standin.py 를 같은 프로세스의 스레드로 띄워 측정 (--redis-url 을 주면 그 서버 사용)
+- get 은 같은 세션을 반복 조회하므로 캐시 적중 기준이며, 캐시 없는 값과 비교
+
+실행: python -m backend.benchmarks.bench_session_backends [--sessions 5000] [--redis-url redis://127.0.0.1:6379/0]
+"""
+import argparse
+import os
+import tempfile
+import time
+
+from backend.services.resp import RespClient
+from backend.services.resp_standin import StandinServer
+from backend.services.session_backends import (
+    CachedSessionBackend,
+    RedisSessionBackend,
+    SQLiteSessionBackend,
+)
+from backend.services.session_store import SessionStore
+
+
+def measure(backend, n: int):
+    results = {}
+
+    start = time.perf_counter()
+    ids = [backend.create(i % 1000, {"page": "home", "n": i}).session_id for i in range(n)]
+    results["create"] = n / (time.perf_counter() - start)
+
+    start = time.perf_counter()
+    for sid in ids:
+        backend.get(sid)
+    results["get"] = n / (time.perf_counter() - start)
+
+    start = time.perf_counter()
+    for sid in ids:
+        backend.update(sid, {"page": "mobility"})
+    results["update"] = n / (time.perf_counter() - start)
+
+    start = time.perf_counter()
+    for sid in ids:
+        backend.extend(sid, 3600)
+    results["extend"] = n / (time.perf_counter() - start)
+
+    start = time.perf_counter()
+    for user_id in range(min(n, 1000)):
+        backend.user_sessions(user_id)
+    results["user_sessions"] = min(n, 1000) / (time.perf_counter() - start)
+
+    start = time.perf_counter()
+    for sid in ids:
+        backend.delete(sid)
+    results["delete"] = n / (time.perf_counter() - start)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="세션 백엔드 처리량 벤치마크")
+    parser.add_argument("--sessions", type=int, default=5000)
+    parser.add_argument("--redis-url", default=None)
+    args = parser.parse_args()
+
+    redis_url = args.redis_url or StandinServer(port=0).start_in_thread()
+    tmpdir = tempfile.mkdtemp()
+
+    backends = {
+        "memory": lambda: SessionStore(),
+        "sqlite": lambda: SQLiteSessionBackend(os.path.join(tmpdir, "a.db")),
+        "sqlite+cache": lambda: CachedSessionBackend(SQLiteSessionBackend(os.path.join(tmpdir, "b.db"))),
+        "redis": lambda: RedisSessionBackend(RespClient(redis_url), prefix="bench:a:"),
+        "redis+cache": lambda: CachedSessionBackend(RedisSessionBackend(RespClient(redis_url), prefix="bench:b:")),
+    }
+    ops = ("create", "get", "update", "extend", "user_sessions", "delete")
+
+    print(f"📊 세션 {args.sessions}개, 단일 스레드 ops/s (redis: {redis_url})")
+    print(f"  {'backend':<14}" + "".join(f"{op:>15}" for op in ops))
+    for name, factory in backends.items():
+        backend = factory()
+        results = measure(backend, args.sessions)
+        backend.close()
+        print(f"  {name:<14}" + "".join(f"{results[op]:15.0f}" for op in ops))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""
+대중교통 구간 거리 조회 벤치마크
+
+실행: python -m backend.benchmarks.bench_transit_distance
+"""
+import random
+import time
+
+from backend.services.transit_distance import BusNetwork, SubwayGraph
+
+N_LINES = 9
+STATIONS_PER_LINE = 60
+N_QUERIES = 100_000
+N_BUS_ROUTES = 500
+STOPS_PER_ROUTE = 80
+
+
+def build_subway_edges():
+    """노선 9개 × 역 60개, 노선 간 환승역이 있는 가상 지하철망"""
+    rng = random.Random(7)
+    edges = []
+    for line in range(N_LINES):
+        stations = [f"{line}호선-{i}" for i in range(STATIONS_PER_LINE)]
+        # 다른 노선과 공유하는 환승역
+        for i in range(0, STATIONS_PER_LINE, 10):
+            stations[i] = f"환승-{(line + i) % 15}"
+        for a, b in zip(stations, stations[1:]):
+            edges.append((a, b, round(rng.uniform(0.6, 2.5), 2)))
+    return edges
+
+
+def build_bus_rows():
+    """노선 500개 × 정류장 80개 (정류장 일부는 여러 노선이 공유)"""
+    rng = random.Random(11)
+    rows = []
+    for route in range(N_BUS_ROUTES):
+        stops = [f"정류장-{rng.randrange(20_000)}" for _ in range(STOPS_PER_ROUTE)]
+        for a, b in zip(stops, stops[1:]):
+            rows.append((str(route), a, b, round(rng.uniform(0.2, 1.2), 2)))
+    return rows
+
+
+def bench_bus():
+    rows = build_bus_rows()
+    start = time.perf_counter()
+    network = BusNetwork(rows)
+    build_ms = (time.perf_counter() - start) * 1000
+
+    rng = random.Random(3)
+    queries = []
+    for _ in range(N_QUERIES):
+        route = network.routes[str(rng.randrange(N_BUS_ROUTES))]
+        i, j = sorted(rng.sample(range(len(route.stops)), 2))
+        queries.append((route.stops[i], route.stops[j], route.route_id))
+
+    start = time.perf_counter()
+    for a, b, route_id in queries:
+        network.distance_km(a, b, route_id)
+    with_route_us = (time.perf_counter() - start) / N_QUERIES * 1e6
+
+    start = time.perf_counter()
+    for a, b, _ in queries:
+        network.distance_km(a, b)
+    any_route_us = (time.perf_counter() - start) / N_QUERIES * 1e6
+
+    print(f"📊 버스 노선: {N_BUS_ROUTES}개, 구간 {len(rows)}개")
+    print(f"  노선 로드/누적거리   {build_ms:8.2f} ms")
+    print(f"  정류장 간 거리(노선) {with_route_us:8.2f} µs/query")
+    print(f"  정류장 간 거리(전체) {any_route_us:8.2f} µs/query")
+
+
+def main():
+    edges = build_subway_edges()
+
+    start = time.perf_counter()
+    graph = SubwayGraph(edges)
+    build_ms = (time.perf_counter() - start) * 1000
+
+    start = time.perf_counter()
+    graph.precompute()
+    precompute_ms = (time.perf_counter() - start) * 1000
+
+    rng = random.Random(1)
+    pairs = [(rng.choice(graph.names), rng.choice(graph.names)) for _ in range(N_QUERIES)]
+    start = time.perf_counter()
+    for a, b in pairs:
+        graph.distance_km(a, b)
+    per_query_us = (time.perf_counter() - start) / N_QUERIES * 1e6
+
+    print(f"📊 지하철 그래프: 역 {len(graph)}개, 구간 {len(edges)}개")
+    print(f"  그래프 생성          {build_ms:8.2f} ms")
+    print(f"  전체 최단거리 계산   {precompute_ms:8.2f} ms")
+    print(f"  역 간 거리 조회      {per_query_us:8.2f} µs/query")
+
+    bench_bus()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+"""
+이동 시간대 중복 검사 벤치마크
+
+실행: python -m backend.benchmarks.bench_trip_index
+"""
+import time
+from datetime import datetime, timedelta
+
+import numpy as np
+
+from backend.services.trip_index import UserTripIndex, dedupe_trips
+
+N_CACHED_TRIPS = 500
+N_CHECKS = 100_000
+N_BULK_TRIPS = 200_000
+N_BULK_USERS = 5_000
+
+
+def bench_single():
+    now = datetime(2025, 10, 1)
+    rows = [
+        (i, now - timedelta(hours=3 * i), now - timedelta(hours=3 * i) + timedelta(minutes=40))
+        for i in range(N_CACHED_TRIPS)
+    ]
+    index = UserTripIndex(now - timedelta(days=90), rows)
+
+    rng = np.random.default_rng(5)
+    offsets = rng.integers(0, 3 * N_CACHED_TRIPS * 60, N_CHECKS).tolist()
+    checks = [(now - timedelta(minutes=m), now - timedelta(minutes=m) + timedelta(minutes=25)) for m in offsets]
+
+    start = time.perf_counter()
+    overlaps = sum(index.find_overlap(s, e) is not None for s, e in checks)
+    per_check_us = (time.perf_counter() - start) / N_CHECKS * 1e6
+    print(f"📊 단건 겹침 검사 (캐시된 이동 {N_CACHED_TRIPS}건)")
+    print(f"  {per_check_us:8.2f} µs/check  (겹침 {overlaps:,}건)")
+
+
+def bench_bulk():
+    rng = np.random.default_rng(9)
+    users = rng.integers(1, N_BULK_USERS, N_BULK_TRIPS)
+    starts = np.datetime64("2025-09-01T00:00:00") + rng.integers(0, 30 * 24 * 3600, N_BULK_TRIPS).astype("timedelta64[s]")
+    ends = starts + rng.integers(300, 3600, N_BULK_TRIPS).astype("timedelta64[s]")
+    # 재전송된 중복 10%
+    dup = rng.choice(N_BULK_TRIPS, N_BULK_TRIPS // 10, replace=False)
+    users = np.concatenate([users, users[dup]])
+    starts = np.concatenate([starts, starts[dup]])
+    ends = np.concatenate([ends, ends[dup]])
+
+    start = time.perf_counter()
+    keep = dedupe_trips(None, users, starts, ends)
+    elapsed = time.perf_counter() - start
+    print(f"📊 일괄 중복 제거 ({users.size:,}건, 사용자 {N_BULK_USERS:,}명)")
+    print(f"  {elapsed * 1000:8.1f} ms  (유지 {int(keep.sum()):,}건 / 제거 {int((~keep).sum()):,}건)")
+
+
+def main():
+    bench_single()
+    bench_bulk()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+"""
+WebSocket 팬아웃 부하 테스트 (가상 클라이언트 10k, 네트워크 없이 송신 큐/writer 동작만)
+
+- 빠른 클라이언트, 느린 클라이언트(메시지당 SLOW_DELAY), 멈춘 클라이언트(전송이 끝나지 않음)를 섞어 연결
+- broadcast 가 바로 반환되는지, 느린/멈춘 클라이언트가 있어도 빠른 클라이언트에 모두 도착하는지 측정
+- 비교용으로 예전 방식(연결마다 차례로 await send_text)의 메시지 1개 전송 시간도 측정
+
+실행: python -m backend.benchmarks.bench_ws_fanout [--clients 10000] [--messages 200]
+"""
+import argparse
+import asyncio
+import json
+import time
+
+from backend.services import ws_hub
+
+SLOW_RATIO = 0.01
+STUCK_RATIO = 0.001
+SLOW_DELAY = 0.02
+
+
+class FakeWebSocket:
+    __slots__ = ("kind", "received", "done", "expected", "closed")
+
+    def __init__(self, kind: str, expected: int, done: asyncio.Event):
+        self.kind = kind
+        self.received = 0
+        self.expected = expected
+        self.done = done
+        self.closed = False
+
+    async def accept(self):
+        pass
+
+    async def send_text(self, message: str):
+        if self.kind == "slow":
+            await asyncio.sleep(SLOW_DELAY)
+        elif self.kind == "stuck":
+            await asyncio.Event().wait()
+        self.received += 1
+        if self.kind == "fast" and self.received == self.expected:
+            self.done.set()
+
+    async def close(self):
+        self.closed = True
+
+
+def make_clients(n: int, expected: int):
+    clients = []
+    for i in range(n):
+        if i % int(1 / STUCK_RATIO) == 1:
+            kind = "stuck"
+        elif i % int(1 / SLOW_RATIO) == 0:
+            kind = "slow"
+        else:
+            kind = "fast"
+        clients.append(FakeWebSocket(kind, expected, asyncio.Event()))
+    return clients
+
+
+async def sequential_send(clients, message: str) -> float:
+    """예전 ConnectionManager.broadcast 와 같은 순차 전송 (멈춘 클라이언트는 제외하고 측정)"""
+    start = time.perf_counter()
+    for ws in clients:
+        if ws.kind != "stuck":
+            await ws.send_text(message)
+    return time.perf_counter() - start
+
+
+async def run(n_clients: int, n_messages: int):
+    ws_hub.SEND_TIMEOUT_SECONDS = 1.0
+    ws_hub.WATCHDOG_INTERVAL_SECONDS = 0.2
+    hub = ws_hub.ConnectionManager()
+    clients = make_clients(n_clients, n_messages)
+    fast = [ws for ws in clients if ws.kind == "fast"]
+
+    start = time.perf_counter()
+    for i, ws in enumerate(clients):
+        await hub.connect(ws, user_id=i // 2)  # 사용자당 기기 2대
+    connect_s = time.perf_counter() - start
+
+    payloads = [json.dumps({"type": "leaderboard_update", "seq": k, "data": list(range(50))}) for k in range(n_messages)]
+    enqueue = []
+    start = time.perf_counter()
+    for payload in payloads:
+        t = time.perf_counter()
+        hub.broadcast(payload, key="leaderboard")
+        enqueue.append(time.perf_counter() - t)
+        await asyncio.sleep(0)
+    await asyncio.gather(*(ws.done.wait() for ws in fast))
+    deliver_s = time.perf_counter() - start
+
+    await asyncio.sleep(ws_hub.SEND_TIMEOUT_SECONDS + 0.2)  # 멈춘 클라이언트 시간 초과
+    stats = hub.stats()
+    stuck_closed = sum(ws.closed for ws in clients if ws.kind == "stuck")
+    slow_received = [ws.received for ws in clients if ws.kind == "slow"]
+
+    old_s = await sequential_send(make_clients(n_clients, 1), payloads[0])
+
+    for ws in list(hub.connections):
+        hub.disconnect(ws)
+
+    print(f"📊 가상 클라이언트 {n_clients} (느림 {len(slow_received)}, 멈춤 {n_clients // int(1 / STUCK_RATIO)}), 메시지 {n_messages}개")
+    print(f"  연결 등록                 {connect_s * 1000:10.1f} ms")
+    print(f"  broadcast 1회 (큐 적재)   {sum(enqueue) / len(enqueue) * 1000:10.2f} ms 평균, 최대 {max(enqueue) * 1000:.2f} ms")
+    print(f"  빠른 클라이언트 전체 수신 {deliver_s * 1000:10.1f} ms ({len(fast) * n_messages / deliver_s:,.0f} msg/s)")
+    print(f"  느린 클라이언트 수신      평균 {sum(slow_received) / len(slow_received):.1f} / {n_messages}"
+          f" (버림 {stats['dropped']}, 합침 {stats['coalesced']})")
+    print(f"  멈춘 클라이언트 종료      {stuck_closed} 개 (시간 초과 {stats['timed_out']}), 남은 연결 {stats['connections']}")
+    print(f"  예전 순차 전송 (메시지 1) {old_s * 1000:10.1f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="WebSocket 팬아웃 부하 테스트")
+    parser.add_argument("--clients", type=int, default=10000)
+    parser.add_argument("--messages", type=int, default=200)
+    args = parser.parse_args()
+    asyncio.run(run(args.clients, args.messages))
+
+
+if __name__ == "__main__":
+    main()
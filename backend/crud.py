@@ -1,9 +1,11 @@
-<<<<<<< HEAD
 from sqlalchemy.orm import Session
-from datetime import datetime, timezone
-from sqlalchemy import func
+from sqlalchemy.exc import IntegrityError
+from typing import Optional
 from . import models, schemas
 from .schemas import UserContext
+from .services import challenge_progress, ingest_adapters, scoring, transit_distance, trip_events
+from .services.challenge_index import challenge_index, record_change
+from .jobs.settle_challenges import scheduler as settlement_scheduler
 
 # =========================
 # UserGroup
@@ -58,6 +60,7 @@ def delete_user(db: Session, user_id: int):
     # Delete related CreditsLedger entries
     db.query(models.CreditsLedger).filter(models.CreditsLedger.user_id == user_id).delete(synchronize_session=False)
     # Delete related ChallengeMembers
+    challenge_progress.remove_user(db, user_id)
     db.query(models.ChallengeMember).filter(models.ChallengeMember.user_id == user_id).delete(synchronize_session=False)
     # Delete related UserGarden and GardenWateringLogs
     db.query(models.GardenWateringLog).filter(models.GardenWateringLog.user_id == user_id).delete(synchronize_session=False)
@@ -66,13 +69,16 @@ def delete_user(db: Session, user_id: int):
     db.query(models.Challenge).filter(models.Challenge.created_by == user_id).delete(synchronize_session=False)
     # Delete UserAchievements
     db.query(models.UserAchievement).filter(models.UserAchievement.user_id == user_id).delete(synchronize_session=False)
+    db.query(models.UserCounter).filter(models.UserCounter.user_id == user_id).delete(synchronize_session=False)
     # Delete Notifications
     db.query(models.Notification).filter(models.Notification.user_id == user_id).delete(synchronize_session=False)
     # Delete IngestRaw entries
     db.query(models.IngestRaw).filter(models.IngestRaw.user_id == user_id).delete(synchronize_session=False)
 
     db.delete(user)
+    record_change(db, user_id)
     db.commit()
+    challenge_index.invalidate()
     return user
 
 def get_user_with_group(db: Session, user_id: int) -> UserContext | None:
@@ -101,275 +107,69 @@ def authenticate_user(db: Session, username: str, password: str):
 # =========================
 # MobilityLog
 # =========================
-def create_mobility_log(db: Session, log: schemas.MobilityLogCreate):
-    # Get carbon factor for the mode
-    carbon_factor = db.query(models.CarbonFactor).filter(
-        models.CarbonFactor.mode == log.mode,
-        models.CarbonFactor.valid_from <= log.started_at,
-        models.CarbonFactor.valid_to >= log.ended_at
-    ).first()
-
-    if not carbon_factor:
-        # Fallback or raise error if no carbon factor found
-        # For simplicity, let's assume a default or raise an error
-        # For now, we'll use a default if not found, or 0 saved
-        co2_saved_g = 0.0
-        print(f"Warning: No carbon factor found for mode {log.mode}. CO2 saved set to 0.")
-    else:
-        co2_saved_g = float(log.distance_km) * float(carbon_factor.g_per_km)
-
-    # Calculate points earned (e.g., 1 point per 100g CO2 saved)
-    points_earned = int(co2_saved_g / 100) # 1 point per 100g saved
-
-    db_log = models.MobilityLog(
-        user_id=log.user_id,
-        mode=log.mode,
-        distance_km=log.distance_km,
-        started_at=log.started_at,
-        ended_at=log.ended_at,
-        co2_saved_g=co2_saved_g,
-        points_earned=points_earned,
-        description=log.description,
-        start_point=log.start_point,
-        end_point=log.end_point,
-        # source_id, raw_ref_id, co2_baseline_g, co2_actual_g, used_at can be added if needed
-    )
-    db.add(db_log)
-    db.commit()
-    db.refresh(db_log)
-    return db_log
-
-# =========================
-# Challenge
-# =========================
-def create_challenge(db: Session, challenge: schemas.ChallengeCreate):
-    db_challenge = models.Challenge(
-        title=challenge.title,
-        description=challenge.description,
-        scope=challenge.scope,
-        target_mode=challenge.target_mode,
-        target_saved_g=challenge.target_saved_g,
-        start_at=challenge.start_at,
-        end_at=challenge.end_at,
-        reward=challenge.reward,
-        created_by=challenge.created_by
-    )
-    db.add(db_challenge)
-    db.commit()
-    db.refresh(db_challenge)
-    return db_challenge
-
-def get_challenge(db: Session, challenge_id: int):
-    return db.query(models.Challenge).filter(models.Challenge.challenge_id == challenge_id).first()
-
-def get_challenges(db: Session, skip: int = 0, limit: int = 100):
-    return db.query(models.Challenge).offset(skip).limit(limit).all()
-
-def update_challenge(db: Session, challenge_id: int, challenge: schemas.ChallengeCreate):
-    db_challenge = db.query(models.Challenge).filter(models.Challenge.challenge_id == challenge_id).first()
-    if db_challenge:
-        for key, value in challenge.dict(exclude_unset=True).items():
-            setattr(db_challenge, key, value)
-        db.commit()
-        db.refresh(db_challenge)
-    return db_challenge
-
-def delete_challenge(db: Session, challenge_id: int):
-    db_challenge = db.query(models.Challenge).filter(models.Challenge.challenge_id == challenge_id).first()
-    if db_challenge:
-        db.delete(db_challenge)
-        db.commit()
-    return db_challenge
-
-# =========================
-# ChallengeMember
-# =========================
-def join_challenge(db: Session, user_id: int, challenge_id: int):
-    # Check if the user has already joined this challenge
-    existing_member = db.query(models.ChallengeMember).filter(
-        models.ChallengeMember.user_id == user_id,
-        models.ChallengeMember.challenge_id == challenge_id
-    ).first()
-
-    if existing_member:
-        # User has already joined, return the existing membership
-        return existing_member
-    
-    db_member = models.ChallengeMember(user_id=user_id, challenge_id=challenge_id)
-    db.add(db_member)
-    db.commit()
-    db.refresh(db_member)
-    return db_member
-
-def leave_challenge(db: Session, user_id: int, challenge_id: int):
-    db_member = db.query(models.ChallengeMember).filter(
-        models.ChallengeMember.user_id == user_id,
-        models.ChallengeMember.challenge_id == challenge_id
-    ).first()
-    if db_member:
-        db.delete(db_member)
-        db.commit()
-    return db_member
-
-def get_user_challenges(db: Session, user_id: int, skip: int = 0, limit: int = 100):
-    return db.query(models.Challenge).join(models.ChallengeMember).filter(
-        models.ChallengeMember.user_id == user_id
-    ).offset(skip).limit(limit).all()
-
-# =========================
-# Challenge Progress Calculation
-# =========================
-def calculate_challenge_progress(db: Session, user_id: int, challenge: models.Challenge) -> float:
-    total_saved_g = db.query(func.sum(models.MobilityLog.co2_saved_g)).filter(
+def get_mobility_log_by_ref(db: Session, source_id: int, user_id: int, raw_ref_id: str):
+    """
+    사용자가 보낸 raw_ref_id 로 이미 기록된 이동을 찾습니다. ((source_id, raw_ref_id) 유니크 키)
+    raw_ref_id 는 사용자별로 구분해 저장하므로 다른 사용자의 기록은 찾지 않습니다.
+    """
+    return db.query(models.MobilityLog).filter(
+        models.MobilityLog.source_id == source_id,
+        models.MobilityLog.raw_ref_id == ingest_adapters.user_ref_id(user_id, raw_ref_id),
         models.MobilityLog.user_id == user_id,
-        models.MobilityLog.started_at >= challenge.start_at,
-        models.MobilityLog.ended_at <= challenge.end_at,
-        (models.MobilityLog.mode == challenge.target_mode) if challenge.target_mode != schemas.TransportMode.ANY else True
-    ).scalar()
-
-    if total_saved_g is None:
-        total_saved_g = 0
-
-    progress = (total_saved_g / challenge.target_saved_g) * 100 if challenge.target_saved_g > 0 else 0
-    return min(progress, 100.0) # Cap progress at 100%
-=======
-from sqlalchemy.orm import Session
-from datetime import datetime, timezone
-from sqlalchemy import func
-from . import models, schemas
-from .schemas import UserContext
-
-# =========================
-# UserGroup
-# =========================
-def create_user_group(db: Session, group: schemas.UserGroupCreate):
-    db_group = models.UserGroup(
-        group_name=group.group_name,
-        group_type=group.group_type,
-        region_code=group.region_code
-    )
-    db.add(db_group)
-    db.commit()
-    db.refresh(db_group)
-    return db_group
-
-def get_user_groups(db: Session, skip: int = 0, limit: int = 100):
-    return db.query(models.UserGroup).offset(skip).limit(limit).all()
+    ).first()
 
+def create_mobility_log(db: Session, log: schemas.MobilityLogCreate, source_id: Optional[int] = None):
+    # 같은 raw_ref_id 재전송이면 기존 기록을 그대로 반환
+    if log.raw_ref_id is not None:
+        existing = get_mobility_log_by_ref(db, source_id, log.user_id, log.raw_ref_id)
+        if existing is not None:
+            return existing
 
-# =========================
-# User
-# =========================
-def create_user(db: Session, user: schemas.UserCreate):
-    db_user = models.User(
-        username=user.username,
-        email=user.email,
-        password_hash=user.password_hash,
-        role=user.role,
-        user_group_id=user.user_group_id
+    distance_km = transit_distance.resolve_distance_km(
+        db, log.mode, log.start_point, log.end_point, route_id=log.route_id
     )
-    db.add(db_user)
-    db.commit()
-    db.refresh(db_user)
-    return db_user
-
-def get_users(db: Session, skip: int = 0, limit: int = 100):
-    return db.query(models.User).offset(skip).limit(limit).all()
-
-def get_user_by_id(db: Session, user_id: int):
-    return db.query(models.User).filter(models.User.user_id == user_id).first()
-
-def get_user_by_username(db: Session, username: str):
-    return db.query(models.User).filter(models.User.username == username).first()
-
-def delete_user(db: Session, user_id: int):
-    user = db.query(models.User).filter(models.User.user_id == user_id).first()
-    if not user:
-        return None
-
-    # Delete related MobilityLogs
-    db.query(models.MobilityLog).filter(models.MobilityLog.user_id == user_id).delete(synchronize_session=False)
-    # Delete related CreditsLedger entries
-    db.query(models.CreditsLedger).filter(models.CreditsLedger.user_id == user_id).delete(synchronize_session=False)
-    # Delete related ChallengeMembers
-    db.query(models.ChallengeMember).filter(models.ChallengeMember.user_id == user_id).delete(synchronize_session=False)
-    # Delete related UserGarden and GardenWateringLogs
-    db.query(models.GardenWateringLog).filter(models.GardenWateringLog.user_id == user_id).delete(synchronize_session=False)
-    db.query(models.UserGarden).filter(models.UserGarden.user_id == user_id).delete(synchronize_session=False)
-    # Delete Challenges created by the user
-    db.query(models.Challenge).filter(models.Challenge.created_by == user_id).delete(synchronize_session=False)
-    # Delete UserAchievements
-    db.query(models.UserAchievement).filter(models.UserAchievement.user_id == user_id).delete(synchronize_session=False)
-    # Delete Notifications
-    db.query(models.Notification).filter(models.Notification.user_id == user_id).delete(synchronize_session=False)
-    # Delete IngestRaw entries
-    db.query(models.IngestRaw).filter(models.IngestRaw.user_id == user_id).delete(synchronize_session=False)
-
-    db.delete(user)
-    db.commit()
-    return user
-
-def get_user_with_group(db: Session, user_id: int) -> UserContext | None:
-    result = (
-        db.query(models.User.username, models.UserGroup.group_name, models.UserGroup.group_type)
-        .join(models.UserGroup, models.User.user_group_id == models.UserGroup.group_id, isouter=True)
-        .filter(models.User.user_id == user_id)
-        .first()
+    if distance_km is None:
+        distance_km = log.distance_km
+    if distance_km is None:
+        raise ValueError("distance_km is required when it cannot be derived from start_point/end_point")
+
+    score = scoring.score_trip(
+        log.mode,
+        distance_km,
+        at=log.started_at,
+        table=scoring.get_factor_table(db),
     )
-    if result:
-        username, group_name, group_type = result
-        return UserContext(username=username, group_name=group_name, group_type=group_type)
-    return None
-
-def authenticate_user(db: Session, username: str, password: str):
-    # In a real application, you would hash the password and compare it with the stored hash.
-    # For simplicity, we're doing a direct comparison here.
-    # Also, you might want to allow login with email as well.
-    user = db.query(models.User).filter(
-        (models.User.username == username) | (models.User.email == username)
-    ).first()
-    if not user or user.password_hash != password: # Assuming password_hash stores plain password for now
-        return None
-    return user
-
-# =========================
-# MobilityLog
-# =========================
-def create_mobility_log(db: Session, log: schemas.MobilityLogCreate):
-    # Get carbon factor for the mode
-    carbon_factor = db.query(models.CarbonFactor).filter(
-        models.CarbonFactor.mode == log.mode,
-        models.CarbonFactor.valid_from <= log.started_at,
-        models.CarbonFactor.valid_to >= log.ended_at
-    ).first()
-
-    if not carbon_factor:
-        # Fallback or raise error if no carbon factor found
-        # For simplicity, let's assume a default or raise an error
-        # For now, we'll use a default if not found, or 0 saved
-        co2_saved_g = 0.0
-        print(f"Warning: No carbon factor found for mode {log.mode}. CO2 saved set to 0.")
-    else:
-        co2_saved_g = float(log.distance_km) * float(carbon_factor.g_per_km)
-
-    # Calculate points earned (e.g., 1 point per 100g CO2 saved)
-    points_earned = int(co2_saved_g / 100) # 1 point per 100g saved
 
     db_log = models.MobilityLog(
         user_id=log.user_id,
         mode=log.mode,
-        distance_km=log.distance_km,
+        distance_km=distance_km,
         started_at=log.started_at,
         ended_at=log.ended_at,
-        co2_saved_g=co2_saved_g,
-        points_earned=points_earned,
+        co2_baseline_g=score.co2_baseline_g,
+        co2_actual_g=score.co2_actual_g,
+        co2_saved_g=score.co2_saved_g,
+        points_earned=score.points,
         description=log.description,
         start_point=log.start_point,
         end_point=log.end_point,
-        # source_id, raw_ref_id, co2_baseline_g, co2_actual_g, used_at can be added if needed
+        source_id=source_id,
+        raw_ref_id=ingest_adapters.user_ref_id(log.user_id, log.raw_ref_id) if log.raw_ref_id else None,
     )
     db.add(db_log)
-    db.commit()
+    # 참여 챌린지 진행률/업적도 같은 트랜잭션에서 갱신
+    trip_events.trips_logged(db, [trip_events.TripEvent(
+        log.user_id, log.mode, log.started_at, log.ended_at, distance_km, score.co2_saved_g, score.points
+    )])
+    try:
+        db.commit()
+    except IntegrityError:
+        # 동시에 들어온 같은 raw_ref_id 가 먼저 기록됨
+        db.rollback()
+        existing = get_mobility_log_by_ref(db, source_id, log.user_id, log.raw_ref_id) if log.raw_ref_id else None
+        if existing is None:
+            raise
+        return existing
     db.refresh(db_log)
     return db_log
 
@@ -389,8 +189,11 @@ def create_challenge(db: Session, challenge: schemas.ChallengeCreate):
         created_by=challenge.created_by
     )
     db.add(db_challenge)
+    record_change(db)
     db.commit()
     db.refresh(db_challenge)
+    challenge_index.invalidate()
+    settlement_scheduler.schedule(db_challenge.challenge_id, db_challenge.end_at)
     return db_challenge
 
 def get_challenge(db: Session, challenge_id: int):
@@ -404,15 +207,24 @@ def update_challenge(db: Session, challenge_id: int, challenge: schemas.Challeng
     if db_challenge:
         for key, value in challenge.dict(exclude_unset=True).items():
             setattr(db_challenge, key, value)
+        # 대상 교통수단/기간이 바뀌었을 수 있으므로 참여자 진행률 재계산
+        challenge_progress.rebuild_challenge(db, db_challenge)
+        record_change(db)
         db.commit()
         db.refresh(db_challenge)
+        challenge_index.invalidate()
+        settlement_scheduler.schedule(db_challenge.challenge_id, db_challenge.end_at)
     return db_challenge
 
 def delete_challenge(db: Session, challenge_id: int):
     db_challenge = db.query(models.Challenge).filter(models.Challenge.challenge_id == challenge_id).first()
     if db_challenge:
+        challenge_progress.remove_challenge(db, challenge_id)
         db.delete(db_challenge)
+        record_change(db)
         db.commit()
+        challenge_index.invalidate()
+        settlement_scheduler.cancel(challenge_id)
     return db_challenge
 
 # =========================
@@ -431,7 +243,12 @@ def join_challenge(db: Session, user_id: int, challenge_id: int):
     
     db_member = models.ChallengeMember(user_id=user_id, challenge_id=challenge_id)
     db.add(db_member)
+    challenge = get_challenge(db, challenge_id)
+    if challenge is not None:
+        challenge_progress.seed_member(db, challenge, user_id)
+    record_change(db, user_id)
     db.commit()
+    challenge_index.add_member(challenge_id, user_id)
     db.refresh(db_member)
     return db_member
 
@@ -441,8 +258,11 @@ def leave_challenge(db: Session, user_id: int, challenge_id: int):
         models.ChallengeMember.challenge_id == challenge_id
     ).first()
     if db_member:
+        challenge_progress.remove_member(db, challenge_id, user_id)
         db.delete(db_member)
+        record_change(db, user_id)
         db.commit()
+        challenge_index.remove_member(challenge_id, user_id)
     return db_member
 
 def get_user_challenges(db: Session, user_id: int, skip: int = 0, limit: int = 100):
@@ -454,17 +274,6 @@ def get_user_challenges(db: Session, user_id: int, skip: int = 0, limit: int = 1
 # Challenge Progress Calculation
 # =========================
 def calculate_challenge_progress(db: Session, user_id: int, challenge: models.Challenge) -> float:
-    from . import models
-    total_saved_g = db.query(func.sum(models.MobilityLog.co2_saved_g)).filter(
-        models.MobilityLog.user_id == user_id,
-        models.MobilityLog.started_at >= challenge.start_at,
-        models.MobilityLog.ended_at <= challenge.end_at,
-        (models.MobilityLog.mode == challenge.target_mode) if challenge.target_mode != schemas.TransportMode.ANY else True
-    ).scalar()
-
-    if total_saved_g is None:
-        total_saved_g = 0
-
-    progress = (total_saved_g / challenge.target_saved_g) * 100 if challenge.target_saved_g > 0 else 0
-    return min(progress, 100.0) # Cap progress at 100%
->>>>>>> 20cdeef2606b3074ac01baad216e4ea7dbd897d5
+    # 이동 기록 시 증분 갱신되는 challenge_progress 를 읽음 (mobility_logs SUM 없음)
+    saved_g = challenge_progress.progress_for_user(db, user_id).get(challenge.challenge_id)
+    return challenge_progress.percent(saved_g, challenge.target_saved_g)
@@ -48,6 +48,7 @@ def init_db():
     from .models import Base
     from .seed_admin_user import seed_admin_user
     from .seed_challenges import seed_challenges
+    from .seed_achievements import seed_achievements
     from .seed_garden_levels import seed_garden_levels
     from .crud import create_user_group # Assuming this is needed for initial groups
 
@@ -60,6 +61,7 @@ def init_db():
         # Example: create_user_group(db, schemas.UserGroupCreate(group_name="Default Group", group_type="ETC"))
         seed_admin_user(db)
         seed_challenges(db)
+        seed_achievements(db)
         seed_garden_levels(db)
     except Exception as e:
         print(f"Error during database seeding: {e}")
@@ -2,6 +2,7 @@ from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
 from jose import JWTError, jwt
 from sqlalchemy.orm import Session
+from typing import Optional
 from . import models, schemas
 from .database import get_db
 import os
@@ -15,21 +16,26 @@ if not SECRET_KEY or not ALGORITHM:
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="auth/login")
 
+def user_id_from_token(token: Optional[str]) -> Optional[int]:
+    """JWT 의 sub(user_id), 토큰이 없거나 유효하지 않으면 None (WebSocket 인증에도 사용)"""
+    if not token:
+        return None
+    try:
+        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+        return schemas.TokenData(user_id=payload.get("sub")).user_id
+    except (JWTError, ValueError):
+        return None
+
 def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)):
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
-    try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        user_id: int = payload.get("sub")
-        if user_id is None:
-            raise credentials_exception
-        token_data = schemas.TokenData(user_id=user_id)
-    except JWTError:
+    user_id = user_id_from_token(token)
+    if user_id is None:
         raise credentials_exception
-    user = db.query(models.User).filter(models.User.user_id == token_data.user_id).first()
+    user = db.query(models.User).filter(models.User.user_id == user_id).first()
     if user is None:
         raise credentials_exception
     return user
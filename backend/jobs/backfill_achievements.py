@@ -0,0 +1,298 @@
+#!/usr/bin/env python3
+"""
+업적 카운터/업적 일괄 백필(backfill) 작업
+
+업적 규칙을 추가했거나 카운터가 어긋났을 때(재계산 배치 후 등) 전체 사용자를 한 번에 다시 평가합니다.
+- user_id 범위(span)를 나누고, span 안에서 사용자 block_size 명씩 keyset 블록으로 처리
+- 블록마다 GROUP BY 두 번으로 카운터 계산 (사용자별 카운터 쿼리 루프 없음)
+    mobility_logs  : (user_id, mode) 별 이동 수 / 거리 / 절감량 / 포인트
+    credits_ledger : 챌린지 보상 EARN 적립 포인트 (이동 포인트는 mobility_logs 쪽에서 합산)
+  연속 일수는 블록 사용자의 친환경 이동 시각을 읽어 KST 날짜 run 으로 한 번에 계산 (services/streaks.py)
+- 카운터 행렬(사용자 × metric) ≥ 임계값 벡터로 모든 규칙을 한 번에 판정하고,
+  이미 받은 업적을 뺀 나머지를 user_achievements 에 bulk INSERT
+- 카운터는 계산값으로 덮어씀. 블록 사용자의 카운터 행을 먼저 잠가 두므로 백필 중 기록된 이동의 증분도 사라지지 않음
+- span 별 체크포인트(job_checkpoints)를 같은 트랜잭션에서 갱신하므로 중단 후 같은 run-id 로 재시작 가능
+- --workers 로 프로세스 풀 병렬 실행
+
+실행: python -m backend.jobs.backfill_achievements --run-id 2025-10-rules --workers 4 [--block-size 5000]
+"""
+import argparse
+import json
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from typing import Any, Dict, List, Sequence, Tuple
+
+import numpy as np
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from .. import models
+from ..database import SessionLocal, engine
+from ..services import achievement_engine, scoring, streaks
+from ..services.upsert import insert_ignore, upsert
+from .settle_challenges import REWARD_REASON_PREFIX
+
+JOB_PREFIX = "achievement_backfill"
+DEFAULT_BLOCK_SIZE = 5000
+
+FIELDS = achievement_engine.TRIP_FIELDS
+# 규칙 판정 열: 카운터 + 연속 일수 (백필에서는 과거에 달성한 연속 일수도 인정하도록 최장 연속 일수 사용)
+FIELD_INDEX = {field: i for i, field in enumerate(FIELDS + ["streak_days"])}
+INT_FIELDS = {"eco_trips", "points_earned"} | {f for f in FIELDS if f.startswith("trips_")}
+
+# 교통수단 코드(scoring.MODES 순서) → 이동 수 / 거리 카운터 열 (ANY 는 이동 기록에 없음)
+_TRIP_COLUMNS = np.array([FIELD_INDEX.get(f"trips_{m.value.lower()}", -1) for m in scoring.MODES])
+_KM_COLUMNS = np.array([FIELD_INDEX.get(f"km_{m.value.lower()}", -1) for m in scoring.MODES])
+_ECO_MODES = np.array([m not in (scoring.BASELINE_MODE, models.TransportMode.ANY) for m in scoring.MODES])
+
+# (체크포인트 이름, 시작 user_id, 끝 user_id, 마지막 처리 user_id)
+Span = Tuple[str, int, int, int]
+
+
+def _empty_report() -> Dict[str, Any]:
+    return {"users": 0, "counters_written": 0, "achievements_granted": 0, "by_achievement": {}}
+
+
+def merge_reports(reports: List[Dict[str, Any]]) -> Dict[str, Any]:
+    merged = _empty_report()
+    for report in reports:
+        for key in ("users", "counters_written", "achievements_granted"):
+            merged[key] += report[key]
+        for achievement_id, count in report["by_achievement"].items():
+            merged["by_achievement"][achievement_id] = merged["by_achievement"].get(achievement_id, 0) + count
+    return merged
+
+
+def plan_spans(db: Session, run_id: str, workers: int) -> List[Span]:
+    """기존 체크포인트가 있으면 이어서, 없으면 user_id 범위를 workers 개로 나눕니다."""
+    existing = db.query(models.JobCheckpoint).filter(
+        models.JobCheckpoint.job_name.like(f"{JOB_PREFIX}:{run_id}:%")
+    ).order_by(models.JobCheckpoint.job_name).all()
+    if existing:
+        return [(cp.job_name, cp.meta_json["lo"], cp.meta_json["hi"], cp.last_id) for cp in existing]
+
+    lo, hi = db.query(func.min(models.User.user_id), func.max(models.User.user_id)).one()
+    if lo is None:
+        return []
+
+    step = -(-(hi - lo + 1) // max(workers, 1))
+    spans = []
+    for index, span_lo in enumerate(range(lo, hi + 1, step)):
+        span_hi = min(span_lo + step - 1, hi)
+        spans.append((f"{JOB_PREFIX}:{run_id}:{index:04d}", span_lo, span_hi, span_lo - 1))
+
+    db.add_all([
+        models.JobCheckpoint(job_name=name, last_id=last_id, meta_json={"lo": span_lo, "hi": span_hi})
+        for name, span_lo, span_hi, last_id in spans
+    ])
+    db.commit()
+    return spans
+
+
+def compute_counters(db: Session, user_ids: np.ndarray) -> np.ndarray:
+    """정렬된 user_id 블록의 (사용자 수, len(FIELDS)) 카운터 행렬 (user_id 범위 GROUP BY 두 번)"""
+    lo, hi = int(user_ids[0]), int(user_ids[-1])
+    log = models.MobilityLog
+    ledger = models.CreditsLedger
+    counters = np.zeros((user_ids.size, len(FIELDS)), dtype=np.float64)
+
+    by_mode = db.query(
+        log.user_id, log.mode, func.count(log.log_id),
+        func.sum(log.distance_km), func.sum(log.co2_saved_g), func.sum(log.points_earned),
+    ).filter(log.user_id.between(lo, hi)).group_by(log.user_id, log.mode).all()
+    if by_mode:
+        user_col = np.array([r[0] for r in by_mode], dtype=np.int64)
+        keep = np.isin(user_col, user_ids)
+        rows = np.searchsorted(user_ids, user_col[keep])
+        codes = scoring.encode_modes([getattr(r[1], "value", r[1]) for r in by_mode])[keep]
+        values = np.array([[r[2], float(r[3] or 0), float(r[4] or 0), float(r[5] or 0)] for r in by_mode])[keep]
+        trip_cols, km_cols = _TRIP_COLUMNS[codes], _KM_COLUMNS[codes]
+        known = trip_cols >= 0
+        np.add.at(counters, (rows[known], trip_cols[known]), values[known, 0])
+        np.add.at(counters, (rows[known], km_cols[known]), values[known, 1])
+        eco = _ECO_MODES[codes]
+        np.add.at(counters[:, FIELD_INDEX["eco_trips"]], rows[eco], values[eco, 0])
+        np.add.at(counters[:, FIELD_INDEX["total_saved_g"]], rows, values[:, 2])
+        np.add.at(counters[:, FIELD_INDEX["points_earned"]], rows, values[:, 3])
+
+    rewards = db.query(ledger.user_id, func.sum(ledger.points)).filter(
+        ledger.user_id.between(lo, hi),
+        ledger.type == models.CreditType.EARN,
+        ledger.reason.like(f"{REWARD_REASON_PREFIX}%"),
+    ).group_by(ledger.user_id).all()
+    if rewards:
+        user_col = np.array([r[0] for r in rewards], dtype=np.int64)
+        keep = np.isin(user_col, user_ids)
+        points = np.array([float(r[1] or 0) for r in rewards])[keep]
+        np.add.at(counters[:, FIELD_INDEX["points_earned"]], np.searchsorted(user_ids, user_col[keep]), points)
+    return counters
+
+
+def compute_streaks(db: Session, user_ids: np.ndarray, today) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """블록 사용자의 (현재, 최장 연속 일수, 마지막 활동일) 배열"""
+    log = models.MobilityLog
+    trips = db.query(log.user_id, log.started_at).filter(
+        log.user_id.between(int(user_ids[0]), int(user_ids[-1])),
+        log.mode != scoring.BASELINE_MODE,
+    ).all()
+    user_col = np.array([t[0] for t in trips], dtype=np.int64)
+    started = np.array([t[1] for t in trips], dtype="datetime64[s]")
+    keep = np.isin(user_col, user_ids)
+    days = (started[keep] + np.timedelta64(int(streaks.KST_OFFSET.total_seconds()), "s")).astype("datetime64[D]")
+    return streaks.from_days(np.searchsorted(user_ids, user_col[keep]), days, user_ids.size, today)
+
+
+def rule_arrays(rules: Sequence[achievement_engine.Rule]) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """카운터 기반 규칙의 (achievement_id, 카운터 열, 임계값) 배열"""
+    rules = [r for r in rules if r.metric in FIELD_INDEX]
+    return (
+        np.array([r.achievement_id for r in rules], dtype=np.int64),
+        np.array([FIELD_INDEX[r.metric] for r in rules], dtype=np.int64),
+        np.array([r.threshold for r in rules], dtype=np.float64),
+    )
+
+
+def granted_mask(db: Session, user_ids: np.ndarray, achievement_ids: np.ndarray) -> np.ndarray:
+    """(사용자 수, 규칙 수) 이미 받은 업적 True"""
+    mask = np.zeros((user_ids.size, achievement_ids.size), dtype=bool)
+    if achievement_ids.size == 0:
+        return mask
+    rows = db.query(models.UserAchievement.user_id, models.UserAchievement.achievement_id).filter(
+        models.UserAchievement.user_id.between(int(user_ids[0]), int(user_ids[-1])),
+        models.UserAchievement.achievement_id.in_(achievement_ids.tolist()),
+    ).all()
+    if rows:
+        pairs = np.array(rows, dtype=np.int64)
+        pairs = pairs[np.isin(pairs[:, 0], user_ids)]
+        order = np.argsort(achievement_ids)
+        r = np.searchsorted(user_ids, pairs[:, 0])
+        c = order[np.searchsorted(achievement_ids, pairs[:, 1], sorter=order)]
+        mask[r, c] = True
+    return mask
+
+
+def backfill_block(db: Session, user_ids: np.ndarray, rules: Tuple[np.ndarray, np.ndarray, np.ndarray], report: Dict[str, Any]):
+    """사용자 블록 하나의 카운터를 덮어쓰고 새로 달성한 업적을 부여합니다. (커밋은 호출자)"""
+    achievement_ids, columns, thresholds = rules
+    # 카운터 행을 먼저 잠가 이동 기록 트랜잭션의 증분 upsert 가 이 블록이 커밋될 때까지 기다리게 함
+    db.query(models.UserCounter.user_id).filter(
+        models.UserCounter.user_id.between(int(user_ids[0]), int(user_ids[-1]))
+    ).with_for_update().all()
+    counters = compute_counters(db, user_ids)
+    now = datetime.utcnow()
+    current, longest, last_day = compute_streaks(db, user_ids, streaks.today_kst(now))
+
+    upsert(db, models.UserCounter, ("user_id",), [
+        {
+            "user_id": int(user_id),
+            **{f: int(v) if f in INT_FIELDS else round(float(v), 3) for f, v in zip(FIELDS, row)},
+            "current_streak": int(current[i]),
+            "longest_streak": int(longest[i]),
+            "last_active_date": None if np.isnat(last_day[i]) else last_day[i].item(),
+            "updated_at": now,
+        }
+        for i, (user_id, row) in enumerate(zip(user_ids.tolist(), counters))
+    ], accumulate=False)
+    report["counters_written"] += user_ids.size
+
+    if achievement_ids.size:
+        values = np.column_stack([counters, longest])
+        crossed = values[:, columns] >= thresholds - 1e-9
+        new = crossed & ~granted_mask(db, user_ids, achievement_ids)
+        r, c = np.nonzero(new)
+        if r.size:
+            db.execute(insert_ignore(db, models.UserAchievement, ("user_id", "achievement_id")), [
+                {"user_id": int(user_ids[i]), "achievement_id": int(achievement_ids[j]), "granted_at": now}
+                for i, j in zip(r.tolist(), c.tolist())
+            ])
+            report["achievements_granted"] += int(r.size)
+            for achievement_id, count in zip(achievement_ids.tolist(), new.sum(axis=0).tolist()):
+                if count:
+                    key = str(achievement_id)
+                    report["by_achievement"][key] = report["by_achievement"].get(key, 0) + count
+    report["users"] += user_ids.size
+
+
+def backfill_span(span: Span, block_size: int) -> Dict[str, Any]:
+    """하나의 user_id 범위를 블록 단위로 처리합니다. (프로세스 풀 작업 단위)"""
+    name, _, span_hi, last_id = span
+    report = _empty_report()
+    db = SessionLocal()
+    try:
+        rules = rule_arrays(achievement_engine.rules.all(db))
+        while last_id < span_hi:
+            user_ids = np.array([user_id for (user_id,) in db.query(models.User.user_id).filter(
+                models.User.user_id > last_id,
+                models.User.user_id <= span_hi,
+            ).order_by(models.User.user_id).limit(block_size)], dtype=np.int64)
+            if user_ids.size == 0:
+                break
+
+            backfill_block(db, user_ids, rules, report)
+            last_id = int(user_ids[-1])
+            # 체크포인트를 같은 트랜잭션에서 갱신 → 재시작 시 끝난 블록은 건너뜀
+            db.query(models.JobCheckpoint).filter(models.JobCheckpoint.job_name == name).update(
+                {"last_id": last_id, "updated_at": datetime.utcnow()}, synchronize_session=False
+            )
+            db.commit()
+
+        db.query(models.JobCheckpoint).filter(models.JobCheckpoint.job_name == name).update(
+            {"last_id": span_hi, "updated_at": datetime.utcnow()}, synchronize_session=False
+        )
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+    return report
+
+
+def _init_worker():
+    # fork 로 복사된 커넥션 풀을 자식 프로세스에서 재사용하지 않도록 초기화
+    engine.dispose(close=False)
+
+
+def run(run_id: str, workers: int = 1, block_size: int = DEFAULT_BLOCK_SIZE) -> Dict[str, Any]:
+    """백필을 실행하고 전체 리포트를 반환합니다."""
+    db = SessionLocal()
+    try:
+        spans = plan_spans(db, run_id, workers)
+    finally:
+        db.close()
+    pending = [span for span in spans if span[3] < span[2]]
+
+    started = time.perf_counter()
+    if workers > 1 and len(pending) > 1:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as pool:
+            futures = [pool.submit(backfill_span, span, block_size) for span in pending]
+            reports = [future.result() for future in futures]
+    else:
+        reports = [backfill_span(span, block_size) for span in pending]
+    elapsed = time.perf_counter() - started
+
+    report = merge_reports(reports)
+    report.update({
+        "run_id": run_id,
+        "spans_total": len(spans),
+        "spans_processed": len(pending),
+        "elapsed_s": round(elapsed, 3),
+        "users_per_s": round(report["users"] / elapsed, 1) if elapsed > 0 else None,
+    })
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="업적 카운터 / 업적 일괄 백필")
+    parser.add_argument("--run-id", required=True, help="재시작 시 같은 값을 사용 (체크포인트 키)")
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--block-size", type=int, default=DEFAULT_BLOCK_SIZE)
+    args = parser.parse_args()
+
+    report = run(args.run_id, workers=args.workers, block_size=args.block_size)
+    print(json.dumps(report, ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""
+challenge_progress / challenge_totals 초기 채우기 (한 번만 실행하는 백필)
+
+진행률 테이블 도입 전부터 있던 참여자는 새 이동이 기록되기 전까지 진행률 행이 없어 0% 로 보이고,
+기존 GROUP 챌린지는 challenge_totals 행이 없어 마감 정산(jobs/settle_challenges.py)에서 지급되지 않습니다.
+- 참여자가 있는 챌린지를 challenge_id 순서로 하나씩 rebuild_challenge (참여자 GROUP BY 한 번) 로 다시 계산
+- 체크포인트(job_checkpoints, "challenge_progress_backfill")의 last_id 를 챌린지마다 같은 트랜잭션에서 갱신하고
+  행 잠금으로 직렬화하므로 중단 후 이어서 처리하고, 여러 워커가 동시에 시작해도 한 번만 계산
+- 끝나면 done 을 기록하므로 다시 실행하면 체크포인트 한 행만 읽고 끝남 (--force 로 처음부터 다시)
+- 서버 시작 시 정산 루프보다 먼저 자동 실행됩니다 (main.py)
+
+실행: python -m backend.jobs.backfill_challenge_progress [--force]
+"""
+import argparse
+import json
+import time
+from datetime import datetime
+from typing import Any, Dict
+
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from .. import models
+from ..database import SessionLocal
+from ..services import challenge_progress
+
+JOB_NAME = "challenge_progress_backfill"
+
+
+def _lock_checkpoint(db: Session) -> models.JobCheckpoint:
+    """체크포인트 행을 만들거나 잠가서 가져옵니다."""
+    query = db.query(models.JobCheckpoint).filter(models.JobCheckpoint.job_name == JOB_NAME)
+    checkpoint = query.with_for_update().first()
+    if checkpoint is not None:
+        return checkpoint
+    try:
+        db.add(models.JobCheckpoint(job_name=JOB_NAME, last_id=0, meta_json={"done": False}))
+        db.commit()
+    except IntegrityError:
+        db.rollback()
+    return query.with_for_update().one()
+
+
+def run(force: bool = False) -> Dict[str, Any]:
+    report = {"challenges_rebuilt": 0, "already_done": False}
+    started = time.perf_counter()
+    db = SessionLocal()
+    try:
+        checkpoint = _lock_checkpoint(db)
+        if (checkpoint.meta_json or {}).get("done"):
+            if not force:
+                db.commit()
+                report["already_done"] = True
+                return report
+            checkpoint.last_id = 0
+            checkpoint.meta_json = {"done": False}
+            db.commit()
+            checkpoint = _lock_checkpoint(db)
+
+        with_members = db.query(models.ChallengeMember.challenge_id).distinct()
+        while True:
+            challenge = db.query(models.Challenge).filter(
+                models.Challenge.challenge_id > checkpoint.last_id,
+                models.Challenge.challenge_id.in_(with_members),
+            ).order_by(models.Challenge.challenge_id).first()
+            now = datetime.utcnow()
+            if challenge is None:
+                checkpoint.meta_json = {"done": True, "finished_at": now.isoformat()}
+                checkpoint.updated_at = now
+                db.commit()
+                break
+            challenge_progress.rebuild_challenge(db, challenge)
+            checkpoint.last_id = challenge.challenge_id
+            checkpoint.updated_at = now
+            db.commit()
+            report["challenges_rebuilt"] += 1
+            checkpoint = _lock_checkpoint(db)
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+    report["elapsed_s"] = round(time.perf_counter() - started, 3)
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="challenge_progress / challenge_totals 백필")
+    parser.add_argument("--force", action="store_true", help="이미 끝났어도 처음부터 다시 계산")
+    args = parser.parse_args()
+    print(json.dumps(run(force=args.force), ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,349 @@
+#!/usr/bin/env python3
+"""
+수집 원시 데이터(ingest_raw) → mobility_logs 스트리밍 파이프라인
+
+- 소스별로 raw_id 순서의 청크를 keyset 방식으로 읽음 (전체를 메모리에 올리지 않음)
+- payload 는 source_name 별 어댑터(services/ingest_adapters.py)로 파싱, --workers 로 프로세스 풀 병렬 파싱
+- 이미 적재된 (source_id, raw_ref_id) 는 청크 단위 IN 조회로 건너뛰고, INSERT 도 중복 키를 무시하므로
+  같은 파일/payload 를 다시 적재해도 변화 없음. 그 사이 다른 트랜잭션이 먼저 넣어 INSERT 가 건너뛴 행은
+  점수·적립·진행률에 반영하지 않음 (이 트랜잭션이 넣은 행만 다시 읽어서 처리)
+- 거리 없는 지하철/버스 이동은 역·정류장 이름으로 계산, 겹치는 이동은 trip_index.dedupe_trips 로 제거
+- scoring.score_batch 로 일괄 점수 계산 후 mobility_logs / credits_ledger 를 bulk INSERT,
+  참여 챌린지 진행률(challenge_progress)과 업적 카운터(user_counters)는 청크당 한 번의 upsert 로 갱신
+- 소스별 체크포인트(job_checkpoints, "ingest_raw:{source_id}")를 청크마다 잠그고 같은 트랜잭션에서 갱신하므로
+  중단 후 다시 실행하면 마지막으로 커밋한 청크 다음부터 이어서 처리하고, 같은 소스를 동시에 실행해도 청크가 겹치지 않음
+
+실행: python -m backend.jobs.ingest_pipeline [--source app] [--workers 4] [--chunk-size 5000]
+"""
+import argparse
+import json
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional
+
+import numpy as np
+from sqlalchemy import insert
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from .. import models
+from ..database import SessionLocal
+from ..services import scoring, trip_events, trip_index
+from ..services.dashboard_cache import dashboard_cache
+from ..services.ingest_adapters import RawCapture, TripRecord, parse_capture_safe
+from ..services.transit_distance import resolve_distance_km
+from ..services.upsert import insert_ignore
+
+JOB_PREFIX = "ingest_raw"
+DEFAULT_CHUNK_SIZE = 5000
+PARSE_CHUNKSIZE = 256  # 프로세스 풀에 한 번에 넘기는 payload 수
+ERROR_SAMPLE_LIMIT = 20
+
+
+def checkpoint_name(source_id: int) -> str:
+    return f"{JOB_PREFIX}:{source_id}"
+
+
+def _empty_report() -> Dict[str, Any]:
+    return {
+        "raw_rows": 0,
+        "trips_parsed": 0,
+        "logs_inserted": 0,
+        "ledger_entries": 0,
+        "points_awarded": 0,
+        "challenge_progress": 0,
+        "achievements_granted": 0,
+        "replays_skipped": 0,
+        "duplicates_skipped": 0,
+        "failed": 0,
+        "errors": [],
+    }
+
+
+def get_or_create_source(db: Session, source_name: str, description: Optional[str] = None) -> models.IngestSource:
+    """source_name 으로 수집 소스를 찾고, 없으면 만듭니다. (커밋은 호출자)"""
+    source = db.query(models.IngestSource).filter(models.IngestSource.source_name == source_name).first()
+    if source is None:
+        source = models.IngestSource(source_name=source_name, description=description)
+        db.add(source)
+        db.flush()
+    return source
+
+
+def existing_refs(db: Session, source_id: int, raw_ref_ids: Iterable[str]) -> Dict[str, int]:
+    """이미 적재된 raw_ref_id → log_id (1000 개씩 유니크 인덱스 IN 조회)"""
+    refs = list(set(raw_ref_ids))
+    found: Dict[str, int] = {}
+    for start in range(0, len(refs), 1000):
+        found.update(
+            (raw_ref_id, log_id)
+            for log_id, raw_ref_id in db.query(models.MobilityLog.log_id, models.MobilityLog.raw_ref_id).filter(
+                models.MobilityLog.source_id == source_id,
+                models.MobilityLog.raw_ref_id.in_(refs[start:start + 1000]),
+            )
+        )
+    return found
+
+
+def _skip_replays(db: Session, source_id: int, records: List[TripRecord], report: Dict[str, Any]) -> List[TripRecord]:
+    """이미 적재됐거나 배치 안에서 반복되는 raw_ref_id 를 제외합니다."""
+    seen = set(existing_refs(db, source_id, (r.raw_ref_id for r in records)))
+    fresh = []
+    for record in records:
+        if record.raw_ref_id in seen:
+            continue
+        seen.add(record.raw_ref_id)
+        fresh.append(record)
+    report["replays_skipped"] += len(records) - len(fresh)
+    return fresh
+
+
+def _lock_checkpoint(db: Session, source_id: int) -> int:
+    """체크포인트 행을 만들거나 잠그고 last_id 를 반환합니다. (같은 소스를 동시에 적재하지 않도록, 커밋 때 풀림)"""
+    name = checkpoint_name(source_id)
+    checkpoint = db.query(models.JobCheckpoint).filter(models.JobCheckpoint.job_name == name).with_for_update().first()
+    if checkpoint is not None:
+        return checkpoint.last_id
+    try:
+        db.add(models.JobCheckpoint(job_name=name, last_id=0, meta_json={"source_id": source_id}))
+        db.commit()
+    except IntegrityError:
+        db.rollback()
+    return db.query(models.JobCheckpoint).filter(models.JobCheckpoint.job_name == name).with_for_update().one().last_id
+
+
+def _parse(captures: List[RawCapture], pool: Optional[Executor]):
+    if pool is not None:
+        return pool.map(parse_capture_safe, captures, chunksize=PARSE_CHUNKSIZE)
+    return map(parse_capture_safe, captures)
+
+
+def _resolve_distances(db: Session, records: List[TripRecord], report: Dict[str, Any]) -> List[TripRecord]:
+    """거리 없는 이동을 역·정류장 이름으로 채우고, 채울 수 없는 이동은 실패 처리합니다."""
+    resolved = []
+    for record in records:
+        if record.distance_km is None:
+            distance = resolve_distance_km(db, record.mode, record.start_point, record.end_point, record.route_id)
+            if distance is None:
+                report["failed"] += 1
+                if len(report["errors"]) < ERROR_SAMPLE_LIMIT:
+                    report["errors"].append({"raw_ref_id": record.raw_ref_id, "error": "distance could not be resolved"})
+                continue
+            record = record._replace(distance_km=distance)
+        resolved.append(record)
+    return resolved
+
+
+def ingest_chunk(
+    db: Session, source_id: int, records: List[TripRecord], report: Optional[Dict[str, Any]] = None
+) -> Dict[str, Any]:
+    """파싱된 이동 목록을 중복 제거·점수 계산 후 bulk INSERT 합니다. (커밋은 호출자)"""
+    if report is None:
+        report = _empty_report()
+    records = _skip_replays(db, source_id, records, report)
+    records = _resolve_distances(db, records, report)
+    if not records:
+        return report
+
+    keep = trip_index.dedupe_trips(
+        db,
+        [r.user_id for r in records],
+        [r.started_at for r in records],
+        [r.ended_at for r in records],
+    )
+    report["duplicates_skipped"] += int((~keep).sum())
+    records = [r for r, k in zip(records, keep.tolist()) if k]
+    if not records:
+        return report
+
+    score = scoring.score_batch(
+        [r.mode for r in records],
+        np.array([r.distance_km for r in records], dtype=np.float64),
+        np.array([r.started_at for r in records], dtype="datetime64[s]"),
+        table=scoring.get_factor_table(db),
+    )
+    now = datetime.utcnow()
+    # 다른 트랜잭션이 같은 raw_ref_id 를 먼저 넣었으면 건너뜀
+    db.execute(insert_ignore(db, models.MobilityLog, ("source_id", "raw_ref_id")), [
+        {
+            "user_id": r.user_id,
+            "source_id": source_id,
+            "mode": r.mode,
+            "distance_km": round(r.distance_km, 3),
+            "started_at": r.started_at,
+            "ended_at": r.ended_at,
+            "raw_ref_id": r.raw_ref_id,
+            "co2_baseline_g": round(float(score.co2_baseline_g[i]), 3),
+            "co2_actual_g": round(float(score.co2_actual_g[i]), 3),
+            "co2_saved_g": round(float(score.co2_saved_g[i]), 3),
+            "points_earned": int(score.points[i]),
+            "description": r.description,
+            "start_point": r.start_point,
+            "end_point": r.end_point,
+            "used_at": r.started_at,
+            "created_at": now,
+        }
+        for i, r in enumerate(records)
+    ])
+    # 이 트랜잭션이 실제로 넣은 행만 다시 읽음 (MySQL 은 bulk RETURNING 미지원).
+    # 다른 트랜잭션이 스냅샷 이후에 커밋한 행은 보이지 않으므로 INSERT 가 건너뛴 행은 빠짐 (InnoDB 기본 격리 수준)
+    log_ids = existing_refs(db, source_id, (r.raw_ref_id for r in records))
+    inserted = [i for i, r in enumerate(records) if r.raw_ref_id in log_ids]
+    report["replays_skipped"] += len(records) - len(inserted)
+    report["logs_inserted"] += len(inserted)
+    if not inserted:
+        return report
+    dashboard_cache.invalidate({records[i].user_id for i in inserted})
+    for key, value in trip_events.trips_logged(db, [
+        trip_events.TripEvent(
+            records[i].user_id, records[i].mode, records[i].started_at, records[i].ended_at,
+            round(records[i].distance_km, 3), float(score.co2_saved_g[i]), int(score.points[i]),
+        )
+        for i in inserted
+    ]).items():
+        report[key] += value
+
+    earning = [i for i in inserted if score.points[i] > 0]
+    if not earning:
+        return report
+
+    db.execute(insert(models.CreditsLedger), [
+        {
+            "user_id": records[i].user_id,
+            "ref_log_id": log_ids.get(records[i].raw_ref_id),
+            "type": models.CreditType.EARN,
+            "points": int(score.points[i]),
+            "reason": f"Mobility: {records[i].mode} for {records[i].distance_km:.2f} km",
+            "meta_json": {"source_id": source_id, "raw_ref_id": records[i].raw_ref_id},
+            "created_at": now,
+        }
+        for i in earning
+    ])
+    report["ledger_entries"] += len(earning)
+    report["points_awarded"] += int(score.points[earning].sum())
+    return report
+
+
+def ingest_source(
+    source: models.IngestSource,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    pool: Optional[Executor] = None,
+    limit: Optional[int] = None,
+) -> Dict[str, Any]:
+    """소스 하나의 미처리 원시 데이터를 청크 단위로 적재합니다."""
+    report = _empty_report()
+    db = SessionLocal()
+    started = time.perf_counter()
+    try:
+        last_id = 0
+        while limit is None or report["raw_rows"] < limit:
+            last_id = _lock_checkpoint(db, source.source_id)
+            size = chunk_size if limit is None else min(chunk_size, limit - report["raw_rows"])
+            rows = db.query(
+                models.IngestRaw.raw_id,
+                models.IngestRaw.user_id,
+                models.IngestRaw.captured_at,
+                models.IngestRaw.payload,
+            ).filter(
+                models.IngestRaw.source_id == source.source_id,
+                models.IngestRaw.raw_id > last_id,
+            ).order_by(models.IngestRaw.raw_id).limit(size).all()
+            if not rows:
+                break
+
+            captures = [
+                RawCapture(raw_id, source.source_name, user_id, captured_at, payload)
+                for raw_id, user_id, captured_at, payload in rows
+            ]
+            records: List[TripRecord] = []
+            for raw_id, parsed, error in _parse(captures, pool):
+                if error is not None:
+                    report["failed"] += 1
+                    if len(report["errors"]) < ERROR_SAMPLE_LIMIT:
+                        report["errors"].append({"raw_id": raw_id, "error": error})
+                    continue
+                records.extend(parsed)
+            report["raw_rows"] += len(rows)
+            report["trips_parsed"] += len(records)
+
+            ingest_chunk(db, source.source_id, records, report)
+            last_id = rows[-1][0]
+            # 체크포인트를 같은 트랜잭션에서 갱신 → 재시작 시 청크 중복 적재 없음
+            db.query(models.JobCheckpoint).filter(
+                models.JobCheckpoint.job_name == checkpoint_name(source.source_id)
+            ).update({"last_id": last_id, "updated_at": datetime.utcnow()}, synchronize_session=False)
+            db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+    elapsed = time.perf_counter() - started
+    report.update({
+        "source_id": source.source_id,
+        "source_name": source.source_name,
+        "last_raw_id": last_id,
+        "elapsed_s": round(elapsed, 3),
+        "rows_per_s": round(report["raw_rows"] / elapsed, 1) if elapsed > 0 else None,
+    })
+    return report
+
+
+def run(
+    source_names: Optional[List[str]] = None,
+    workers: int = 1,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    limit: Optional[int] = None,
+) -> Dict[str, Any]:
+    """소스별 파이프라인을 차례로 실행하고 전체 리포트를 반환합니다."""
+    db = SessionLocal()
+    try:
+        query = db.query(models.IngestSource).order_by(models.IngestSource.source_id)
+        if source_names:
+            query = query.filter(models.IngestSource.source_name.in_(source_names))
+        sources = query.all()
+        db.expunge_all()
+    finally:
+        db.close()
+
+    started = time.perf_counter()
+    pool = ProcessPoolExecutor(max_workers=workers) if workers > 1 else None
+    try:
+        reports = [ingest_source(source, chunk_size, pool, limit) for source in sources]
+    finally:
+        if pool is not None:
+            pool.shutdown()
+    elapsed = time.perf_counter() - started
+
+    total = _empty_report()
+    for report in reports:
+        for key in (
+            "raw_rows", "trips_parsed", "logs_inserted", "ledger_entries", "points_awarded",
+            "challenge_progress", "achievements_granted", "replays_skipped", "duplicates_skipped", "failed",
+        ):
+            total[key] += report[key]
+    del total["errors"]
+    total.update({
+        "elapsed_s": round(elapsed, 3),
+        "rows_per_s": round(total["raw_rows"] / elapsed, 1) if elapsed > 0 else None,
+        "sources": reports,
+    })
+    return total
+
+
+def main():
+    parser = argparse.ArgumentParser(description="ingest_raw → mobility_logs 적재")
+    parser.add_argument("--source", action="append", help="처리할 source_name (여러 번 지정 가능, 기본: 전체)")
+    parser.add_argument("--workers", type=int, default=1, help="payload 파싱 프로세스 수")
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE)
+    parser.add_argument("--limit", type=int, help="소스별 최대 처리 행 수")
+    args = parser.parse_args()
+
+    report = run(args.source, workers=args.workers, chunk_size=args.chunk_size, limit=args.limit)
+    print(json.dumps(report, ensure_ascii=False, indent=2, default=str))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""
+챌린지 추천 야간 배치
+
+- 후보 챌린지 특징 행렬을 한 번 만들고, 사용자를 user_id keyset 블록 단위로 읽어
+  블록마다 사용자 특징 행렬 → 점수 행렬(행렬곱 한 번) → 상위 K 를 계산 (services/challenge_recommender.py)
+- 블록마다 해당 사용자들의 기존 추천을 지우고 새 추천을 bulk INSERT 후 커밋 → 다시 실행해도 결과 동일
+- API(GET /api/challenges/recommendations)는 저장된 추천이 없거나 오래됐으면 한 사용자만 즉시 계산
+
+실행: python -m backend.jobs.recommend_challenges [--k 5] [--block-size 5000]
+"""
+import argparse
+import json
+import time
+from datetime import datetime
+from typing import Any, Dict, Optional
+
+from sqlalchemy import insert
+
+from .. import models
+from ..database import SessionLocal
+from ..services import challenge_recommender as recommender
+
+DEFAULT_K = 5
+DEFAULT_BLOCK_SIZE = 5000
+
+
+def run(k: int = DEFAULT_K, block_size: int = DEFAULT_BLOCK_SIZE, now: Optional[datetime] = None) -> Dict[str, Any]:
+    """전체 사용자 추천을 계산해 challenge_recommendations 에 저장하고 리포트를 반환합니다."""
+    now = now or datetime.utcnow()
+    report = {"users": 0, "recommendations": 0, "candidates": 0}
+    started = time.perf_counter()
+    db = SessionLocal()
+    try:
+        challenge_ids, c_features = recommender.challenge_features(recommender.candidate_challenges(db, now))
+        report["candidates"] = int(challenge_ids.size)
+
+        last_id = 0
+        while True:
+            block = [user_id for (user_id,) in db.query(models.User.user_id).filter(
+                models.User.user_id > last_id
+            ).order_by(models.User.user_id).limit(block_size)]
+            if not block:
+                break
+            last_id = block[-1]
+
+            user_ids, u_features = recommender.user_features(db, block, now)
+            index, best = recommender.top_k(
+                recommender.score_matrix(u_features, c_features), k,
+                recommender.joined_mask(db, user_ids, challenge_ids),
+            )
+            rows = [
+                {
+                    "user_id": int(user_ids[r]),
+                    "rank": rank,
+                    "challenge_id": int(challenge_ids[i]),
+                    "score": round(float(best[r, rank - 1]), 4),
+                    "computed_at": now,
+                }
+                for r in range(user_ids.size)
+                for rank, i in enumerate(index[r].tolist(), start=1) if i >= 0
+            ]
+            db.query(models.ChallengeRecommendation).filter(
+                models.ChallengeRecommendation.user_id.in_(block)
+            ).delete(synchronize_session=False)
+            if rows:
+                db.execute(insert(models.ChallengeRecommendation), rows)
+            db.commit()
+            report["users"] += len(block)
+            report["recommendations"] += len(rows)
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+    elapsed = time.perf_counter() - started
+    report.update({
+        "elapsed_s": round(elapsed, 3),
+        "users_per_s": round(report["users"] / elapsed, 1) if elapsed > 0 else None,
+    })
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="사용자별 챌린지 추천 일괄 계산")
+    parser.add_argument("--k", type=int, default=DEFAULT_K)
+    parser.add_argument("--block-size", type=int, default=DEFAULT_BLOCK_SIZE)
+    args = parser.parse_args()
+
+    report = run(k=args.k, block_size=args.block_size)
+    print(json.dumps(report, ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
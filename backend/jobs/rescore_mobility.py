@@ -0,0 +1,311 @@
+#!/usr/bin/env python3
+"""
+모빌리티 로그 재계산(re-scoring) 배치 작업
+
+배출 계수나 포인트 규칙이 바뀐 뒤 기존 mobility_logs 의 CO2 / 포인트 값을 다시 계산합니다.
+- log_id 범위(span)를 나누고, 각 span 을 keyset 방식의 청크 단위로 스트리밍 (전체를 메모리에 올리지 않음)
+- 청크마다 scoring.score_batch 로 일괄 재계산한 뒤 값이 바뀐 행만 bulk UPDATE
+- 포인트 차이만큼 ADJUST 원장 항목을 bulk INSERT, 끝나면 챌린지 진행률(challenge_progress) 재계산
+- 사용자별 절감량/포인트 차이는 같은 트랜잭션에서 user_counters 에 더하고 해당 업적만 다시 판정
+- span 별 체크포인트(job_checkpoints)를 같은 트랜잭션에서 갱신하므로 중단 후 같은 run-id 로 재시작 가능
+- --workers 로 프로세스 풀 병렬 실행, --dry-run 으로 DB 변경 없이 차이 리포트만 출력
+
+실행: python -m backend.jobs.rescore_mobility --run-id 2025-10-factors --workers 4 [--dry-run]
+"""
+import argparse
+import json
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from typing import Any, Dict, List, Tuple
+
+import numpy as np
+from sqlalchemy import func, insert, update
+from sqlalchemy.orm import Session
+
+from .. import models
+from ..database import SessionLocal, engine
+from ..services import achievement_engine, challenge_progress, scoring
+
+JOB_PREFIX = "rescore_mobility"
+DEFAULT_CHUNK_SIZE = 20000
+CO2_TOLERANCE_G = 0.0005  # Numeric(12, 3) 저장 정밀도
+SAMPLE_LIMIT = 20
+
+_VALID_MODES = np.array([mode.value for mode in scoring.MODES])
+
+# (체크포인트 이름, 시작 log_id, 끝 log_id, 마지막 처리 log_id)
+Span = Tuple[str, int, int, int]
+
+
+def _empty_report() -> Dict[str, Any]:
+    return {
+        "rows_scanned": 0,
+        "rows_changed": 0,
+        "rows_skipped": 0,
+        "co2_saved_delta_g": 0.0,
+        "points_delta": 0,
+        "ledger_entries": 0,
+        "by_mode": {},
+        "samples": [],
+    }
+
+
+def merge_reports(reports: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """span 별 리포트를 하나로 합칩니다."""
+    merged = _empty_report()
+    for report in reports:
+        for key in ("rows_scanned", "rows_changed", "rows_skipped", "co2_saved_delta_g", "points_delta", "ledger_entries"):
+            merged[key] += report[key]
+        for mode, stats in report["by_mode"].items():
+            target = merged["by_mode"].setdefault(mode, {"rows_changed": 0, "co2_saved_delta_g": 0.0, "points_delta": 0})
+            for key, value in stats.items():
+                target[key] += value
+        merged["samples"].extend(report["samples"][:SAMPLE_LIMIT - len(merged["samples"])])
+    return merged
+
+
+def plan_spans(db: Session, run_id: str, workers: int, dry_run: bool) -> List[Span]:
+    """기존 체크포인트가 있으면 이어서, 없으면 log_id 범위를 workers 개로 나눕니다."""
+    existing = db.query(models.JobCheckpoint).filter(
+        models.JobCheckpoint.job_name.like(f"{JOB_PREFIX}:{run_id}:%")
+    ).order_by(models.JobCheckpoint.job_name).all()
+    if existing:
+        return [(cp.job_name, cp.meta_json["lo"], cp.meta_json["hi"], cp.last_id) for cp in existing]
+
+    lo, hi = db.query(func.min(models.MobilityLog.log_id), func.max(models.MobilityLog.log_id)).one()
+    if lo is None:
+        return []
+
+    step = -(-(hi - lo + 1) // max(workers, 1))
+    spans = []
+    for index, span_lo in enumerate(range(lo, hi + 1, step)):
+        span_hi = min(span_lo + step - 1, hi)
+        spans.append((f"{JOB_PREFIX}:{run_id}:{index:04d}", span_lo, span_hi, span_lo - 1))
+
+    if not dry_run:
+        db.add_all([
+            models.JobCheckpoint(job_name=name, last_id=last_id, meta_json={"lo": span_lo, "hi": span_hi})
+            for name, span_lo, span_hi, last_id in spans
+        ])
+        db.commit()
+    return spans
+
+
+def _to_float_array(values) -> np.ndarray:
+    return np.array([np.nan if v is None else float(v) for v in values], dtype=np.float64)
+
+
+def rescore_chunk(rows: List[Any], table: scoring.FactorTable, report: Dict[str, Any]):
+    """
+    청크 하나를 재계산하고 리포트를 갱신합니다.
+    반환: (mobility_logs UPDATE 파라미터 목록, (log_id, user_id, 이전 포인트, 새 포인트) 목록,
+           user_counters 증가분 목록)
+    """
+    log_ids, user_ids, modes, distances, started, old_baseline, old_actual, old_saved, old_points = zip(*rows)
+    report["rows_scanned"] += len(rows)
+
+    mode_names = np.array([getattr(m, "value", m) for m in modes])
+    valid = np.isin(mode_names, _VALID_MODES)
+    report["rows_skipped"] += int((~valid).sum())
+    if not valid.any():
+        return [], [], []
+
+    ids = np.array(log_ids, dtype=np.int64)[valid]
+    users = np.array(user_ids, dtype=np.int64)[valid]
+    mode_names = mode_names[valid]
+    timestamps = np.array(started, dtype="datetime64[s]")[valid]
+    score = scoring.score_batch(mode_names, _to_float_array(distances)[valid], timestamps, table=table)
+
+    old_saved_arr = _to_float_array(old_saved)[valid]
+    old_points_arr = np.array([p or 0 for p in old_points], dtype=np.int64)[valid]
+    changed = old_points_arr != score.points
+    for new, old in (
+        (score.co2_baseline_g, _to_float_array(old_baseline)[valid]),
+        (score.co2_actual_g, _to_float_array(old_actual)[valid]),
+        (score.co2_saved_g, old_saved_arr),
+    ):
+        changed |= np.isnan(old) | (np.abs(new - old) > CO2_TOLERANCE_G)
+    if not changed.any():
+        return [], [], []
+
+    idx = np.flatnonzero(changed)
+    saved_delta = score.co2_saved_g[idx] - np.nan_to_num(old_saved_arr[idx])
+    points_delta = score.points[idx] - old_points_arr[idx]
+    report["rows_changed"] += idx.size
+    report["co2_saved_delta_g"] += float(saved_delta.sum())
+    report["points_delta"] += int(points_delta.sum())
+
+    codes = scoring.encode_modes(mode_names[idx])
+    rows_by_mode = np.bincount(codes, minlength=len(scoring.MODES))
+    saved_by_mode = np.bincount(codes, weights=saved_delta, minlength=len(scoring.MODES))
+    points_by_mode = np.bincount(codes, weights=points_delta, minlength=len(scoring.MODES))
+    for code in np.flatnonzero(rows_by_mode):
+        stats = report["by_mode"].setdefault(
+            scoring.MODES[code].value, {"rows_changed": 0, "co2_saved_delta_g": 0.0, "points_delta": 0}
+        )
+        stats["rows_changed"] += int(rows_by_mode[code])
+        stats["co2_saved_delta_g"] += float(saved_by_mode[code])
+        stats["points_delta"] += int(points_by_mode[code])
+
+    for i in idx[:max(SAMPLE_LIMIT - len(report["samples"]), 0)]:
+        report["samples"].append({
+            "log_id": int(ids[i]),
+            "mode": str(mode_names[i]),
+            "co2_saved_g": [None if np.isnan(old_saved_arr[i]) else round(float(old_saved_arr[i]), 3), round(float(score.co2_saved_g[i]), 3)],
+            "points": [int(old_points_arr[i]), int(score.points[i])],
+        })
+
+    updates = [
+        {
+            "log_id": int(ids[i]),
+            "co2_baseline_g": round(float(score.co2_baseline_g[i]), 3),
+            "co2_actual_g": round(float(score.co2_actual_g[i]), 3),
+            "co2_saved_g": round(float(score.co2_saved_g[i]), 3),
+            "points_earned": int(score.points[i]),
+        }
+        for i in idx
+    ]
+    adjustments = [
+        (int(ids[i]), int(users[i]), int(old_points_arr[i]), int(score.points[i]))
+        for i in idx if score.points[i] != old_points_arr[i]
+    ]
+    changed_users, inverse = np.unique(users[idx], return_inverse=True)
+    saved_by_user = np.bincount(inverse, weights=saved_delta)
+    points_by_user = np.bincount(inverse, weights=points_delta)
+    counter_deltas = [
+        {"user_id": int(user_id), "total_saved_g": round(float(saved), 3), "points_earned": int(points)}
+        for user_id, saved, points in zip(changed_users, saved_by_user, points_by_user)
+    ]
+    return updates, adjustments, counter_deltas
+
+
+def rescore_span(run_id: str, span: Span, chunk_size: int, dry_run: bool) -> Dict[str, Any]:
+    """하나의 log_id 범위를 청크 단위로 재계산합니다. (프로세스 풀 작업 단위)"""
+    name, _, span_hi, last_id = span
+    report = _empty_report()
+    db = SessionLocal()
+    try:
+        table = scoring.FactorTable.from_db(db)
+        while last_id < span_hi:
+            rows = db.query(
+                models.MobilityLog.log_id,
+                models.MobilityLog.user_id,
+                models.MobilityLog.mode,
+                models.MobilityLog.distance_km,
+                models.MobilityLog.started_at,
+                models.MobilityLog.co2_baseline_g,
+                models.MobilityLog.co2_actual_g,
+                models.MobilityLog.co2_saved_g,
+                models.MobilityLog.points_earned,
+            ).filter(
+                models.MobilityLog.log_id > last_id,
+                models.MobilityLog.log_id <= span_hi,
+            ).order_by(models.MobilityLog.log_id).limit(chunk_size).all()
+            if not rows:
+                break
+
+            updates, adjustments, counter_deltas = rescore_chunk(rows, table, report)
+            last_id = rows[-1][0]
+            if dry_run:
+                continue
+
+            if updates:
+                db.execute(update(models.MobilityLog), updates)
+            if adjustments:
+                now = datetime.utcnow()
+                db.execute(insert(models.CreditsLedger), [
+                    {
+                        "user_id": user_id,
+                        "ref_log_id": log_id,
+                        "type": models.CreditType.ADJUST,
+                        "points": new_points - old_points,
+                        "reason": f"Rescore adjustment ({run_id})",
+                        "meta_json": {"run_id": run_id, "old_points": old_points, "new_points": new_points},
+                        "created_at": now,
+                    }
+                    for log_id, user_id, old_points, new_points in adjustments
+                ])
+                report["ledger_entries"] += len(adjustments)
+            if counter_deltas:
+                # 업적/리더보드가 읽는 카운터도 로그와 같은 값으로 맞추고, 올라간 사용자는 업적 판정
+                now = datetime.utcnow()
+                achievement_engine.add_counters(db, [{**row, "updated_at": now} for row in counter_deltas])
+                achievement_engine.evaluate(db, [row["user_id"] for row in counter_deltas], ("total_saved_g", "points_earned"))
+            # 체크포인트를 같은 트랜잭션에서 갱신 → 재시작 시 청크 중복 반영 없음
+            db.query(models.JobCheckpoint).filter(models.JobCheckpoint.job_name == name).update(
+                {"last_id": last_id, "updated_at": datetime.utcnow()}, synchronize_session=False
+            )
+            db.commit()
+
+        if not dry_run:
+            db.query(models.JobCheckpoint).filter(models.JobCheckpoint.job_name == name).update(
+                {"last_id": span_hi, "updated_at": datetime.utcnow()}, synchronize_session=False
+            )
+            db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+    return report
+
+
+def _init_worker():
+    # fork 로 복사된 커넥션 풀을 자식 프로세스에서 재사용하지 않도록 초기화
+    engine.dispose(close=False)
+
+
+def run(run_id: str, workers: int = 1, chunk_size: int = DEFAULT_CHUNK_SIZE, dry_run: bool = False) -> Dict[str, Any]:
+    """재계산 작업을 실행하고 전체 리포트를 반환합니다."""
+    db = SessionLocal()
+    try:
+        spans = plan_spans(db, run_id, workers, dry_run)
+    finally:
+        db.close()
+    pending = [span for span in spans if span[3] < span[2]]
+
+    started = time.perf_counter()
+    if workers > 1 and len(pending) > 1:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as pool:
+            futures = [pool.submit(rescore_span, run_id, span, chunk_size, dry_run) for span in pending]
+            reports = [future.result() for future in futures]
+    else:
+        reports = [rescore_span(run_id, span, chunk_size, dry_run) for span in pending]
+    elapsed = time.perf_counter() - started
+
+    report = merge_reports(reports)
+    report.update({
+        "run_id": run_id,
+        "dry_run": dry_run,
+        "spans_total": len(spans),
+        "spans_processed": len(pending),
+        "elapsed_s": round(elapsed, 3),
+        "rows_per_s": round(report["rows_scanned"] / elapsed, 1) if elapsed > 0 else None,
+    })
+    report["co2_saved_delta_g"] = round(report["co2_saved_delta_g"], 3)
+
+    # 절감량이 바뀌었으면 챌린지 진행률도 다시 계산
+    if not dry_run and report["rows_changed"]:
+        db = SessionLocal()
+        try:
+            report["challenges_rebuilt"] = challenge_progress.rebuild_all(db)
+        finally:
+            db.close()
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="mobility_logs CO2 / 포인트 재계산")
+    parser.add_argument("--run-id", required=True, help="재시작 시 같은 값을 사용 (체크포인트 키)")
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE)
+    parser.add_argument("--dry-run", action="store_true", help="DB 변경 없이 차이 리포트만 출력")
+    args = parser.parse_args()
+
+    report = run(args.run_id, workers=args.workers, chunk_size=args.chunk_size, dry_run=args.dry_run)
+    print(json.dumps(report, ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+"""
+끊긴 연속 일수(streak) 야간 초기화
+
+KST 자정이 지나면 어제까지 친환경 이동이 없었던 사용자(last_active_date < 어제)의 current_streak 을 0 으로 만듭니다.
+- last_active_date 인덱스로 대상만 user_id keyset 청크로 골라 청크당 UPDATE 한 번
+- 최장 연속 일수와 마지막 활동일은 그대로 두므로 여러 번 실행해도 결과 동일
+
+실행: python -m backend.jobs.reset_streaks [--chunk-size 5000]  (KST 00:05 cron 권장)
+"""
+import argparse
+import json
+import time
+from datetime import date, timedelta
+from typing import Any, Dict, Optional
+
+from sqlalchemy.orm import Session
+
+from .. import models
+from ..database import SessionLocal
+from ..services import streaks
+
+DEFAULT_CHUNK_SIZE = 5000
+
+
+def reset_broken(db: Session, today: date, chunk_size: int = DEFAULT_CHUNK_SIZE) -> int:
+    """어제 이전이 마지막 활동일인 사용자의 current_streak 을 0 으로 만들고 초기화한 수를 반환합니다."""
+    counter = models.UserCounter
+    cutoff = today - timedelta(days=1)
+    reset = 0
+    last_id = 0
+    while True:
+        user_ids = [user_id for (user_id,) in db.query(counter.user_id).filter(
+            counter.last_active_date < cutoff,
+            counter.current_streak > 0,
+            counter.user_id > last_id,
+        ).order_by(counter.user_id).limit(chunk_size)]
+        if not user_ids:
+            break
+        db.query(counter).filter(
+            counter.user_id.in_(user_ids),
+            counter.last_active_date < cutoff,  # 그 사이 이동이 기록된 사용자는 제외
+        ).update({"current_streak": 0}, synchronize_session=False)
+        db.commit()
+        reset += len(user_ids)
+        last_id = user_ids[-1]
+    return reset
+
+
+def run(today: Optional[date] = None, chunk_size: int = DEFAULT_CHUNK_SIZE) -> Dict[str, Any]:
+    today = today or streaks.today_kst()
+    started = time.perf_counter()
+    db = SessionLocal()
+    try:
+        reset = reset_broken(db, today, chunk_size)
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+    return {"today_kst": today.isoformat(), "streaks_reset": reset, "elapsed_s": round(time.perf_counter() - started, 3)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="끊긴 친환경 이동 연속 일수 초기화")
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE)
+    args = parser.parse_args()
+
+    report = run(chunk_size=args.chunk_size)
+    print(json.dumps(report, ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,291 @@
+#!/usr/bin/env python3
+"""
+챌린지 종료 정산(보상 지급) 작업
+
+- 챌린지 종료 시각(end_at)을 min-heap 에 넣어 두고 가장 가까운 마감에 깨어나 정산 (settlement_loop)
+- 달성자는 challenge_progress 에서 user_id keyset 청크로 조회
+  PERSONAL: 본인 saved_g >= target_saved_g, GROUP: 챌린지 합계(challenge_totals)가 목표 이상이면 참여자 전원
+- reward 문자열의 "150P" 같은 포인트를 credits_ledger 에 청크당 bulk INSERT, 업적 카운터(points_earned)에도 반영
+- 챌린지별 체크포인트(job_checkpoints, "challenge_settle:{challenge_id}")의 last_id(마지막 지급 user_id)를
+  같은 트랜잭션에서 갱신하고 행 잠금으로 직렬화하므로, 중단·재실행·여러 워커가 동시에 돌아도 중복 지급 없음
+- 시작할 때 마감이 지났는데 정산되지 않은 챌린지를 모두 다시 넣으므로 서버가 내려가 있던 동안의 마감도 처리
+
+실행: python -m backend.jobs.settle_challenges [--chunk-size 5000]  (마감이 지난 챌린지를 한 번 정산)
+"""
+import argparse
+import asyncio
+import heapq
+import json
+import re
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy import insert
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from .. import models
+from ..database import SessionLocal
+from ..services import achievement_engine
+from ..services.dashboard_cache import dashboard_cache
+
+JOB_PREFIX = "challenge_settle"
+DEFAULT_CHUNK_SIZE = 5000
+SETTLE_DELAY_SECONDS = 600  # 종료 직후 업로드되는 이동(실시간 이동 종료 등)을 기다림
+POLL_SECONDS = 60
+RELOAD_SECONDS = 600  # 다른 프로세스에서 만든 챌린지를 반영하기 위해 DB 에서 다시 읽는 주기
+
+REWARD_REASON_PREFIX = "Challenge: "  # 보상 원장 항목의 reason (업적 백필이 보상 적립을 구분하는 기준)
+_POINTS_RE = re.compile(r"(\d[\d,]*)\s*(?:P\b|포인트|points?)", re.IGNORECASE)
+
+
+def checkpoint_name(challenge_id: int) -> str:
+    return f"{JOB_PREFIX}:{challenge_id}"
+
+
+def reward_points(reward: Optional[str]) -> int:
+    """reward 문자열에서 지급 포인트를 읽습니다. ("에코 크레딧 150P + 뱃지" → 150, 포인트가 없으면 0)"""
+    match = _POINTS_RE.search(reward or "")
+    return int(match.group(1).replace(",", "")) if match else 0
+
+
+def _lock_checkpoint(db: Session, challenge_id: int) -> models.JobCheckpoint:
+    """정산 체크포인트 행을 만들거나 잠가서 가져옵니다. (같은 챌린지를 동시에 정산하지 않도록)"""
+    name = checkpoint_name(challenge_id)
+    checkpoint = db.query(models.JobCheckpoint).filter(models.JobCheckpoint.job_name == name).with_for_update().first()
+    if checkpoint is not None:
+        return checkpoint
+    try:
+        db.add(models.JobCheckpoint(job_name=name, last_id=0, meta_json={"challenge_id": challenge_id, "done": False}))
+        db.commit()
+    except IntegrityError:
+        db.rollback()
+    return db.query(models.JobCheckpoint).filter(models.JobCheckpoint.job_name == name).with_for_update().one()
+
+
+def _completers_query(db: Session, challenge: models.Challenge):
+    query = db.query(models.ChallengeProgress.user_id).filter(
+        models.ChallengeProgress.challenge_id == challenge.challenge_id
+    )
+    if challenge.scope == models.ChallengeScope.GROUP:
+        total = db.query(models.ChallengeTotal.saved_g).filter(
+            models.ChallengeTotal.challenge_id == challenge.challenge_id
+        ).scalar()
+        if total is None or float(total) < challenge.target_saved_g:
+            return None
+        return query
+    return query.filter(models.ChallengeProgress.saved_g >= challenge.target_saved_g)
+
+
+def settle_challenge(db: Session, challenge: models.Challenge, chunk_size: int = DEFAULT_CHUNK_SIZE) -> Dict[str, Any]:
+    """
+    챌린지 하나를 정산합니다. 청크마다 커밋하며, 이미 정산된 챌린지는 아무것도 하지 않습니다.
+    """
+    report = {"challenge_id": challenge.challenge_id, "completers": 0, "points_awarded": 0, "already_settled": False}
+    points = reward_points(challenge.reward)
+    now = datetime.utcnow()
+
+    first = True
+    while True:
+        checkpoint = _lock_checkpoint(db, challenge.challenge_id)
+        state = dict(checkpoint.meta_json or {})
+        if state.get("done"):
+            db.commit()
+            report["already_settled"] = first
+            return report
+        first = False
+
+        query = _completers_query(db, challenge)
+        user_ids = [] if query is None else [
+            user_id for (user_id,) in query.filter(
+                models.ChallengeProgress.user_id > checkpoint.last_id
+            ).order_by(models.ChallengeProgress.user_id).limit(chunk_size)
+        ]
+
+        if user_ids and points > 0:
+            db.execute(insert(models.CreditsLedger), [
+                {
+                    "user_id": user_id,
+                    "ref_log_id": None,
+                    "type": models.CreditType.EARN,
+                    "points": points,
+                    "reason": f"{REWARD_REASON_PREFIX}{challenge.title}"[:120],
+                    "meta_json": {"challenge_id": challenge.challenge_id, "reward": challenge.reward},
+                    "created_at": now,
+                }
+                for user_id in user_ids
+            ])
+            # 적립 포인트 업적 카운터도 같은 트랜잭션에서 갱신
+            achievement_engine.on_points(db, dict.fromkeys(user_ids, points))
+            dashboard_cache.invalidate(user_ids)
+        report["completers"] += len(user_ids)
+        report["points_awarded"] += points * len(user_ids)
+
+        state["completers"] = state.get("completers", 0) + len(user_ids)
+        state["points_awarded"] = state.get("points_awarded", 0) + points * len(user_ids)
+        if len(user_ids) < chunk_size:
+            state.update({"done": True, "settled_at": now.isoformat()})
+        # 지급과 체크포인트를 같은 트랜잭션에서 커밋 → 중단 후 재실행해도 중복 지급 없음
+        checkpoint.last_id = user_ids[-1] if user_ids else checkpoint.last_id
+        checkpoint.meta_json = state
+        checkpoint.updated_at = now
+        db.commit()
+        if state["done"]:
+            return report
+
+
+def unsettled_deadlines(db: Session) -> List[Tuple[datetime, int]]:
+    """정산이 끝나지 않은 챌린지의 (end_at, challenge_id)"""
+    done = {
+        job_name for job_name, state in db.query(models.JobCheckpoint.job_name, models.JobCheckpoint.meta_json).filter(
+            models.JobCheckpoint.job_name.like(f"{JOB_PREFIX}:%")
+        )
+        if state and state.get("done")
+    }
+    return [
+        (end_at, challenge_id)
+        for challenge_id, end_at in db.query(models.Challenge.challenge_id, models.Challenge.end_at)
+        if checkpoint_name(challenge_id) not in done
+    ]
+
+
+def settle_due(now: Optional[datetime] = None, chunk_size: int = DEFAULT_CHUNK_SIZE) -> Dict[str, Any]:
+    """마감(+ SETTLE_DELAY_SECONDS)이 지난 미정산 챌린지를 모두 정산합니다."""
+    now = now or datetime.utcnow()
+    cutoff = now - timedelta(seconds=SETTLE_DELAY_SECONDS)
+    db = SessionLocal()
+    started = time.perf_counter()
+    reports = []
+    try:
+        for end_at, challenge_id in sorted(unsettled_deadlines(db)):
+            if end_at > cutoff:
+                break
+            challenge = db.get(models.Challenge, challenge_id)
+            if challenge is not None:
+                reports.append(settle_challenge(db, challenge, chunk_size))
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+    return {
+        "challenges": len(reports),
+        "completers": sum(r["completers"] for r in reports),
+        "points_awarded": sum(r["points_awarded"] for r in reports),
+        "elapsed_s": round(time.perf_counter() - started, 3),
+        "settled": reports,
+    }
+
+
+class SettlementScheduler:
+    """챌린지 마감 min-heap. 마감이 바뀐 챌린지는 이전 항목을 버전으로 무시합니다."""
+
+    def __init__(self):
+        self._heap: List[Tuple[datetime, int]] = []
+        self._deadlines: Dict[int, datetime] = {}
+        self._loaded_at: Optional[float] = None
+        self._lock = threading.Lock()
+
+    def schedule(self, challenge_id: int, end_at: datetime):
+        with self._lock:
+            self._deadlines[challenge_id] = end_at
+            heapq.heappush(self._heap, (end_at, challenge_id))
+
+    def cancel(self, challenge_id: int):
+        with self._lock:
+            self._deadlines.pop(challenge_id, None)
+
+    def reload(self, db: Session):
+        deadlines = unsettled_deadlines(db)
+        with self._lock:
+            self._deadlines = {challenge_id: end_at for end_at, challenge_id in deadlines}
+            self._heap = [(end_at, challenge_id) for end_at, challenge_id in deadlines]
+            heapq.heapify(self._heap)
+            self._loaded_at = time.monotonic()
+
+    def needs_reload(self) -> bool:
+        return self._loaded_at is None or time.monotonic() - self._loaded_at >= RELOAD_SECONDS
+
+    def next_deadline(self) -> Optional[datetime]:
+        with self._lock:
+            while self._heap and self._deadlines.get(self._heap[0][1]) != self._heap[0][0]:
+                heapq.heappop(self._heap)
+            return self._heap[0][0] if self._heap else None
+
+    def pop_due(self, now: datetime) -> List[int]:
+        """정산 시각(end_at + SETTLE_DELAY_SECONDS)이 지난 챌린지 ID"""
+        cutoff = now - timedelta(seconds=SETTLE_DELAY_SECONDS)
+        due = []
+        with self._lock:
+            while self._heap and self._heap[0][0] <= cutoff:
+                end_at, challenge_id = heapq.heappop(self._heap)
+                if self._deadlines.get(challenge_id) == end_at:
+                    del self._deadlines[challenge_id]
+                    due.append(challenge_id)
+        return due
+
+
+scheduler = SettlementScheduler()
+
+
+def _settle_once(chunk_size: int = DEFAULT_CHUNK_SIZE) -> List[Dict[str, Any]]:
+    db = SessionLocal()
+    try:
+        if scheduler.needs_reload():
+            scheduler.reload(db)
+        reports = []
+        for challenge_id in scheduler.pop_due(datetime.utcnow()):
+            challenge = db.get(models.Challenge, challenge_id)
+            if challenge is None:
+                continue
+            try:
+                reports.append(settle_challenge(db, challenge, chunk_size))
+            except Exception:
+                # 다음 주기에 이어서 (체크포인트부터) 다시 시도
+                db.rollback()
+                scheduler.schedule(challenge_id, challenge.end_at)
+                raise
+        return reports
+    finally:
+        db.close()
+
+
+async def settlement_loop():
+    """가장 가까운 마감까지 (최대 POLL_SECONDS) 잠들었다가 마감이 지난 챌린지를 정산합니다."""
+    while True:
+        try:
+            for report in await asyncio.to_thread(_settle_once):
+                print(f"Challenge settled: {report}")
+        except Exception as e:
+            print(f"Challenge settlement error: {e}")
+        deadline = scheduler.next_deadline()
+        delay = POLL_SECONDS
+        if deadline is not None:
+            due_in = (deadline + timedelta(seconds=SETTLE_DELAY_SECONDS) - datetime.utcnow()).total_seconds()
+            delay = min(max(due_in, 1), POLL_SECONDS)
+        await asyncio.sleep(delay)
+
+
+_settlement_task: Optional[asyncio.Task] = None
+
+
+def ensure_settlement_task():
+    """앱 시작 시 정산 루프를 시작합니다. (밀린 마감은 첫 주기에 정산)"""
+    global _settlement_task
+    if _settlement_task is None or _settlement_task.done():
+        _settlement_task = asyncio.get_running_loop().create_task(settlement_loop())
+
+
+def main():
+    parser = argparse.ArgumentParser(description="마감이 지난 챌린지 보상 정산")
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE)
+    args = parser.parse_args()
+
+    report = settle_due(chunk_size=args.chunk_size)
+    print(json.dumps(report, ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,12 +1,15 @@
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
+import asyncio
 import os
 
 from .database import init_db, SessionLocal
-from .routes import dashboard, credits, challenges, auth, achievements, users, admin, mobility # mobility 라우터 추가
+from .routes import dashboard, credits, challenges, auth, achievements, users, admin, mobility, websocket, session, activity # mobility 라우터 추가
 from .seed_admin_user import seed_admin_user
 from .bedrock_logic import router as chat_router
+from .jobs import backfill_challenge_progress, settle_challenges
+from .services import pubsub, session_backends, session_kv
 
 # FastAPI 앱 생성
 app = FastAPI(
@@ -47,6 +50,9 @@ app.include_router(users.router)
 app.include_router(admin.router)
 app.include_router(chat_router)
 app.include_router(mobility.router) # mobility 라우터 추가
+app.include_router(activity.router) # 활동 기록 (대시보드 delta 반환)
+app.include_router(websocket.router) # 실시간 이동 추적 등 WebSocket
+app.include_router(session.router) # 세션 (SESSION_BACKEND 로 공유 백엔드 선택)
 
 @app.on_event("startup")
 async def startup_event():
@@ -61,6 +67,19 @@ async def startup_event():
     finally:
         db.close()
 
+    # 진행률 테이블 도입 전 참여자/GROUP 합계 채우기 (한 번만 실행, 정산이 합계를 읽으므로 정산 루프보다 먼저)
+    await asyncio.to_thread(backfill_challenge_progress.run)
+
+    # 챌린지 마감 정산 스케줄러 (서버가 내려가 있던 동안 지난 마감도 첫 주기에 정산)
+    settle_challenges.ensure_settlement_task()
+
+    # 만료 세션 / 만료된 세션 상태 키 정리
+    session_backends.ensure_expiry_task()
+    session_kv.ensure_expiry_task()
+
+    # 워커 간 WebSocket 메시지 버스 (PUBSUB_BACKEND)
+    pubsub.bus.start()
+
 @app.get("/")
 async def root():
     """루트 엔드포인트"""
@@ -2,7 +2,7 @@ from datetime import datetime
 import enum
 
 from sqlalchemy import (
-    Column, BigInteger, Enum, DateTime, Numeric, String, Integer, ForeignKey
+    Column, BigInteger, Enum, Date, DateTime, Numeric, String, Integer, ForeignKey, Index, UniqueConstraint
 )
 from sqlalchemy.dialects.mysql import JSON
 from sqlalchemy.orm import relationship
@@ -138,6 +138,13 @@ class MobilityLog(Base):
     used_at = Column(DateTime)
     created_at = Column(DateTime, default=datetime.utcnow)
     
+    __table_args__ = (
+        # 사용자별 이동 시간대 중복 검사 (services/trip_index.py)
+        Index("idx_mobility_logs_user_started", "user_id", "started_at"),
+        # 같은 원본 이동의 재적재/재전송 방지 (raw_ref_id 가 NULL 이면 적용되지 않음)
+        UniqueConstraint("source_id", "raw_ref_id", name="uq_mobility_logs_source_ref"),
+    )
+    
     # Relationships
     source = relationship("IngestSource", backref="mobility_logs")
 
@@ -189,6 +196,43 @@ class ChallengeMember(Base):
     user_id = Column(BigInteger, ForeignKey("users.user_id"), primary_key=True)
     joined_at = Column(DateTime, default=datetime.utcnow)
 
+# Challenge Progress (참여자별 누적 진행률, services/challenge_progress.py 가 증분 갱신)
+class ChallengeProgress(Base):
+    __tablename__ = "challenge_progress"
+    
+    challenge_id = Column(BigInteger, ForeignKey("challenges.challenge_id"), primary_key=True)
+    user_id = Column(BigInteger, ForeignKey("users.user_id"), primary_key=True)
+    saved_g = Column(Numeric(14, 3), nullable=False, default=0)
+    trips = Column(Integer, nullable=False, default=0)
+    updated_at = Column(DateTime, default=datetime.utcnow)
+    
+    __table_args__ = (
+        # 챌린지 목록: 사용자의 모든 챌린지 진행률을 한 번에 조회
+        Index("idx_challenge_progress_user", "user_id"),
+        # 리더보드: 챌린지별 기여도 상위 K 명
+        Index("idx_challenge_progress_rank", "challenge_id", "saved_g"),
+    )
+
+# Challenge Totals (GROUP 챌린지 참여자 합계, 참여자 진행률과 같은 트랜잭션에서 증분 갱신)
+class ChallengeTotal(Base):
+    __tablename__ = "challenge_totals"
+    
+    challenge_id = Column(BigInteger, ForeignKey("challenges.challenge_id"), primary_key=True)
+    saved_g = Column(Numeric(16, 3), nullable=False, default=0)
+    trips = Column(Integer, nullable=False, default=0)
+    members = Column(Integer, nullable=False, default=0)
+    updated_at = Column(DateTime, default=datetime.utcnow)
+
+# Challenge Recommendations (야간 배치가 계산한 사용자별 추천 상위 K, services/challenge_recommender.py)
+class ChallengeRecommendation(Base):
+    __tablename__ = "challenge_recommendations"
+    
+    user_id = Column(BigInteger, ForeignKey("users.user_id"), primary_key=True)
+    rank = Column(Integer, primary_key=True)
+    challenge_id = Column(BigInteger, ForeignKey("challenges.challenge_id"), nullable=False)
+    score = Column(Numeric(10, 4), nullable=False)
+    computed_at = Column(DateTime, default=datetime.utcnow)
+
 # Achievements
 class Achievement(Base):
     __tablename__ = "achievements"
@@ -197,6 +241,9 @@ class Achievement(Base):
     code = Column(String(50), unique=True)
     title = Column(String(100), nullable=False)
     description = Column(String(255))
+    # 달성 규칙: user_counters.<metric> >= threshold (services/achievement_engine.py)
+    metric = Column(String(30))
+    threshold = Column(Numeric(14, 3))
     
     # Relationships
     users = relationship("User", secondary="user_achievements", backref="achievements")
@@ -209,6 +256,37 @@ class UserAchievement(Base):
     achievement_id = Column(BigInteger, ForeignKey("achievements.achievement_id"), primary_key=True)
     granted_at = Column(DateTime, default=datetime.utcnow)
 
+# User Counters (업적 판정용 사용자별 누적 카운터, 이동/포인트 이벤트마다 증분 갱신)
+class UserCounter(Base):
+    __tablename__ = "user_counters"
+    
+    user_id = Column(BigInteger, ForeignKey("users.user_id"), primary_key=True)
+    eco_trips = Column(Integer, nullable=False, default=0)
+    total_saved_g = Column(Numeric(16, 3), nullable=False, default=0)
+    points_earned = Column(BigInteger, nullable=False, default=0)
+    trips_walk = Column(Integer, nullable=False, default=0)
+    trips_bike = Column(Integer, nullable=False, default=0)
+    trips_bus = Column(Integer, nullable=False, default=0)
+    trips_subway = Column(Integer, nullable=False, default=0)
+    trips_car = Column(Integer, nullable=False, default=0)
+    km_walk = Column(Numeric(12, 3), nullable=False, default=0)
+    km_bike = Column(Numeric(12, 3), nullable=False, default=0)
+    km_bus = Column(Numeric(12, 3), nullable=False, default=0)
+    km_subway = Column(Numeric(12, 3), nullable=False, default=0)
+    km_car = Column(Numeric(12, 3), nullable=False, default=0)
+    # 친환경 이동 연속 일수 (KST 날짜 기준, services/streaks.py)
+    current_streak = Column(Integer, nullable=False, default=0)
+    longest_streak = Column(Integer, nullable=False, default=0)
+    last_active_date = Column(Date)
+    # 안 읽은 알림 수 (배지, services/notifications.py)
+    unread_notifications = Column(Integer, nullable=False, default=0)
+    updated_at = Column(DateTime, default=datetime.utcnow)
+
+    __table_args__ = (
+        Index("idx_user_counters_last_active", "last_active_date"),
+        Index("idx_user_counters_points", "points_earned"),  # 리더보드 상위 N (services/leaderboard_ticker.py)
+    )
+
 # Notifications
 class Notification(Base):
     __tablename__ = "notifications"
@@ -218,9 +296,16 @@ class Notification(Base):
     title = Column(String(120), nullable=False)
     body = Column(String(500))
     status = Column(Enum(NotificationStatus), default=NotificationStatus.PENDING)
+    # bulk INSERT 한 묶음의 새 행을 다시 읽기 위한 표식 (MySQL 은 RETURNING 없음)
+    batch_id = Column(String(32))
     created_at = Column(DateTime, default=datetime.utcnow)
     read_at = Column(DateTime)
 
+    __table_args__ = (
+        Index("idx_notifications_user", "user_id", "notification_id"),  # since-id backlog, 읽음 처리
+        Index("idx_notifications_batch", "batch_id"),
+    )
+
 # Ingest Raw
 class IngestRaw(Base):
     __tablename__ = "ingest_raw"
@@ -293,3 +378,12 @@ class GardenWateringLog(Base):
     
     # Relationships
     user = relationship("User", backref="watering_logs")
+
+# Job Checkpoints (배치 작업 재시작 지점)
+class JobCheckpoint(Base):
+    __tablename__ = "job_checkpoints"
+    
+    job_name = Column(String(100), primary_key=True)
+    last_id = Column(BigInteger, nullable=False, default=0)
+    meta_json = Column(JSON)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
@@ -1,10 +1,15 @@
 # backend/routes/activity.py
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.orm import Session
+from sqlalchemy import text
 from pydantic import BaseModel
 from typing import Dict, Any
 from datetime import datetime
-from .. import database
+from .. import database, models
+from ..dependencies import get_current_user
+from ..schemas import CreditType, TransportMode
+from ..services import scoring, trip_events
+from ..services.dashboard_cache import dashboard_cache
 
 router = APIRouter(prefix="/activity", tags=["activity"])
 
@@ -15,38 +20,41 @@ class ActivityLogRequest(BaseModel):
     distance_km: float = 0.0
     description: str = ""
 
-# 📌 활동 타입별 설정
+# 📌 활동 타입별 설정 (CO2 절약량과 포인트는 services.scoring 에서 계산)
 ACTIVITY_CONFIG = {
     "subway": {
-        "co2_saved_per_km": 151,  # g CO2/km 절약
-        "points_per_km": 20,      # 포인트/km
+        "mode": TransportMode.SUBWAY,
         "name": "지하철"
     },
     "bike": {
-        "co2_saved_per_km": 80,   # g CO2/km 절약
-        "points_per_km": 25,      # 포인트/km
+        "mode": TransportMode.BIKE,
         "name": "자전거"
     },
     "bus": {
-        "co2_saved_per_km": 87,   # g CO2/km 절약
-        "points_per_km": 15,      # 포인트/km
+        "mode": TransportMode.BUS,
         "name": "버스"
     },
     "walk": {
-        "co2_saved_per_km": 80,   # g CO2/km 절약 (자동차 대비)
-        "points_per_km": 30,      # 포인트/km
+        "mode": TransportMode.WALK,
         "name": "도보"
     }
 }
 
 @router.post("/log")
-def log_activity(request: ActivityLogRequest, db: Session = Depends(database.get_db)) -> Dict[str, Any]:
+def log_activity(
+    request: ActivityLogRequest,
+    db: Session = Depends(database.get_db),
+    current_user: models.User = Depends(get_current_user),
+) -> Dict[str, Any]:
     """
     활동 기록 API
     - 교통수단별 CO2 절약량과 포인트 계산
-    - mobility_logs 테이블에 기록
-    - 업데이트된 대시보드 데이터 반환
+    - mobility_logs 와 credits_ledger(EARN) 에 같은 트랜잭션으로 기록
+      (GET /api/dashboard 의 포인트는 원장 합계이므로 delta 와 다음 조회 값이 일치)
+    - 대시보드 변경분(delta) 반환
     """
+    if request.user_id != current_user.user_id:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Cannot log data for another user")
     
     # 활동 타입 검증
     if request.activity_type not in ACTIVITY_CONFIG:
@@ -59,119 +67,69 @@ def log_activity(request: ActivityLogRequest, db: Session = Depends(database.get
         request.distance_km = 5.0  # 기본 5km
     
     # CO2 절약량과 포인트 계산
-    co2_saved = request.distance_km * config["co2_saved_per_km"]
-    points_earned = int(request.distance_km * config["points_per_km"])
+    score = scoring.score_trip(config["mode"], request.distance_km, table=scoring.get_factor_table(db))
     
     # mobility_logs 테이블에 기록
-    insert_query = """
-        INSERT INTO mobility_logs (user_id, mode, distance_km, co2_saved_g, points_earned, description, created_at)
-        VALUES (:user_id, :mode, :distance_km, :co2_saved_g, :points_earned, :description, NOW())
-    """
+    insert_query = text("""
+        INSERT INTO mobility_logs (user_id, mode, distance_km, started_at, ended_at, co2_baseline_g, co2_actual_g, co2_saved_g, points_earned, description, created_at)
+        VALUES (:user_id, :mode, :distance_km, :created_at, :created_at, :co2_baseline_g, :co2_actual_g, :co2_saved_g, :points_earned, :description, :created_at)
+    """)
+    created_at = datetime.utcnow()
     
     try:
-        db.execute(insert_query, {
+        result = db.execute(insert_query, {
             "user_id": request.user_id,
-            "mode": config["name"],
+            "mode": config["mode"].value,
             "distance_km": request.distance_km,
-            "co2_saved_g": co2_saved,
-            "points_earned": points_earned,
-            "description": request.description or f"{config['name']} 이용 {request.distance_km}km"
+            "co2_baseline_g": score.co2_baseline_g,
+            "co2_actual_g": score.co2_actual_g,
+            "co2_saved_g": score.co2_saved_g,
+            "points_earned": score.points,
+            "description": request.description or f"{config['name']} 이용 {request.distance_km}km",
+            "created_at": created_at,
         })
+        if score.points > 0:
+            db.add(models.CreditsLedger(
+                user_id=request.user_id,
+                ref_log_id=result.lastrowid,
+                type=CreditType.EARN,
+                points=score.points,
+                reason=f"Mobility: {config['mode'].value} for {request.distance_km:.2f} km",
+                created_at=created_at,
+            ))
+        trip_events.trips_logged(db, [trip_events.TripEvent(
+            request.user_id, config["mode"], created_at, created_at,
+            request.distance_km, score.co2_saved_g, score.points,
+        )])
         db.commit()
-        
-        # 업데이트된 대시보드 데이터 반환
-        return get_updated_dashboard_data(request.user_id, db)
-        
     except Exception as e:
         db.rollback()
         raise HTTPException(status_code=500, detail=f"활동 기록 중 오류가 발생했습니다: {str(e)}")
-
-def get_updated_dashboard_data(user_id: int, db: Session) -> Dict[str, Any]:
-    """업데이트된 대시보드 데이터 반환"""
-    
-    # 오늘 절약량
-    today_query = """
-        SELECT IFNULL(SUM(co2_saved_g), 0) AS saved_today
-        FROM mobility_logs
-        WHERE user_id = :user_id AND DATE(created_at) = CURDATE()
-    """
-    today_row = db.execute(today_query, {"user_id": user_id}).fetchone()
-    co2_saved_today = float(today_row[0]) if today_row else 0.0
-    
-    # 누적 절약량
-    total_query = """
-        SELECT IFNULL(SUM(co2_saved_g), 0) AS total_saved
-        FROM mobility_logs
-        WHERE user_id = :user_id
-    """
-    total_row = db.execute(total_query, {"user_id": user_id}).fetchone()
-    total_saved = float(total_row[0]) if total_row else 0.0
-    
-    # 누적 포인트
-    points_query = """
-        SELECT IFNULL(SUM(points_earned), 0) AS total_points
-        FROM mobility_logs
-        WHERE user_id = :user_id
-    """
-    points_row = db.execute(points_query, {"user_id": user_id}).fetchone()
-    total_points = int(points_row[0]) if points_row else 0
-    
-    # 최근 7일 절감량
-    daily_query = """
-        SELECT DATE(created_at) AS ymd, SUM(co2_saved_g) AS saved_g
-        FROM mobility_logs
-        WHERE user_id = :user_id
-          AND created_at >= CURDATE() - INTERVAL 7 DAY
-        GROUP BY DATE(created_at)
-        ORDER BY ymd ASC
-    """
-    daily_rows = db.execute(daily_query, {"user_id": user_id}).fetchall()
-    last7days = [{"date": str(row[0]), "saved_g": float(row[1])} for row in daily_rows]
     
-    # 교통수단별 절감 비율
-    mode_query = """
-        SELECT mode, SUM(co2_saved_g) AS saved_g
-        FROM mobility_logs
-        WHERE user_id = :user_id
-        GROUP BY mode
-    """
-    mode_rows = db.execute(mode_query, {"user_id": user_id}).fetchall()
-    modeStats = [{"mode": row[0], "saved_g": float(row[1])} for row in mode_rows]
-    
-    # 정원 레벨 계산 (100g당 레벨 1)
-    garden_level = int(total_saved // 100)
-    
-    # 오늘 획득 포인트
-    today_points_query = """
-        SELECT IFNULL(SUM(points_earned), 0) AS today_points
-        FROM mobility_logs
-        WHERE user_id = :user_id AND DATE(created_at) = CURDATE()
-    """
-    today_points_row = db.execute(today_points_query, {"user_id": user_id}).fetchone()
-    eco_credits_earned = int(today_points_row[0]) if today_points_row else 0
-    
-    # 챌린지 진행 상황
-    challenge = {
-        "goal": 100,  # 100kg 목표
-        "progress": total_saved / 1000  # g → kg 변환
-    }
-    
-    return {
-        "user_id": user_id,
-        "co2_saved_today": co2_saved_today,
-        "eco_credits_earned": eco_credits_earned,
-        "garden_level": garden_level,
-        "total_saved": total_saved / 1000,  # g → kg 변환
-        "total_points": total_points,
-        "last7days": last7days,
-        "modeStats": modeStats,
-        "challenge": challenge
-    }
+    # 대시보드 전체를 다시 집계하지 않고 바뀐 값(delta)만 반환 → 클라이언트가 병합
+    return dashboard_cache.apply_log(
+        request.user_id,
+        config["mode"],
+        score.co2_saved_g,
+        score.points,
+        created_at=created_at,
+        distance_km=request.distance_km,
+    )
 
 @router.get("/types")
 def get_activity_types() -> Dict[str, Any]:
     """지원하는 활동 타입 목록 반환"""
+    table = scoring.get_factor_table()
+    configs = {}
+    for activity_type, config in ACTIVITY_CONFIG.items():
+        co2_saved_per_km = scoring.score_trip(config["mode"], 1.0, table=table).co2_saved_g
+        configs[activity_type] = {
+            "mode": config["mode"].value,
+            "name": config["name"],
+            "co2_saved_per_km": co2_saved_per_km,  # g CO2/km 절약
+            "points_per_km": co2_saved_per_km * scoring.POINTS_PER_G_SAVED  # 포인트/km
+        }
     return {
         "activity_types": list(ACTIVITY_CONFIG.keys()),
-        "configs": ACTIVITY_CONFIG
+        "configs": configs
     }
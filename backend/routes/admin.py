@@ -1,12 +1,12 @@
 from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
 from typing import List
-<<<<<<< HEAD
-
-=======
 from backend import crud
->>>>>>> 20cdeef2606b3074ac01baad216e4ea7dbd897d5
 from .. import database, schemas, models
+from ..jobs import ingest_pipeline
+from ..services import ingest_adapters, scoring, transit_distance, trip_events, trip_index
+from ..services.dashboard_cache import dashboard_cache
 
 router = APIRouter(
     prefix="/api/admin",
@@ -56,6 +56,8 @@ def delete_user_by_admin(user_id: int, db: Session = Depends(database.get_db)):
         raise HTTPException(status_code=404, detail="User not found")
     return {"message": f"User {user_id} deleted successfully"}
 
+ADMIN_SOURCE_NAME = "admin"
+
 @router.post("/add-mobility-log")
 def add_mobility_log(
     log_create: schemas.MobilityLogCreate,
@@ -67,10 +69,34 @@ def add_mobility_log(
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
 
-    # CO2 절감량 및 포인트 계산 (임시 로직, 실제는 더 복잡할 수 있음)
-    # 예시: 1km 당 100g CO2 절감, 100g 당 10포인트
-    co2_saved_g = log_create.distance_km * 100 # 1km 당 100g 절감 가정
-    points_earned = int(co2_saved_g / 10) # 10g 당 1포인트 가정
+    # 지하철/버스는 역·정류장 이름으로 거리 계산
+    derived_km = transit_distance.resolve_distance_km(
+        db, log_create.mode, log_create.start_point, log_create.end_point, route_id=log_create.route_id
+    )
+    if derived_km is not None:
+        log_create.distance_km = derived_km
+    if log_create.distance_km is None:
+        raise HTTPException(status_code=400, detail="distance_km is required")
+
+    # 같은 raw_ref_id 로 이미 기록된 이동이면 다시 적립하지 않음
+    source = ingest_pipeline.get_or_create_source(db, ADMIN_SOURCE_NAME, "Admin mobility entry")
+    if log_create.raw_ref_id is not None:
+        existing = crud.get_mobility_log_by_ref(db, source.source_id, log_create.user_id, log_create.raw_ref_id)
+        if existing is not None:
+            return {"message": f"Mobility log {existing.log_id} already recorded for user {existing.user_id}"}
+
+    overlap_log_id = trip_index.find_overlap(db, log_create.user_id, log_create.started_at, log_create.ended_at)
+    if overlap_log_id is not None:
+        raise HTTPException(status_code=409, detail=f"Trip overlaps an existing mobility log ({overlap_log_id})")
+
+    # CO2 절감량 및 포인트 계산 (통합 계산 엔진 사용)
+    score = scoring.score_trip(
+        log_create.mode,
+        log_create.distance_km,
+        at=log_create.started_at,
+        table=scoring.get_factor_table(db),
+    )
+    points_earned = score.points
 
     new_log = models.MobilityLog(
         user_id=log_create.user_id,
@@ -78,13 +104,26 @@ def add_mobility_log(
         distance_km=log_create.distance_km,
         started_at=log_create.started_at,
         ended_at=log_create.ended_at,
-        co2_saved_g=co2_saved_g,
+        co2_baseline_g=score.co2_baseline_g,
+        co2_actual_g=score.co2_actual_g,
+        co2_saved_g=score.co2_saved_g,
         points_earned=points_earned,
         description=log_create.description,
         start_point=log_create.start_point,
-        end_point=log_create.end_point
+        end_point=log_create.end_point,
+        source_id=source.source_id,
+        raw_ref_id=ingest_adapters.user_ref_id(log_create.user_id, log_create.raw_ref_id) if log_create.raw_ref_id else None,
     )
     db.add(new_log)
+    try:
+        db.flush() # log_id 할당
+    except IntegrityError:
+        # 동시에 들어온 같은 raw_ref_id 요청이 먼저 기록됨
+        db.rollback()
+        existing = crud.get_mobility_log_by_ref(db, source.source_id, log_create.user_id, log_create.raw_ref_id) if log_create.raw_ref_id else None
+        if existing is None:
+            raise
+        return {"message": f"Mobility log {existing.log_id} already recorded for user {existing.user_id}"}
 
     # 크레딧 장부에 포인트 추가
     credit_entry = models.CreditsLedger(
@@ -96,9 +135,12 @@ def add_mobility_log(
         meta_json={"mobility_log_id": new_log.log_id}
     )
     db.add(credit_entry)
+    trip_events.trips_logged(db, [trip_events.from_log(new_log)])
 
     db.commit()
     db.refresh(new_log)
     db.refresh(credit_entry)
+    trip_index.record_trip(log_create.user_id, new_log.log_id, log_create.started_at, log_create.ended_at)
+    dashboard_cache.invalidate([log_create.user_id])
 
     return {"message": f"Mobility log added and {points_earned} points earned for user {log_create.user_id}"}
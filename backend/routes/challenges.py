@@ -1,10 +1,12 @@
 # routes/challenges.py
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy.orm import Session
-from sqlalchemy import text
 from typing import List
+from datetime import datetime, timedelta
 
 from .. import database, models, schemas
+from ..services import achievement_engine, challenge_progress, challenge_recommender
+from ..services.challenge_index import challenge_index, record_change
 from ..dependencies import get_current_user
 
 # /api/challenges 경로로 설정
@@ -13,6 +15,8 @@ router = APIRouter(
     tags=["Challenges"]
 )
 
+RECOMMENDATION_MAX_AGE_HOURS = 36  # 야간 배치 결과를 사용할 최대 경과 시간
+
 # 챌린지 참여 요청을 위한 Pydantic 모델
 class ChallengeJoinRequest(schemas.BaseModel):
     # user_id는 JWT에서 추출하므로 더 이상 요청 본문에 필요 없음
@@ -55,7 +59,11 @@ def join_challenge(
         user_id=user_id
     )
     db.add(new_member)
+    # 참여 전에 기록된 기간 내 이동으로 진행률 시작값 설정
+    challenge_progress.seed_member(db, challenge, user_id)
+    record_change(db, user_id)  # 다른 워커의 인덱스에도 참여 반영
     db.commit()
+    challenge_index.add_member(challenge_id, user_id)
 
     return {"message": f"Successfully joined challenge '{challenge.title}'"}
 
@@ -69,19 +77,15 @@ def get_challenges(current_user: models.User = Depends(get_current_user), db: Se
     # 모든 챌린지 목록을 가져옴
     all_challenges = db.query(models.Challenge).order_by(models.Challenge.challenge_id).all()
     
-    # 사용자가 참여한 챌린지 ID 목록을 가져옴
-    joined_challenge_ids = {
-        member.challenge_id for member in 
-        db.query(models.ChallengeMember).filter(models.ChallengeMember.user_id == user_id).all()
-    }
+    # 참여한 챌린지의 진행률을 사용자 인덱스로 한 번에 조회 (challenge_progress)
+    saved_by_challenge = challenge_progress.progress_for_user(db, user_id)
+    joined_challenge_ids = set(saved_by_challenge)
 
     result = []
     for c in all_challenges:
-        # TODO: 실제 진행률 계산 로직 필요
-        progress = 0 
+        progress = 0
         if c.challenge_id in joined_challenge_ids:
-            # 참여한 챌린지의 경우 임시로 25% 진행률 부여
-            progress = 25 
+            progress = int(challenge_progress.percent(saved_by_challenge.get(c.challenge_id), c.target_saved_g))
 
         result.append({
             "id": c.challenge_id,
@@ -95,31 +99,98 @@ def get_challenges(current_user: models.User = Depends(get_current_user), db: Se
     return result
 
 
-@router.get("/achievements", response_model=List[dict])
-def get_achievements(current_user: models.User = Depends(get_current_user), db: Session = Depends(database.get_db)):
+@router.get("/recommendations", response_model=List[schemas.ChallengeRecommendation])
+def get_challenge_recommendations(
+    limit: int = Query(3, ge=1, le=20),
+    current_user: models.User = Depends(get_current_user),
+    db: Session = Depends(database.get_db)
+):
+    """
+    사용자에게 맞는 챌린지를 추천합니다.
+    야간 배치(jobs/recommend_challenges.py)가 저장한 추천을 우선 사용하고, 없으면 즉시 계산합니다.
+    """
     user_id = current_user.user_id
-    query = text(
-        """
-        SELECT a.achievement_id, a.title, a.description, ua.granted_at
-        FROM achievements a
-        LEFT JOIN user_achievements ua
-          ON ua.achievement_id = a.achievement_id AND ua.user_id = :uid
-        ORDER BY a.achievement_id
-        """
-    )
-    rows = db.execute(query, {"uid": user_id}).fetchall()
+    now = datetime.utcnow()
+    joined = set(challenge_progress.progress_for_user(db, user_id))
+
+    def load(picks):
+        if not picks:
+            return {}
+        return {
+            c.challenge_id: c for c in db.query(models.Challenge).filter(
+                models.Challenge.challenge_id.in_([p.challenge_id for p in picks])
+            )
+        }
+
+    picks = challenge_recommender.stored_recommendations(db, user_id, timedelta(hours=RECOMMENDATION_MAX_AGE_HOURS))
+    by_id = load(picks)
+    # 저장 이후 참여했거나 끝난 챌린지는 제외
+    picks = [p for p in picks if p.challenge_id in by_id and p.challenge_id not in joined and by_id[p.challenge_id].end_at > now]
+    if not picks:
+        picks = challenge_recommender.recommend(db, user_id, limit, now)
+        by_id = load(picks)
+
     result = []
-    for r in rows:
+    for p in picks[:limit]:
+        c = by_id.get(p.challenge_id)
+        if c is None:
+            continue
         result.append({
-            "id": int(r[0]),
-            "name": r[1],
-            "desc": r[2],
-            "date": str(r[3]) if r[3] else None,
-            "unlocked": bool(r[3]),
-            "progress": 100 if r[3] else 50,  # 임시 진행률
+            "id": c.challenge_id,
+            "title": c.title,
+            "description": c.description,
+            "reward": c.reward,
+            "target_mode": c.target_mode.value if c.target_mode else models.TransportMode.ANY.value,
+            "target_saved_g": c.target_saved_g,
+            "start_at": c.start_at,
+            "end_at": c.end_at,
+            "score": round(p.score, 4),
         })
-    if not result:
-        result = [
-            {"id": 1, "name": "첫 친환경 이동", "desc": "첫 이동기록을 등록했습니다", "unlocked": True, "date": "2025-09-10", "progress": 100}
-        ]
-    return result
\ No newline at end of file
+    return result
+
+
+@router.get("/{challenge_id}/leaderboard", response_model=schemas.ChallengeLeaderboard)
+def get_challenge_leaderboard(
+    challenge_id: int,
+    limit: int = Query(10, ge=1, le=100),
+    current_user: models.User = Depends(get_current_user),
+    db: Session = Depends(database.get_db)
+):
+    """
+    챌린지 기여도 상위 참여자와 진행률을 반환합니다.
+    GROUP 챌린지는 참여자 합계(challenge_totals) 기준이며, 참여자 수와 관계없이 행 몇 개만 읽습니다.
+    """
+    challenge = db.query(models.Challenge).filter(models.Challenge.challenge_id == challenge_id).first()
+    if not challenge:
+        raise HTTPException(status_code=404, detail="Challenge not found")
+
+    my_row = db.query(models.ChallengeProgress.saved_g).filter(
+        models.ChallengeProgress.challenge_id == challenge_id,
+        models.ChallengeProgress.user_id == current_user.user_id
+    ).first()
+    my_saved_g = float(my_row[0] or 0) if my_row else 0.0
+
+    total = None
+    if challenge.scope == models.ChallengeScope.GROUP:
+        total = db.query(models.ChallengeTotal).filter(models.ChallengeTotal.challenge_id == challenge_id).first()
+    progress_g = float(total.saved_g or 0) if total else my_saved_g
+
+    top = challenge_progress.leaderboard(db, challenge_id, limit)
+    return {
+        "challenge_id": challenge.challenge_id,
+        "scope": challenge.scope.value if challenge.scope else models.ChallengeScope.PERSONAL.value,
+        "target_saved_g": challenge.target_saved_g,
+        "total_saved_g": float(total.saved_g or 0) if total else None,
+        "members": total.members if total else None,
+        "progress": int(challenge_progress.percent(progress_g, challenge.target_saved_g)),
+        "my_saved_g": my_saved_g,
+        "top": [
+            {"rank": rank, "user_id": user_id, "username": username, "saved_g": saved_g, "trips": trips}
+            for rank, (user_id, username, saved_g, trips) in enumerate(top, start=1)
+        ],
+    }
+
+
+@router.get("/achievements", response_model=List[dict])
+def get_achievements(current_user: models.User = Depends(get_current_user), db: Session = Depends(database.get_db)):
+    return achievement_engine.progress(db, current_user.user_id)
@@ -6,8 +6,10 @@ from typing import Dict, Any, List
 from datetime import datetime, timedelta
 from ..database import get_db
 from ..models import User, CreditsLedger, MobilityLog, UserGarden, GardenLevel
-from ..schemas import DashboardStats, DailySaving, ModeStat, ChallengeStat, DailyStats, WeeklyStats
+from ..schemas import DashboardStats, DailySaving, ModeStat, ChallengeStat, StreakStat, DailyStats, WeeklyStats
 from ..dependencies import get_current_user
+from ..services import streaks
+from ..services.dashboard_cache import DashboardSnapshot, dashboard_cache
 
 router = APIRouter(prefix="/api/dashboard", tags=["dashboard"])
 
@@ -25,6 +27,7 @@ async def get_dashboard(current_user: User = Depends(get_current_user), db: Sess
     - 최근 7일 절감량
     - 교통수단별 절감 비율
     - 챌린지 진행 상황
+    - 친환경 이동 연속 일수
     """
     user_id = current_user.user_id
     # 사용자 존재 확인
@@ -80,6 +83,21 @@ async def get_dashboard(current_user: User = Depends(get_current_user), db: Sess
     # 📌 챌린지 진행 상황
     challenge = ChallengeStat(goal=CHALLENGE_GOAL_KG, progress=total_saved_kg)
 
+    # 📌 연속 일수 (user_counters 한 행, 이동 기록 시 증분 갱신)
+    streak = StreakStat(**streaks.for_user(db, user_id))
+
+    # 이후 이동 기록은 이 값에 delta 만 반영 (services/dashboard_cache.py)
+    dashboard_cache.put(user_id, DashboardSnapshot(
+        day=datetime.utcnow().date(),
+        co2_saved_today=co2_saved_today,
+        eco_credits_earned=eco_credits_earned,
+        total_saved_g=total_saved_g,
+        total_points=total_points,
+        garden_level=garden_level,
+        daily={str(d): s for d, s in last7days_data},
+        modes={getattr(m, "value", m): s for m, s in mode_stats_data},
+    ))
+
     return DashboardStats(
         user_id=user_id,
         co2_saved_today=co2_saved_today,
@@ -89,7 +107,8 @@ async def get_dashboard(current_user: User = Depends(get_current_user), db: Sess
         total_points=total_points,
         last7days=last7days,
         modeStats=modeStats,
-        challenge=challenge
+        challenge=challenge,
+        streak=streak,
     )
 
 @router.get("/{user_id}/daily", response_model=List[DailyStats])
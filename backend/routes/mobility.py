@@ -1,36 +1,39 @@
 from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.orm import Session
-<<<<<<< HEAD
-from datetime import datetime
-from typing import Optional
-=======
 from datetime import datetime, timedelta # Added timedelta
 from typing import Optional, List # Added List
 from sqlalchemy import func # Added func
->>>>>>> 20cdeef2606b3074ac01baad216e4ea7dbd897d5
+from sqlalchemy.exc import IntegrityError
 
-from .. import schemas, models
+from .. import crud, schemas, models
 from ..database import get_db
 from ..dependencies import get_current_user # Assuming authentication is required
+from ..jobs import ingest_pipeline
+from ..services import ingest_adapters, scoring, transit_distance, trip_events, trip_index
+from ..services.dashboard_cache import dashboard_cache
 
 router = APIRouter(
     prefix="/mobility",
     tags=["mobility"],
 )
 
-# Carbon emission factors in gCO2/km for different modes
-# Assuming car travel is the baseline for CO2 reduction when using sustainable modes.
-# These values are illustrative and can be refined.
-CARBON_EMISSION_FACTORS_G_PER_KM = {
-    schemas.TransportMode.WALK: 0, # Actual emission for walking
-    schemas.TransportMode.BIKE: 0, # Actual emission for biking
-    schemas.TransportMode.BUS: 100, # Average bus emission
-    schemas.TransportMode.SUBWAY: 50, # Average subway emission
-    schemas.TransportMode.CAR: 170, # Average car emission (baseline for savings)
-}
+APP_SOURCE_NAME = "mobility_tracker"
 
-# Credit conversion: 1 point per X grams of CO2 saved
-CREDIT_PER_G_CO2 = 0.1 # Example: 1 point for every 10g of CO2 saved
+def _to_response(log: models.MobilityLog) -> schemas.MobilityLogResponse:
+    # The frontend expects eco_credits_earned, which maps to points_earned
+    return schemas.MobilityLogResponse(
+        log_id=log.log_id,
+        user_id=log.user_id,
+        mode=log.mode,
+        distance_km=log.distance_km,
+        started_at=log.started_at,
+        ended_at=log.ended_at,
+        co2_saved_g=log.co2_saved_g,
+        eco_credits_earned=log.points_earned,
+        description=log.description,
+        start_point=log.start_point,
+        end_point=log.end_point,
+    )
 
 @router.post("/log", response_model=schemas.MobilityLogResponse)
 async def log_mobility_data(
@@ -45,19 +48,44 @@ async def log_mobility_data(
             detail="Cannot log data for another user"
         )
 
-    # Calculate CO2 saved and points earned
-    mode_emission = CARBON_EMISSION_FACTORS_G_PER_KM.get(log_data.mode, 0)
-    car_emission_baseline = CARBON_EMISSION_FACTORS_G_PER_KM.get(schemas.TransportMode.CAR, 170)
+    # 지하철/버스는 역·정류장 이름으로 서버에서 거리를 계산 (클라이언트 입력값 대체)
+    derived_km = transit_distance.resolve_distance_km(
+        db, log_data.mode, log_data.start_point, log_data.end_point, route_id=log_data.route_id
+    )
+    if derived_km is not None:
+        log_data.distance_km = derived_km
+    if log_data.distance_km is None:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="distance_km is required when it cannot be derived from start_point/end_point"
+        )
 
-    # If the mode is a sustainable one (WALK, BIKE), calculate savings against car baseline
-    if log_data.mode in [schemas.TransportMode.WALK, schemas.TransportMode.BIKE, schemas.TransportMode.BUS, schemas.TransportMode.SUBWAY]:
-        co2_saved_g = (car_emission_baseline - mode_emission) * log_data.distance_km
-        if co2_saved_g < 0: # Ensure savings are not negative
-            co2_saved_g = 0
-    else: # For other modes, no CO2 saving is assumed for now
-        co2_saved_g = 0
+    if log_data.ended_at < log_data.started_at:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="ended_at must not be before started_at")
 
-    points_earned = int(co2_saved_g * CREDIT_PER_G_CO2)
+    # 같은 raw_ref_id 재전송(클라이언트 재시도)이면 기존 기록을 그대로 반환
+    source = ingest_pipeline.get_or_create_source(db, APP_SOURCE_NAME, "App mobility logging")
+    if log_data.raw_ref_id is not None:
+        existing = crud.get_mobility_log_by_ref(db, source.source_id, current_user.user_id, log_data.raw_ref_id)
+        if existing is not None:
+            return _to_response(existing)
+
+    # 같은 시간대에 이미 기록된 이동이 있으면 거부 (중복 입력/재전송 방지)
+    overlap_log_id = trip_index.find_overlap(db, current_user.user_id, log_data.started_at, log_data.ended_at)
+    if overlap_log_id is not None:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=f"Trip overlaps an existing mobility log ({overlap_log_id})"
+        )
+
+    # Calculate CO2 saved and points earned
+    score = scoring.score_trip(
+        log_data.mode,
+        log_data.distance_km,
+        at=log_data.started_at,
+        table=scoring.get_factor_table(db),
+    )
+    points_earned = score.points
 
     # Create a new MobilityLog entry
     db_mobility_log = models.MobilityLog(
@@ -66,21 +94,35 @@ async def log_mobility_data(
         distance_km=log_data.distance_km,
         started_at=log_data.started_at,
         ended_at=log_data.ended_at,
-        co2_baseline_g=car_emission_baseline * log_data.distance_km, # Baseline if car was used
-        co2_actual_g=mode_emission * log_data.distance_km, # Actual emission for the chosen mode
-        co2_saved_g=co2_saved_g,
+        co2_baseline_g=score.co2_baseline_g, # Baseline if car was used
+        co2_actual_g=score.co2_actual_g, # Actual emission for the chosen mode
+        co2_saved_g=score.co2_saved_g,
         points_earned=points_earned,
         description=log_data.description,
         start_point=log_data.start_point,
         end_point=log_data.end_point,
         created_at=datetime.utcnow(),
-        # source_id needs to be handled. For now, let's assume a default or add it later.
-        # For simplicity, we'll omit source_id for now or use a hardcoded default if necessary.
-        # A better approach would be to have a default 'MobilityTracker' source in the DB.
+        source_id=source.source_id,
+        raw_ref_id=ingest_adapters.user_ref_id(current_user.user_id, log_data.raw_ref_id) if log_data.raw_ref_id else None,
     )
     db.add(db_mobility_log)
-    db.commit()
+    # 참여 챌린지 진행률/업적도 같은 트랜잭션에서 갱신
+    trip_events.trips_logged(db, [trip_events.TripEvent(
+        current_user.user_id, log_data.mode, log_data.started_at, log_data.ended_at,
+        log_data.distance_km, score.co2_saved_g, points_earned,
+    )])
+    try:
+        db.commit()
+    except IntegrityError:
+        # 동시에 들어온 같은 raw_ref_id 요청이 먼저 기록됨
+        db.rollback()
+        existing = crud.get_mobility_log_by_ref(db, source.source_id, current_user.user_id, log_data.raw_ref_id) if log_data.raw_ref_id else None
+        if existing is None:
+            raise
+        return _to_response(existing)
     db.refresh(db_mobility_log)
+    trip_index.record_trip(current_user.user_id, db_mobility_log.log_id, log_data.started_at, log_data.ended_at)
+    dashboard_cache.invalidate([current_user.user_id])
 
     # Update user's total credits
     # Assuming user has a 'total_points' field or similar in the User model
@@ -103,22 +145,99 @@ async def log_mobility_data(
         db.commit()
         db.refresh(db_credit_entry)
     
-    # The frontend expects eco_credits_earned, which maps to points_earned
-    return schemas.MobilityLogResponse(
-        log_id=db_mobility_log.log_id,
-        user_id=db_mobility_log.user_id,
-        mode=db_mobility_log.mode,
-        distance_km=db_mobility_log.distance_km,
-        started_at=db_mobility_log.started_at,
-        ended_at=db_mobility_log.ended_at,
-        co2_saved_g=db_mobility_log.co2_saved_g,
-        eco_credits_earned=db_mobility_log.points_earned,
-        description=db_mobility_log.description,
-        start_point=db_mobility_log.start_point,
-        end_point=db_mobility_log.end_point,
+    return _to_response(db_mobility_log)
+
+@router.post("/trace", response_model=schemas.GpsTraceResponse)
+async def log_gps_trace(
+    trace: schemas.GpsTraceCreate,
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(get_current_user)
+):
+    """
+    GPS 궤적을 ingest_raw 에 저장하고, 교통수단별 이동으로 나누어 mobility_logs 에 기록합니다.
+    """
+    if trace.user_id != current_user.user_id:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Cannot log data for another user"
+        )
+    if len(trace.points) < 2 or any(len(point) < 3 for point in trace.points):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="points must be [lat, lon, ts] triples")
+
+    source = ingest_pipeline.get_or_create_source(db, "gps_trace", "GPS trace upload")
+
+    raw = models.IngestRaw(
+        source_id=source.source_id,
+        user_id=current_user.user_id,
+        captured_at=datetime.utcnow(),
+        payload={"points": trace.points, "description": trace.description},
+    )
+    db.add(raw)
+    db.flush()
+
+    try:
+        records = ingest_adapters.parse_capture(
+            ingest_adapters.RawCapture(raw.raw_id, source.source_name, current_user.user_id, raw.captured_at, raw.payload)
+        )
+    except ingest_adapters.PayloadError as e:
+        db.rollback()
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+
+    report = ingest_pipeline.ingest_chunk(db, source.source_id, records)
+    db.commit()
+    trip_index.trip_cache.invalidate(current_user.user_id)
+
+    logs = db.query(models.MobilityLog).filter(
+        models.MobilityLog.source_id == source.source_id,
+        models.MobilityLog.raw_ref_id.in_([r.raw_ref_id for r in records]),
+    ).order_by(models.MobilityLog.started_at).all() if records else []
+    return schemas.GpsTraceResponse(
+        raw_id=raw.raw_id,
+        trips=[_to_response(log) for log in logs],
+        duplicates_skipped=report["duplicates_skipped"],
+    )
+
+@router.get("/distance/subway", response_model=schemas.TransitDistance)
+async def get_subway_distance(
+    start_point: str,
+    end_point: str,
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(get_current_user)
+):
+    """
+    두 지하철역 사이의 최단 이동 거리(km)를 반환합니다.
+    """
+    distance_km = transit_distance.subway_distance_km(db, start_point, end_point)
+    if distance_km is None:
+        raise HTTPException(status_code=404, detail="Station not found or not connected")
+    return schemas.TransitDistance(
+        mode=schemas.TransportMode.SUBWAY,
+        start_point=start_point,
+        end_point=end_point,
+        distance_km=distance_km,
+    )
+
+@router.get("/distance/bus", response_model=schemas.TransitDistance)
+async def get_bus_distance(
+    start_point: str,
+    end_point: str,
+    route_id: Optional[str] = None,
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(get_current_user)
+):
+    """
+    버스 정류장 사이의 이동 거리(km)를 반환합니다.
+    route_id 를 생략하면 두 정류장을 지나는 노선 중 최단 거리를 사용합니다.
+    """
+    distance_km = transit_distance.bus_distance_km(db, start_point, end_point, route_id)
+    if distance_km is None:
+        raise HTTPException(status_code=404, detail="Stop not found on route")
+    return schemas.TransitDistance(
+        mode=schemas.TransportMode.BUS,
+        start_point=start_point,
+        end_point=end_point,
+        distance_km=distance_km,
     )
-<<<<<<< HEAD
-=======
 
 # Statistical endpoints from Kim Kyuri version, adapted for ORM and authentication
 @router.get("/stats/mode", response_model=List[schemas.ModeStat])
@@ -159,4 +278,3 @@ async def get_daily_savings(current_user: models.User = Depends(get_current_user
     ).all()
 
     return [schemas.DailySaving(date=str(date), saved_g=float(saved_g)) for date, saved_g in daily_savings]
->>>>>>> 20cdeef2606b3074ac01baad216e4ea7dbd897d5
@@ -1,116 +1,199 @@
-from fastapi import APIRouter, HTTPException, Depends
+from fastapi import APIRouter, HTTPException, Depends, Body, status
 from sqlalchemy.orm import Session
-from typing import Dict, Any, Optional
-from datetime import datetime, timedelta
-import json
+from typing import Dict, Any, Optional, List
+from datetime import datetime
 
 from backend.database import get_db
+from backend.dependencies import get_current_user
 from backend.models import User
+from backend.schemas import SessionStateWrite
+from backend.services.session_backends import session_backend
+from backend.services.session_store import SessionEntry
+from backend.services.session_kv import session_kv, ValueTooLarge, MAX_KEY_LENGTH
 
 router = APIRouter(prefix="/api/session", tags=["session"])
 
-# 세션 데이터 저장 (메모리 기반 - 실제 운영에서는 Redis 등 사용)
-session_store: Dict[str, Dict[str, Any]] = {}
+# 세션 데이터는 설정된 세션 백엔드에 보관 (SESSION_BACKEND: memory | sqlite | redis - services/session_backends.py)
+# sqlite/redis 백엔드는 여러 워커가 같은 세션을 공유, 디스크/네트워크 I/O 라 핸들러는 스레드풀에서 실행되도록 def 로 둠
+
+def _require_self(user_id: int, current_user: User):
+    """경로/요청의 user_id 가 로그인한 사용자와 같아야 함"""
+    if user_id != current_user.user_id:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Cannot access another user's session")
+
+def _owned_session(session_id: str, current_user: User) -> SessionEntry:
+    """로그인한 사용자의 세션만 반환 (다른 사용자의 세션은 있는지도 알리지 않도록 404)"""
+    entry = session_backend.get(session_id)
+    if entry is None or entry.user_id != current_user.user_id:
+        raise HTTPException(status_code=404, detail="Session not found")
+    return entry
+
+# ---- 사용자별 세션 상태 (키-값, frontend sessionService) ----
+# user_id 는 숫자만 매칭({user_id:int}) → "session_..." 세션 ID 경로와 겹치지 않음
+# 로그인한 본인의 상태만 읽고 쓸 수 있음 (경로 user_id 가 토큰 사용자와 다르면 403)
+
+def _check_keys(keys: List[str]):
+    for key in keys:
+        if not key or len(key) > MAX_KEY_LENGTH:
+            raise HTTPException(status_code=400, detail=f"Invalid session key: {key[:MAX_KEY_LENGTH]}")
+
+def _save_states(user_id: int, values: Dict[str, Any], ttls: Dict[str, Optional[float]]) -> int:
+    _check_keys(list(values))
+    try:
+        return session_kv.mset(user_id, values, ttls)
+    except ValueTooLarge as e:
+        raise HTTPException(status_code=413, detail=str(e))
+
+@router.get("/{user_id:int}")
+def get_session_states(user_id: int, keys: Optional[str] = None, current_user: User = Depends(get_current_user)):
+    """사용자의 세션 상태를 한 번에 조회합니다. (keys=a,b 로 일부만, 없으면 전체 - 페이지 로드 복원용)"""
+    _require_self(user_id, current_user)
+    wanted = [k for k in keys.split(",") if k] if keys else None
+    return {
+        "user_id": user_id,
+        "data": session_kv.mget(user_id, wanted)
+    }
+
+@router.post("/{user_id:int}")
+def save_session_states(user_id: int, request: SessionStateWrite, current_user: User = Depends(get_current_user)):
+    """여러 세션 상태를 한 번에 저장합니다."""
+    _require_self(user_id, current_user)
+    ttls = {key: request.ttls.get(key, request.ttl_seconds) for key in request.values}
+    saved = _save_states(user_id, request.values, ttls)
+    return {
+        "success": True,
+        "saved": saved
+    }
+
+@router.delete("/{user_id:int}")
+def clear_session_states(user_id: int, current_user: User = Depends(get_current_user)):
+    """사용자의 모든 세션 상태를 삭제합니다. (로그아웃 시)"""
+    _require_self(user_id, current_user)
+    return {
+        "success": True,
+        "deleted": session_kv.clear(user_id)
+    }
+
+@router.post("/{user_id:int}/{session_key}")
+def save_session_state(user_id: int, session_key: str, data: Any = Body(...), ttl_seconds: Optional[float] = None,
+                       current_user: User = Depends(get_current_user)):
+    """세션 상태 하나를 저장합니다."""
+    _require_self(user_id, current_user)
+    _save_states(user_id, {session_key: data}, {session_key: ttl_seconds})
+    return {
+        "success": True,
+        "key": session_key
+    }
+
+@router.get("/{user_id:int}/{session_key}")
+def get_session_state(user_id: int, session_key: str, current_user: User = Depends(get_current_user)):
+    """세션 상태 하나를 조회합니다. (없거나 만료되면 data 는 null)"""
+    _require_self(user_id, current_user)
+    return {
+        "key": session_key,
+        "data": session_kv.mget(user_id, [session_key]).get(session_key)
+    }
+
+@router.delete("/{user_id:int}/{session_key}")
+def delete_session_state(user_id: int, session_key: str, current_user: User = Depends(get_current_user)):
+    """세션 상태 하나를 삭제합니다."""
+    _require_self(user_id, current_user)
+    return {
+        "success": True,
+        "deleted": session_kv.delete(user_id, [session_key])
+    }
+
+# ---- 로그인 세션 ----
 
 @router.post("/create")
-async def create_session(
+def create_session(
     user_id: int,
     session_data: Optional[Dict[str, Any]] = None,
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
 ):
     """새 세션을 생성합니다."""
+    _require_self(user_id, current_user)
     try:
         # 사용자 존재 확인
         user = db.query(User).filter(User.user_id == user_id).first()
         if not user:
             raise HTTPException(status_code=404, detail="User not found")
         
-        # 세션 ID 생성
-        session_id = f"session_{user_id}_{int(datetime.now().timestamp())}"
-        
-        # 세션 데이터 저장
-        session_data = session_data or {}
-        session_data.update({
-            "user_id": user_id,
-            "created_at": datetime.now().isoformat(),
-            "last_activity": datetime.now().isoformat(),
-            "is_active": True
-        })
-        
-        session_store[session_id] = session_data
+        # 세션 생성 (기본 24시간 후 만료)
+        entry = session_backend.create(user_id, session_data)
         
         return {
             "success": True,
-            "session_id": session_id,
+            "session_id": entry.session_id,
             "user_id": user_id,
-            "created_at": session_data["created_at"]
+            "created_at": entry.to_dict()["created_at"]
         }
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"세션 생성 실패: {str(e)}")
 
 @router.get("/{session_id}")
-async def get_session(session_id: str):
+def get_session(session_id: str, current_user: User = Depends(get_current_user)):
     """세션 정보를 조회합니다."""
-    if session_id not in session_store:
+    # 다른 사용자의 세션은 만료 여부도 알리지 않도록 소유자부터 확인
+    if session_backend.owner(session_id) != current_user.user_id:
         raise HTTPException(status_code=404, detail="Session not found")
-    
-    session_data = session_store[session_id]
-    
-    # 세션 만료 확인 (24시간)
-    created_at = datetime.fromisoformat(session_data["created_at"])
-    if datetime.now() - created_at > timedelta(hours=24):
-        del session_store[session_id]
+    entry = session_backend.get(session_id)
+    if entry is None:
+        # 저장돼 있었지만 만료 시각이 지남 (정리 주기 전)
         raise HTTPException(status_code=410, detail="Session expired")
     
     return {
         "session_id": session_id,
-        "session_data": session_data
+        "session_data": entry.to_dict()
     }
 
 @router.put("/{session_id}/update")
-async def update_session(
+def update_session(
     session_id: str,
-    update_data: Dict[str, Any]
+    update_data: Dict[str, Any],
+    current_user: User = Depends(get_current_user)
 ):
     """세션 데이터를 업데이트합니다."""
-    if session_id not in session_store:
+    _owned_session(session_id, current_user)
+    entry = session_backend.update(session_id, update_data)
+    if entry is None:
         raise HTTPException(status_code=404, detail="Session not found")
     
-    session_data = session_store[session_id]
-    session_data.update(update_data)
-    session_data["last_activity"] = datetime.now().isoformat()
-    
     return {
         "success": True,
         "message": "세션이 업데이트되었습니다",
-        "session_data": session_data
+        "session_data": entry.to_dict()
     }
 
 @router.delete("/{session_id}")
-async def delete_session(session_id: str):
+def delete_session(session_id: str, current_user: User = Depends(get_current_user)):
     """세션을 삭제합니다."""
-    if session_id not in session_store:
+    _owned_session(session_id, current_user)
+    if not session_backend.delete(session_id):
         raise HTTPException(status_code=404, detail="Session not found")
     
-    del session_store[session_id]
-    
     return {
         "success": True,
         "message": "세션이 삭제되었습니다"
     }
 
 @router.get("/user/{user_id}/sessions")
-async def get_user_sessions(user_id: int):
+def get_user_sessions(user_id: int, current_user: User = Depends(get_current_user)):
     """사용자의 모든 활성 세션을 조회합니다."""
+    _require_self(user_id, current_user)
+    # 사용자 인덱스로 이 사용자의 세션만 확인
     user_sessions = []
     
-    for session_id, session_data in session_store.items():
-        if session_data.get("user_id") == user_id and session_data.get("is_active", False):
-            user_sessions.append({
-                "session_id": session_id,
-                "created_at": session_data["created_at"],
-                "last_activity": session_data["last_activity"]
-            })
+    for entry in session_backend.user_sessions(user_id):
+        session_data = entry.to_dict()
+        user_sessions.append({
+            "session_id": entry.session_id,
+            "created_at": session_data["created_at"],
+            "last_activity": session_data["last_activity"]
+        })
     
     return {
         "user_id": user_id,
@@ -119,29 +202,29 @@ async def get_user_sessions(user_id: int):
     }
 
 @router.post("/{session_id}/extend")
-async def extend_session(session_id: str, hours: int = 24):
+def extend_session(session_id: str, hours: int = 24, current_user: User = Depends(get_current_user)):
     """세션을 연장합니다."""
-    if session_id not in session_store:
+    _owned_session(session_id, current_user)
+    # 만료 시각을 옮기면 만료 힙에도 새 시각으로 반영됨
+    entry = session_backend.extend(session_id, hours * 3600)
+    if entry is None:
         raise HTTPException(status_code=404, detail="Session not found")
     
-    session_data = session_store[session_id]
-    session_data["last_activity"] = datetime.now().isoformat()
-    session_data["expires_at"] = (datetime.now() + timedelta(hours=hours)).isoformat()
-    
     return {
         "success": True,
         "message": f"세션이 {hours}시간 연장되었습니다",
-        "expires_at": session_data["expires_at"]
+        "expires_at": entry.to_dict()["expires_at"]
     }
 
 @router.get("/health/check")
-async def session_health_check():
+def session_health_check():
     """세션 시스템 상태를 확인합니다."""
-    active_sessions = len([s for s in session_store.values() if s.get("is_active", False)])
+    # 저장소가 유지하는 카운터 (전체 순회 없음)
+    stats = session_backend.stats()
     
     return {
         "status": "healthy",
-        "total_sessions": len(session_store),
-        "active_sessions": active_sessions,
+        "total_sessions": stats["total_sessions"],
+        "active_sessions": stats["active_sessions"],
         "timestamp": datetime.now().isoformat()
     }
@@ -1,52 +1,46 @@
-from fastapi import APIRouter, WebSocket, WebSocketDisconnect
-from typing import List, Dict, Any
+from fastapi import APIRouter, WebSocket, WebSocketDisconnect, status
 import json
 import asyncio
 from datetime import datetime
+from typing import Optional
+
+from .. import models
+from ..database import SessionLocal
+from ..dependencies import user_id_from_token
+from ..services import leaderboard_ticker, live_trip, notifications, pubsub
+from ..services.ws_hub import manager  # 연결별 송신 큐 + writer 작업, 사용자별 여러 기기
 
 router = APIRouter(prefix="/ws", tags=["websocket"])
 
-# 연결된 클라이언트들을 관리
-class ConnectionManager:
-    def __init__(self):
-        self.active_connections: List[WebSocket] = []
-        self.user_connections: Dict[int, WebSocket] = {}
-
-    async def connect(self, websocket: WebSocket, user_id: int = None):
-        await websocket.accept()
-        self.active_connections.append(websocket)
-        if user_id:
-            self.user_connections[user_id] = websocket
-
-    def disconnect(self, websocket: WebSocket, user_id: int = None):
-        if websocket in self.active_connections:
-            self.active_connections.remove(websocket)
-        if user_id and user_id in self.user_connections:
-            del self.user_connections[user_id]
-
-    async def send_personal_message(self, message: str, user_id: int):
-        if user_id in self.user_connections:
-            websocket = self.user_connections[user_id]
-            try:
-                await websocket.send_text(message)
-            except:
-                # 연결이 끊어진 경우 제거
-                self.disconnect(websocket, user_id)
-
-    async def broadcast(self, message: str):
-        for connection in self.active_connections:
-            try:
-                await connection.send_text(message)
-            except:
-                # 연결이 끊어진 경우 제거
-                self.active_connections.remove(connection)
-
-manager = ConnectionManager()
+PROGRESS_EVERY_POINTS = 10  # 점 단위 전송 시 진행 상황 응답 간격
+
+
+def _user_exists(user_id: int) -> bool:
+    db = SessionLocal()
+    try:
+        return db.query(models.User.user_id).filter(models.User.user_id == user_id).first() is not None
+    finally:
+        db.close()
+
+async def _authorize(websocket: WebSocket, user_id: int) -> bool:
+    """
+    브라우저 WebSocket 은 헤더를 못 붙이므로 ?token=<access token> (또는 Authorization: Bearer) 으로 인증
+    토큰의 사용자가 경로의 user_id 와 다르면 수락하지 않고 닫음 (get_current_user 와 같은 JWT 검증)
+    """
+    token = websocket.query_params.get("token")
+    if token is None:
+        scheme, _, credentials = websocket.headers.get("authorization", "").partition(" ")
+        token = credentials if scheme.lower() == "bearer" else None
+    if user_id_from_token(token) != user_id or not await asyncio.to_thread(_user_exists, user_id):
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
+        return False
+    return True
+
 
 @router.websocket("/statistics/{user_id}")
 async def websocket_statistics(websocket: WebSocket, user_id: int):
     """실시간 통계 업데이트 WebSocket"""
-    await manager.connect(websocket, user_id)
+    conn = await manager.connect(websocket, user_id)
     
     try:
         while True:
@@ -56,92 +50,113 @@ async def websocket_statistics(websocket: WebSocket, user_id: int):
             
             if message.get("type") == "ping":
                 # 핑 메시지에 퐁 응답
-                await websocket.send_text(json.dumps({
+                conn.send(json.dumps({
                     "type": "pong",
                     "timestamp": datetime.utcnow().isoformat()
                 }))
             elif message.get("type") == "subscribe":
                 # 특정 통계 구독
-                await websocket.send_text(json.dumps({
+                conn.send(json.dumps({
                     "type": "subscribed",
                     "subscription": message.get("subscription"),
                     "timestamp": datetime.utcnow().isoformat()
                 }))
                 
     except WebSocketDisconnect:
-        manager.disconnect(websocket, user_id)
+        manager.disconnect(websocket)
     except Exception as e:
         print(f"WebSocket error: {e}")
-        manager.disconnect(websocket, user_id)
+        manager.disconnect(websocket)
 
 @router.websocket("/leaderboard")
 async def websocket_leaderboard(websocket: WebSocket):
-    """실시간 리더보드 업데이트 WebSocket"""
-    await manager.connect(websocket)
+    """
+    실시간 리더보드 업데이트 WebSocket
+    구독 직후 leaderboard_snapshot, 이후 순위가 바뀔 때마다 leaderboard_update(변경분)
+    워커당 작업 하나가 순위를 계산해 모든 구독자에게 같은 메시지를 보냄 (services/leaderboard_ticker.py)
+    """
+    conn = await manager.connect(websocket)
+    leaderboard_ticker.ticker.subscribe(conn)
+    leaderboard_ticker.ensure_ticker_task()
     
     try:
         while True:
-            # 30초마다 리더보드 업데이트 브로드캐스트
-            await asyncio.sleep(30)
-            
-            # 실제로는 데이터베이스에서 최신 리더보드 데이터를 가져와야 함
-            leaderboard_update = {
-                "type": "leaderboard_update",
-                "data": {
-                    "timestamp": datetime.utcnow().isoformat(),
-                    "message": "리더보드가 업데이트되었습니다!"
-                }
-            }
-            
-            await websocket.send_text(json.dumps(leaderboard_update))
+            # 연결 종료 감지용 수신 대기 (ping 에만 응답)
+            data = await websocket.receive_text()
+            if json.loads(data).get("type") == "ping":
+                conn.send(json.dumps({
+                    "type": "pong",
+                    "timestamp": datetime.utcnow().isoformat()
+                }))
             
     except WebSocketDisconnect:
-        manager.disconnect(websocket)
+        pass
     except Exception as e:
         print(f"WebSocket error: {e}")
+    finally:
+        leaderboard_ticker.ticker.unsubscribe(conn)
         manager.disconnect(websocket)
 
+def _notification_call(fn, *args, commit: bool = False):
+    """알림 서비스 함수를 새 DB 세션으로 실행 (스레드풀에서 호출)"""
+    db = SessionLocal()
+    try:
+        result = fn(db, *args)
+        if commit:
+            db.commit()
+        return result
+    finally:
+        db.close()
+
 @router.websocket("/notifications/{user_id}")
-async def websocket_notifications(websocket: WebSocket, user_id: int):
-    """실시간 알림 WebSocket"""
-    await manager.connect(websocket, user_id)
+async def websocket_notifications(websocket: WebSocket, user_id: int, since_id: Optional[int] = None):
+    """
+    실시간 알림 WebSocket (폴링 없음)
+    - 연결 직후 notifications_backlog: since_id(마지막으로 받은 알림 id) 다음 알림들, 없으면 최근 알림
+    - 새 알림은 생성 트랜잭션이 커밋되면 notifications 로 바로 push (services/notifications.py)
+    - {"type": "get_notifications", "since_id", "limit"} → has_more 일 때 다음 backlog 페이지
+    - {"type": "mark_read", "ids": [...]} 또는 {"type": "mark_read", "up_to_id"} → notifications_read
+    - /ws/trip 과 같이 ?token= 으로 인증, 토큰 사용자의 알림만 받음
+    """
+    if not await _authorize(websocket, user_id):
+        return
+    conn = await manager.connect(websocket, user_id)
     
     try:
+        page = await asyncio.to_thread(_notification_call, notifications.backlog, user_id, since_id)
+        conn.send(json.dumps({"type": "notifications_backlog", **page}, ensure_ascii=False))
         while True:
             # 클라이언트로부터 메시지 수신 대기
             data = await websocket.receive_text()
             message = json.loads(data)
+            message_type = message.get("type")
             
-            if message.get("type") == "get_notifications":
-                # 사용자별 알림 조회
-                notifications = {
-                    "type": "notifications",
-                    "data": [
-                        {
-                            "id": 1,
-                            "title": "새로운 배지 획득!",
-                            "message": "에코 워리어 배지를 획득했습니다! 🛡️",
-                            "timestamp": datetime.utcnow().isoformat(),
-                            "read": False
-                        },
-                        {
-                            "id": 2,
-                            "title": "리더보드 순위 상승",
-                            "message": "5위에서 4위로 올라갔습니다! 🎉",
-                            "timestamp": datetime.utcnow().isoformat(),
-                            "read": False
-                        }
-                    ]
-                }
-                await websocket.send_text(json.dumps(notifications))
+            if message_type == "get_notifications":
+                page = await asyncio.to_thread(
+                    _notification_call, notifications.backlog, user_id,
+                    message.get("since_id"), int(message.get("limit") or notifications.BACKLOG_LIMIT),
+                )
+                conn.send(json.dumps({"type": "notifications_backlog", **page}, ensure_ascii=False))
+            elif message_type == "mark_read":
+                # 다른 기기에는 커밋 후 버스로 notifications_read 가 감
+                unread = await asyncio.to_thread(
+                    _notification_call, notifications.mark_read, user_id,
+                    message.get("ids"), message.get("up_to_id"), commit=True,
+                )
+                conn.send(json.dumps({"type": "notifications_read", "unread": unread}))
+            elif message_type == "ping":
+                conn.send(json.dumps({
+                    "type": "pong",
+                    "timestamp": datetime.utcnow().isoformat()
+                }))
                 
     except WebSocketDisconnect:
-        manager.disconnect(websocket, user_id)
+        manager.disconnect(websocket)
     except Exception as e:
         print(f"WebSocket error: {e}")
-        manager.disconnect(websocket, user_id)
+        manager.disconnect(websocket)
 
-# 실시간 업데이트를 위한 헬퍼 함수들
+# 실시간 업데이트를 위한 헬퍼 함수들 (pub/sub 버스를 거쳐 모든 워커의 연결에 전달)
 async def broadcast_statistics_update():
     """통계 업데이트를 모든 클라이언트에게 브로드캐스트"""
     update_message = {
@@ -151,18 +166,82 @@ async def broadcast_statistics_update():
             "message": "통계가 업데이트되었습니다!"
         }
     }
-    await manager.broadcast(json.dumps(update_message))
+    pubsub.bus.publish_topic("statistics", json.dumps(update_message), key="statistics")
 
 async def send_user_notification(user_id: int, title: str, message: str):
-    """특정 사용자에게 알림 전송"""
-    notification = {
-        "type": "notification",
-        "data": {
-            "title": title,
-            "message": message,
-            "timestamp": datetime.utcnow().isoformat()
-        }
-    }
-    await manager.send_personal_message(json.dumps(notification), user_id)
+    """특정 사용자에게 알림 전송 (notifications 에 기록, 커밋 후 연결된 기기에 push)"""
+    await asyncio.to_thread(_notification_call, notifications.create, user_id, title, message, commit=True)
+
+
+
+async def _current_trip(user_id: int):
+    """이 워커에서 추적 중인 이동, 없으면 체크포인트에서 복구한 이동 (둘 다 없으면 None)"""
+    trip = live_trip.registry.get(user_id)
+    if trip is None:
+        trip = await asyncio.to_thread(live_trip.resume_trip, user_id)
+        if trip is not None:
+            live_trip.registry.put(trip)
+    return trip
+
+@router.websocket("/trip/{user_id}")
+async def websocket_trip(websocket: WebSocket, user_id: int):
+    """
+    실시간 이동 추적 WebSocket
+    - {"type": "start", "mode": "BUS"(선택)} → trip_started / trip_resumed
+    - {"type": "point", "lat", "lon", "ts"} 또는 {"type": "points", "points": [[lat, lon, ts], ...]}
+    - {"type": "end"} → 이동을 mobility_logs 에 기록하고 trip_ended 응답
+    점 단위로는 메모리 상태만 갱신하며, DB 에는 체크포인트 주기와 이동 종료 때만 기록합니다.
+    ?token= 의 사용자와 user_id 가 같아야 연결됩니다.
+    """
+    if not await _authorize(websocket, user_id):
+        return
+    conn = await manager.connect(websocket, user_id)
+    live_trip.ensure_checkpoint_task()
+
+    try:
+        while True:
+            data = await websocket.receive_text()
+            message = json.loads(data)
+            message_type = message.get("type")
 
+            if message_type == "start":
+                trip = await _current_trip(user_id)
+                resumed = trip is not None
+                if trip is None:
+                    trip = live_trip.registry.start(user_id, message.get("mode"))
+                conn.send(json.dumps({
+                    "type": "trip_resumed" if resumed else "trip_started",
+                    "data": trip.summary(),
+                }))
+            elif message_type in ("point", "points"):
+                points = message["points"] if message_type == "points" else [(message["lat"], message["lon"], message["ts"])]
+                await _current_trip(user_id)
+                accepted = live_trip.registry.add_points(user_id, points)
+                trip = live_trip.registry.get(user_id)
+                if message_type == "points" or trip.points % PROGRESS_EVERY_POINTS == 0:
+                    conn.send(json.dumps({
+                        "type": "trip_progress",
+                        "accepted": accepted,
+                        "data": trip.summary(),
+                    }))
+            elif message_type == "end":
+                # 재시작/다른 워커로 재연결한 뒤의 종료도 체크포인트의 이동을 바로 기록
+                await _current_trip(user_id)
+                trip = live_trip.registry.pop(user_id)
+                log = await asyncio.to_thread(live_trip.end_trip, trip) if trip is not None else None
+                conn.send(json.dumps({
+                    "type": "trip_ended",
+                    "data": {"trip": trip.summary() if trip else None, "log": log},
+                }))
+            elif message_type == "ping":
+                conn.send(json.dumps({
+                    "type": "pong",
+                    "timestamp": datetime.utcnow().isoformat()
+                }))
 
+    except WebSocketDisconnect:
+        # 진행 중인 이동은 유지 (재연결 시 이어서 추적, 방치되면 체크포인트 루프가 종료 처리)
+        manager.disconnect(websocket)
+    except Exception as e:
+        print(f"WebSocket error: {e}")
+        manager.disconnect(websocket)
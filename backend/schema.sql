@@ -98,6 +98,7 @@ CREATE TABLE IF NOT EXISTS mobility_logs (
   distance_km DECIMAL(10,3) NOT NULL,
   started_at DATETIME NOT NULL,
   ended_at DATETIME NOT NULL,
+  raw_ref_id VARCHAR(100),
   co2_saved_g DECIMAL(12,3),
   points_earned INT NOT NULL DEFAULT 0,
   description VARCHAR(255),
@@ -121,12 +122,50 @@ CREATE TABLE IF NOT EXISTS challenges (
   created_at DATETIME DEFAULT CURRENT_TIMESTAMP
 ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
 
+-- 챌린지 참여자별 진행률 (이동 기록 시 증분 갱신)
+CREATE TABLE IF NOT EXISTS challenge_progress (
+  challenge_id BIGINT NOT NULL,
+  user_id BIGINT NOT NULL,
+  saved_g DECIMAL(14,3) NOT NULL DEFAULT 0,
+  trips INT NOT NULL DEFAULT 0,
+  updated_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+  PRIMARY KEY (challenge_id, user_id),
+  KEY idx_challenge_progress_user (user_id),
+  KEY idx_challenge_progress_rank (challenge_id, saved_g),
+  CONSTRAINT fk_cp_challenge FOREIGN KEY (challenge_id) REFERENCES challenges(challenge_id),
+  CONSTRAINT fk_cp_user FOREIGN KEY (user_id) REFERENCES users(user_id)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+
+-- GROUP 챌린지 합계 (참여자 기여분 증분 합산)
+CREATE TABLE IF NOT EXISTS challenge_totals (
+  challenge_id BIGINT PRIMARY KEY,
+  saved_g DECIMAL(16,3) NOT NULL DEFAULT 0,
+  trips INT NOT NULL DEFAULT 0,
+  members INT NOT NULL DEFAULT 0,
+  updated_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+  CONSTRAINT fk_ct_challenge FOREIGN KEY (challenge_id) REFERENCES challenges(challenge_id)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+
+-- 사용자별 챌린지 추천 (야간 배치)
+CREATE TABLE IF NOT EXISTS challenge_recommendations (
+  user_id BIGINT NOT NULL,
+  `rank` INT NOT NULL,
+  challenge_id BIGINT NOT NULL,
+  score DECIMAL(10,4) NOT NULL,
+  computed_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+  PRIMARY KEY (user_id, `rank`),
+  CONSTRAINT fk_cr_user FOREIGN KEY (user_id) REFERENCES users(user_id),
+  CONSTRAINT fk_cr_challenge FOREIGN KEY (challenge_id) REFERENCES challenges(challenge_id)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+
 -- 업적
 CREATE TABLE IF NOT EXISTS achievements (
   achievement_id BIGINT PRIMARY KEY AUTO_INCREMENT,
   code VARCHAR(50) UNIQUE,
   title VARCHAR(100) NOT NULL,
-  description VARCHAR(255)
+  description VARCHAR(255),
+  metric VARCHAR(30) NULL,
+  threshold DECIMAL(14,3) NULL
 ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
 
 -- 사용자 업적
@@ -139,6 +178,32 @@ CREATE TABLE IF NOT EXISTS user_achievements (
   CONSTRAINT fk_ua_ach FOREIGN KEY (achievement_id) REFERENCES achievements(achievement_id)
 ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
 
+-- 업적 판정용 사용자별 누적 카운터
+CREATE TABLE IF NOT EXISTS user_counters (
+  user_id BIGINT PRIMARY KEY,
+  eco_trips INT NOT NULL DEFAULT 0,
+  total_saved_g DECIMAL(16,3) NOT NULL DEFAULT 0,
+  points_earned BIGINT NOT NULL DEFAULT 0,
+  trips_walk INT NOT NULL DEFAULT 0,
+  trips_bike INT NOT NULL DEFAULT 0,
+  trips_bus INT NOT NULL DEFAULT 0,
+  trips_subway INT NOT NULL DEFAULT 0,
+  trips_car INT NOT NULL DEFAULT 0,
+  km_walk DECIMAL(12,3) NOT NULL DEFAULT 0,
+  km_bike DECIMAL(12,3) NOT NULL DEFAULT 0,
+  km_bus DECIMAL(12,3) NOT NULL DEFAULT 0,
+  km_subway DECIMAL(12,3) NOT NULL DEFAULT 0,
+  km_car DECIMAL(12,3) NOT NULL DEFAULT 0,
+  current_streak INT NOT NULL DEFAULT 0,
+  longest_streak INT NOT NULL DEFAULT 0,
+  last_active_date DATE NULL,
+  unread_notifications INT NOT NULL DEFAULT 0,
+  updated_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+  KEY idx_user_counters_last_active (last_active_date),
+  KEY idx_user_counters_points (points_earned),
+  CONSTRAINT fk_uc_user FOREIGN KEY (user_id) REFERENCES users(user_id)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+
 -- 대시보드 통계
 CREATE TABLE IF NOT EXISTS dashboard_stats (
   id BIGINT PRIMARY KEY AUTO_INCREMENT,
@@ -153,6 +218,29 @@ CREATE TABLE IF NOT EXISTS dashboard_stats (
   UNIQUE KEY uq_ds_user_date (user_id, date)
 ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
 
+-- 알림
+CREATE TABLE IF NOT EXISTS notifications (
+  notification_id BIGINT PRIMARY KEY AUTO_INCREMENT,
+  user_id BIGINT NOT NULL,
+  title VARCHAR(120) NOT NULL,
+  body VARCHAR(500),
+  status ENUM('PENDING','SENT','READ') DEFAULT 'PENDING',
+  batch_id VARCHAR(32) NULL,
+  created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+  read_at DATETIME NULL,
+  KEY idx_notifications_user (user_id, notification_id),
+  KEY idx_notifications_batch (batch_id),
+  CONSTRAINT fk_notif_user FOREIGN KEY (user_id) REFERENCES users(user_id)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+
+-- 배치 작업 체크포인트
+CREATE TABLE IF NOT EXISTS job_checkpoints (
+  job_name VARCHAR(100) PRIMARY KEY,
+  last_id BIGINT NOT NULL DEFAULT 0,
+  meta_json JSON NULL,
+  updated_at DATETIME DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+
 -- 인덱스
 CREATE INDEX idx_credits_ledger_user_id ON credits_ledger(user_id);
 CREATE INDEX idx_credits_ledger_created_at ON credits_ledger(created_at);
@@ -160,4 +248,6 @@ CREATE INDEX idx_user_gardens_user_id ON user_gardens(user_id);
 CREATE INDEX idx_user_achievements_user_id ON user_achievements(user_id);
 CREATE INDEX idx_mobility_logs_user_id ON mobility_logs(user_id);
 CREATE INDEX idx_mobility_logs_created_at ON mobility_logs(created_at);
+CREATE INDEX idx_mobility_logs_user_started ON mobility_logs(user_id, started_at);
+CREATE UNIQUE INDEX uq_mobility_logs_source_ref ON mobility_logs(source_id, raw_ref_id);
 CREATE INDEX idx_dashboard_stats_user_date ON dashboard_stats(user_id, date);
@@ -1,6 +1,6 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, Field, field_validator, model_validator
 from typing import Optional, List, Dict, Any
-from datetime import datetime
+from datetime import date, datetime, timedelta, timezone
 from enum import Enum
 
 # --------------------------
@@ -99,6 +99,11 @@ class ChallengeStat(BaseModel):
     goal: float
     progress: float
 
+class StreakStat(BaseModel):
+    current: int
+    longest: int
+    last_active_date: Optional[date] = None
+
 class DashboardStats(BaseModel):
     user_id: int
     co2_saved_today: float
@@ -109,6 +114,7 @@ class DashboardStats(BaseModel):
     last7days: List[DailySaving]
     modeStats: List[ModeStat]
     challenge: ChallengeStat
+    streak: Optional[StreakStat] = None
     class Config:
         from_attributes = True
 
@@ -124,15 +130,34 @@ class MobilityLog(BaseModel):
     start_point: Optional[str] = None
     end_point: Optional[str] = None
 
+MAX_TRIP_DURATION = timedelta(hours=12) # 이동 한 건의 최대 길이 (중복/겹침 검사 범위)
+
 class MobilityLogCreate(BaseModel):
     user_id: int
     mode: TransportMode
-    distance_km: float
+    distance_km: Optional[float] = None # 지하철/버스는 start_point/end_point 로 계산 가능
     started_at: datetime
     ended_at: datetime
     description: Optional[str] = None
     start_point: Optional[str] = None
     end_point: Optional[str] = None
+    route_id: Optional[str] = None # 버스 노선 ID (bus_distances.route_id)
+    raw_ref_id: Optional[str] = Field(None, max_length=64) # 클라이언트 이동 식별자 (재전송 시 같은 값 → 중복 기록 없음, 사용자별로 구분)
+
+    @field_validator("started_at", "ended_at")
+    @classmethod
+    def to_naive_utc(cls, value: datetime) -> datetime:
+        # 프론트엔드의 toISOString()("...Z") 은 tz-aware → DB/인덱스와 같은 naive UTC 로 맞춤
+        if value.tzinfo is not None:
+            value = value.astimezone(timezone.utc).replace(tzinfo=None)
+        return value
+
+    @model_validator(mode="after")
+    def check_duration(self) -> "MobilityLogCreate":
+        # 겹침 검사(services/trip_index.py)는 이 길이까지만 거슬러 보므로 더 긴 이동은 받지 않음
+        if self.ended_at - self.started_at > MAX_TRIP_DURATION:
+            raise ValueError(f"trip must not be longer than {MAX_TRIP_DURATION}")
+        return self
 
 # 챌린지 관련 스키마
 class Challenge(BaseModel):
@@ -174,6 +199,34 @@ class FrontendChallenge(BaseModel):
     reward: Optional[str] = None
     is_joined: bool # New field
 
+class ChallengeLeaderboardEntry(BaseModel):
+    rank: int
+    user_id: int
+    username: str
+    saved_g: float
+    trips: int
+
+class ChallengeLeaderboard(BaseModel):
+    challenge_id: int
+    scope: str
+    target_saved_g: int
+    total_saved_g: Optional[float] = None # GROUP 챌린지 합계
+    members: Optional[int] = None
+    progress: int # Percentage
+    my_saved_g: float
+    top: List[ChallengeLeaderboardEntry]
+
+class ChallengeRecommendation(BaseModel):
+    id: int
+    title: str
+    description: Optional[str] = None
+    reward: Optional[str] = None
+    target_mode: str
+    target_saved_g: int
+    start_at: datetime
+    end_at: datetime
+    score: float
+
 class ChallengeRecommendationRequest(BaseModel):
     user_id: int
     title: str
@@ -318,4 +371,25 @@ class MobilityLogResponse(BaseModel):
     start_point: Optional[str] = None
     end_point: Optional[str] = None
     class Config:
-        from_attributes = True
\ No newline at end of file
+        from_attributes = True
+
+class TransitDistance(BaseModel):
+    mode: TransportMode
+    start_point: str
+    end_point: str
+    distance_km: float
+
+class GpsTraceCreate(BaseModel):
+    user_id: int
+    points: List[List[float]] # [[위도, 경도, epoch 초], ...]
+    description: Optional[str] = None
+
+class GpsTraceResponse(BaseModel):
+    raw_id: int
+    trips: List[MobilityLogResponse]
+    duplicates_skipped: int = 0
+
+class SessionStateWrite(BaseModel):
+    values: Dict[str, Any] # 세션 키 → 값 (여러 키를 한 번에 저장)
+    ttl_seconds: Optional[float] = None # 모든 키 공통 TTL (없으면 만료 없음)
+    ttls: Dict[str, Optional[float]] = {} # 키별 TTL (공통 TTL 보다 우선)
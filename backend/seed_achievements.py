@@ -0,0 +1,45 @@
+from sqlalchemy.orm import Session
+
+from .database import SessionLocal
+from . import models
+from .services import achievement_engine
+
+# 업적 규칙: user_counters.<metric> >= threshold (services/achievement_engine.py)
+ACHIEVEMENTS = [
+    {"code": "FIRST_ECO_TRIP", "title": "첫 친환경 이동", "description": "첫 번째 친환경 교통수단 이용", "metric": "eco_trips", "threshold": 1},
+    {"code": "SAVED_10KG", "title": "탄소 절약 마스터", "description": "총 10kg CO₂ 절약 달성", "metric": "total_saved_g", "threshold": 10000},
+    {"code": "SUBWAY_20", "title": "지하철 애호가", "description": "지하철 20회 이용", "metric": "trips_subway", "threshold": 20},
+    {"code": "BIKE_50KM", "title": "자전거 라이더", "description": "자전거 50km 주행", "metric": "km_bike", "threshold": 50},
+    {"code": "WALK_100KM", "title": "도보의 달인", "description": "도보 100km 이동", "metric": "km_walk", "threshold": 100},
+    {"code": "STREAK_30", "title": "연속 출석왕", "description": "30일 연속 친환경 이동", "metric": "streak_days", "threshold": 30},
+    {"code": "POINTS_1000", "title": "에코 크레딧 수집가", "description": "1000P 이상 적립", "metric": "points_earned", "threshold": 1000},
+    {"code": "SAVED_50KG", "title": "환경 보호자", "description": "총 50kg CO₂ 절약 달성", "metric": "total_saved_g", "threshold": 50000},
+]
+
+
+def seed_achievements(db: Session):
+    """code 기준으로 업적 규칙을 추가하거나 갱신합니다."""
+    existing = {a.code: a for a in db.query(models.Achievement).filter(
+        models.Achievement.code.in_([item["code"] for item in ACHIEVEMENTS])
+    )}
+    for item in ACHIEVEMENTS:
+        achievement = existing.get(item["code"])
+        if achievement is None:
+            db.add(models.Achievement(**item))
+            print(f"Created achievement: {item['title']}")
+        else:
+            for key, value in item.items():
+                setattr(achievement, key, value)
+    db.commit()
+    achievement_engine.rules.invalidate()
+
+
+if __name__ == "__main__":
+    db = SessionLocal()
+    try:
+        seed_achievements(db)
+        print("Default achievements seeded successfully!")
+    except Exception as e:
+        print(f"Error seeding achievements: {e}")
+    finally:
+        db.close()
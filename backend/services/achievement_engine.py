@@ -0,0 +1,236 @@
+"""
+업적 규칙 엔진
+
+업적(achievements)은 "user_counters.<metric> >= threshold" 형태의 선언적 규칙입니다.
+  예) total_saved_g >= 10000 (총 10kg 절감), trips_subway >= 20, km_bike >= 50, points_earned >= 1000,
+      streak_days >= 30 (30일 연속 친환경 이동, services/streaks.py)
+
+- 이동/포인트 이벤트가 오면 사용자별 누적 카운터(user_counters)에 증가분만 upsert 하고,
+  바뀐 metric 의 규칙만 카운터 값으로 판정 → mobility_logs / credits_ledger 를 다시 읽지 않음
+- 임계값을 넘은 규칙은 user_achievements 에 INSERT (이미 받은 업적은 건너뜀, 커밋은 호출자)
+  새로 받은 업적은 같은 트랜잭션에서 알림으로 기록 (커밋 후 push, services/notifications.py)
+- 규칙은 REFRESH_SECONDS 동안 메모리에 두고 metric 별 임계값 순으로 보관
+- progress(): 규칙 목록 + 카운터 행 하나 + 받은 업적 행들로 O(규칙 수) 진행률 계산
+"""
+import threading
+import time
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional, Sequence, Set, Tuple
+
+from sqlalchemy.orm import Session
+
+from .. import models
+from . import notifications, streaks
+from .scoring import BASELINE_MODE
+from .upsert import insert_ignore, upsert
+
+REFRESH_SECONDS = 300
+TRIP_MODES = [m.value for m in models.TransportMode if m != models.TransportMode.ANY]
+
+# 이동/포인트 증가분을 더하는 카운터 (user_counters 컬럼 이름과 같음)
+TRIP_FIELDS = [
+    "eco_trips", "total_saved_g", "points_earned",
+    *[f"trips_{m.lower()}" for m in TRIP_MODES],
+    *[f"km_{m.lower()}" for m in TRIP_MODES],
+]
+# metric 이름 → user_counters 컬럼
+METRICS: Dict[str, Any] = {
+    **{field: getattr(models.UserCounter, field) for field in TRIP_FIELDS},
+    "streak_days": models.UserCounter.current_streak,
+}
+
+
+def _mode_value(mode: Any) -> str:
+    return getattr(mode, "value", mode)
+
+
+class Rule(NamedTuple):
+    achievement_id: int
+    title: str
+    description: Optional[str]
+    metric: Optional[str]
+    threshold: float
+
+
+class RuleSet:
+    def __init__(self, refresh_seconds: int = REFRESH_SECONDS):
+        self.refresh_seconds = refresh_seconds
+        self._rules: List[Rule] = []
+        self._by_metric: Dict[str, List[Rule]] = {}
+        self._loaded_at: Optional[float] = None
+        self._lock = threading.Lock()
+
+    def _ensure_loaded(self, db: Session):
+        if self._loaded_at is not None and time.monotonic() - self._loaded_at < self.refresh_seconds:
+            return
+        rules = [
+            Rule(a.achievement_id, a.title, a.description, a.metric, float(a.threshold or 0))
+            for a in db.query(models.Achievement).order_by(models.Achievement.achievement_id)
+        ]
+        by_metric: Dict[str, List[Rule]] = {}
+        for rule in rules:
+            if rule.metric in METRICS:
+                by_metric.setdefault(rule.metric, []).append(rule)
+        for items in by_metric.values():
+            items.sort(key=lambda r: r.threshold)
+        with self._lock:
+            self._rules, self._by_metric = rules, by_metric
+            self._loaded_at = time.monotonic()
+
+    def invalidate(self):
+        with self._lock:
+            self._loaded_at = None
+
+    def all(self, db: Session) -> List[Rule]:
+        self._ensure_loaded(db)
+        return self._rules
+
+    def for_metrics(self, db: Session, metrics: Iterable[str]) -> List[Rule]:
+        self._ensure_loaded(db)
+        return [rule for metric in metrics for rule in self._by_metric.get(metric, ())]
+
+
+rules = RuleSet()
+
+
+def add_counters(db: Session, rows: List[Dict[str, Any]]):
+    """user_id 별 카운터 증가분 upsert (모든 행이 같은 키를 가져야 함, 커밋은 호출자)"""
+    upsert(db, models.UserCounter, ("user_id",), rows, accumulate=True)
+
+
+def counters_for(db: Session, user_ids: Sequence[int], metrics: Iterable[str]) -> Dict[int, Dict[str, float]]:
+    """user_id → {metric: 값} (카운터 행이 없는 사용자는 빠짐)"""
+    metrics = list(metrics)
+    found: Dict[int, Dict[str, float]] = {}
+    for start in range(0, len(user_ids), 1000):
+        for row in db.query(models.UserCounter.user_id, *[METRICS[m] for m in metrics]).filter(
+            models.UserCounter.user_id.in_(user_ids[start:start + 1000])
+        ):
+            found[row[0]] = {m: float(v or 0) for m, v in zip(metrics, row[1:])}
+    return found
+
+
+def evaluate(db: Session, user_ids: Iterable[int], metrics: Iterable[str]) -> List[Tuple[int, int]]:
+    """
+    metrics 에 걸린 규칙만 사용자 카운터로 판정해 새로 달성한 업적을 부여합니다. (커밋은 호출자)
+    반환값은 새로 부여한 (user_id, achievement_id) 목록입니다.
+    """
+    user_ids = sorted(set(user_ids))
+    candidates = rules.for_metrics(db, set(metrics))
+    if not user_ids or not candidates:
+        return []
+    counters = counters_for(db, user_ids, {r.metric for r in candidates})
+
+    crossed = [
+        (user_id, rule.achievement_id)
+        for user_id, values in counters.items()
+        for rule in candidates if values[rule.metric] >= rule.threshold
+    ]
+    if not crossed:
+        return []
+    granted: Set[Tuple[int, int]] = set()
+    rule_ids = list({r.achievement_id for r in candidates})
+    crossed_users = sorted({user_id for user_id, _ in crossed})
+    for start in range(0, len(crossed_users), 1000):
+        granted.update(db.query(models.UserAchievement.user_id, models.UserAchievement.achievement_id).filter(
+            models.UserAchievement.user_id.in_(crossed_users[start:start + 1000]),
+            models.UserAchievement.achievement_id.in_(rule_ids),
+        ))
+    new = [key for key in crossed if key not in granted]
+    if new:
+        now = datetime.utcnow()
+        db.execute(insert_ignore(db, models.UserAchievement, ("user_id", "achievement_id")), [
+            {"user_id": user_id, "achievement_id": achievement_id, "granted_at": now}
+            for user_id, achievement_id in new
+        ])
+        titles = {r.achievement_id: r.title for r in candidates}
+        notifications.create_many(db, [
+            (user_id, "새로운 업적 달성!", f"{titles[achievement_id]} 업적을 달성했습니다!")
+            for user_id, achievement_id in new
+        ])
+    return new
+
+
+def on_trips(db: Session, trips: Sequence[Any]) -> List[Tuple[int, int]]:
+    """
+    기록된 이동들(user_id, mode, distance_km, co2_saved_g, points)을 카운터에 더하고 업적을 판정합니다.
+    같은 사용자의 이동은 합쳐서 사용자당 한 행으로 upsert 합니다.
+    """
+    if not trips:
+        return []
+    increments: Dict[int, Dict[str, float]] = {}
+    metrics = {"eco_trips", "total_saved_g", "points_earned"}
+    for trip in trips:
+        mode = _mode_value(trip.mode).lower()
+        acc = increments.get(trip.user_id)
+        if acc is None:
+            acc = increments[trip.user_id] = dict.fromkeys(TRIP_FIELDS, 0)
+        acc["total_saved_g"] += float(trip.co2_saved_g or 0)
+        acc["points_earned"] += int(trip.points or 0)
+        # ANY 는 교통수단별 카운터가 없으므로 건너뜀 (jobs/backfill_achievements.py 와 같은 기준)
+        if f"trips_{mode}" not in acc:
+            continue
+        acc["eco_trips"] += mode != BASELINE_MODE.value.lower()
+        acc[f"trips_{mode}"] += 1
+        acc[f"km_{mode}"] += float(trip.distance_km or 0)
+        metrics.update((f"trips_{mode}", f"km_{mode}"))
+
+    now = datetime.utcnow()
+    add_counters(db, [
+        {
+            "user_id": user_id,
+            **{k: round(v, 3) if isinstance(v, float) else v for k, v in acc.items()},
+            "updated_at": now,
+        }
+        for user_id, acc in increments.items()
+    ])
+    if streaks.apply_trips(db, trips):
+        metrics.add("streak_days")
+    return evaluate(db, increments, metrics)
+
+
+def on_points(db: Session, points_by_user: Dict[int, int]) -> List[Tuple[int, int]]:
+    """챌린지 보상 포인트를 카운터에 더하고 포인트 업적만 판정합니다."""
+    points_by_user = {u: p for u, p in points_by_user.items() if p}
+    if not points_by_user:
+        return []
+    now = datetime.utcnow()
+    add_counters(db, [
+        {"user_id": user_id, "points_earned": points, "updated_at": now}
+        for user_id, points in points_by_user.items()
+    ])
+    return evaluate(db, points_by_user, ("points_earned",))
+
+
+def progress(db: Session, user_id: int) -> List[Dict[str, Any]]:
+    """
+    사용자의 업적 목록과 진행률 (규칙 순)
+    규칙은 메모리, 카운터는 기본키 한 행(연속 일수는 streaks.for_user), 받은 업적은 사용자 인덱스로 읽음
+    """
+    all_rules = rules.all(db)
+    values = counters_for(db, [user_id], METRICS).get(user_id, {})
+    # 저장된 current_streak 은 마지막 활동일 기준이므로 오늘(KST) 기준으로 끊겼는지 다시 판단
+    values["streak_days"] = streaks.for_user(db, user_id)["current"]
+    granted = dict(db.query(models.UserAchievement.achievement_id, models.UserAchievement.granted_at).filter(
+        models.UserAchievement.user_id == user_id
+    ).all())
+
+    result = []
+    for rule in all_rules:
+        unlocked = rule.achievement_id in granted
+        if unlocked:
+            percent = 100
+        elif rule.metric in METRICS and rule.threshold > 0:
+            percent = min(int(values.get(rule.metric, 0) / rule.threshold * 100), 99)
+        else:
+            percent = 0
+        granted_at = granted.get(rule.achievement_id)
+        result.append({
+            "id": rule.achievement_id,
+            "name": rule.title,
+            "desc": rule.description,
+            "progress": percent,
+            "unlocked": unlocked,
+            "date": granted_at.date().isoformat() if granted_at else None,
+        })
+    return result
@@ -0,0 +1,245 @@
+"""
+진행 중인 챌린지 인메모리 인덱스
+
+이동 하나가 어떤 챌린지에 기여하는지 매번 DB 에서 찾지 않도록 진행 중인 챌린지를
+target_mode 별 버킷(ANY 포함)에 start_at 순으로 정렬해 두고, 사용자별 참여 챌린지 ID 집합을 함께 보관합니다.
+
+- match(): 이동의 교통수단 버킷과 ANY 버킷에서 started_at 이전에 시작한 챌린지만 bisect 로 잘라낸 뒤,
+  사용자 참여 집합 쪽이 더 작으면 그 집합을 순회 → 비용은 후보(대개 매칭되는 챌린지) 수에 비례
+- 챌린지 생성/수정/삭제 시 refresh(), 참여/탈퇴 시 add_member()/remove_member()
+- 여러 프로세스(워커, 배치)가 각자 인덱스를 가지므로 참여/탈퇴와 챌린지 변경은 같은 트랜잭션에서
+  record_change() 로 버전 행(job_checkpoints, VERSION_JOB)의 번호를 올리고 바뀐 user_id 를 남김
+  → ensure_loaded() 는 버전 번호만 기본키로 읽고, 바뀌었으면 그 사용자들만 sync_members() 로 다시 읽음
+  (챌린지 변경이거나 MAX_CHANGES 를 넘게 밀렸으면 refresh). 안전망으로 REFRESH_SECONDS 마다 전체를 다시 읽음
+- 종료 후 LATE_TRIP_DAYS 가 지난 챌린지는 인덱스에서 빠짐. cutoff 이전에 끝난 과거 이동(배치 재적재 등)은
+  인덱스로 판단할 수 없으므로 호출자가 DB 로 조회 (challenge_progress.apply_trips)
+"""
+import threading
+import time
+from bisect import bisect_right
+from datetime import datetime, timedelta
+from itertools import islice
+from typing import Any, Dict, Iterable, List, Optional, Set
+
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from .. import models
+
+REFRESH_SECONDS = 60
+LATE_TRIP_DAYS = 7
+VERSION_JOB = "challenge_index_version"
+MAX_CHANGES = 500  # 버전 행에 남기는 최근 변경 수
+ANY = models.TransportMode.ANY.value
+
+
+def _mode_value(mode: Any) -> str:
+    return getattr(mode, "value", mode)
+
+
+def _version_query(db: Session):
+    return db.query(models.JobCheckpoint).filter(models.JobCheckpoint.job_name == VERSION_JOB)
+
+
+def current_version(db: Session) -> int:
+    row = db.query(models.JobCheckpoint.last_id).filter(models.JobCheckpoint.job_name == VERSION_JOB).first()
+    return row[0] if row else 0
+
+
+def record_change(db: Session, user_id: Optional[int] = None):
+    """
+    참여/탈퇴(user_id) 또는 챌린지 생성/수정/삭제(None)를 버전 행에 기록합니다. (커밋은 호출자)
+    변경과 같은 트랜잭션에서 호출해야 다른 프로세스가 변경을 보는 순간 버전도 함께 보임
+    """
+    row = _version_query(db).with_for_update().first()
+    if row is None:
+        try:
+            with db.begin_nested():
+                db.add(models.JobCheckpoint(job_name=VERSION_JOB, last_id=0, meta_json={"changes": []}))
+        except IntegrityError:
+            pass
+        row = _version_query(db).with_for_update().one()
+    row.last_id += 1
+    changes = list((row.meta_json or {}).get("changes", ()))
+    changes.append([row.last_id, user_id])
+    row.meta_json = {"changes": changes[-MAX_CHANGES:]}
+    row.updated_at = datetime.utcnow()
+
+
+class IndexedChallenge:
+    """인덱스에 보관하는 챌린지 요약 (세션과 분리된 값)"""
+
+    __slots__ = ("challenge_id", "mode", "scope", "start_at", "end_at", "target_saved_g")
+
+    def __init__(self, challenge_id: int, mode: str, scope: str, start_at: datetime, end_at: datetime, target_saved_g: int):
+        self.challenge_id = challenge_id
+        self.mode = mode
+        self.scope = scope
+        self.start_at = start_at
+        self.end_at = end_at
+        self.target_saved_g = target_saved_g
+
+    @classmethod
+    def from_model(cls, challenge: models.Challenge) -> "IndexedChallenge":
+        return cls(
+            challenge.challenge_id,
+            _mode_value(challenge.target_mode) or ANY,
+            _mode_value(challenge.scope) or models.ChallengeScope.PERSONAL.value,
+            challenge.start_at,
+            challenge.end_at,
+            challenge.target_saved_g,
+        )
+
+    def covers(self, started_at: datetime, ended_at: datetime) -> bool:
+        return self.start_at <= started_at and ended_at <= self.end_at
+
+
+class _Bucket:
+    """한 교통수단의 챌린지들 (start_at 오름차순)"""
+
+    __slots__ = ("starts", "challenges")
+
+    def __init__(self, challenges: List[IndexedChallenge]):
+        self.challenges = sorted(challenges, key=lambda c: (c.start_at, c.challenge_id))
+        self.starts = [c.start_at for c in self.challenges]
+
+    def started_before(self, at: datetime) -> int:
+        """at 이전에 시작한 챌린지 수 (self.challenges 의 앞부분)"""
+        return bisect_right(self.starts, at)
+
+
+class ChallengeIndex:
+    def __init__(self, refresh_seconds: int = REFRESH_SECONDS):
+        self.refresh_seconds = refresh_seconds
+        self._challenges: Dict[int, IndexedChallenge] = {}
+        self._buckets: Dict[str, _Bucket] = {}
+        self._joined: Dict[int, Set[int]] = {}
+        self._loaded_at: Optional[float] = None
+        self.version: Optional[int] = None
+        self.cutoff: Optional[datetime] = None
+        self._lock = threading.Lock()
+
+    def is_stale(self) -> bool:
+        return self._loaded_at is None or time.monotonic() - self._loaded_at >= self.refresh_seconds
+
+    def ensure_loaded(self, db: Session):
+        """오래됐으면 다시 읽고, 아니면 버전 행(기본키 한 행)으로 다른 프로세스의 변경만 반영합니다."""
+        if self.is_stale():
+            self.refresh(db)
+            return
+        version = current_version(db)
+        if version == self.version:
+            return
+        row = _version_query(db).first()
+        changes = (row.meta_json or {}).get("changes", ()) if row else ()
+        pending = [(v, user_id) for v, user_id in changes if v > (self.version or 0)]
+        if not pending or pending[0][0] != (self.version or 0) + 1 or any(user_id is None for _, user_id in pending):
+            self.refresh(db)
+            return
+        self.sync_members(db, (user_id for _, user_id in pending))
+        with self._lock:
+            self.version = max(self.version or 0, pending[-1][0])
+
+    def refresh(self, db: Session, now: Optional[datetime] = None):
+        """진행 중(및 종료 후 LATE_TRIP_DAYS 이내) 챌린지와 참여자를 다시 읽어 인덱스를 교체합니다."""
+        version = current_version(db)  # 먼저 읽어 두면 읽는 도중의 변경은 다음 ensure_loaded 에서 다시 반영
+        cutoff = (now or datetime.utcnow()) - timedelta(days=LATE_TRIP_DAYS)
+        challenges = {
+            c.challenge_id: IndexedChallenge.from_model(c)
+            for c in db.query(models.Challenge).filter(models.Challenge.end_at >= cutoff)
+        }
+        joined: Dict[int, Set[int]] = {}
+        ids = list(challenges)
+        for start in range(0, len(ids), 1000):
+            for challenge_id, user_id in db.query(models.ChallengeMember.challenge_id, models.ChallengeMember.user_id).filter(
+                models.ChallengeMember.challenge_id.in_(ids[start:start + 1000])
+            ):
+                joined.setdefault(user_id, set()).add(challenge_id)
+        by_mode: Dict[str, List[IndexedChallenge]] = {}
+        for challenge in challenges.values():
+            by_mode.setdefault(challenge.mode, []).append(challenge)
+        buckets = {mode: _Bucket(items) for mode, items in by_mode.items()}
+
+        with self._lock:
+            self._challenges, self._buckets, self._joined = challenges, buckets, joined
+            self.cutoff = cutoff
+            self.version = version
+            self._loaded_at = time.monotonic()
+
+    def invalidate(self):
+        with self._lock:
+            self._loaded_at = None
+
+    def add_member(self, challenge_id: int, user_id: int):
+        with self._lock:
+            if challenge_id in self._challenges:
+                self._joined.setdefault(user_id, set()).add(challenge_id)
+
+    def remove_member(self, challenge_id: int, user_id: int):
+        with self._lock:
+            joined = self._joined.get(user_id)
+            if joined is not None:
+                joined.discard(challenge_id)
+                if not joined:
+                    del self._joined[user_id]
+
+    def sync_members(self, db: Session, user_ids: Iterable[int]):
+        """사용자들의 참여 챌린지를 DB 기준으로 다시 맞춥니다. (다른 프로세스에서 참여/탈퇴한 사용자)"""
+        user_ids = sorted(set(user_ids))
+        if not user_ids or self.cutoff is None:
+            return
+        found: Dict[int, Set[int]] = {user_id: set() for user_id in user_ids}
+        for start in range(0, len(user_ids), 1000):
+            for challenge_id, user_id in db.query(models.ChallengeMember.challenge_id, models.ChallengeMember.user_id).join(
+                models.Challenge, models.Challenge.challenge_id == models.ChallengeMember.challenge_id
+            ).filter(
+                models.ChallengeMember.user_id.in_(user_ids[start:start + 1000]),
+                models.Challenge.end_at >= self.cutoff,
+            ):
+                found[user_id].add(challenge_id)
+        # 다른 프로세스에서 만든 챌린지가 아직 인덱스에 없음
+        if any(challenge_id not in self._challenges for ids in found.values() for challenge_id in ids):
+            self.refresh(db)
+        with self._lock:
+            for user_id, ids in found.items():
+                ids &= self._challenges.keys()
+                if ids:
+                    self._joined[user_id] = ids
+                else:
+                    self._joined.pop(user_id, None)
+
+    def covers_time(self, ended_at: datetime) -> bool:
+        """이 시각에 끝난 이동을 인덱스만으로 매칭할 수 있는지 (cutoff 이후에 끝난 챌린지만 보관)"""
+        return self.cutoff is not None and ended_at >= self.cutoff
+
+    def get(self, challenge_id: int) -> Optional[IndexedChallenge]:
+        return self._challenges.get(challenge_id)
+
+    def joined(self, user_id: int) -> Set[int]:
+        return self._joined.get(user_id, set())
+
+    def match(self, user_id: int, mode: Any, started_at: datetime, ended_at: datetime) -> List[IndexedChallenge]:
+        """사용자가 참여했고 교통수단(또는 ANY)과 기간이 맞는 챌린지"""
+        mode = _mode_value(mode)
+        with self._lock:
+            joined = self._joined.get(user_id)
+            if not joined:
+                return []
+            challenges, buckets = self._challenges, self._buckets
+            joined = tuple(joined)
+
+        candidates: List[IndexedChallenge] = []
+        started = [(buckets[m], buckets[m].started_before(started_at)) for m in {mode, ANY} if m in buckets]
+        if len(joined) <= sum(n for _, n in started):
+            for challenge_id in joined:
+                challenge = challenges.get(challenge_id)
+                if challenge is not None and challenge.mode in (mode, ANY):
+                    candidates.append(challenge)
+        else:
+            joined_set = set(joined)
+            for bucket, n in started:
+                candidates.extend(c for c in islice(bucket.challenges, n) if c.challenge_id in joined_set)
+        return [c for c in candidates if c.covers(started_at, ended_at)]
+
+
+challenge_index = ChallengeIndex()
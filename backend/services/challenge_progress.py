@@ -0,0 +1,312 @@
+"""
+챌린지 진행률 증분 집계 (challenge_progress 테이블)
+
+이동이 기록될 때 사용자가 참여한 챌린지 중 교통수단(또는 ANY)과 기간이 맞는 것만 골라
+(challenge_id, user_id) 별 누적 절감량/이동 수를 더합니다. 매칭은 services/challenge_index.py 의 인메모리 인덱스 사용.
+챌린지 목록은 mobility_logs 를 챌린지마다 SUM 하지 않고 이 테이블을 사용자 인덱스로 한 번 읽습니다.
+GROUP 챌린지는 참여자 기여분을 같은 트랜잭션에서 challenge_totals 에도 더하므로
+참여자가 많아도 진행률 조회는 행 하나, 리더보드는 (challenge_id, saved_g) 인덱스 상위 K 행만 읽습니다.
+
+기간 판정은 기존 calculate_challenge_progress 와 같습니다: start_at <= started_at, ended_at <= end_at
+"""
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from .. import models
+from .challenge_index import challenge_index
+from .upsert import upsert
+
+Key = Tuple[int, int]  # (challenge_id, user_id)
+
+
+def _mode_value(mode: Any) -> str:
+    return getattr(mode, "value", mode)
+
+
+def upsert_progress(db: Session, rows: List[Dict[str, Any]], accumulate: bool = True):
+    """(challenge_id, user_id) 별 saved_g/trips upsert"""
+    upsert(db, models.ChallengeProgress, ("challenge_id", "user_id"), rows, accumulate)
+
+
+def upsert_totals(db: Session, rows: List[Dict[str, Any]], accumulate: bool = True):
+    """GROUP 챌린지별 saved_g/trips/members upsert"""
+    upsert(db, models.ChallengeTotal, ("challenge_id",), rows, accumulate)
+
+
+def _is_group(scope: Any) -> bool:
+    return _mode_value(scope) == models.ChallengeScope.GROUP.value
+
+
+def _matches(challenge: models.Challenge, trip: Any) -> bool:
+    target = _mode_value(challenge.target_mode)
+    if target != models.TransportMode.ANY.value and target != _mode_value(trip.mode):
+        return False
+    return challenge.start_at <= trip.started_at and trip.ended_at <= challenge.end_at
+
+
+def joined_challenges(
+    db: Session, user_ids: Iterable[int], window_start: datetime, window_end: datetime
+) -> Dict[int, List[models.Challenge]]:
+    """사용자들이 참여한 챌린지 중 [window_start, window_end] 와 기간이 겹치는 것 (user_id → 챌린지 목록)"""
+    user_ids = list(set(user_ids))
+    found: Dict[int, List[models.Challenge]] = {}
+    for start in range(0, len(user_ids), 1000):
+        rows = db.query(models.ChallengeMember.user_id, models.Challenge).join(
+            models.Challenge, models.Challenge.challenge_id == models.ChallengeMember.challenge_id
+        ).filter(
+            models.ChallengeMember.user_id.in_(user_ids[start:start + 1000]),
+            models.Challenge.start_at <= window_end,
+            models.Challenge.end_at >= window_start,
+        ).all()
+        for user_id, challenge in rows:
+            found.setdefault(user_id, []).append(challenge)
+    return found
+
+
+def apply_trips(db: Session, trips: Sequence[Any]) -> int:
+    """
+    기록된 이동들을 참여 챌린지 진행률에 더합니다. (커밋은 호출자)
+    매칭은 challenge_index 의 인메모리 인덱스로 하고(과거 이동만 DB 조회), 같은 (챌린지, 사용자) 증가분은 합쳐서 upsert 합니다.
+    반환값은 갱신된 (챌린지, 사용자) 수입니다.
+    """
+    if not trips:
+        return 0
+    # 다른 워커에서 방금 참여/탈퇴한 사용자도 버전 행으로 확인해 반영
+    challenge_index.ensure_loaded(db)
+
+    increments: Dict[Key, List[float]] = {}
+    group_ids = set()
+
+    def add(challenge_id: int, scope: Any, trip: Any):
+        if _is_group(scope):
+            group_ids.add(challenge_id)
+        acc = increments.setdefault((challenge_id, trip.user_id), [0.0, 0])
+        acc[0] += float(trip.co2_saved_g or 0)
+        acc[1] += 1
+
+    old_trips = []
+    for trip in trips:
+        if not challenge_index.covers_time(trip.ended_at):
+            old_trips.append(trip)
+            continue
+        for challenge in challenge_index.match(trip.user_id, trip.mode, trip.started_at, trip.ended_at):
+            add(challenge.challenge_id, challenge.scope, trip)
+
+    # 인덱스 보관 기간 이전의 과거 이동은 참여 챌린지를 DB 에서 한 번에 조회
+    if old_trips:
+        by_user = joined_challenges(
+            db,
+            (t.user_id for t in old_trips),
+            min(t.started_at for t in old_trips),
+            max(t.ended_at for t in old_trips),
+        )
+        for trip in old_trips:
+            for challenge in by_user.get(trip.user_id, ()):
+                if _matches(challenge, trip):
+                    add(challenge.challenge_id, challenge.scope, trip)
+    if not increments:
+        return 0
+
+    now = datetime.utcnow()
+    upsert_progress(db, [
+        {"challenge_id": c, "user_id": u, "saved_g": round(g, 3), "trips": n, "updated_at": now}
+        for (c, u), (g, n) in increments.items()
+    ])
+
+    # GROUP 챌린지는 참여자 기여분을 챌린지 합계에도 더함
+    if group_ids:
+        totals: Dict[int, List[float]] = {}
+        for (c, _), (g, n) in increments.items():
+            if c in group_ids:
+                acc = totals.setdefault(c, [0.0, 0])
+                acc[0] += g
+                acc[1] += n
+        upsert_totals(db, [
+            {"challenge_id": c, "saved_g": round(g, 3), "trips": n, "members": 0, "updated_at": now}
+            for c, (g, n) in totals.items()
+        ])
+    return len(increments)
+
+
+def _logs_matching(db: Session, challenge: models.Challenge):
+    query = db.query(
+        models.MobilityLog.user_id,
+        func.coalesce(func.sum(models.MobilityLog.co2_saved_g), 0),
+        func.count(models.MobilityLog.log_id),
+    ).filter(
+        models.MobilityLog.started_at >= challenge.start_at,
+        models.MobilityLog.ended_at <= challenge.end_at,
+    )
+    if _mode_value(challenge.target_mode) != models.TransportMode.ANY.value:
+        query = query.filter(models.MobilityLog.mode == challenge.target_mode)
+    return query
+
+
+def _member_row(db: Session, challenge_id: int, user_id: int) -> Optional[Tuple[float, int]]:
+    """현재 (saved_g, trips) — upsert 는 세션 identity map 을 거치지 않으므로 컬럼 조회로 읽음"""
+    row = db.query(models.ChallengeProgress.saved_g, models.ChallengeProgress.trips).filter(
+        models.ChallengeProgress.challenge_id == challenge_id,
+        models.ChallengeProgress.user_id == user_id,
+    ).first()
+    return (float(row[0] or 0), row[1] or 0) if row else None
+
+
+def seed_member(db: Session, challenge: models.Challenge, user_id: int):
+    """참여 시점에 이미 기록된 이동으로 진행률 행을 만듭니다. (한 번의 SUM, 커밋은 호출자)"""
+    _, saved_g, trips = _logs_matching(db, challenge).filter(
+        models.MobilityLog.user_id == user_id
+    ).group_by(models.MobilityLog.user_id).first() or (user_id, 0, 0)
+    saved_g, trips, now = round(float(saved_g), 3), int(trips), datetime.utcnow()
+    old = _member_row(db, challenge.challenge_id, user_id) if _is_group(challenge.scope) else None
+    upsert_progress(db, [{
+        "challenge_id": challenge.challenge_id,
+        "user_id": user_id,
+        "saved_g": saved_g,
+        "trips": trips,
+        "updated_at": now,
+    }], accumulate=False)
+    if _is_group(challenge.scope):
+        upsert_totals(db, [{
+            "challenge_id": challenge.challenge_id,
+            "saved_g": saved_g - (old[0] if old else 0),
+            "trips": trips - (old[1] if old else 0),
+            "members": 0 if old else 1,
+            "updated_at": now,
+        }])
+
+
+def rebuild_challenge(db: Session, challenge: models.Challenge):
+    """챌린지의 대상 교통수단/기간이 바뀌면 참여자 전체 진행률을 GROUP BY 한 번으로 다시 계산합니다."""
+    members = db.query(models.ChallengeMember.user_id).filter(
+        models.ChallengeMember.challenge_id == challenge.challenge_id
+    )
+    totals = {
+        user_id: (saved_g, trips)
+        for user_id, saved_g, trips in _logs_matching(db, challenge).filter(
+            models.MobilityLog.user_id.in_(members)
+        ).group_by(models.MobilityLog.user_id)
+    }
+    now = datetime.utcnow()
+    rows = [
+        {
+            "challenge_id": challenge.challenge_id,
+            "user_id": user_id,
+            "saved_g": round(float(totals.get(user_id, (0, 0))[0]), 3),
+            "trips": int(totals.get(user_id, (0, 0))[1]),
+            "updated_at": now,
+        }
+        for (user_id,) in members
+    ]
+    upsert_progress(db, rows, accumulate=False)
+
+    # GROUP 합계는 방금 계산한 참여자 값으로 덮어쓰고, GROUP 이 아니게 됐으면 제거
+    if _is_group(challenge.scope):
+        upsert_totals(db, [{
+            "challenge_id": challenge.challenge_id,
+            "saved_g": round(sum(r["saved_g"] for r in rows), 3),
+            "trips": sum(r["trips"] for r in rows),
+            "members": len(rows),
+            "updated_at": now,
+        }], accumulate=False)
+    else:
+        db.query(models.ChallengeTotal).filter(
+            models.ChallengeTotal.challenge_id == challenge.challenge_id
+        ).delete(synchronize_session=False)
+
+
+def remove_member(db: Session, challenge_id: int, user_id: int):
+    """탈퇴한 참여자의 진행률 행을 지우고 GROUP 합계에서 기여분을 뺍니다. (커밋은 호출자)"""
+    row = _member_row(db, challenge_id, user_id)
+    if row is None:
+        return
+    challenge = db.get(models.Challenge, challenge_id)
+    if challenge is not None and _is_group(challenge.scope):
+        upsert_totals(db, [{
+            "challenge_id": challenge_id,
+            "saved_g": -row[0],
+            "trips": -row[1],
+            "members": -1,
+            "updated_at": datetime.utcnow(),
+        }])
+    db.query(models.ChallengeProgress).filter(
+        models.ChallengeProgress.challenge_id == challenge_id,
+        models.ChallengeProgress.user_id == user_id,
+    ).delete(synchronize_session=False)
+
+
+def remove_user(db: Session, user_id: int):
+    """사용자 삭제 시 모든 챌린지에서 진행률을 제거합니다. (커밋은 호출자)"""
+    for (challenge_id,) in db.query(models.ChallengeProgress.challenge_id).filter(
+        models.ChallengeProgress.user_id == user_id
+    ).all():
+        remove_member(db, challenge_id, user_id)
+
+
+def remove_challenge(db: Session, challenge_id: int):
+    """챌린지 삭제 시 진행률/합계 행을 지웁니다. (커밋은 호출자)"""
+    db.query(models.ChallengeProgress).filter(
+        models.ChallengeProgress.challenge_id == challenge_id
+    ).delete(synchronize_session=False)
+    db.query(models.ChallengeTotal).filter(
+        models.ChallengeTotal.challenge_id == challenge_id
+    ).delete(synchronize_session=False)
+
+
+def rebuild_all(db: Session) -> int:
+    """참여자가 있는 모든 챌린지의 진행률을 다시 계산합니다. (재계산 배치 후, 도입 시 채우기는 jobs/backfill_challenge_progress.py)"""
+    challenges = db.query(models.Challenge).filter(
+        models.Challenge.challenge_id.in_(db.query(models.ChallengeMember.challenge_id).distinct())
+    ).all()
+    for challenge in challenges:
+        rebuild_challenge(db, challenge)
+        db.commit()
+    return len(challenges)
+
+
+def progress_for_user(db: Session, user_id: int) -> Dict[int, float]:
+    """
+    사용자가 참여한 모든 챌린지의 진행률 기준 절감량 (challenge_id → saved_g)
+    PERSONAL 은 본인 누적값, GROUP 은 챌린지 합계(challenge_totals)를 사용
+    challenge_members 에 challenge_progress / challenge_totals 를 기본키로 조인하는 쿼리 한 번
+    """
+    rows = db.query(
+        models.ChallengeMember.challenge_id, models.ChallengeProgress.saved_g, models.ChallengeTotal.saved_g
+    ).outerjoin(
+        models.ChallengeProgress,
+        (models.ChallengeProgress.challenge_id == models.ChallengeMember.challenge_id)
+        & (models.ChallengeProgress.user_id == models.ChallengeMember.user_id),
+    ).outerjoin(
+        models.ChallengeTotal, models.ChallengeTotal.challenge_id == models.ChallengeMember.challenge_id
+    ).filter(models.ChallengeMember.user_id == user_id).all()
+    return {
+        challenge_id: float(total_g if total_g is not None else (saved_g or 0))
+        for challenge_id, saved_g, total_g in rows
+    }
+
+
+def leaderboard(db: Session, challenge_id: int, limit: int = 10) -> List[Tuple[int, str, float, int]]:
+    """
+    챌린지 기여도 상위 limit 명 (user_id, username, saved_g, trips)
+    (challenge_id, saved_g) 인덱스를 역순으로 limit 행만 읽으므로 참여자 수와 무관
+    (InnoDB 보조 인덱스 끝에 기본키 user_id 가 붙으므로 동점은 user_id 역순이어야 filesort 없이 역방향 스캔)
+    """
+    rows = db.query(
+        models.ChallengeProgress.user_id, models.User.username,
+        models.ChallengeProgress.saved_g, models.ChallengeProgress.trips,
+    ).join(
+        models.User, models.User.user_id == models.ChallengeProgress.user_id
+    ).filter(
+        models.ChallengeProgress.challenge_id == challenge_id
+    ).order_by(
+        models.ChallengeProgress.saved_g.desc(), models.ChallengeProgress.user_id.desc()
+    ).limit(limit).all()
+    return [(user_id, username, float(saved_g or 0), trips or 0) for user_id, username, saved_g, trips in rows]
+
+
+def percent(saved_g: Optional[float], target_saved_g: Optional[int]) -> float:
+    if not target_saved_g or target_saved_g <= 0:
+        return 0.0
+    return min(float(saved_g or 0) / target_saved_g * 100, 100.0)
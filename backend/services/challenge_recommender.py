@@ -0,0 +1,215 @@
+"""
+챌린지 추천 (NumPy 행렬 연산)
+
+사용자와 챌린지를 같은 특징 공간의 벡터로 만들고, 점수 행렬을 행렬곱 한 번(U @ C.T)으로 계산한 뒤
+사용자별 상위 K 개를 argpartition 으로 고릅니다.
+
+사용자 특징 (최근 WINDOW_DAYS 일 집계, 사용자×교통수단 / 사용자×날짜 GROUP BY 두 번):
+    교통수단별 이동거리 비율, 주간 절감량 수준(로그 스케일), 활동일 비율, 연속 활동일(streak)
+챌린지 특징:
+    대상 교통수단(ANY 는 모든 교통수단에 ANY_AFFINITY), 주간 목표 절감량 수준, 기간
+
+점수 = W_MODE·교통수단 친화도 − W_LEVEL·(사용자 수준 + STRETCH − 챌린지 수준)² + W_LENGTH·꾸준함·기간
+제곱 항은 사용자 벡터에 [2a, −a², 1], 챌린지 벡터에 [b, 1, −b²] 를 두어 행렬곱 안에서 계산합니다.
+
+- recommend(): 요청 시 한 사용자 추천
+- jobs/recommend_challenges.py: 전체 사용자를 블록 단위로 한 번에 계산해 challenge_recommendations 에 저장
+"""
+from datetime import date, datetime, timedelta
+from typing import List, NamedTuple, Optional, Sequence, Tuple
+
+import numpy as np
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from .. import models
+from .scoring import MODES, encode_modes
+
+WINDOW_DAYS = 28
+FEATURE_MODES = MODES[:-1]  # ANY 제외 (WALK, BIKE, BUS, SUBWAY, CAR)
+N_MODES = len(FEATURE_MODES)
+ANY_AFFINITY = 0.6
+LEVEL_SCALE_G = 20000.0  # 주간 절감량 20kg = 수준 1.0
+STRETCH = 0.1  # 지금보다 조금 어려운 챌린지를 우선
+UPCOMING_DAYS = 7  # 곧 시작하는 챌린지도 후보
+W_MODE, W_LEVEL, W_LENGTH = 1.0, 2.0, 0.3
+
+# 특징 벡터 길이: 교통수단 N_MODES + 수준 3 + 꾸준함 1
+N_FEATURES = N_MODES + 4
+
+
+class Recommendation(NamedTuple):
+    challenge_id: int
+    score: float
+
+
+def _mode_value(mode) -> str:
+    return getattr(mode, "value", mode)
+
+
+def _level(weekly_saved_g: np.ndarray) -> np.ndarray:
+    return np.log1p(np.maximum(weekly_saved_g, 0) / LEVEL_SCALE_G * (np.e - 1))
+
+
+def _day_index(values: Sequence, today: date) -> np.ndarray:
+    """func.date() 결과(date 또는 'YYYY-MM-DD')를 오늘로부터 며칠 전인지로 변환"""
+    days = np.array([str(v)[:10] for v in values], dtype="datetime64[D]")
+    return (np.datetime64(today, "D") - days).astype(np.int64)
+
+
+def user_features(
+    db: Session, user_ids: Optional[Sequence[int]] = None, now: Optional[datetime] = None
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    사용자 특징 행렬을 만듭니다. user_ids 를 생략하면 기간 내 이동이 있는 모든 사용자
+    반환: (user_id 배열, (사용자 수, N_FEATURES) 행렬)
+    """
+    now = now or datetime.utcnow()
+    since = now - timedelta(days=WINDOW_DAYS)
+    log = models.MobilityLog
+
+    def scoped(query):
+        query = query.filter(log.started_at >= since, log.started_at <= now)
+        return query.filter(log.user_id.in_(user_ids)) if user_ids is not None else query
+
+    by_mode = scoped(db.query(
+        log.user_id, log.mode, func.sum(log.distance_km), func.sum(log.co2_saved_g)
+    )).group_by(log.user_id, log.mode).all()
+    by_day = scoped(db.query(log.user_id, func.date(log.started_at))).group_by(
+        log.user_id, func.date(log.started_at)
+    ).all()
+
+    ids = np.array(
+        sorted(set(user_ids) if user_ids is not None else {r[0] for r in by_mode}), dtype=np.int64
+    )
+    n = ids.size
+    distance = np.zeros((n, len(MODES)), dtype=np.float64)
+    saved = np.zeros(n, dtype=np.float64)
+    if by_mode:
+        rows = np.searchsorted(ids, np.array([r[0] for r in by_mode], dtype=np.int64))
+        codes = encode_modes([_mode_value(r[1]) for r in by_mode])
+        np.add.at(distance, (rows, codes), np.array([float(r[2] or 0) for r in by_mode]))
+        np.add.at(saved, rows, np.array([float(r[3] or 0) for r in by_mode]))
+
+    # 최근 WINDOW_DAYS 일 활동 여부 (열 0 = 오늘) → 활동일 비율, 오늘(또는 어제)부터 이어진 연속 활동일
+    active = np.zeros((n, WINDOW_DAYS + 1), dtype=bool)
+    if by_day:
+        rows = np.searchsorted(ids, np.array([r[0] for r in by_day], dtype=np.int64))
+        days = _day_index([r[1] for r in by_day], now.date())
+        inside = (days >= 0) & (days <= WINDOW_DAYS)
+        active[rows[inside], days[inside]] = True
+    trailing = np.cumprod(active[:, 1:], axis=1).sum(axis=1)  # 어제부터 끊기지 않은 일수
+    streak = trailing + active[:, 0]
+
+    total_km = distance[:, :N_MODES].sum(axis=1, keepdims=True)
+    share = np.divide(distance[:, :N_MODES], total_km, out=np.zeros((n, N_MODES)), where=total_km > 0)
+    level = _level(saved / (WINDOW_DAYS / 7)) + STRETCH
+    consistency = 0.5 * active.mean(axis=1) + 0.5 * np.minimum(streak, WINDOW_DAYS) / WINDOW_DAYS
+
+    features = np.empty((n, N_FEATURES), dtype=np.float64)
+    features[:, :N_MODES] = W_MODE * share
+    features[:, N_MODES] = W_LEVEL * 2 * level
+    features[:, N_MODES + 1] = -W_LEVEL * level ** 2
+    features[:, N_MODES + 2] = W_LEVEL
+    features[:, N_MODES + 3] = W_LENGTH * consistency
+    return ids, features
+
+
+def candidate_challenges(db: Session, now: Optional[datetime] = None) -> List[models.Challenge]:
+    """진행 중이거나 UPCOMING_DAYS 안에 시작하는 챌린지"""
+    now = now or datetime.utcnow()
+    return db.query(models.Challenge).filter(
+        models.Challenge.end_at > now,
+        models.Challenge.start_at <= now + timedelta(days=UPCOMING_DAYS),
+    ).order_by(models.Challenge.challenge_id).all()
+
+
+def challenge_features(challenges: Sequence[models.Challenge]) -> Tuple[np.ndarray, np.ndarray]:
+    """반환: (challenge_id 배열, (챌린지 수, N_FEATURES) 행렬)"""
+    m = len(challenges)
+    ids = np.array([c.challenge_id for c in challenges], dtype=np.int64)
+    features = np.zeros((m, N_FEATURES), dtype=np.float64)
+    if m == 0:
+        return ids, features
+
+    codes = encode_modes([_mode_value(c.target_mode or models.TransportMode.ANY) for c in challenges])
+    specific = codes < N_MODES
+    features[np.flatnonzero(specific), codes[specific]] = 1.0
+    features[~specific, :N_MODES] = ANY_AFFINITY
+
+    days = np.array([max((c.end_at - c.start_at).total_seconds() / 86400, 1.0) for c in challenges])
+    weekly_target = np.array([float(c.target_saved_g or 0) for c in challenges]) / (days / 7)
+    level = _level(weekly_target)
+    features[:, N_MODES] = level
+    features[:, N_MODES + 1] = 1.0
+    features[:, N_MODES + 2] = -level ** 2
+    features[:, N_MODES + 3] = np.minimum(days, WINDOW_DAYS) / WINDOW_DAYS
+    return ids, features
+
+
+def score_matrix(users: np.ndarray, challenges: np.ndarray) -> np.ndarray:
+    """(사용자 수, 챌린지 수) 점수 행렬"""
+    return users @ challenges.T
+
+
+def top_k(scores: np.ndarray, k: int, exclude: Optional[np.ndarray] = None) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    행별 상위 k 개 열 인덱스와 점수 (점수 내림차순). exclude 가 True 인 칸은 제외하고,
+    후보가 k 개보다 적으면 남는 자리는 인덱스 -1
+    """
+    scores = scores.astype(np.float64, copy=True)
+    if exclude is not None:
+        scores[exclude] = -np.inf
+    n, m = scores.shape
+    k = min(k, m)
+    if k == 0:
+        return np.zeros((n, 0), dtype=np.int64), np.zeros((n, 0))
+    part = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+    part_scores = np.take_along_axis(scores, part, axis=1)
+    order = np.argsort(-part_scores, axis=1, kind="stable")
+    index = np.take_along_axis(part, order, axis=1)
+    best = np.take_along_axis(part_scores, order, axis=1)
+    index[~np.isfinite(best)] = -1
+    return index, best
+
+
+def joined_mask(db: Session, user_ids: np.ndarray, challenge_ids: np.ndarray) -> np.ndarray:
+    """(사용자 수, 챌린지 수) 이미 참여한 칸 True"""
+    mask = np.zeros((user_ids.size, challenge_ids.size), dtype=bool)
+    if user_ids.size == 0 or challenge_ids.size == 0:
+        return mask
+    order = np.argsort(challenge_ids)
+    rows = db.query(models.ChallengeMember.user_id, models.ChallengeMember.challenge_id).filter(
+        models.ChallengeMember.user_id.in_(user_ids.tolist()),
+        models.ChallengeMember.challenge_id.in_(challenge_ids.tolist()),
+    ).all()
+    if rows:
+        members = np.array(rows, dtype=np.int64)
+        r = np.searchsorted(user_ids, members[:, 0])
+        c = order[np.searchsorted(challenge_ids, members[:, 1], sorter=order)]
+        mask[r, c] = True
+    return mask
+
+
+def recommend(db: Session, user_id: int, k: int = 3, now: Optional[datetime] = None) -> List[Recommendation]:
+    """한 사용자에게 참여하지 않은 후보 챌린지 상위 k 개를 추천합니다."""
+    challenge_ids, c_features = challenge_features(candidate_challenges(db, now))
+    user_ids, u_features = user_features(db, [user_id], now)
+    scores = score_matrix(u_features, c_features)
+    index, best = top_k(scores, k, joined_mask(db, user_ids, challenge_ids))
+    return [
+        Recommendation(int(challenge_ids[i]), float(s))
+        for i, s in zip(index[0].tolist(), best[0].tolist()) if i >= 0
+    ]
+
+
+def stored_recommendations(db: Session, user_id: int, max_age: timedelta) -> List[Recommendation]:
+    """배치가 저장한 추천 중 max_age 이내에 계산된 것 (순위순)"""
+    cutoff = datetime.utcnow() - max_age
+    rows = db.query(
+        models.ChallengeRecommendation.challenge_id, models.ChallengeRecommendation.score
+    ).filter(
+        models.ChallengeRecommendation.user_id == user_id,
+        models.ChallengeRecommendation.computed_at >= cutoff,
+    ).order_by(models.ChallengeRecommendation.rank).all()
+    return [Recommendation(challenge_id, float(score)) for challenge_id, score in rows]
@@ -0,0 +1,160 @@
+"""
+대시보드 상태 캐시와 증분(delta) 계산
+
+GET /api/dashboard 가 계산한 값을 사용자별로 보관하고, 이동이 기록되면
+전체 집계를 다시 하지 않고 방금 기록한 행만으로 바뀐 값(카운터, 해당 날짜/교통수단 버킷)을 계산합니다.
+캐시가 없으면 증가분만 돌려주며, 클라이언트가 자신의 대시보드 상태에 합칩니다.
+"""
+import threading
+import time
+from collections import OrderedDict
+from datetime import date, datetime, timedelta
+from typing import Any, Dict, Iterable, Optional
+
+CACHE_TTL_SECONDS = 300
+MAX_CACHED_USERS = 10000
+LAST_DAYS = 7
+
+
+class DashboardSnapshot:
+    """한 사용자의 대시보드 집계값"""
+
+    __slots__ = (
+        "day", "co2_saved_today", "eco_credits_earned", "total_saved_g", "total_points",
+        "garden_level", "daily", "modes", "loaded_at",
+    )
+
+    def __init__(
+        self,
+        day: date,
+        co2_saved_today: float,
+        eco_credits_earned: int,
+        total_saved_g: float,
+        total_points: int,
+        garden_level: int,
+        daily: Dict[str, float],
+        modes: Dict[str, float],
+    ):
+        self.day = day
+        self.co2_saved_today = float(co2_saved_today)
+        self.eco_credits_earned = int(eco_credits_earned)
+        self.total_saved_g = float(total_saved_g)
+        self.total_points = int(total_points)
+        self.garden_level = garden_level
+        self.daily = {str(k): float(v) for k, v in daily.items()}
+        self.modes = {str(k): float(v) for k, v in modes.items()}
+        self.loaded_at = time.monotonic()
+
+    def roll_to(self, today: date):
+        """날짜가 바뀌었으면 오늘 카운터를 초기화하고 7일 범위 밖 버킷을 버립니다."""
+        if today == self.day:
+            return
+        self.day = today
+        self.co2_saved_today = 0.0
+        self.eco_credits_earned = 0
+        cutoff = str(today - timedelta(days=LAST_DAYS))
+        self.daily = {d: g for d, g in self.daily.items() if d >= cutoff}
+
+
+class DashboardCache:
+    """사용자별 DashboardSnapshot 의 LRU 캐시"""
+
+    def __init__(self, max_users: int = MAX_CACHED_USERS):
+        self.max_users = max_users
+        self._users: "OrderedDict[int, DashboardSnapshot]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, user_id: int) -> Optional[DashboardSnapshot]:
+        with self._lock:
+            snapshot = self._users.get(user_id)
+            if snapshot is None:
+                return None
+            if time.monotonic() - snapshot.loaded_at >= CACHE_TTL_SECONDS:
+                del self._users[user_id]
+                return None
+            self._users.move_to_end(user_id)
+            return snapshot
+
+    def put(self, user_id: int, snapshot: DashboardSnapshot):
+        with self._lock:
+            self._users[user_id] = snapshot
+            self._users.move_to_end(user_id)
+            while len(self._users) > self.max_users:
+                self._users.popitem(last=False)
+
+    def invalidate(self, user_ids: Optional[Iterable[int]] = None):
+        with self._lock:
+            if user_ids is None:
+                self._users.clear()
+            else:
+                for user_id in user_ids:
+                    self._users.pop(user_id, None)
+
+    def apply_log(
+        self,
+        user_id: int,
+        mode: Any,
+        co2_saved_g: float,
+        points: int,
+        created_at: Optional[datetime] = None,
+        distance_km: Optional[float] = None,
+    ) -> Dict[str, Any]:
+        """
+        방금 기록한 이동 하나를 반영하고 대시보드 delta 를 반환합니다. (O(1))
+        캐시된 상태가 있으면 바뀐 버킷의 새 값도 함께 담고, 없으면 증가분만 담습니다.
+        """
+        created_at = created_at or datetime.utcnow()
+        mode = getattr(mode, "value", mode)
+        co2_saved_g = float(co2_saved_g or 0)
+        points = int(points or 0)
+        day = str(created_at.date())
+        today = datetime.utcnow().date()
+        is_today = created_at.date() == today
+
+        delta: Dict[str, Any] = {
+            "type": "dashboard_delta",
+            "user_id": user_id,
+            "log": {
+                "mode": mode,
+                "distance_km": distance_km,
+                "co2_saved_g": co2_saved_g,
+                "points_earned": points,
+                "created_at": created_at.isoformat(),
+            },
+            "increments": {
+                "co2_saved_today": co2_saved_g if is_today else 0.0,
+                "eco_credits_earned": points if is_today else 0,
+                "total_saved": co2_saved_g / 1000,  # kg
+                "total_points": points,
+            },
+            "day": {"date": day, "delta_g": co2_saved_g, "saved_g": None},
+            "mode": {"mode": mode, "delta_g": co2_saved_g, "saved_g": None},
+            "values": None,
+        }
+
+        with self._lock:
+            snapshot = self._users.get(user_id)
+            if snapshot is None or time.monotonic() - snapshot.loaded_at >= CACHE_TTL_SECONDS:
+                return delta
+            snapshot.roll_to(today)
+            if is_today:
+                snapshot.co2_saved_today += co2_saved_g
+                snapshot.eco_credits_earned += points
+            snapshot.total_saved_g += co2_saved_g
+            snapshot.total_points += points
+            if day >= str(today - timedelta(days=LAST_DAYS)):
+                snapshot.daily[day] = snapshot.daily.get(day, 0.0) + co2_saved_g
+                delta["day"]["saved_g"] = snapshot.daily[day]
+            snapshot.modes[mode] = snapshot.modes.get(mode, 0.0) + co2_saved_g
+            delta["mode"]["saved_g"] = snapshot.modes[mode]
+            delta["values"] = {
+                "co2_saved_today": snapshot.co2_saved_today,
+                "eco_credits_earned": snapshot.eco_credits_earned,
+                "total_saved": snapshot.total_saved_g / 1000,
+                "total_points": snapshot.total_points,
+                "garden_level": snapshot.garden_level,
+            }
+        return delta
+
+
+dashboard_cache = DashboardCache()
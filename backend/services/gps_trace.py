@@ -0,0 +1,192 @@
+"""
+GPS 궤적(trace) 분석
+
+위도/경도/시각 배열 전체를 NumPy 로 한 번에 처리합니다.
+- 구간 거리: haversine
+- 속도 프로파일: 인접 구간 몇 개를 묶은 시간 가중 이동 평균 (GPS 잡음 완화)
+- 정지 감지: 일정 속도 이하가 STOP_SPLIT_SECONDS 이상 이어지면 이동을 나눔
+- 교통수단 추정: 구간(leg)별 속도 분포(85 백분위)와 신호 끊김 비율로 도보/자전거/버스/지하철 판정
+
+반복문은 구간 수가 아니라 속도 등급이 바뀌는 횟수(run) 만큼만 돕니다.
+정지나 도보 없이 바로 이어지는 탈것 변경(예: 지하철 → 자전거)은 하나의 이동으로 봅니다.
+"""
+from typing import List, NamedTuple, Tuple
+
+import numpy as np
+
+from ..schemas import TransportMode
+
+EARTH_RADIUS_KM = 6371.0088
+
+MAX_SPEED_KMH = 200.0       # 이보다 빠른 점프는 GPS 튐으로 보고 제거
+SMOOTH_SEGMENTS = 5         # 이동 평균에 사용하는 구간 수
+STOP_SPEED_KMH = 1.5
+WALK_MAX_KMH = 7.0
+BIKE_MAX_KMH = 25.0
+SUBWAY_MIN_P85_KMH = 60.0
+GAP_SECONDS = 60            # 이보다 긴 점 간격은 신호 끊김 (지하 구간)
+SUBWAY_GAP_RATIO = 0.3
+STOP_SPLIT_SECONDS = 180    # 이 이상 정지하면 이동을 나눔 (환승/도착)
+MIN_LEG_SECONDS = 120       # 이보다 짧은 속도 등급 변화는 앞 구간에 합침
+MIN_LEG_KM = 0.05
+
+# 구간 분할용 속도 등급 (자전거/버스/지하철 구분은 leg 전체 분포로 classify_leg 에서)
+STOP, WALKING, RIDING = 0, 1, 2
+_SPEED_BINS = np.array([STOP_SPEED_KMH, WALK_MAX_KMH])
+
+
+class TraceProfile(NamedTuple):
+    """점 n 개 → 구간 n-1 개"""
+    lat: np.ndarray
+    lon: np.ndarray
+    ts: np.ndarray          # epoch 초 (float64)
+    seg_km: np.ndarray
+    seg_s: np.ndarray
+    speed_kmh: np.ndarray   # 구간 속도
+    smooth_kmh: np.ndarray  # 이동 평균 속도
+
+
+class TraceLeg(NamedTuple):
+    mode: TransportMode
+    distance_km: float
+    started_at: float       # epoch 초
+    ended_at: float
+    start: Tuple[float, float]
+    end: Tuple[float, float]
+    avg_speed_kmh: float
+    p85_speed_kmh: float
+
+
+def haversine_km(lat1, lon1, lat2, lon2) -> np.ndarray:
+    """두 좌표 배열 사이의 대원 거리(km)"""
+    lat1, lon1, lat2, lon2 = (np.radians(np.asarray(a, dtype=np.float64)) for a in (lat1, lon1, lat2, lon2))
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.minimum(a, 1.0)))
+
+
+def _clean(lat: np.ndarray, lon: np.ndarray, ts: np.ndarray):
+    """시각 정렬, 같은 시각 중복 점 제거, 앞뒤 구간이 모두 비정상 속도인 튀는 점 제거"""
+    valid = np.isfinite(lat) & np.isfinite(lon) & np.isfinite(ts) & (np.abs(lat) <= 90) & (np.abs(lon) <= 180)
+    lat, lon, ts = lat[valid], lon[valid], ts[valid]
+    order = np.argsort(ts, kind="stable")
+    lat, lon, ts = lat[order], lon[order], ts[order]
+    keep = np.ones(ts.size, dtype=bool)
+    keep[1:] = np.diff(ts) > 0
+    lat, lon, ts = lat[keep], lon[keep], ts[keep]
+    if ts.size < 3:
+        return lat, lon, ts
+
+    speed = haversine_km(lat[:-1], lon[:-1], lat[1:], lon[1:]) / np.diff(ts) * 3600
+    jump = speed > MAX_SPEED_KMH
+    spike = np.zeros(ts.size, dtype=bool)
+    spike[1:-1] = jump[:-1] & jump[1:]
+    return lat[~spike], lon[~spike], ts[~spike]
+
+
+def analyze_trace(lat, lon, ts) -> TraceProfile:
+    """구간 거리, 구간 속도, 이동 평균 속도를 계산합니다."""
+    lat, lon, ts = _clean(
+        np.asarray(lat, dtype=np.float64), np.asarray(lon, dtype=np.float64), np.asarray(ts, dtype=np.float64)
+    )
+    seg_km = haversine_km(lat[:-1], lon[:-1], lat[1:], lon[1:])
+    seg_s = np.diff(ts)
+    speed = np.divide(seg_km * 3600, seg_s, out=np.zeros_like(seg_km), where=seg_s > 0)
+
+    # 중심 구간 앞뒤 half 개씩의 거리 합 / 시간 합 (누적합 차이로 계산)
+    half = SMOOTH_SEGMENTS // 2
+    cum_km = np.concatenate(([0.0], np.cumsum(seg_km)))
+    cum_s = np.concatenate(([0.0], np.cumsum(seg_s)))
+    idx = np.arange(seg_km.size)
+    lo = np.maximum(idx - half, 0)
+    hi = np.minimum(idx + half + 1, seg_km.size)
+    window_s = cum_s[hi] - cum_s[lo]
+    smooth = np.divide((cum_km[hi] - cum_km[lo]) * 3600, window_s, out=np.zeros_like(seg_km), where=window_s > 0)
+    return TraceProfile(lat, lon, ts, seg_km, seg_s, speed, smooth)
+
+
+def classify_leg(smooth_kmh: np.ndarray, seg_s: np.ndarray) -> Tuple[TransportMode, float]:
+    """leg 하나의 속도 분포로 교통수단을 추정합니다. 반환: (교통수단, 85 백분위 속도)"""
+    moving = smooth_kmh > STOP_SPEED_KMH
+    speeds = smooth_kmh[moving] if moving.any() else smooth_kmh
+    p85 = float(np.percentile(speeds, 85))
+    gap_ratio = float(seg_s[seg_s > GAP_SECONDS].sum() / max(seg_s.sum(), 1e-9))
+    return mode_for_speed(p85, gap_ratio), p85
+
+
+def mode_for_speed(p85_kmh: float, gap_ratio: float = 0.0) -> TransportMode:
+    """85 백분위 이동 속도와 신호 끊김 시간 비율로 교통수단을 정합니다."""
+    if p85_kmh < WALK_MAX_KMH:
+        return TransportMode.WALK
+    if p85_kmh < BIKE_MAX_KMH:
+        return TransportMode.BIKE
+    if gap_ratio >= SUBWAY_GAP_RATIO or p85_kmh >= SUBWAY_MIN_P85_KMH:
+        return TransportMode.SUBWAY
+    return TransportMode.BUS
+
+
+def _runs(classes: np.ndarray, seg_s: np.ndarray):
+    """같은 속도 등급이 이어지는 구간 묶음: (등급, 시작 구간, 끝 구간(미포함), 지속 초)"""
+    starts = np.concatenate(([0], np.flatnonzero(np.diff(classes)) + 1))
+    ends = np.append(starts[1:], classes.size)
+    durations = np.add.reduceat(seg_s, starts)
+    return zip(classes[starts].tolist(), starts.tolist(), ends.tolist(), durations.tolist())
+
+
+def split_legs(profile: TraceProfile) -> List[TraceLeg]:
+    """긴 정지와 속도 등급 변화를 기준으로 궤적을 이동(leg) 단위로 나눕니다."""
+    if profile.seg_km.size == 0:
+        return []
+    classes = np.digitize(profile.smooth_kmh, _SPEED_BINS)
+
+    # 1) 등급 run 을 leg 후보로 묶음 (긴 정지는 경계)
+    #    짧은 run(가감속, 신호 대기)은 앞 후보에 합치고, 긴 run 은 후보의 주된 등급과 같을 때만 합침
+    spans: List[list] = []  # [시작 구간, 끝 구간(미포함), 등급별 이동 시간]
+    split_next = True
+    for cls, start, end, duration in _runs(classes, profile.seg_s):
+        if cls == STOP and duration >= STOP_SPLIT_SECONDS:
+            split_next = True
+            continue
+        if not split_next:
+            span = spans[-1]
+            span_s = span[2].sum()
+            dominant = int(span[2][1:].argmax()) + 1
+            if cls == STOP or duration < MIN_LEG_SECONDS or span_s < MIN_LEG_SECONDS or dominant == cls:
+                span[1] = end
+                span[2][cls] += duration
+                continue
+        spans.append([start, end, np.zeros(RIDING + 1)])
+        spans[-1][2][cls] += duration
+        split_next = False
+
+    # 2) leg 별 교통수단 추정, 정지 없이 이어지는 같은 교통수단은 합침
+    legs: List[list] = []  # [시작, 끝, 교통수단, p85]
+    for start, end, _ in spans:
+        mode, p85 = classify_leg(profile.smooth_kmh[start:end], profile.seg_s[start:end])
+        if legs and legs[-1][1] == start and legs[-1][2] == mode:
+            start = legs.pop()[0]
+            mode, p85 = classify_leg(profile.smooth_kmh[start:end], profile.seg_s[start:end])
+        legs.append([start, end, mode, p85])
+    return [
+        leg for leg in (_make_leg(profile, *args) for args in legs)
+        if leg.distance_km >= MIN_LEG_KM
+    ]
+
+
+def _make_leg(profile: TraceProfile, start: int, end: int, mode: TransportMode, p85: float) -> TraceLeg:
+    distance = float(profile.seg_km[start:end].sum())
+    duration = float(profile.ts[end] - profile.ts[start])
+    return TraceLeg(
+        mode=mode,
+        distance_km=round(distance, 3),
+        started_at=float(profile.ts[start]),
+        ended_at=float(profile.ts[end]),
+        start=(float(profile.lat[start]), float(profile.lon[start])),
+        end=(float(profile.lat[end]), float(profile.lon[end])),
+        avg_speed_kmh=round(distance / duration * 3600, 2) if duration > 0 else 0.0,
+        p85_speed_kmh=round(p85, 2),
+    )
+
+
+def trace_legs(lat, lon, ts) -> List[TraceLeg]:
+    """GPS 궤적 → 교통수단별 이동 목록"""
+    return split_legs(analyze_trace(lat, lon, ts))
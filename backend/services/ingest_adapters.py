@@ -0,0 +1,220 @@
+"""
+수집 소스별 원시 데이터(ingest_raw.payload) 파서
+
+각 어댑터는 RawCapture 하나를 받아 TripRecord 목록을 반환합니다.
+어댑터는 source_name 으로 등록하며, 등록되지 않은 소스는 기본 JSON 어댑터를 사용합니다.
+프로세스 풀에서 실행될 수 있으므로 DB 접근 없이 순수 함수로 작성합니다.
+"""
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List, NamedTuple, Optional
+
+import numpy as np
+
+from . import gps_trace
+from .scoring import to_mode
+from ..schemas import MAX_TRIP_DURATION
+
+
+class RawCapture(NamedTuple):
+    raw_id: int
+    source_name: str
+    user_id: Optional[int]
+    captured_at: datetime
+    payload: Any
+
+
+class TripRecord(NamedTuple):
+    user_id: int
+    mode: str
+    distance_km: Optional[float]  # None 이면 역/정류장 이름으로 계산
+    started_at: datetime
+    ended_at: datetime
+    raw_ref_id: str
+    start_point: Optional[str] = None
+    end_point: Optional[str] = None
+    route_id: Optional[str] = None
+    description: Optional[str] = None
+
+
+class PayloadError(ValueError):
+    """payload 형식 오류"""
+
+
+Adapter = Callable[[RawCapture], List[TripRecord]]
+ADAPTERS: Dict[str, Adapter] = {}
+
+
+def register_adapter(*source_names: str):
+    """source_name 에 어댑터를 등록하는 데코레이터"""
+    def decorator(fn: Adapter) -> Adapter:
+        for name in source_names:
+            ADAPTERS[name.lower()] = fn
+        return fn
+    return decorator
+
+
+def parse_datetime(value: Any) -> datetime:
+    """ISO 문자열 / epoch 초(ms) 를 naive UTC datetime 으로 변환합니다."""
+    if isinstance(value, datetime):
+        dt = value
+    elif isinstance(value, (int, float)):
+        seconds = value / 1000 if value > 1e11 else value
+        return datetime.utcfromtimestamp(seconds)
+    elif isinstance(value, str):
+        try:
+            dt = datetime.fromisoformat(value.replace("Z", "+00:00"))
+        except ValueError as e:
+            raise PayloadError(f"invalid datetime: {value}") from e
+    else:
+        raise PayloadError(f"invalid datetime: {value!r}")
+    if dt.tzinfo is not None:
+        dt = dt.astimezone(timezone.utc).replace(tzinfo=None)
+    return dt
+
+
+def _user_id(capture: RawCapture, item: Dict[str, Any]) -> int:
+    user_id = item.get("user_id", capture.user_id)
+    if user_id is None:
+        raise PayloadError("user_id is missing")
+    return int(user_id)
+
+
+def user_ref_id(user_id: int, ref: Any) -> str:
+    """클라이언트가 정한 이동 식별자를 사용자별로 구분한 raw_ref_id (다른 사용자가 같은 값을 보내도 충돌하지 않음)"""
+    return f"{user_id}:{ref}"
+
+
+def _ref_id(capture: RawCapture, item: Dict[str, Any], user_id: int, index: int, count: int) -> str:
+    if item.get("trip_id") is not None:
+        return user_ref_id(user_id, item["trip_id"])
+    return f"raw:{capture.raw_id}" if count == 1 else f"raw:{capture.raw_id}:{index}"
+
+
+@register_adapter("app", "manual", "mobility_tracker")
+def parse_trip_json(capture: RawCapture) -> List[TripRecord]:
+    """
+    기본 JSON 형식
+    {"mode": "BUS", "distance_km": 3.2, "started_at": "...", "ended_at": "...", ...}
+    또는 {"trips": [...]} / [...] 형태의 여러 건
+    """
+    payload = capture.payload
+    items = payload.get("trips", [payload]) if isinstance(payload, dict) else payload
+    if not isinstance(items, list):
+        raise PayloadError("payload must be an object or a list")
+
+    records = []
+    for index, item in enumerate(items):
+        if not isinstance(item, dict):
+            raise PayloadError(f"trip {index}: must be an object")
+        try:
+            distance = item.get("distance_km")
+            user_id = _user_id(capture, item)
+            records.append(TripRecord(
+                user_id=user_id,
+                mode=to_mode(item["mode"]).value,
+                distance_km=None if distance is None else float(distance),
+                started_at=parse_datetime(item.get("started_at", capture.captured_at)),
+                ended_at=parse_datetime(item.get("ended_at", item.get("started_at", capture.captured_at))),
+                raw_ref_id=_ref_id(capture, item, user_id, index, len(items)),
+                start_point=item.get("start_point"),
+                end_point=item.get("end_point"),
+                route_id=None if item.get("route_id") is None else str(item["route_id"]),
+                description=item.get("description"),
+            ))
+        except (AttributeError, KeyError, TypeError, ValueError) as e:
+            raise PayloadError(f"trip {index}: {e}") from e
+    return records
+
+
+@register_adapter("transit_card", "tmoney")
+def parse_transit_card(capture: RawCapture) -> List[TripRecord]:
+    """
+    교통카드 승·하차 태그
+    {"mode": "SUBWAY", "tap_in": {"stop": "시청", "at": "..."}, "tap_out": {"stop": "강남", "at": "..."}, "route_id": "..."}
+    거리는 역/정류장 이름으로 계산합니다.
+    """
+    payload = capture.payload
+    if not isinstance(payload, dict):
+        raise PayloadError("transit card payload must be an object")
+    try:
+        tap_in, tap_out = payload["tap_in"], payload["tap_out"]
+        user_id = _user_id(capture, payload)
+        return [TripRecord(
+            user_id=user_id,
+            mode=to_mode(payload.get("mode", "SUBWAY")).value,
+            distance_km=None,
+            started_at=parse_datetime(tap_in["at"]),
+            ended_at=parse_datetime(tap_out["at"]),
+            raw_ref_id=_ref_id(capture, payload, user_id, 0, 1),
+            start_point=tap_in["stop"],
+            end_point=tap_out["stop"],
+            route_id=None if payload.get("route_id") is None else str(payload["route_id"]),
+        )]
+    except (AttributeError, KeyError, TypeError, ValueError) as e:
+        raise PayloadError(f"transit card payload: {e}") from e
+
+
+def _trace_arrays(payload: Dict[str, Any]):
+    """{"points": [[lat, lon, ts], ...]} 또는 {"lat": [...], "lon": [...], "ts": [...]}"""
+    if "points" in payload:
+        points = payload["points"]
+        lat, lon, ts = ([p[i] for p in points] for i in range(3))
+    else:
+        lat, lon, ts = payload["lat"], payload["lon"], payload["ts"]
+    if not (len(lat) == len(lon) == len(ts)):
+        raise PayloadError("lat/lon/ts length mismatch")
+    if ts and isinstance(ts[0], str):
+        epoch = datetime(1970, 1, 1)
+        ts = [(parse_datetime(t) - epoch).total_seconds() for t in ts]
+    ts = np.asarray(ts, dtype=np.float64)
+    if ts.size and np.nanmax(ts) > 1e11:  # epoch ms
+        ts = ts / 1000
+    return np.asarray(lat, dtype=np.float64), np.asarray(lon, dtype=np.float64), ts
+
+
+@register_adapter("gps", "gps_trace")
+def parse_gps_trace(capture: RawCapture) -> List[TripRecord]:
+    """GPS 궤적 → 교통수단별 이동 (services/gps_trace.py)"""
+    payload = capture.payload
+    if not isinstance(payload, dict):
+        raise PayloadError("gps trace payload must be an object")
+    try:
+        user_id = _user_id(capture, payload)
+        legs = gps_trace.trace_legs(*_trace_arrays(payload))
+    except (AttributeError, KeyError, IndexError, TypeError, ValueError) as e:
+        raise PayloadError(f"gps trace payload: {e}") from e
+    trip_id = payload.get("trip_id")
+    prefix = user_ref_id(user_id, trip_id) if trip_id else f"raw:{capture.raw_id}"
+    return [
+        TripRecord(
+            user_id=user_id,
+            mode=leg.mode.value,
+            distance_km=leg.distance_km,
+            started_at=datetime.utcfromtimestamp(leg.started_at),
+            ended_at=datetime.utcfromtimestamp(leg.ended_at),
+            raw_ref_id=f"{prefix}:{index}",
+            start_point="{:.6f},{:.6f}".format(*leg.start),
+            end_point="{:.6f},{:.6f}".format(*leg.end),
+            description=payload.get("description") or f"GPS {leg.mode.value} {leg.avg_speed_kmh:.1f} km/h",
+        )
+        for index, leg in enumerate(legs)
+    ]
+
+
+def parse_capture(capture: RawCapture) -> List[TripRecord]:
+    """소스에 맞는 어댑터로 파싱합니다."""
+    adapter = ADAPTERS.get((capture.source_name or "").lower(), parse_trip_json)
+    records = adapter(capture)
+    # 겹침 검사 범위(MAX_TRIP_DURATION)를 넘는 이동은 그 안에 재입력한 이동을 못 걸러내므로 거부
+    for index, record in enumerate(records):
+        if record.ended_at - record.started_at > MAX_TRIP_DURATION:
+            raise PayloadError(f"trip {index}: longer than {MAX_TRIP_DURATION}")
+    return records
+
+
+def parse_capture_safe(capture: RawCapture):
+    """프로세스 풀용: (raw_id, 레코드 목록, 오류 메시지), 어떤 형식 오류도 작업을 멈추지 않고 실패로 셈"""
+    try:
+        return capture.raw_id, parse_capture(capture), None
+    except (PayloadError, AttributeError, IndexError, KeyError, TypeError, ValueError) as e:
+        return capture.raw_id, [], str(e) if isinstance(e, PayloadError) else f"{type(e).__name__}: {e}"
@@ -0,0 +1,147 @@
+"""
+실시간 리더보드 (/ws/leaderboard)
+
+워커마다 작업 하나가 TICK_SECONDS 마다 상위 TOP_N 을 user_counters 에서 읽고(points_earned 인덱스, limit 행만)
+이전 스냅샷과 비교한 변경분만 보냅니다. 변경분 JSON 은 한 번만 만들어 모든 구독자 큐에 같은 문자열을 넣으므로
+구독자 수와 관계없이 틱당 DB 조회 1회, 직렬화 1회입니다. (구독자가 없으면 조회하지 않음)
+
+메시지
+- leaderboard_snapshot: {"version", "data": [entry, ...]}  구독 직후, 또는 메시지가 버려진 연결의 재동기화
+- leaderboard_update:   {"version", "base_version", "changed": [entry, ...], "removed": [user_id, ...]}
+  base_version 이 클라이언트가 가진 버전과 다르면 다음 틱에 스냅샷이 옴
+entry: {"rank", "user_id", "name", "points", "carbon_reduced_kg"}
+"""
+import asyncio
+import json
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy.orm import Session
+
+from .. import models
+from ..database import SessionLocal
+from .ws_hub import Connection
+
+TICK_SECONDS = 30
+TOP_N = 50
+MESSAGE_KEY = "leaderboard"
+
+Entry = Tuple[int, int, str, int, float]  # rank, user_id, name, points, carbon_reduced_kg
+
+
+def fetch_top(db: Session, limit: int = TOP_N) -> List[Entry]:
+    # 동점은 user_id 역순: InnoDB 보조 인덱스 끝에 기본키가 붙으므로 (points_earned, user_id) 역방향 스캔으로 limit 행만 읽음
+    counter = models.UserCounter
+    rows = db.query(
+        counter.user_id, models.User.username, counter.points_earned, counter.total_saved_g,
+    ).join(
+        models.User, models.User.user_id == counter.user_id
+    ).order_by(
+        counter.points_earned.desc(), counter.user_id.desc()
+    ).limit(limit).all()
+    return [
+        (rank, user_id, username, int(points or 0), round(float(saved_g or 0) / 1000, 2))
+        for rank, (user_id, username, points, saved_g) in enumerate(rows, 1)
+    ]
+
+
+def _load_top(limit: int) -> List[Entry]:
+    db = SessionLocal()
+    try:
+        return fetch_top(db, limit)
+    finally:
+        db.close()
+
+
+def _entry_dict(entry: Entry) -> Dict[str, Any]:
+    rank, user_id, name, points, carbon = entry
+    return {"rank": rank, "user_id": user_id, "name": name, "points": points, "carbon_reduced_kg": carbon}
+
+
+def diff(previous: List[Entry], current: List[Entry]) -> Tuple[List[Entry], List[int]]:
+    """(바뀌거나 새로 들어온 항목, 빠진 user_id)"""
+    before = {entry[1]: entry for entry in previous}
+    changed = [entry for entry in current if before.get(entry[1]) != entry]
+    current_ids = {entry[1] for entry in current}
+    removed = [user_id for user_id in before if user_id not in current_ids]
+    return changed, removed
+
+
+class LeaderboardTicker:
+    def __init__(self, limit: int = TOP_N):
+        self.limit = limit
+        self.version = 0
+        self.entries: List[Entry] = []
+        # 연결 → 마지막으로 보낸 시점의 버림/합침 수 (-1 이면 아직 스냅샷을 받지 못함)
+        self.subscribers: Dict[Connection, int] = {}
+        self._snapshot: Optional[str] = None
+
+    def snapshot_message(self) -> str:
+        if self._snapshot is None:
+            self._snapshot = json.dumps({
+                "type": "leaderboard_snapshot",
+                "version": self.version,
+                "data": [_entry_dict(e) for e in self.entries],
+            }, ensure_ascii=False)
+        return self._snapshot
+
+    def subscribe(self, conn: Connection):
+        if self.version:
+            conn.send(self.snapshot_message(), MESSAGE_KEY)
+            self.subscribers[conn] = conn.dropped + conn.coalesced
+        else:
+            self.subscribers[conn] = -1  # 첫 틱에 스냅샷
+
+    def unsubscribe(self, conn: Connection):
+        self.subscribers.pop(conn, None)
+
+    def apply(self, entries: List[Entry]) -> int:
+        """새 순위를 반영하고 구독자 큐에 넣은 메시지 수를 반환합니다."""
+        changed, removed = diff(self.entries, entries)
+        base_version = self.version
+        if changed or removed or not self.version:
+            self.version += 1
+            self.entries = entries
+            self._snapshot = None
+        update: Optional[str] = None
+        sent = 0
+        for conn, losses in list(self.subscribers.items()):
+            if conn.closed:
+                del self.subscribers[conn]
+                continue
+            now_losses = conn.dropped + conn.coalesced
+            if losses != now_losses:
+                # 스냅샷을 아직 못 받았거나 그 사이 큐에서 메시지가 버려짐 → 전체 재전송
+                sent += conn.send(self.snapshot_message(), MESSAGE_KEY)
+                self.subscribers[conn] = conn.dropped + conn.coalesced
+            elif self.version != base_version:
+                if update is None:
+                    update = json.dumps({
+                        "type": "leaderboard_update",
+                        "version": self.version,
+                        "base_version": base_version,
+                        "changed": [_entry_dict(e) for e in changed],
+                        "removed": removed,
+                    }, ensure_ascii=False)
+                # 이 변경분을 넣다가 이전 메시지가 버려졌으면 수를 갱신하지 않음 → 다음 틱에 스냅샷
+                sent += conn.send(update, MESSAGE_KEY)
+        return sent
+
+    async def run(self, interval: float = TICK_SECONDS):
+        while True:
+            if self.subscribers:
+                try:
+                    self.apply(await asyncio.to_thread(_load_top, self.limit))
+                except Exception as e:
+                    print(f"Leaderboard ticker error: {e}")
+            await asyncio.sleep(interval)
+
+
+ticker = LeaderboardTicker()
+_ticker_task: Optional[asyncio.Task] = None
+
+
+def ensure_ticker_task():
+    """첫 구독 때 리더보드 작업을 시작합니다."""
+    global _ticker_task
+    if _ticker_task is None or _ticker_task.done():
+        _ticker_task = asyncio.get_running_loop().create_task(ticker.run())
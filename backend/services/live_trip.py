@@ -0,0 +1,357 @@
+"""
+실시간 이동 추적 (/ws/trip/{user_id})
+
+- 진행 중인 이동마다 누적 거리, 마지막 점, 속도 구간별 이동 시간(히스토그램)만 메모리에 보관
+  (점 목록은 저장하지 않으므로 이동 하나가 수백 바이트)
+- 점이 들어올 때마다 O(1) 로 갱신하며 DB 에 쓰지 않음
+- 이동이 끝나면 mobility_logs / credits_ledger 를 한 번에 기록 (ingest_pipeline.ingest_chunk)
+- CHECKPOINT_SECONDS 마다 바뀐 이동 상태를 job_checkpoints("live_trip:{user_id}")에 저장하여
+  워커가 재시작되어도 다시 연결하면 이어서 추적, 오래 방치된 체크포인트는 종료 처리
+"""
+import asyncio
+import bisect
+import math
+import time
+import uuid
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterable, List, Optional, Sequence
+
+from sqlalchemy import insert
+from sqlalchemy.orm import Session
+
+from .. import models
+from ..database import SessionLocal
+from ..jobs import ingest_pipeline
+from . import gps_trace, trip_index
+from .ingest_adapters import TripRecord
+from .scoring import to_mode
+from ..schemas import MAX_TRIP_DURATION
+
+SOURCE_NAME = "live_trip"
+JOB_PREFIX = "live_trip"
+CHECKPOINT_SECONDS = 15
+IDLE_TIMEOUT_SECONDS = 30 * 60  # 점이 이 시간 이상 들어오지 않으면 이동 종료
+MIN_POINTS = 2
+
+# 속도 구간 상한 (km/h). 0 번 구간은 정지, 마지막 구간 상한은 gps_trace.MAX_SPEED_KMH
+SPEED_EDGES_KMH = (gps_trace.STOP_SPEED_KMH, 4, 7, 10, 15, 20, 25, 30, 40, 50, 60, 80, 100, 130, gps_trace.MAX_SPEED_KMH)
+
+_EPOCH = datetime(1970, 1, 1)
+
+
+def checkpoint_name(user_id: int) -> str:
+    return f"{JOB_PREFIX}:{user_id}"
+
+
+def haversine_km(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+    """점 두 개 사이 거리 (스칼라 버전, 점 단위 갱신용)"""
+    p1, p2 = math.radians(lat1), math.radians(lat2)
+    a = math.sin((p2 - p1) / 2) ** 2 + math.cos(p1) * math.cos(p2) * math.sin(math.radians(lon2 - lon1) / 2) ** 2
+    return 2 * gps_trace.EARTH_RADIUS_KM * math.asin(math.sqrt(min(a, 1.0)))
+
+
+class LiveTrip:
+    """진행 중인 이동 하나의 누적 상태"""
+
+    __slots__ = (
+        "trip_id", "user_id", "mode", "started_at", "first_lat", "first_lon",
+        "last_ts", "last_lat", "last_lon", "distance_km", "points", "gap_s", "speed_s",
+        "dirty", "touched_at",
+    )
+
+    def __init__(self, user_id: int, mode: Optional[str] = None, trip_id: Optional[str] = None):
+        self.trip_id = trip_id or uuid.uuid4().hex
+        self.user_id = user_id
+        self.mode = mode              # 클라이언트가 지정한 교통수단 (없으면 종료 시 추정)
+        self.started_at: Optional[float] = None
+        self.first_lat = self.first_lon = None
+        self.last_ts: Optional[float] = None
+        self.last_lat = self.last_lon = None
+        self.distance_km = 0.0
+        self.points = 0
+        self.gap_s = 0.0              # 신호 끊김 구간 시간 (지하 구간 판단)
+        self.speed_s = [0.0] * len(SPEED_EDGES_KMH)  # 속도 구간별 이동 시간 (초)
+        self.dirty = True
+        self.touched_at = time.monotonic()
+
+    def add_point(self, lat: float, lon: float, ts: float) -> bool:
+        """점 하나를 반영합니다. 역순/중복 시각, GPS 튐, MAX_TRIP_DURATION 을 넘는 점이면 무시하고 False"""
+        self.touched_at = time.monotonic()
+        if self.last_ts is None:
+            self.started_at = self.last_ts = ts
+            self.first_lat, self.first_lon = self.last_lat, self.last_lon = lat, lon
+            self.points = 1
+            self.dirty = True
+            return True
+
+        dt = ts - self.last_ts
+        if dt <= 0 or ts - self.started_at > MAX_TRIP_DURATION.total_seconds():
+            return False
+        d = haversine_km(self.last_lat, self.last_lon, lat, lon)
+        speed = d / dt * 3600
+        if speed > gps_trace.MAX_SPEED_KMH:
+            return False
+
+        self.distance_km += d
+        if dt > gps_trace.GAP_SECONDS:
+            self.gap_s += dt
+        self.speed_s[bisect.bisect_right(SPEED_EDGES_KMH, speed, hi=len(SPEED_EDGES_KMH) - 1)] += dt
+        self.last_ts, self.last_lat, self.last_lon = ts, lat, lon
+        self.points += 1
+        self.dirty = True
+        return True
+
+    def p85_speed_kmh(self) -> float:
+        """이동 중(정지 제외) 시간 기준 85 백분위 속도 (구간 중앙값으로 근사)"""
+        moving = self.speed_s[1:]
+        total = sum(moving)
+        if total <= 0:
+            return 0.0
+        acc = 0.0
+        for i, seconds in enumerate(moving, start=1):
+            acc += seconds
+            if acc >= 0.85 * total:
+                return (SPEED_EDGES_KMH[i - 1] + SPEED_EDGES_KMH[i]) / 2
+        return SPEED_EDGES_KMH[-1]
+
+    def inferred_mode(self) -> str:
+        if self.mode:
+            return self.mode
+        elapsed = (self.last_ts or 0) - (self.started_at or 0)
+        gap_ratio = self.gap_s / elapsed if elapsed > 0 else 0.0
+        return gps_trace.mode_for_speed(self.p85_speed_kmh(), gap_ratio).value
+
+    def summary(self) -> Dict[str, Any]:
+        elapsed = (self.last_ts - self.started_at) if self.points else 0.0
+        return {
+            "trip_id": self.trip_id,
+            "points": self.points,
+            "distance_km": round(self.distance_km, 3),
+            "elapsed_s": round(elapsed, 1),
+            "avg_speed_kmh": round(self.distance_km / elapsed * 3600, 2) if elapsed > 0 else 0.0,
+            "mode": self.inferred_mode(),
+        }
+
+    def to_state(self) -> Dict[str, Any]:
+        return {
+            "trip_id": self.trip_id,
+            "mode": self.mode,
+            "started_at": self.started_at,
+            "first": [self.first_lat, self.first_lon],
+            "last": [self.last_ts, self.last_lat, self.last_lon],
+            "distance_km": self.distance_km,
+            "points": self.points,
+            "gap_s": self.gap_s,
+            "speed_s": self.speed_s,
+        }
+
+    @classmethod
+    def from_state(cls, user_id: int, state: Dict[str, Any]) -> "LiveTrip":
+        trip = cls(user_id, state.get("mode"), state["trip_id"])
+        trip.started_at = state["started_at"]
+        trip.first_lat, trip.first_lon = state["first"]
+        trip.last_ts, trip.last_lat, trip.last_lon = state["last"]
+        trip.distance_km = state["distance_km"]
+        trip.points = state["points"]
+        trip.gap_s = state["gap_s"]
+        trip.speed_s = list(state["speed_s"])
+        trip.dirty = False
+        return trip
+
+    def to_record(self) -> TripRecord:
+        return TripRecord(
+            user_id=self.user_id,
+            mode=self.inferred_mode(),
+            distance_km=round(self.distance_km, 3),
+            started_at=_EPOCH + timedelta(seconds=self.started_at),
+            ended_at=_EPOCH + timedelta(seconds=self.last_ts),
+            raw_ref_id=f"live:{self.trip_id}",
+            start_point=f"{self.first_lat:.6f},{self.first_lon:.6f}",
+            end_point=f"{self.last_lat:.6f},{self.last_lon:.6f}",
+            description=f"Live {self.inferred_mode()} trip",
+        )
+
+
+class LiveTripRegistry:
+    """워커 하나가 추적 중인 이동 (사용자당 하나)"""
+
+    def __init__(self):
+        self.trips: Dict[int, LiveTrip] = {}
+
+    def __len__(self) -> int:
+        return len(self.trips)
+
+    def get(self, user_id: int) -> Optional[LiveTrip]:
+        return self.trips.get(user_id)
+
+    def start(self, user_id: int, mode: Optional[str] = None) -> LiveTrip:
+        trip = self.trips.get(user_id)
+        if trip is None:
+            trip = self.trips[user_id] = LiveTrip(user_id, to_mode(mode).value if mode else None)
+        return trip
+
+    def put(self, trip: LiveTrip):
+        self.trips[trip.user_id] = trip
+
+    def add_points(self, user_id: int, points: Iterable[Sequence[float]]) -> int:
+        """[lat, lon, ts] 목록을 반영하고, 받아들인 점 수를 반환합니다."""
+        trip = self.start(user_id)
+        return sum(trip.add_point(float(lat), float(lon), float(ts)) for lat, lon, ts in points)
+
+    def pop(self, user_id: int) -> Optional[LiveTrip]:
+        return self.trips.pop(user_id, None)
+
+    def take_dirty(self) -> List[LiveTrip]:
+        """마지막 체크포인트 이후 바뀐 이동 (dirty 표시 해제)"""
+        dirty = [trip for trip in self.trips.values() if trip.dirty]
+        for trip in dirty:
+            trip.dirty = False
+        return dirty
+
+    def take_idle(self, timeout: float = IDLE_TIMEOUT_SECONDS) -> List[LiveTrip]:
+        now = time.monotonic()
+        idle = [trip for trip in self.trips.values() if now - trip.touched_at >= timeout]
+        for trip in idle:
+            del self.trips[trip.user_id]
+        return idle
+
+
+registry = LiveTripRegistry()
+
+
+# ---------------------------
+# DB 반영 (스레드 풀에서 실행)
+# ---------------------------
+def save_checkpoints(db: Session, states: List[tuple]):
+    """(user_id, 상태) 목록을 job_checkpoints 에 일괄 저장합니다."""
+    if not states:
+        return
+    names = [checkpoint_name(user_id) for user_id, _ in states]
+    now = datetime.utcnow()
+    db.query(models.JobCheckpoint).filter(models.JobCheckpoint.job_name.in_(names)).delete(synchronize_session=False)
+    db.execute(insert(models.JobCheckpoint), [
+        {"job_name": name, "last_id": state["points"], "meta_json": state, "updated_at": now}
+        for name, (_, state) in zip(names, states)
+    ])
+    db.commit()
+
+
+def load_trip(db: Session, user_id: int) -> Optional[LiveTrip]:
+    """체크포인트에 남아 있는 이동을 불러옵니다. (재연결/워커 재시작)"""
+    checkpoint = db.query(models.JobCheckpoint).filter(
+        models.JobCheckpoint.job_name == checkpoint_name(user_id)
+    ).first()
+    if checkpoint is None or not checkpoint.meta_json:
+        return None
+    return LiveTrip.from_state(user_id, checkpoint.meta_json)
+
+
+def resume_trip(user_id: int) -> Optional[LiveTrip]:
+    """체크포인트에서 이동을 불러와 등록합니다. (스레드 풀에서 실행)"""
+    db = SessionLocal()
+    try:
+        return load_trip(db, user_id)
+    finally:
+        db.close()
+
+
+def end_trip(trip: LiveTrip) -> Optional[Dict[str, Any]]:
+    """이동을 기록하고 응답용 요약을 반환합니다. (스레드 풀에서 실행)"""
+    db = SessionLocal()
+    try:
+        log = finish_trip(db, trip)
+        if log is None:
+            return None
+        return {
+            "log_id": log.log_id,
+            "mode": getattr(log.mode, "value", log.mode),
+            "distance_km": float(log.distance_km),
+            "co2_saved_g": float(log.co2_saved_g or 0),
+            "eco_credits_earned": log.points_earned,
+            "started_at": log.started_at.isoformat(),
+            "ended_at": log.ended_at.isoformat(),
+        }
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+
+def finish_trip(db: Session, trip: LiveTrip) -> Optional[models.MobilityLog]:
+    """이동을 mobility_logs / credits_ledger 에 기록하고 체크포인트를 지웁니다."""
+    log = None
+    if trip.points >= MIN_POINTS and trip.distance_km >= gps_trace.MIN_LEG_KM:
+        source = ingest_pipeline.get_or_create_source(db, SOURCE_NAME, "Live trip tracking")
+        record = trip.to_record()
+        report = ingest_pipeline.ingest_chunk(db, source.source_id, [record])
+        if report["logs_inserted"]:
+            log = db.query(models.MobilityLog).filter(
+                models.MobilityLog.source_id == source.source_id,
+                models.MobilityLog.raw_ref_id == record.raw_ref_id,
+            ).first()
+    db.query(models.JobCheckpoint).filter(
+        models.JobCheckpoint.job_name == checkpoint_name(trip.user_id)
+    ).delete(synchronize_session=False)
+    db.commit()
+    if log is not None:
+        trip_index.trip_cache.invalidate(trip.user_id)
+    return log
+
+
+def finish_stale_checkpoints(db: Session, active_user_ids: Iterable[int], timeout: float = IDLE_TIMEOUT_SECONDS) -> int:
+    """다른(또는 죽은) 워커가 남긴 오래된 체크포인트를 종료 처리합니다."""
+    cutoff = datetime.utcnow() - timedelta(seconds=timeout)
+    active = {checkpoint_name(user_id) for user_id in active_user_ids}
+    rows = db.query(models.JobCheckpoint.job_name, models.JobCheckpoint.meta_json).filter(
+        models.JobCheckpoint.job_name.like(f"{JOB_PREFIX}:%"),
+        models.JobCheckpoint.updated_at < cutoff,
+    ).all()
+    finished = 0
+    for job_name, state in rows:
+        if job_name in active or not state:
+            continue
+        finish_trip(db, LiveTrip.from_state(int(job_name.split(":", 1)[1]), state))
+        finished += 1
+    return finished
+
+
+def _checkpoint_once(states: List[tuple], idle: List[LiveTrip], active_user_ids: List[int]):
+    db = SessionLocal()
+    try:
+        save_checkpoints(db, states)
+        for trip in idle:
+            finish_trip(db, trip)
+        finish_stale_checkpoints(db, active_user_ids)
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+
+async def checkpoint_loop(interval: float = CHECKPOINT_SECONDS):
+    """주기적으로 바뀐 이동 상태를 저장하고, 방치된 이동을 종료합니다."""
+    while True:
+        await asyncio.sleep(interval)
+        # 상태 스냅샷은 이벤트 루프에서 만들고 DB 쓰기만 스레드에서 실행
+        idle = registry.take_idle()
+        states = [(trip.user_id, trip.to_state()) for trip in registry.take_dirty()]
+        try:
+            await asyncio.to_thread(_checkpoint_once, states, idle, list(registry.trips))
+        except Exception as e:
+            print(f"Live trip checkpoint error: {e}")
+            for user_id, _ in states:
+                trip = registry.get(user_id)
+                if trip is not None:
+                    trip.dirty = True
+
+
+_checkpoint_task: Optional[asyncio.Task] = None
+
+
+def ensure_checkpoint_task():
+    """첫 연결 때 체크포인트 루프를 시작합니다."""
+    global _checkpoint_task
+    if _checkpoint_task is None or _checkpoint_task.done():
+        _checkpoint_task = asyncio.get_running_loop().create_task(checkpoint_loop())
@@ -0,0 +1,176 @@
+"""
+사용자 알림 (notifications)
+
+- create_many(): 알림 행을 한 번의 bulk INSERT 로 기록하고 user_counters.unread_notifications 를 사용자당 한 행씩 증가
+  (커밋은 호출자). 커밋되면 세션의 after_commit 훅이 pub/sub 버스로 사용자의 모든 기기에 바로 push 하고,
+  롤백되면 보내지 않음 → 클라이언트는 폴링하지 않음
+- backlog(): 재연결 시 놓친 알림을 since-id 커서로 페이지 조회 ((user_id, notification_id) 인덱스 범위 스캔)
+- mark_read(): 읽음 처리 후 카운터 감소, 같은 사용자의 다른 기기에도 읽음 상태 push
+- 안 읽은 알림 수(배지)는 COUNT(*) 대신 카운터 한 행으로 읽음
+
+push 메시지
+- notifications:      {"data": [item, ...], "unread"}  새 알림
+- notifications_read: {"ids" | "up_to_id", "unread"}   다른 기기에서 읽음
+item: {"id", "title", "message", "timestamp", "read"}
+버스 메시지는 연결 직후/재연결 중이나 브로커 장애 시(발행 오류는 로그만 남김) 놓칠 수 있으므로 클라이언트는 마지막으로 받은 id 로 backlog 를 받고 id 로 중복을 거릅니다.
+"""
+import json
+import uuid
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from sqlalchemy import case, event, insert
+from sqlalchemy.orm import Session
+
+from .. import models
+from . import pubsub
+from .upsert import upsert
+
+BACKLOG_LIMIT = 50
+MAX_BACKLOG_LIMIT = 200
+OUTBOX_KEY = "notifications_outbox"  # Session.info 에 쌓아 두었다가 커밋 후 발행
+
+
+def _item(row: models.Notification) -> Dict[str, Any]:
+    return {
+        "id": row.notification_id,
+        "title": row.title,
+        "message": row.body,
+        "timestamp": row.created_at.isoformat() if row.created_at else None,
+        "read": row.status == models.NotificationStatus.READ,
+    }
+
+
+def _queue(db: Session, user_id: int, message: Dict[str, Any]):
+    db.info.setdefault(OUTBOX_KEY, []).append((user_id, json.dumps(message, ensure_ascii=False)))
+
+
+@event.listens_for(Session, "after_commit")
+def _publish_outbox(session: Session):
+    # 이미 커밋된 뒤이므로 버스(브로커) 오류가 commit() 밖으로 나가면 안 됨. 놓친 알림은 클라이언트가 backlog 로 받음
+    failed = 0
+    for user_id, payload in session.info.pop(OUTBOX_KEY, ()):
+        try:
+            pubsub.bus.publish_user(user_id, payload)
+        except Exception as e:
+            failed += 1
+            error = e
+    if failed:
+        print(f"Notification publish error ({failed} messages): {error}")
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_outbox(session: Session):
+    session.info.pop(OUTBOX_KEY, None)
+
+
+def unread_counts(db: Session, user_ids: Sequence[int]) -> Dict[int, int]:
+    """user_id → 안 읽은 알림 수 (카운터 행이 없으면 0)"""
+    found = dict.fromkeys(user_ids, 0)
+    for start in range(0, len(user_ids), 1000):
+        for user_id, unread in db.query(
+            models.UserCounter.user_id, models.UserCounter.unread_notifications
+        ).filter(models.UserCounter.user_id.in_(user_ids[start:start + 1000])):
+            found[user_id] = int(unread or 0)
+    return found
+
+
+def unread_count(db: Session, user_id: int) -> int:
+    return unread_counts(db, [user_id])[user_id]
+
+
+def create_many(db: Session, items: Iterable[Tuple[int, str, Optional[str]]]) -> int:
+    """
+    (user_id, title, body) 알림들을 bulk INSERT 하고 커밋 후 push 를 예약합니다. (커밋은 호출자)
+    MySQL 은 bulk INSERT 의 RETURNING 이 없으므로 batch_id 로 새 행을 다시 읽어 id 를 얻습니다.
+    """
+    now = datetime.utcnow()
+    batch_id = uuid.uuid4().hex
+    rows = [
+        {
+            "user_id": user_id,
+            "title": title[:120],
+            "body": body[:500] if body else None,
+            "status": models.NotificationStatus.PENDING,
+            "batch_id": batch_id,
+            "created_at": now,
+        }
+        for user_id, title, body in items
+    ]
+    if not rows:
+        return 0
+    db.execute(insert(models.Notification), rows)
+
+    per_user: Dict[int, int] = {}
+    for row in rows:
+        per_user[row["user_id"]] = per_user.get(row["user_id"], 0) + 1
+    upsert(db, models.UserCounter, ("user_id",), [
+        {"user_id": user_id, "unread_notifications": count, "updated_at": now}
+        for user_id, count in per_user.items()
+    ], accumulate=True)
+
+    created: Dict[int, List[Dict[str, Any]]] = {}
+    for row in db.query(models.Notification).filter(
+        models.Notification.batch_id == batch_id
+    ).order_by(models.Notification.notification_id):
+        created.setdefault(row.user_id, []).append(_item(row))
+    unread = unread_counts(db, sorted(created))
+    for user_id, data in created.items():
+        _queue(db, user_id, {"type": "notifications", "data": data, "unread": unread[user_id]})
+    return len(rows)
+
+
+def create(db: Session, user_id: int, title: str, body: Optional[str] = None) -> int:
+    return create_many(db, [(user_id, title, body)])
+
+
+def backlog(db: Session, user_id: int, since_id: Optional[int] = None, limit: int = BACKLOG_LIMIT) -> Dict[str, Any]:
+    """
+    since_id 다음 알림부터 오래된 순으로 limit 개 (has_more 면 next_since_id 로 이어서 조회)
+    since_id 가 없으면(첫 연결) 최근 limit 개
+    """
+    limit = max(1, min(limit, MAX_BACKLOG_LIMIT))
+    query = db.query(models.Notification).filter(models.Notification.user_id == user_id)
+    if since_id is None:
+        rows = query.order_by(models.Notification.notification_id.desc()).limit(limit).all()[::-1]
+        has_more = False
+    else:
+        rows = query.filter(
+            models.Notification.notification_id > since_id
+        ).order_by(models.Notification.notification_id).limit(limit + 1).all()
+        has_more = len(rows) > limit
+        rows = rows[:limit]
+    return {
+        "data": [_item(row) for row in rows],
+        "has_more": has_more,
+        "next_since_id": rows[-1].notification_id if rows else since_id,
+        "unread": unread_count(db, user_id),
+    }
+
+
+def mark_read(db: Session, user_id: int, ids: Optional[Sequence[int]] = None, up_to_id: Optional[int] = None) -> int:
+    """ids 또는 up_to_id 이하의 안 읽은 알림을 읽음 처리하고 남은 안 읽은 수를 반환합니다. (커밋은 호출자)"""
+    query = db.query(models.Notification).filter(
+        models.Notification.user_id == user_id,
+        models.Notification.status != models.NotificationStatus.READ,
+    )
+    if ids is not None:
+        query = query.filter(models.Notification.notification_id.in_(list(ids)))
+    elif up_to_id is not None:
+        query = query.filter(models.Notification.notification_id <= up_to_id)
+    else:
+        return unread_count(db, user_id)
+    updated = query.update({
+        models.Notification.status: models.NotificationStatus.READ,
+        models.Notification.read_at: datetime.utcnow(),
+    }, synchronize_session=False)
+    if updated:
+        unread_col = models.UserCounter.unread_notifications
+        db.query(models.UserCounter).filter(models.UserCounter.user_id == user_id).update({
+            unread_col: case((unread_col > updated, unread_col - updated), else_=0),
+        }, synchronize_session=False)
+    unread = unread_count(db, user_id)
+    if updated:
+        target = {"ids": list(ids)} if ids is not None else {"up_to_id": up_to_id}
+        _queue(db, user_id, {"type": "notifications_read", **target, "unread": unread})
+    return unread
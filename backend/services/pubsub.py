@@ -0,0 +1,200 @@
+"""
+워커 간 WebSocket 메시지 버스
+
+ws_hub.manager 는 이 프로세스의 연결만 알기 때문에, 워커가 여럿이면 다른 워커에 붙은 사용자에게 보낼 메시지는
+버스를 거쳐야 합니다. 어느 워커(또는 배치 작업 프로세스)에서 publish 해도 사용자가 연결된 워커에 도착합니다.
+- 채널: "ws:user:{user_id}" (사용자별), "ws:topic:{name}" (전체 연결, 예: statistics)
+- local: 같은 프로세스에 바로 전달 (단일 워커, 기본값)
+- redis: Redis 프로토콜 서버의 PUBLISH/SUBSCRIBE (개발 환경은 services/resp_standin.py)
+  워커는 연결된 사용자 채널만 구독하므로(첫 기기 연결 시 SUBSCRIBE, 마지막 기기 종료 시 UNSUBSCRIBE)
+  사용자 메시지는 그 사용자가 붙은 워커에만 전달되고, 토픽 채널은 모든 워커가 구독
+PUBSUB_BACKEND(local | redis), PUBSUB_REDIS_URL 로 설정합니다.
+메시지는 "key\\npayload" 한 줄 헤더만 붙여 보내므로 payload 를 다시 직렬화하지 않습니다.
+구독 직전/재연결 중에 발행된 메시지는 전달되지 않을 수 있습니다. (놓치면 안 되는 알림은 DB 기록 후 backlog 로 보완)
+"""
+import asyncio
+import os
+import threading
+from abc import ABC, abstractmethod
+from typing import Callable, Optional, Set, Tuple
+
+from .resp import DEFAULT_URL, RespClient, RespError, encode_command, parse_url, read_reply_async
+from .ws_hub import ConnectionManager, manager
+
+CHANNEL_PREFIX = "ws:"
+TOPICS = ("statistics",)  # 모든 워커가 시작할 때 구독하는 토픽
+RECONNECT_SECONDS = 1.0
+
+
+def user_channel(user_id: int) -> str:
+    return f"{CHANNEL_PREFIX}user:{user_id}"
+
+
+def topic_channel(topic: str) -> str:
+    return f"{CHANNEL_PREFIX}topic:{topic}"
+
+
+def frame(payload: str, key: Optional[str] = None) -> bytes:
+    return f"{key or ''}\n{payload}".encode()
+
+
+def unframe(data: bytes) -> Tuple[Optional[str], str]:
+    key, _, payload = data.decode().partition("\n")
+    return key or None, payload
+
+
+class Bus(ABC):
+    def __init__(self, hub: ConnectionManager = manager):
+        self.hub = hub
+        self.published = 0
+        self.delivered = 0
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._loop_thread: Optional[int] = None
+
+    def start(self):
+        """앱 시작 시 이벤트 루프에서 호출합니다."""
+        self._loop = asyncio.get_running_loop()
+        self._loop_thread = threading.get_ident()
+
+    def _on_loop(self, fn: Callable, *args):
+        """이벤트 루프 스레드에서 fn 실행 (스레드풀의 동기 핸들러에서 호출해도 안전)"""
+        if self._loop is None:
+            return
+        if threading.get_ident() == self._loop_thread:
+            fn(*args)
+        else:
+            self._loop.call_soon_threadsafe(fn, *args)
+
+    def deliver(self, channel: str, data: bytes) -> int:
+        """버스에서 받은 메시지를 이 워커의 연결에 전달합니다."""
+        key, payload = unframe(data)
+        kind, _, target = channel[len(CHANNEL_PREFIX):].partition(":")
+        if kind == "user":
+            sent = self.hub.send_to_user(int(target), payload, key)
+        else:
+            sent = self.hub.broadcast(payload, key)
+        self.delivered += sent
+        return sent
+
+    def publish_user(self, user_id: int, payload: str, key: Optional[str] = None):
+        self.published += 1
+        self._publish(user_channel(user_id), frame(payload, key))
+
+    def publish_topic(self, topic: str, payload: str, key: Optional[str] = None):
+        self.published += 1
+        self._publish(topic_channel(topic), frame(payload, key))
+
+    @abstractmethod
+    def _publish(self, channel: str, data: bytes):
+        ...
+
+
+class LocalBus(Bus):
+    def _publish(self, channel: str, data: bytes):
+        self._on_loop(self.deliver, channel, data)
+
+
+class RedisBus(Bus):
+    """구독 연결 하나 + 발행 연결 하나 (asyncio 스트림). 끊기면 RECONNECT_SECONDS 뒤 다시 연결하고 재구독"""
+
+    def __init__(self, url: str = DEFAULT_URL, hub: ConnectionManager = manager):
+        super().__init__(hub)
+        self.url = url
+        self.host, self.port, _, self.password = parse_url(url)
+        self.channels: Set[str] = {topic_channel(topic) for topic in TOPICS}
+        self.dropped = 0
+        self._sub_writer: Optional[asyncio.StreamWriter] = None
+        self._pub_writer: Optional[asyncio.StreamWriter] = None
+        self._task: Optional[asyncio.Task] = None
+        self._sync_client: Optional[RespClient] = None
+
+    def start(self):
+        super().start()
+        self.hub.on_user_added = lambda user_id: self._on_loop(self._subscribe, user_channel(user_id))
+        self.hub.on_user_removed = lambda user_id: self._on_loop(self._unsubscribe, user_channel(user_id))
+        self.channels.update(user_channel(user_id) for user_id in self.hub.user_connections)
+        if self._task is None or self._task.done():
+            self._task = self._loop.create_task(self._run())
+
+    async def _open(self) -> Tuple[asyncio.StreamReader, asyncio.StreamWriter]:
+        reader, writer = await asyncio.open_connection(self.host, self.port)
+        if self.password:
+            writer.write(encode_command("AUTH", self.password))
+            reply = await read_reply_async(reader)
+            if isinstance(reply, RespError):
+                raise reply
+        return reader, writer
+
+    async def _drain_replies(self, reader: asyncio.StreamReader):
+        """발행 연결의 응답(수신 워커 수)은 읽어서 버림"""
+        while True:
+            await read_reply_async(reader)
+
+    async def _run(self):
+        while True:
+            pub_reader = None
+            drain: Optional[asyncio.Task] = None
+            try:
+                sub_reader, self._sub_writer = await self._open()
+                pub_reader, self._pub_writer = await self._open()
+                drain = asyncio.get_running_loop().create_task(self._drain_replies(pub_reader))
+                if self.channels:
+                    self._sub_writer.write(encode_command("SUBSCRIBE", *sorted(self.channels)))
+                while True:
+                    reply = await read_reply_async(sub_reader)
+                    if isinstance(reply, list) and reply and reply[0] == b"message":
+                        self.deliver(reply[1].decode(), reply[2])
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"Pub/sub connection error: {e}")
+            finally:
+                if drain is not None:
+                    drain.cancel()
+                for writer in (self._sub_writer, self._pub_writer):
+                    if writer is not None:
+                        writer.close()
+                self._sub_writer = self._pub_writer = None
+            await asyncio.sleep(RECONNECT_SECONDS)
+
+    def _subscribe(self, channel: str):
+        self.channels.add(channel)
+        if self._sub_writer is not None:
+            self._sub_writer.write(encode_command("SUBSCRIBE", channel))
+
+    def _unsubscribe(self, channel: str):
+        self.channels.discard(channel)
+        if self._sub_writer is not None:
+            self._sub_writer.write(encode_command("UNSUBSCRIBE", channel))
+
+    def _write_publish(self, channel: str, data: bytes):
+        if self._pub_writer is None:
+            self.dropped += 1  # 재연결 중
+            return
+        self._pub_writer.write(encode_command("PUBLISH", channel, data))
+
+    def _publish(self, channel: str, data: bytes):
+        if self._loop is None:
+            # 이벤트 루프 밖 (배치 작업 프로세스 등) → 동기 연결로 발행
+            if self._sync_client is None:
+                self._sync_client = RespClient(self.url)
+            self._sync_client.execute("PUBLISH", channel, data)
+            return
+        self._on_loop(self._write_publish, channel, data)
+
+    def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+
+def create_bus(kind: Optional[str] = None) -> Bus:
+    kind = (kind or os.getenv("PUBSUB_BACKEND", "local")).lower()
+    if kind == "local":
+        return LocalBus()
+    if kind == "redis":
+        return RedisBus(os.getenv("PUBSUB_REDIS_URL", DEFAULT_URL))
+    raise ValueError(f"Unknown PUBSUB_BACKEND: {kind}")
+
+
+bus = create_bus()
@@ -0,0 +1,166 @@
+"""
+Redis 프로토콜(RESP2) 최소 구현
+
+redis 패키지 없이 Redis(또는 호환 서버, 로컬 대체 서버 services/resp_standin.py)에 명령을 보내는 클라이언트와
+요청/응답 인코딩·파싱 함수입니다. 세션 백엔드(services/session_backends.py)가 사용합니다.
+
+- RespClient: 스레드마다 연결 하나, execute() 는 명령 하나, pipeline() 은 여러 명령을 한 번에 보내고 응답을 모아 읽음
+- read_reply_async: asyncio 스트림용 (pub/sub 구독 연결, services/pubsub.py)
+- URL 형식: redis://host:port/db
+"""
+import asyncio
+import socket
+import threading
+from typing import Any, BinaryIO, List, Sequence
+from urllib.parse import urlparse
+
+DEFAULT_URL = "redis://127.0.0.1:6379/0"
+
+
+class RespError(Exception):
+    """서버가 돌려준 오류 응답 (-ERR ...)"""
+
+
+def _to_bytes(value: Any) -> bytes:
+    if isinstance(value, bytes):
+        return value
+    if isinstance(value, float):
+        return repr(value).encode()
+    return str(value).encode()
+
+
+def encode_command(*args: Any) -> bytes:
+    parts = [b"*%d\r\n" % len(args)]
+    for arg in args:
+        data = _to_bytes(arg)
+        parts.append(b"$%d\r\n%s\r\n" % (len(data), data))
+    return b"".join(parts)
+
+
+def encode_reply(value: Any) -> bytes:
+    """서버 쪽 응답 인코딩 (None → nil, int → 정수, list → 배열, RespError → 오류, 그 외 bulk)"""
+    if value is None:
+        return b"$-1\r\n"
+    if isinstance(value, RespError):
+        return b"-%s\r\n" % str(value).encode()
+    if isinstance(value, bool):
+        return b":%d\r\n" % int(value)
+    if isinstance(value, int):
+        return b":%d\r\n" % value
+    if isinstance(value, (list, tuple)):
+        return b"*%d\r\n" % len(value) + b"".join(encode_reply(v) for v in value)
+    if value == "OK":
+        return b"+OK\r\n"
+    data = _to_bytes(value)
+    return b"$%d\r\n%s\r\n" % (len(data), data)
+
+
+def read_reply(stream: BinaryIO) -> Any:
+    """응답(또는 요청 배열) 하나를 읽습니다. 오류 응답은 RespError 객체로 반환"""
+    line = stream.readline()
+    if not line:
+        raise ConnectionError("connection closed")
+    kind, rest = line[:1], line[1:-2]
+    if kind == b"+":
+        return rest.decode()
+    if kind == b"-":
+        return RespError(rest.decode())
+    if kind == b":":
+        return int(rest)
+    if kind == b"$":
+        length = int(rest)
+        if length < 0:
+            return None
+        data = stream.read(length + 2)
+        return data[:-2]
+    if kind == b"*":
+        length = int(rest)
+        if length < 0:
+            return None
+        return [read_reply(stream) for _ in range(length)]
+    raise RespError(f"protocol error: {line!r}")
+
+
+async def read_reply_async(reader: asyncio.StreamReader) -> Any:
+    line = await reader.readline()
+    if not line:
+        raise ConnectionError("connection closed")
+    kind, rest = line[:1], line[1:-2]
+    if kind == b"+":
+        return rest.decode()
+    if kind == b"-":
+        return RespError(rest.decode())
+    if kind == b":":
+        return int(rest)
+    if kind == b"$":
+        length = int(rest)
+        if length < 0:
+            return None
+        return (await reader.readexactly(length + 2))[:-2]
+    if kind == b"*":
+        length = int(rest)
+        if length < 0:
+            return None
+        return [await read_reply_async(reader) for _ in range(length)]
+    raise RespError(f"protocol error: {line!r}")
+
+
+def parse_url(url: str):
+    """redis://[:password@]host:port/db → (host, port, db, password)"""
+    parsed = urlparse(url)
+    return parsed.hostname or "127.0.0.1", parsed.port or 6379, int((parsed.path or "/0").lstrip("/") or 0), parsed.password
+
+
+class RespClient:
+    def __init__(self, url: str = DEFAULT_URL, timeout: float = 5.0):
+        self.host, self.port, self.db, self.password = parse_url(url)
+        self.timeout = timeout
+        self._local = threading.local()
+
+    def _connection(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            sock = socket.create_connection((self.host, self.port), timeout=self.timeout)
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            conn = (sock, sock.makefile("rb"))
+            self._local.conn = conn
+            if self.password:
+                self._check(self._roundtrip([("AUTH", self.password)])[0])
+            if self.db:
+                self._check(self._roundtrip([("SELECT", self.db)])[0])
+        return conn
+
+    def _roundtrip(self, commands: Sequence[Sequence[Any]]) -> List[Any]:
+        sock, stream = self._connection()
+        try:
+            sock.sendall(b"".join(encode_command(*command) for command in commands))
+            return [read_reply(stream) for _ in commands]
+        except (OSError, ConnectionError):
+            self.close()
+            raise
+
+    @staticmethod
+    def _check(reply: Any) -> Any:
+        if isinstance(reply, RespError):
+            raise reply
+        return reply
+
+    def execute(self, *args: Any) -> Any:
+        return self._check(self._roundtrip([args])[0])
+
+    def pipeline(self, commands: Sequence[Sequence[Any]]) -> List[Any]:
+        """명령들을 한 번에 보내고 응답 목록을 반환합니다. (원자적이지 않음)"""
+        return [self._check(reply) for reply in self._roundtrip(commands)]
+
+    def close(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            self._local.conn = None
+            try:
+                conn[1].close()
+                conn[0].close()
+            except OSError:
+                pass
+
+    def ping(self) -> bool:
+        return self.execute("PING") == "PONG"
@@ -0,0 +1,433 @@
+#!/usr/bin/env python3
+"""
+로컬 Redis 대체 서버 (개발·벤치마크용)
+
+Redis 가 없는 개발 환경에서 Redis 프로토콜 백엔드(세션 등)를 여러 워커가 함께 쓰도록 띄우는 단일 프로세스 서버입니다.
+services/resp.py 의 인코딩을 그대로 쓰며, 이 저장소가 사용하는 명령만 구현합니다.
+  문자열: GET SET(PX/NX) MGET DEL EXISTS PEXPIRE PTTL
+  집합:   SADD SREM SMEMBERS SCARD
+  해시:   HSET HMGET HGETALL HDEL HKEYS HLEN
+  정렬 집합: ZADD ZREM ZCARD ZRANGEBYSCORE ZREMRANGEBYSCORE
+  pub/sub: PUBLISH SUBSCRIBE UNSUBSCRIBE (구독 중인 연결에는 ["message", 채널, 데이터] 를 push)
+  기타:   PING AUTH SELECT FLUSHDB DBSIZE
+만료는 접근 시 확인하고, 1초마다 만료 키를 정리합니다. 운영 환경에서는 실제 Redis 를 사용합니다.
+
+실행: python -m backend.services.resp_standin [--host 127.0.0.1] [--port 6390]
+"""
+import argparse
+import asyncio
+import bisect
+import fnmatch
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
+
+from .resp import RespError, encode_reply, read_reply
+
+WRONGTYPE = RespError("WRONGTYPE Operation against a key holding the wrong kind of value")
+
+
+def _now_ms() -> int:
+    return int(time.time() * 1000)
+
+
+def _score(raw: bytes, is_max: bool = False) -> float:
+    text = raw.decode()
+    if text in ("-inf", "+inf", "inf"):
+        return float(text if text != "+inf" else "inf")
+    if text.startswith("("):
+        # 배타 구간은 아주 작은 값만큼 좁혀서 근사
+        value = float(text[1:])
+        return value - 1e-9 if is_max else value + 1e-9
+    return float(text)
+
+
+class _StreamReader:
+    """asyncio StreamReader 위에서 read_reply 를 쓰기 위해 버퍼링된 바이트를 동기 인터페이스로 제공"""
+
+    def __init__(self, data: bytes):
+        self.data = data
+        self.pos = 0
+
+    def readline(self) -> bytes:
+        end = self.data.find(b"\r\n", self.pos)
+        if end < 0:
+            raise EOFError
+        line = self.data[self.pos:end + 2]
+        self.pos = end + 2
+        return line
+
+    def read(self, n: int) -> bytes:
+        if self.pos + n > len(self.data):
+            raise EOFError
+        chunk = self.data[self.pos:self.pos + n]
+        self.pos += n
+        return chunk
+
+
+class StandinStore:
+    def __init__(self):
+        self.data: Dict[bytes, Any] = {}
+        self.expires: Dict[bytes, int] = {}
+
+    # ---- 키 공통 ----
+    def _alive(self, key: bytes) -> bool:
+        deadline = self.expires.get(key)
+        if deadline is not None and deadline <= _now_ms():
+            self.data.pop(key, None)
+            del self.expires[key]
+            return False
+        return key in self.data
+
+    def _get(self, key: bytes, kind: type) -> Any:
+        if not self._alive(key):
+            return None
+        value = self.data[key]
+        if not isinstance(value, kind):
+            raise WRONGTYPE
+        return value
+
+    def sweep(self):
+        now = _now_ms()
+        for key in [k for k, deadline in self.expires.items() if deadline <= now]:
+            self.data.pop(key, None)
+            del self.expires[key]
+
+    # ---- 명령 ----
+    def cmd_ping(self, *args):
+        return "PONG" if not args else args[0]
+
+    def cmd_auth(self, *args):
+        return "OK"
+
+    def cmd_select(self, *args):
+        return "OK"
+
+    def cmd_flushdb(self, *args):
+        self.data.clear()
+        self.expires.clear()
+        return "OK"
+
+    def cmd_dbsize(self):
+        self.sweep()
+        return len(self.data)
+
+    def cmd_get(self, key):
+        return self._get(key, bytes)
+
+    def cmd_mget(self, *keys):
+        return [self._get(key, bytes) if self._alive(key) and isinstance(self.data[key], bytes) else None for key in keys]
+
+    def cmd_set(self, key, value, *options):
+        options = [o.upper() for o in options]
+        px: Optional[int] = None
+        nx = False
+        i = 0
+        while i < len(options):
+            if options[i] == b"PX":
+                px = int(options[i + 1])
+                i += 2
+            elif options[i] == b"EX":
+                px = int(options[i + 1]) * 1000
+                i += 2
+            elif options[i] == b"NX":
+                nx = True
+                i += 1
+            else:
+                raise RespError("ERR syntax error")
+        if nx and self._alive(key):
+            return None
+        self.data[key] = value
+        if px is not None:
+            self.expires[key] = _now_ms() + px
+        else:
+            self.expires.pop(key, None)
+        return "OK"
+
+    def cmd_del(self, *keys):
+        removed = 0
+        for key in keys:
+            if self._alive(key):
+                del self.data[key]
+                self.expires.pop(key, None)
+                removed += 1
+        return removed
+
+    def cmd_exists(self, *keys):
+        return sum(1 for key in keys if self._alive(key))
+
+    def cmd_pexpire(self, key, ms):
+        if not self._alive(key):
+            return 0
+        self.expires[key] = _now_ms() + int(ms)
+        return 1
+
+    def cmd_pttl(self, key):
+        if not self._alive(key):
+            return -2
+        deadline = self.expires.get(key)
+        return -1 if deadline is None else max(deadline - _now_ms(), 0)
+
+    def cmd_keys(self, pattern):
+        self.sweep()
+        return [k for k in self.data if fnmatch.fnmatchcase(k.decode(), pattern.decode())]
+
+    def cmd_sadd(self, key, *members):
+        members_set = self._get(key, set)
+        if members_set is None:
+            members_set = self.data[key] = set()
+        before = len(members_set)
+        members_set.update(members)
+        return len(members_set) - before
+
+    def cmd_srem(self, key, *members):
+        members_set = self._get(key, set)
+        if members_set is None:
+            return 0
+        before = len(members_set)
+        members_set.difference_update(members)
+        if not members_set:
+            self.cmd_del(key)
+        return before - len(members_set)
+
+    def cmd_smembers(self, key):
+        return sorted(self._get(key, set) or ())
+
+    def cmd_scard(self, key):
+        return len(self._get(key, set) or ())
+
+    def cmd_hset(self, key, *pairs):
+        if not pairs or len(pairs) % 2:
+            raise RespError("ERR wrong number of arguments for 'hset' command")
+        fields = self._get(key, dict)
+        if fields is None:
+            fields = self.data[key] = {}
+        added = 0
+        for i in range(0, len(pairs), 2):
+            added += pairs[i] not in fields
+            fields[pairs[i]] = pairs[i + 1]
+        return added
+
+    def cmd_hmget(self, key, *names):
+        fields = self._get(key, dict) or {}
+        return [fields.get(name) for name in names]
+
+    def cmd_hgetall(self, key):
+        fields = self._get(key, dict) or {}
+        return [v for item in fields.items() for v in item]
+
+    def cmd_hkeys(self, key):
+        return list(self._get(key, dict) or ())
+
+    def cmd_hlen(self, key):
+        return len(self._get(key, dict) or ())
+
+    def cmd_hdel(self, key, *names):
+        fields = self._get(key, dict)
+        if fields is None:
+            return 0
+        removed = sum(1 for name in names if fields.pop(name, None) is not None)
+        if not fields:
+            self.cmd_del(key)
+        return removed
+
+    def _zset(self, key, create: bool = False) -> Optional[Tuple[Dict[bytes, float], List[Tuple[float, bytes]]]]:
+        zset = self._get(key, tuple)
+        if zset is None and create:
+            zset = self.data[key] = ({}, [])
+        return zset
+
+    def cmd_zadd(self, key, *pairs):
+        scores, ordered = self._zset(key, create=True)
+        added = 0
+        for i in range(0, len(pairs), 2):
+            score, member = float(pairs[i]), pairs[i + 1]
+            old = scores.get(member)
+            if old is not None:
+                ordered.pop(bisect.bisect_left(ordered, (old, member)))
+            else:
+                added += 1
+            scores[member] = score
+            bisect.insort(ordered, (score, member))
+        return added
+
+    def cmd_zrem(self, key, *members):
+        zset = self._zset(key)
+        if zset is None:
+            return 0
+        scores, ordered = zset
+        removed = 0
+        for member in members:
+            old = scores.pop(member, None)
+            if old is not None:
+                ordered.pop(bisect.bisect_left(ordered, (old, member)))
+                removed += 1
+        if not scores:
+            self.cmd_del(key)
+        return removed
+
+    def cmd_zcard(self, key):
+        zset = self._zset(key)
+        return len(zset[0]) if zset else 0
+
+    def _zrange(self, key, lo, hi) -> Tuple[int, int, List[Tuple[float, bytes]]]:
+        zset = self._zset(key)
+        if zset is None:
+            return 0, 0, []
+        ordered = zset[1]
+        start = bisect.bisect_left(ordered, (_score(lo), b""))
+        end = bisect.bisect_right(ordered, (_score(hi, is_max=True), b"\xff" * 64))
+        return start, end, ordered
+
+    def cmd_zrangebyscore(self, key, lo, hi, *options):
+        start, end, ordered = self._zrange(key, lo, hi)
+        items = ordered[start:end]
+        options = [o.upper() for o in options]
+        if b"LIMIT" in options:
+            i = options.index(b"LIMIT")
+            offset, count = int(options[i + 1]), int(options[i + 2])
+            items = items[offset:offset + count if count >= 0 else None]
+        if b"WITHSCORES" in options:
+            return [v for score, member in items for v in (member, repr(score).encode())]
+        return [member for _, member in items]
+
+    def cmd_zremrangebyscore(self, key, lo, hi):
+        start, end, ordered = self._zrange(key, lo, hi)
+        if end <= start:
+            return 0
+        scores = self.data[key][0]
+        for _, member in ordered[start:end]:
+            del scores[member]
+        del ordered[start:end]
+        if not scores:
+            self.cmd_del(key)
+        return end - start
+
+    def execute(self, args: List[bytes]) -> Any:
+        if not args:
+            return RespError("ERR empty command")
+        handler: Optional[Callable] = getattr(self, f"cmd_{args[0].decode().lower()}", None)
+        if handler is None:
+            return RespError(f"ERR unknown command '{args[0].decode()}'")
+        try:
+            return handler(*args[1:])
+        except RespError as e:
+            return e
+        except (TypeError, ValueError, IndexError):
+            return RespError(f"ERR wrong arguments for '{args[0].decode()}' command")
+
+
+class StandinServer:
+    def __init__(self, host: str = "127.0.0.1", port: int = 6390):
+        self.host = host
+        self.port = port
+        self.store = StandinStore()
+        self.channels: Dict[bytes, Set[asyncio.StreamWriter]] = {}
+        self._server: Optional[asyncio.AbstractServer] = None
+
+    def _pubsub(self, writer: asyncio.StreamWriter, subscribed: Set[bytes], request: List[bytes]) -> Optional[bytes]:
+        """pub/sub 명령이면 응답 바이트, 아니면 None"""
+        command = request[0].upper() if request else b""
+        if command == b"PUBLISH":
+            channel, message = request[1], request[2]
+            push = encode_reply([b"message", channel, message])
+            receivers = self.channels.get(channel, ())
+            for receiver in receivers:
+                receiver.write(push)
+            return encode_reply(len(receivers))
+        if command == b"SUBSCRIBE":
+            replies = []
+            for channel in request[1:]:
+                self.channels.setdefault(channel, set()).add(writer)
+                subscribed.add(channel)
+                replies.append(encode_reply([b"subscribe", channel, len(subscribed)]))
+            return b"".join(replies)
+        if command == b"UNSUBSCRIBE":
+            replies = []
+            for channel in request[1:] or list(subscribed):
+                subscribed.discard(channel)
+                receivers = self.channels.get(channel)
+                if receivers is not None:
+                    receivers.discard(writer)
+                    if not receivers:
+                        del self.channels[channel]
+                replies.append(encode_reply([b"unsubscribe", channel, len(subscribed)]))
+            return b"".join(replies)
+        return None
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        buffer = b""
+        subscribed: Set[bytes] = set()
+        try:
+            while True:
+                chunk = await reader.read(65536)
+                if not chunk:
+                    break
+                buffer += chunk
+                stream = _StreamReader(buffer)
+                replies = []
+                while stream.pos < len(buffer):
+                    start = stream.pos
+                    try:
+                        request = read_reply(stream)
+                    except EOFError:
+                        stream.pos = start
+                        break
+                    reply = self._pubsub(writer, subscribed, request)
+                    replies.append(reply if reply is not None else encode_reply(self.store.execute(request)))
+                buffer = buffer[stream.pos:]
+                if replies:
+                    writer.write(b"".join(replies))
+                    await writer.drain()
+        except (ConnectionError, OSError):
+            pass
+        finally:
+            if subscribed:
+                self._pubsub(writer, subscribed, [b"UNSUBSCRIBE"])
+            writer.close()
+
+    async def _sweep_loop(self):
+        while True:
+            await asyncio.sleep(1)
+            self.store.sweep()
+
+    async def serve(self):
+        self._server = await asyncio.start_server(self._handle, self.host, self.port)
+        self.port = self._server.sockets[0].getsockname()[1]
+        sweeper = asyncio.get_running_loop().create_task(self._sweep_loop())
+        try:
+            async with self._server:
+                await self._server.serve_forever()
+        finally:
+            sweeper.cancel()
+
+    def start_in_thread(self) -> str:
+        """백그라운드 스레드에서 서버를 띄우고 접속 URL 을 반환합니다. (port=0 이면 빈 포트 사용)"""
+        started = threading.Event()
+        loop = asyncio.new_event_loop()
+
+        async def main():
+            self._server = await asyncio.start_server(self._handle, self.host, self.port)
+            self.port = self._server.sockets[0].getsockname()[1]
+            loop.create_task(self._sweep_loop())
+            started.set()
+            await self._server.serve_forever()
+
+        threading.Thread(target=lambda: loop.run_until_complete(main()), daemon=True).start()
+        started.wait()
+        return f"redis://{self.host}:{self.port}/0"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="로컬 Redis 대체 서버")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=6390)
+    args = parser.parse_args()
+
+    server = StandinServer(args.host, args.port)
+    print(f"RESP stand-in listening on redis://{args.host}:{args.port}/0")
+    asyncio.run(server.serve())
+
+
+if __name__ == "__main__":
+    main()
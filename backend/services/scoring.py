@@ -0,0 +1,257 @@
+"""
+탄소 절감량 / 에코 포인트 통합 계산 엔진
+
+모든 이동 기록 경로(모빌리티 로그, 관리자 입력, 활동 기록 등)는 이 모듈을 통해
+CO2 기준 배출량(자동차 이용 가정), 실제 배출량, 절감량, 포인트를 계산합니다.
+
+- score_trip: 단건 계산 (스칼라 API)
+- score_batch: NumPy 배열 기반 일괄 계산 (배치 API)
+
+배출 계수는 carbon_factors 테이블(유효기간 포함)을 우선 사용하고,
+테이블에 값이 없는 교통수단은 DEFAULT_EMISSION_G_PER_KM 으로 대체합니다.
+"""
+import bisect
+import calendar
+import threading
+import time
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+import numpy as np
+from sqlalchemy.orm import Session
+
+from .. import models
+from ..schemas import TransportMode
+
+# 배치 API에서 사용하는 교통수단 정수 코드 (순서 변경 금지)
+MODES: Tuple[TransportMode, ...] = (
+    TransportMode.WALK,
+    TransportMode.BIKE,
+    TransportMode.BUS,
+    TransportMode.SUBWAY,
+    TransportMode.CAR,
+    TransportMode.ANY,
+)
+MODE_CODES: Dict[TransportMode, int] = {mode: code for code, mode in enumerate(MODES)}
+
+# 기본 탄소 배출 계수 (gCO2/km)
+DEFAULT_EMISSION_G_PER_KM: Dict[TransportMode, float] = {
+    TransportMode.WALK: 0.0,
+    TransportMode.BIKE: 0.0,
+    TransportMode.BUS: 100.0,
+    TransportMode.SUBWAY: 50.0,
+    TransportMode.CAR: 170.0,
+}
+
+# 절감량 계산의 기준 교통수단 (자동차 이용 대비 절감량)
+BASELINE_MODE = TransportMode.CAR
+
+# 포인트 환산: 절감 CO2 1g 당 0.1 포인트 (10g 당 1포인트)
+POINTS_PER_G_SAVED = 0.1
+
+# 부동소수점 오차로 포인트가 1 모자라게 내림되는 것을 방지
+_POINTS_EPSILON = 1e-9
+
+# carbon_factors 캐시 유지 시간
+FACTOR_TABLE_TTL_SECONDS = 300
+
+_BASELINE_CODE = MODE_CODES[BASELINE_MODE]
+_ANY_CODE = MODE_CODES[TransportMode.ANY]
+_FAR_FUTURE = np.iinfo(np.int64).max
+
+
+class TripScore(NamedTuple):
+    co2_baseline_g: float
+    co2_actual_g: float
+    co2_saved_g: float
+    points: int
+
+
+class BatchScore(NamedTuple):
+    co2_baseline_g: np.ndarray
+    co2_actual_g: np.ndarray
+    co2_saved_g: np.ndarray
+    points: np.ndarray
+
+
+def to_mode(mode: Any) -> TransportMode:
+    """문자열/Enum 교통수단 값을 TransportMode 로 변환합니다."""
+    if isinstance(mode, TransportMode):
+        return mode
+    value = getattr(mode, "value", mode)
+    return TransportMode(str(value).upper())
+
+
+def encode_modes(modes: Iterable[Any]) -> np.ndarray:
+    """교통수단 배열을 MODES 기준 정수 코드 배열(int8)로 변환합니다."""
+    arr = np.asarray(modes)
+    if arr.dtype.kind in "iu":
+        return arr.astype(np.int8, copy=False)
+    # 고유값만 Python 으로 매핑하고 나머지는 역인덱스로 펼침
+    uniques, inverse = np.unique(arr.astype(str), return_inverse=True)
+    lookup = np.array([MODE_CODES[to_mode(u)] for u in uniques], dtype=np.int8)
+    return lookup[inverse.reshape(-1)]
+
+
+def to_epoch(at: Optional[datetime]) -> int:
+    """datetime 을 epoch 초로 변환합니다. (naive 값은 UTC 로 간주)"""
+    if at is None:
+        return int(time.time())
+    return calendar.timegm(at.utctimetuple())
+
+
+def to_epoch_array(timestamps: Any, size: int) -> np.ndarray:
+    """타임스탬프 배열을 epoch 초(int64) 배열로 변환합니다."""
+    if timestamps is None:
+        return np.full(size, int(time.time()), dtype=np.int64)
+    arr = np.asarray(timestamps)
+    if arr.dtype.kind in "iu":
+        return arr.astype(np.int64, copy=False)
+    return arr.astype("datetime64[s]").astype(np.int64)
+
+
+def points_for_saved(co2_saved_g: float) -> int:
+    """절감량(g)에 대한 포인트를 계산합니다."""
+    return int(np.floor(co2_saved_g * POINTS_PER_G_SAVED + _POINTS_EPSILON))
+
+
+class FactorTable:
+    """교통수단별 유효기간을 가진 배출 계수 테이블"""
+
+    def __init__(self, rows: Iterable[Tuple[Any, float, datetime, Optional[datetime]]] = ()):
+        self._defaults = np.zeros(len(MODES), dtype=np.float64)
+        for mode, g_per_km in DEFAULT_EMISSION_G_PER_KM.items():
+            self._defaults[MODE_CODES[mode]] = g_per_km
+
+        segments: Dict[int, List[Tuple[int, int, float]]] = {}
+        for mode, g_per_km, valid_from, valid_to in rows:
+            code = MODE_CODES[to_mode(mode)]
+            end = to_epoch(valid_to) if valid_to is not None else _FAR_FUTURE
+            segments.setdefault(code, []).append((to_epoch(valid_from), end, float(g_per_km)))
+
+        # code -> (시작 epoch 목록, 종료 epoch 목록, 계수 목록)
+        self._segments: Dict[int, Tuple[np.ndarray, np.ndarray, np.ndarray]] = {}
+        self._segment_lists: Dict[int, Tuple[List[int], List[int], List[float]]] = {}
+        for code, items in segments.items():
+            items.sort()
+            starts, ends, values = (list(col) for col in zip(*items))
+            self._segment_lists[code] = (starts, ends, values)
+            self._segments[code] = (
+                np.array(starts, dtype=np.int64),
+                np.array(ends, dtype=np.int64),
+                np.array(values, dtype=np.float64),
+            )
+
+    @classmethod
+    def from_db(cls, db: Session) -> "FactorTable":
+        rows = db.query(
+            models.CarbonFactor.mode,
+            models.CarbonFactor.g_per_km,
+            models.CarbonFactor.valid_from,
+            models.CarbonFactor.valid_to,
+        ).all()
+        return cls(rows)
+
+    def factor(self, mode: Any, at: Optional[datetime] = None) -> float:
+        """단일 교통수단의 특정 시점 배출 계수(gCO2/km)를 반환합니다."""
+        code = MODE_CODES[to_mode(mode)]
+        if code == _ANY_CODE:
+            code = _BASELINE_CODE
+        segment = self._segment_lists.get(code)
+        if segment:
+            ts = to_epoch(at)
+            starts, ends, values = segment
+            idx = bisect.bisect_right(starts, ts) - 1
+            if idx >= 0 and ts <= ends[idx]:
+                return values[idx]
+        return float(self._defaults[code])
+
+    def factors(self, codes: np.ndarray, ts: np.ndarray) -> np.ndarray:
+        """교통수단 코드 배열과 epoch 배열에 대한 배출 계수 배열을 반환합니다."""
+        codes = np.where(codes == _ANY_CODE, _BASELINE_CODE, codes)
+        out = self._defaults[codes]
+        for code, (starts, ends, values) in self._segments.items():
+            mask = codes == code
+            if not mask.any():
+                continue
+            t = ts[mask]
+            idx = np.searchsorted(starts, t, side="right") - 1
+            safe_idx = np.maximum(idx, 0)
+            valid = (idx >= 0) & (t <= ends[safe_idx])
+            out[mask] = np.where(valid, values[safe_idx], out[mask])
+        return out
+
+
+_table_lock = threading.Lock()
+_cached_table: Optional[FactorTable] = None
+_cached_at = 0.0
+
+
+def get_factor_table(db: Optional[Session] = None) -> FactorTable:
+    """carbon_factors 기반 계수 테이블을 반환합니다. (TTL 캐시)"""
+    global _cached_table, _cached_at
+    now = time.monotonic()
+    if _cached_table is not None and now - _cached_at < FACTOR_TABLE_TTL_SECONDS:
+        return _cached_table
+    if db is None:
+        return _cached_table or FactorTable()
+    table = FactorTable.from_db(db)
+    with _table_lock:
+        _cached_table, _cached_at = table, now
+    return table
+
+
+def invalidate_factor_table():
+    """배출 계수 변경 후 캐시를 비웁니다."""
+    global _cached_table, _cached_at
+    with _table_lock:
+        _cached_table, _cached_at = None, 0.0
+
+
+def score_trip(
+    mode: Any,
+    distance_km: float,
+    at: Optional[datetime] = None,
+    table: Optional[FactorTable] = None,
+) -> TripScore:
+    """단일 이동의 CO2 기준/실제/절감량(g)과 포인트를 계산합니다."""
+    table = table or get_factor_table()
+    distance_km = max(float(distance_km), 0.0)
+    baseline = table.factor(BASELINE_MODE, at) * distance_km
+    actual = table.factor(mode, at) * distance_km
+    saved = max(baseline - actual, 0.0)
+    return TripScore(
+        co2_baseline_g=baseline,
+        co2_actual_g=actual,
+        co2_saved_g=saved,
+        points=points_for_saved(saved),
+    )
+
+
+def score_batch(
+    modes: Any,
+    distances_km: Any,
+    timestamps: Any = None,
+    table: Optional[FactorTable] = None,
+) -> BatchScore:
+    """
+    여러 이동을 한 번에 계산합니다.
+    - modes: 교통수단 코드(int) 또는 문자열/Enum 배열
+    - distances_km: 이동 거리 배열
+    - timestamps: datetime64 / epoch 초 배열 (None 이면 현재 시점 계수 사용)
+    """
+    table = table or get_factor_table()
+    codes = encode_modes(modes)
+    distances = np.maximum(np.asarray(distances_km, dtype=np.float64), 0.0)
+    ts = to_epoch_array(timestamps, codes.shape[0])
+
+    baseline = table.factors(np.full_like(codes, _BASELINE_CODE), ts) * distances
+    actual = table.factors(codes, ts) * distances
+    saved = np.maximum(baseline - actual, 0.0)
+    points = np.floor(saved * POINTS_PER_G_SAVED + _POINTS_EPSILON).astype(np.int64)
+    return BatchScore(
+        co2_baseline_g=baseline,
+        co2_actual_g=actual,
+        co2_saved_g=saved,
+        points=points,
+    )
@@ -0,0 +1,441 @@
+"""
+세션 백엔드 (프로세스/호스트 간 공유)
+
+인메모리 SessionStore 는 워커 프로세스마다 따로 있어서 uvicorn 워커가 둘 이상이면 다른 워커에서 만든 세션이 404 가 됩니다.
+SESSION_BACKEND 환경 변수로 백엔드를 고릅니다.
+- memory: SessionStore (단일 워커, 기본값)
+- sqlite: 한 호스트의 여러 워커가 파일 하나를 공유 (WAL 모드 → 읽기는 쓰기를 기다리지 않음). SESSION_SQLITE_PATH
+- redis:  여러 호스트가 Redis 프로토콜 서버를 공유 (개발 환경은 services/resp_standin.py). SESSION_REDIS_URL
+sqlite/redis 는 워커별 짧은 read-through 캐시(CachedSessionBackend, SESSION_CACHE_TTL 초)를 앞에 둡니다.
+다른 워커의 변경은 캐시 TTL 이내에 보이고, 자기 워커의 변경은 즉시 반영됩니다.
+"""
+import asyncio
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+from .resp import DEFAULT_URL, RespClient
+from .session_store import (
+    DEFAULT_TTL_SECONDS,
+    SessionBackend,
+    SessionEntry,
+    SessionStore,
+    apply_update,
+    new_session_id,
+)
+
+EXPIRE_INTERVAL_SECONDS = 30
+DEFAULT_SQLITE_PATH = "./sessions.db"
+DEFAULT_CACHE_TTL_SECONDS = 1.0
+CACHE_MAX_ENTRIES = 10000
+# Redis 키는 만료 시각보다 이만큼 더 남겨 두어 만료 직후 조회가 410(만료)으로 구분되게 함
+REDIS_GRACE_SECONDS = 3600
+
+
+def _dumps(value: Any) -> str:
+    return json.dumps(value, ensure_ascii=False, separators=(",", ":"))
+
+
+class SQLiteSessionBackend(SessionBackend):
+    """SQLite(WAL) 파일 하나를 같은 호스트의 모든 워커가 공유
+
+    - 스레드마다 연결 하나 (autocommit, 읽고 고치는 작업만 BEGIN IMMEDIATE 로 쓰기 잠금)
+    - user_id, expires_at 인덱스 → 사용자별 조회/만료 정리가 해당 행만 읽음
+    """
+
+    SCHEMA = (
+        "CREATE TABLE IF NOT EXISTS sessions ("
+        " session_id TEXT PRIMARY KEY, user_id INTEGER NOT NULL, data TEXT NOT NULL,"
+        " created_at REAL NOT NULL, last_activity REAL NOT NULL, expires_at REAL NOT NULL,"
+        " is_active INTEGER NOT NULL DEFAULT 1)",
+        "CREATE INDEX IF NOT EXISTS idx_sessions_user ON sessions (user_id)",
+        "CREATE INDEX IF NOT EXISTS idx_sessions_expires ON sessions (expires_at)",
+    )
+    COLUMNS = "session_id, user_id, data, created_at, last_activity, expires_at, is_active"
+
+    def __init__(self, path: str = DEFAULT_SQLITE_PATH, default_ttl: float = DEFAULT_TTL_SECONDS):
+        self.path = path
+        self.default_ttl = default_ttl
+        self._local = threading.local()
+        conn = self._conn()
+        for statement in self.SCHEMA:
+            conn.execute(statement)
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=10, isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")  # WAL 에서는 체크포인트 때만 fsync
+            self._local.conn = conn
+        return conn
+
+    @staticmethod
+    def _entry(row: Tuple) -> SessionEntry:
+        return SessionEntry.from_record({
+            "session_id": row[0], "user_id": row[1], "data": json.loads(row[2]),
+            "created_at": row[3], "last_activity": row[4], "expires_at": row[5], "is_active": bool(row[6]),
+        })
+
+    def _select(self, conn: sqlite3.Connection, session_id: str) -> Optional[SessionEntry]:
+        row = conn.execute(f"SELECT {self.COLUMNS} FROM sessions WHERE session_id = ?", (session_id,)).fetchone()
+        return self._entry(row) if row else None
+
+    def create(self, user_id: int, data: Optional[Dict[str, Any]] = None, ttl_seconds: Optional[float] = None,
+               now: Optional[float] = None) -> SessionEntry:
+        now = time.time() if now is None else now
+        entry = SessionEntry(new_session_id(user_id), user_id, dict(data or {}), now, ttl_seconds or self.default_ttl)
+        self._conn().execute(
+            f"INSERT INTO sessions ({self.COLUMNS}) VALUES (?, ?, ?, ?, ?, ?, 1)",
+            (entry.session_id, user_id, _dumps(entry.data), now, now, entry.expires_at),
+        )
+        return entry
+
+    def get(self, session_id: str, now: Optional[float] = None) -> Optional[SessionEntry]:
+        entry = self._select(self._conn(), session_id)
+        if entry is None or entry.expires_at <= (time.time() if now is None else now):
+            return None
+        return entry
+
+    def owner(self, session_id: str) -> Optional[int]:
+        row = self._conn().execute("SELECT user_id FROM sessions WHERE session_id = ?", (session_id,)).fetchone()
+        return row[0] if row is not None else None
+
+    def update(self, session_id: str, data: Dict[str, Any], now: Optional[float] = None) -> Optional[SessionEntry]:
+        now = time.time() if now is None else now
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            entry = self._select(conn, session_id)
+            if entry is None or entry.expires_at <= now:
+                conn.execute("COMMIT")
+                return None
+            apply_update(entry, data, now)
+            conn.execute(
+                "UPDATE sessions SET data = ?, last_activity = ?, is_active = ? WHERE session_id = ?",
+                (_dumps(entry.data), now, int(entry.is_active), session_id),
+            )
+            conn.execute("COMMIT")
+            return entry
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+    def extend(self, session_id: str, ttl_seconds: float, now: Optional[float] = None) -> Optional[SessionEntry]:
+        now = time.time() if now is None else now
+        row = self._conn().execute(
+            "UPDATE sessions SET last_activity = ?, expires_at = ? WHERE session_id = ? AND expires_at > ?"
+            f" RETURNING {self.COLUMNS}",
+            (now, now + ttl_seconds, session_id, now),
+        ).fetchone()
+        return self._entry(row) if row else None
+
+    def delete(self, session_id: str) -> bool:
+        return self._conn().execute("DELETE FROM sessions WHERE session_id = ?", (session_id,)).rowcount > 0
+
+    def user_sessions(self, user_id: int, now: Optional[float] = None) -> List[SessionEntry]:
+        rows = self._conn().execute(
+            f"SELECT {self.COLUMNS} FROM sessions WHERE user_id = ? AND is_active = 1 AND expires_at > ?"
+            " ORDER BY created_at",
+            (user_id, time.time() if now is None else now),
+        ).fetchall()
+        return [self._entry(row) for row in rows]
+
+    def delete_user(self, user_id: int) -> int:
+        return self._conn().execute("DELETE FROM sessions WHERE user_id = ?", (user_id,)).rowcount
+
+    def expire(self, now: Optional[float] = None) -> int:
+        now = time.time() if now is None else now
+        return self._conn().execute("DELETE FROM sessions WHERE expires_at <= ?", (now,)).rowcount
+
+    def stats(self) -> Dict[str, int]:
+        total, active, users = self._conn().execute(
+            "SELECT COUNT(*), COALESCE(SUM(is_active), 0), COUNT(DISTINCT user_id) FROM sessions"
+        ).fetchone()
+        return {"total_sessions": total, "active_sessions": active, "users": users}
+
+    def close(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            self._local.conn = None
+            conn.close()
+
+
+class RedisSessionBackend(SessionBackend):
+    """Redis 프로토콜 서버를 여러 호스트가 공유
+
+    키 구성 (prefix 기본 "sess:")
+    - {prefix}{session_id}: 세션 레코드 JSON (만료 시각 + REDIS_GRACE_SECONDS 뒤 서버가 자동 삭제)
+    - {prefix}user:{user_id}: 사용자의 세션 ID 집합
+    - {prefix}exp: 만료 시각 정렬 집합 (member "user_id session_id") → expire() 가 지난 것만 범위 조회
+    - {prefix}inactive: 비활성 세션 ID 집합 (stats 용)
+    update/extend 는 읽고 쓰는 두 번의 왕복이라 같은 세션을 동시에 고치면 나중 쓰기가 이깁니다.
+    """
+
+    def __init__(self, client: Optional[RespClient] = None, prefix: str = "sess:",
+                 default_ttl: float = DEFAULT_TTL_SECONDS):
+        self.client = client or RespClient(DEFAULT_URL)
+        self.prefix = prefix
+        self.default_ttl = default_ttl
+        self.exp_key = f"{prefix}exp"
+        self.inactive_key = f"{prefix}inactive"
+
+    def _key(self, session_id: str) -> str:
+        return f"{self.prefix}{session_id}"
+
+    def _user_key(self, user_id: int) -> str:
+        return f"{self.prefix}user:{user_id}"
+
+    @staticmethod
+    def _member(entry: SessionEntry) -> str:
+        return f"{entry.user_id} {entry.session_id}"
+
+    @staticmethod
+    def _load(raw: Optional[bytes]) -> Optional[SessionEntry]:
+        return SessionEntry.from_record(json.loads(raw)) if raw else None
+
+    def _save_commands(self, entry: SessionEntry) -> List[Tuple]:
+        px = max(int((entry.expires_at - time.time() + REDIS_GRACE_SECONDS) * 1000), 1)
+        return [
+            ("SET", self._key(entry.session_id), _dumps(entry.to_record()), "PX", px),
+            ("ZADD", self.exp_key, entry.expires_at, self._member(entry)),
+        ]
+
+    def create(self, user_id: int, data: Optional[Dict[str, Any]] = None, ttl_seconds: Optional[float] = None,
+               now: Optional[float] = None) -> SessionEntry:
+        now = time.time() if now is None else now
+        entry = SessionEntry(new_session_id(user_id), user_id, dict(data or {}), now, ttl_seconds or self.default_ttl)
+        self.client.pipeline(self._save_commands(entry) + [("SADD", self._user_key(user_id), entry.session_id)])
+        return entry
+
+    def _read(self, session_id: str) -> Optional[SessionEntry]:
+        return self._load(self.client.execute("GET", self._key(session_id)))
+
+    def get(self, session_id: str, now: Optional[float] = None) -> Optional[SessionEntry]:
+        entry = self._read(session_id)
+        if entry is None or entry.expires_at <= (time.time() if now is None else now):
+            return None
+        return entry
+
+    def owner(self, session_id: str) -> Optional[int]:
+        entry = self._read(session_id)
+        return entry.user_id if entry is not None else None
+
+    def update(self, session_id: str, data: Dict[str, Any], now: Optional[float] = None) -> Optional[SessionEntry]:
+        now = time.time() if now is None else now
+        entry = self.get(session_id, now)
+        if entry is None:
+            return None
+        apply_update(entry, data, now)
+        commands = self._save_commands(entry)
+        commands.append(("SREM" if entry.is_active else "SADD", self.inactive_key, session_id))
+        self.client.pipeline(commands)
+        return entry
+
+    def extend(self, session_id: str, ttl_seconds: float, now: Optional[float] = None) -> Optional[SessionEntry]:
+        now = time.time() if now is None else now
+        entry = self.get(session_id, now)
+        if entry is None:
+            return None
+        entry.last_activity = now
+        entry.expires_at = now + ttl_seconds
+        self.client.pipeline(self._save_commands(entry))
+        return entry
+
+    def _remove_commands(self, entries: List[SessionEntry]) -> List[Tuple]:
+        if not entries:
+            return []
+        commands: List[Tuple] = [
+            ("DEL", *[self._key(e.session_id) for e in entries]),
+            ("ZREM", self.exp_key, *[self._member(e) for e in entries]),
+            ("SREM", self.inactive_key, *[e.session_id for e in entries]),
+        ]
+        by_user: Dict[int, List[str]] = {}
+        for e in entries:
+            by_user.setdefault(e.user_id, []).append(e.session_id)
+        commands.extend(("SREM", self._user_key(uid), *sids) for uid, sids in by_user.items())
+        return commands
+
+    def delete(self, session_id: str) -> bool:
+        entry = self._read(session_id)
+        if entry is None:
+            return False
+        self.client.pipeline(self._remove_commands([entry]))
+        return True
+
+    def _user_entries(self, user_id: int) -> List[SessionEntry]:
+        session_ids = self.client.execute("SMEMBERS", self._user_key(user_id))
+        if not session_ids:
+            return []
+        raws = self.client.execute("MGET", *[self._key(sid.decode()) for sid in session_ids])
+        return [entry for entry in map(self._load, raws) if entry is not None]
+
+    def user_sessions(self, user_id: int, now: Optional[float] = None) -> List[SessionEntry]:
+        now = time.time() if now is None else now
+        entries = [e for e in self._user_entries(user_id) if e.is_active and e.expires_at > now]
+        return sorted(entries, key=lambda e: e.created_at)
+
+    def delete_user(self, user_id: int) -> int:
+        entries = self._user_entries(user_id)
+        self.client.pipeline(self._remove_commands(entries) + [("DEL", self._user_key(user_id))])
+        return len(entries)
+
+    def expire(self, now: Optional[float] = None, batch_size: int = 1000) -> int:
+        """만료 정렬 집합에서 지난 항목만 배치로 꺼내 삭제 (여러 워커가 동시에 돌려도 결과 동일)"""
+        now = time.time() if now is None else now
+        removed = 0
+        while True:
+            members = self.client.execute("ZRANGEBYSCORE", self.exp_key, "-inf", now, "LIMIT", 0, batch_size)
+            if not members:
+                return removed
+            pairs = [m.decode().split(" ", 1) for m in members]
+            raws = self.client.execute("MGET", *[self._key(sid) for _, sid in pairs])
+            expired = []
+            for (uid, sid), raw in zip(pairs, raws):
+                entry = self._load(raw)
+                if entry is None:
+                    # 레코드는 이미 서버가 지움 → 인덱스만 정리
+                    entry = SessionEntry(sid, int(uid), {}, 0, 0)
+                elif entry.expires_at > now:
+                    continue  # 조회 사이에 다른 워커가 연장함 (새 점수로 ZADD 됨)
+                expired.append(entry)
+            if expired:
+                self.client.pipeline(self._remove_commands(expired))
+                removed += len(expired)
+            if len(members) < batch_size:
+                return removed
+
+    def stats(self) -> Dict[str, int]:
+        total, inactive = self.client.pipeline([("ZCARD", self.exp_key), ("SCARD", self.inactive_key)])
+        return {"total_sessions": total, "active_sessions": total - inactive}
+
+    def close(self):
+        self.client.close()
+
+
+class CachedSessionBackend(SessionBackend):
+    """워커별 read-through 캐시: get 결과를 ttl 초 동안 보관, 이 워커의 쓰기는 즉시 무효화"""
+
+    def __init__(self, backend: SessionBackend, ttl: float = DEFAULT_CACHE_TTL_SECONDS,
+                 max_entries: int = CACHE_MAX_ENTRIES):
+        self.backend = backend
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._cache: "OrderedDict[str, Tuple[float, SessionEntry]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def _put(self, entry: SessionEntry):
+        with self._lock:
+            self._cache[entry.session_id] = (time.monotonic() + self.ttl, entry)
+            self._cache.move_to_end(entry.session_id)
+            while len(self._cache) > self.max_entries:
+                self._cache.popitem(last=False)
+
+    def _drop(self, session_id: str):
+        with self._lock:
+            self._cache.pop(session_id, None)
+
+    def get(self, session_id: str, now: Optional[float] = None) -> Optional[SessionEntry]:
+        with self._lock:
+            cached = self._cache.get(session_id)
+        if cached is not None and cached[0] > time.monotonic():
+            entry = cached[1]
+            if entry.expires_at > (time.time() if now is None else now):
+                self.hits += 1
+                return entry
+        self.misses += 1
+        entry = self.backend.get(session_id, now)
+        if entry is None:
+            self._drop(session_id)
+        else:
+            self._put(entry)
+        return entry
+
+    def create(self, user_id: int, data: Optional[Dict[str, Any]] = None, ttl_seconds: Optional[float] = None,
+               now: Optional[float] = None) -> SessionEntry:
+        entry = self.backend.create(user_id, data, ttl_seconds, now)
+        self._put(entry)
+        return entry
+
+    def owner(self, session_id: str) -> Optional[int]:
+        return self.backend.owner(session_id)
+
+    def update(self, session_id: str, data: Dict[str, Any], now: Optional[float] = None) -> Optional[SessionEntry]:
+        self._drop(session_id)
+        entry = self.backend.update(session_id, data, now)
+        if entry is not None:
+            self._put(entry)
+        return entry
+
+    def extend(self, session_id: str, ttl_seconds: float, now: Optional[float] = None) -> Optional[SessionEntry]:
+        self._drop(session_id)
+        entry = self.backend.extend(session_id, ttl_seconds, now)
+        if entry is not None:
+            self._put(entry)
+        return entry
+
+    def delete(self, session_id: str) -> bool:
+        self._drop(session_id)
+        return self.backend.delete(session_id)
+
+    def user_sessions(self, user_id: int, now: Optional[float] = None) -> List[SessionEntry]:
+        return self.backend.user_sessions(user_id, now)
+
+    def delete_user(self, user_id: int) -> int:
+        with self._lock:
+            for session_id in [sid for sid, (_, e) in self._cache.items() if e.user_id == user_id]:
+                del self._cache[session_id]
+        return self.backend.delete_user(user_id)
+
+    def expire(self, now: Optional[float] = None) -> int:
+        return self.backend.expire(now)
+
+    def stats(self) -> Dict[str, int]:
+        return {**self.backend.stats(), "cache_hits": self.hits, "cache_misses": self.misses}
+
+    def close(self):
+        self.backend.close()
+
+
+def create_backend(kind: Optional[str] = None) -> SessionBackend:
+    """SESSION_BACKEND(memory | sqlite | redis) 설정에 맞는 백엔드를 만듭니다."""
+    kind = (kind or os.getenv("SESSION_BACKEND", "memory")).lower()
+    if kind == "memory":
+        return SessionStore()
+    if kind == "sqlite":
+        backend: SessionBackend = SQLiteSessionBackend(os.getenv("SESSION_SQLITE_PATH", DEFAULT_SQLITE_PATH))
+    elif kind == "redis":
+        backend = RedisSessionBackend(RespClient(os.getenv("SESSION_REDIS_URL", DEFAULT_URL)))
+    else:
+        raise ValueError(f"Unknown SESSION_BACKEND: {kind}")
+    cache_ttl = float(os.getenv("SESSION_CACHE_TTL", DEFAULT_CACHE_TTL_SECONDS))
+    return CachedSessionBackend(backend, cache_ttl) if cache_ttl > 0 else backend
+
+
+session_backend = create_backend()
+
+
+async def expiry_loop(interval: float = EXPIRE_INTERVAL_SECONDS):
+    while True:
+        try:
+            # sqlite/redis 는 네트워크·디스크 I/O 라 이벤트 루프를 막지 않도록 스레드에서 실행
+            await asyncio.to_thread(session_backend.expire)
+        except Exception as e:
+            print(f"Session expiry error: {e}")
+        await asyncio.sleep(interval)
+
+
+_expiry_task: Optional[asyncio.Task] = None
+
+
+def ensure_expiry_task():
+    """앱 시작 시 만료 세션 정리 작업을 시작합니다. (워커마다 실행해도 정리 결과는 같음)"""
+    global _expiry_task
+    if _expiry_task is None or _expiry_task.done():
+        _expiry_task = asyncio.get_running_loop().create_task(expiry_loop())
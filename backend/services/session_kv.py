@@ -0,0 +1,336 @@
+"""
+사용자별 세션 키-값 저장소 (frontend/src/services/sessionService.ts)
+
+화면 상태(채팅 기록, 활성 탭, 사용자 설정 등)를 사용자 → 키 → 값으로 보관합니다.
+- 여러 키를 한 번에 읽고 쓰기 (mget/mset) → 페이지 로드 시 요청 한 번으로 모든 키 복원
+- 키마다 TTL 을 따로 줄 수 있음 (없으면 만료 없음). 만료된 키는 읽을 때 제외하고 expiry_loop 가 주기적으로 삭제
+- 값은 압축 형식으로 저장: 9바이트 헤더(형식, 만료 시각) + 공백 없는 JSON, COMPRESS_MIN_BYTES 이상이면 zlib
+백엔드는 세션과 같은 SESSION_BACKEND 설정을 따릅니다. (memory | sqlite | redis - services/session_backends.py)
+"""
+import asyncio
+import heapq
+import json
+import os
+import sqlite3
+import struct
+import threading
+import time
+import zlib
+from abc import ABC, abstractmethod
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from .resp import DEFAULT_URL, RespClient
+from .session_backends import DEFAULT_SQLITE_PATH, EXPIRE_INTERVAL_SECONDS
+
+COMPRESS_MIN_BYTES = 512
+MAX_VALUE_BYTES = 256 * 1024
+MAX_KEY_LENGTH = 64
+
+_HEADER = struct.Struct("<Bd")  # 형식(0: JSON, 1: zlib JSON), 만료 epoch 초 (0 = 만료 없음)
+_JSON, _ZLIB = 0, 1
+
+
+class ValueTooLarge(ValueError):
+    pass
+
+
+def pack(value: Any, expires_at: Optional[float] = None) -> bytes:
+    raw = json.dumps(value, ensure_ascii=False, separators=(",", ":")).encode()
+    if len(raw) > MAX_VALUE_BYTES:
+        raise ValueTooLarge(f"value is {len(raw)} bytes (max {MAX_VALUE_BYTES})")
+    kind = _JSON
+    if len(raw) >= COMPRESS_MIN_BYTES:
+        compressed = zlib.compress(raw, 6)
+        if len(compressed) < len(raw):
+            kind, raw = _ZLIB, compressed
+    return _HEADER.pack(kind, expires_at or 0.0) + raw
+
+
+def expires_of(blob: bytes) -> float:
+    return _HEADER.unpack_from(blob)[1]
+
+
+def unpack(blob: bytes) -> Any:
+    kind, _ = _HEADER.unpack_from(blob)
+    raw = blob[_HEADER.size:]
+    return json.loads(zlib.decompress(raw) if kind == _ZLIB else raw)
+
+
+def _alive(blob: Optional[bytes], now: float) -> bool:
+    if blob is None:
+        return False
+    expires_at = expires_of(blob)
+    return not expires_at or expires_at > now
+
+
+def _decode(blobs: Iterable[Tuple[str, Optional[bytes]]], now: float) -> Dict[str, Any]:
+    return {key: unpack(blob) for key, blob in blobs if _alive(blob, now)}
+
+
+class SessionKV(ABC):
+    """백엔드 공통 인터페이스. keys=None 이면 사용자의 모든 키"""
+
+    @abstractmethod
+    def mget(self, user_id: int, keys: Optional[List[str]] = None, now: Optional[float] = None) -> Dict[str, Any]:
+        ...
+
+    @abstractmethod
+    def mset(self, user_id: int, values: Dict[str, Any], ttls: Optional[Dict[str, Optional[float]]] = None,
+             now: Optional[float] = None) -> int:
+        """값을 저장하고 저장한 키 수를 반환합니다. ttls[key] 초 뒤 만료 (없거나 None 이면 만료 없음)"""
+
+    @abstractmethod
+    def delete(self, user_id: int, keys: List[str]) -> int:
+        ...
+
+    @abstractmethod
+    def clear(self, user_id: int) -> int:
+        ...
+
+    @abstractmethod
+    def expire(self, now: Optional[float] = None) -> int:
+        ...
+
+    @staticmethod
+    def _blobs(values: Dict[str, Any], ttls: Optional[Dict[str, Optional[float]]], now: float) -> Dict[str, bytes]:
+        ttls = ttls or {}
+        return {key: pack(value, now + ttls[key] if ttls.get(key) else None) for key, value in values.items()}
+
+
+class MemorySessionKV(SessionKV):
+    def __init__(self):
+        self._data: Dict[int, Dict[str, bytes]] = {}
+        self._heap: List[Tuple[float, int, str]] = []
+        self._lock = threading.Lock()
+
+    def mget(self, user_id, keys=None, now=None):
+        now = time.time() if now is None else now
+        with self._lock:
+            fields = self._data.get(user_id, {})
+            items = fields.items() if keys is None else ((k, fields.get(k)) for k in keys)
+            return _decode(list(items), now)
+
+    def mset(self, user_id, values, ttls=None, now=None):
+        now = time.time() if now is None else now
+        blobs = self._blobs(values, ttls, now)
+        with self._lock:
+            self._data.setdefault(user_id, {}).update(blobs)
+            for key, blob in blobs.items():
+                expires_at = expires_of(blob)
+                if expires_at:
+                    heapq.heappush(self._heap, (expires_at, user_id, key))
+        return len(blobs)
+
+    def delete(self, user_id, keys):
+        with self._lock:
+            fields = self._data.get(user_id, {})
+            removed = sum(1 for k in keys if fields.pop(k, None) is not None)
+            if not fields:
+                self._data.pop(user_id, None)
+            return removed
+
+    def clear(self, user_id):
+        with self._lock:
+            return len(self._data.pop(user_id, {}))
+
+    def expire(self, now=None):
+        now = time.time() if now is None else now
+        removed = 0
+        with self._lock:
+            while self._heap and self._heap[0][0] <= now:
+                expires_at, user_id, key = heapq.heappop(self._heap)
+                fields = self._data.get(user_id)
+                blob = fields.get(key) if fields else None
+                # 다시 쓰여서 만료 시각이 바뀐 키는 이전 힙 항목을 무시
+                if blob is not None and expires_of(blob) == expires_at:
+                    del fields[key]
+                    removed += 1
+                    if not fields:
+                        del self._data[user_id]
+        return removed
+
+
+class SQLiteSessionKV(SessionKV):
+    """세션 백엔드와 같은 SQLite(WAL) 파일의 session_kv 테이블 (user_id, key) 기본 키, WITHOUT ROWID"""
+
+    SCHEMA = (
+        "CREATE TABLE IF NOT EXISTS session_kv ("
+        " user_id INTEGER NOT NULL, key TEXT NOT NULL, value BLOB NOT NULL, expires_at REAL,"
+        " PRIMARY KEY (user_id, key)) WITHOUT ROWID",
+        "CREATE INDEX IF NOT EXISTS idx_session_kv_expires ON session_kv (expires_at) WHERE expires_at IS NOT NULL",
+    )
+
+    def __init__(self, path: str = DEFAULT_SQLITE_PATH):
+        self.path = path
+        self._local = threading.local()
+        conn = self._conn()
+        for statement in self.SCHEMA:
+            conn.execute(statement)
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=10, isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def mget(self, user_id, keys=None, now=None):
+        now = time.time() if now is None else now
+        if keys is None:
+            rows = self._conn().execute("SELECT key, value FROM session_kv WHERE user_id = ?", (user_id,))
+        else:
+            if not keys:
+                return {}
+            marks = ",".join("?" * len(keys))
+            rows = self._conn().execute(
+                f"SELECT key, value FROM session_kv WHERE user_id = ? AND key IN ({marks})", (user_id, *keys)
+            )
+        return _decode(rows.fetchall(), now)
+
+    def mset(self, user_id, values, ttls=None, now=None):
+        now = time.time() if now is None else now
+        blobs = self._blobs(values, ttls, now)
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.executemany(
+                "INSERT OR REPLACE INTO session_kv (user_id, key, value, expires_at) VALUES (?, ?, ?, ?)",
+                [(user_id, key, blob, expires_of(blob) or None) for key, blob in blobs.items()],
+            )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return len(blobs)
+
+    def delete(self, user_id, keys):
+        if not keys:
+            return 0
+        marks = ",".join("?" * len(keys))
+        return self._conn().execute(
+            f"DELETE FROM session_kv WHERE user_id = ? AND key IN ({marks})", (user_id, *keys)
+        ).rowcount
+
+    def clear(self, user_id):
+        return self._conn().execute("DELETE FROM session_kv WHERE user_id = ?", (user_id,)).rowcount
+
+    def expire(self, now=None):
+        now = time.time() if now is None else now
+        return self._conn().execute(
+            "DELETE FROM session_kv WHERE expires_at IS NOT NULL AND expires_at <= ?", (now,)
+        ).rowcount
+
+
+class RedisSessionKV(SessionKV):
+    """사용자마다 해시 하나({prefix}{user_id}: key → 값), TTL 있는 키는 {prefix}exp 정렬 집합("user_id:key")에 등록"""
+
+    def __init__(self, client: Optional[RespClient] = None, prefix: str = "kv:"):
+        self.client = client or RespClient(DEFAULT_URL)
+        self.prefix = prefix
+        self.exp_key = f"{prefix}exp"
+
+    def _hash(self, user_id: int) -> str:
+        return f"{self.prefix}{user_id}"
+
+    def mget(self, user_id, keys=None, now=None):
+        now = time.time() if now is None else now
+        if keys is None:
+            flat = self.client.execute("HGETALL", self._hash(user_id))
+            items = [(flat[i].decode(), flat[i + 1]) for i in range(0, len(flat), 2)]
+        else:
+            if not keys:
+                return {}
+            items = list(zip(keys, self.client.execute("HMGET", self._hash(user_id), *keys)))
+        return _decode(items, now)
+
+    def mset(self, user_id, values, ttls=None, now=None):
+        now = time.time() if now is None else now
+        blobs = self._blobs(values, ttls, now)
+        if not blobs:
+            return 0
+        commands: List[Tuple] = [("HSET", self._hash(user_id), *[v for kv in blobs.items() for v in kv])]
+        scored = [(expires_of(blob), f"{user_id}:{key}") for key, blob in blobs.items() if expires_of(blob)]
+        unscored = [f"{user_id}:{key}" for key, blob in blobs.items() if not expires_of(blob)]
+        if scored:
+            commands.append(("ZADD", self.exp_key, *[v for pair in scored for v in pair]))
+        if unscored:
+            commands.append(("ZREM", self.exp_key, *unscored))  # 이전에 TTL 이 있던 키
+        self.client.pipeline(commands)
+        return len(blobs)
+
+    def delete(self, user_id, keys):
+        if not keys:
+            return 0
+        removed, _ = self.client.pipeline([
+            ("HDEL", self._hash(user_id), *keys),
+            ("ZREM", self.exp_key, *[f"{user_id}:{key}" for key in keys]),
+        ])
+        return removed
+
+    def clear(self, user_id):
+        keys = [k.decode() for k in self.client.execute("HKEYS", self._hash(user_id))]
+        if not keys:
+            return 0
+        self.client.pipeline([
+            ("DEL", self._hash(user_id)),
+            ("ZREM", self.exp_key, *[f"{user_id}:{key}" for key in keys]),
+        ])
+        return len(keys)
+
+    def expire(self, now=None, batch_size: int = 1000):
+        now = time.time() if now is None else now
+        removed = 0
+        while True:
+            members = self.client.execute("ZRANGEBYSCORE", self.exp_key, "-inf", now, "LIMIT", 0, batch_size)
+            if not members:
+                return removed
+            by_user: Dict[int, List[str]] = {}
+            for member in members:
+                user_id, key = member.decode().split(":", 1)
+                by_user.setdefault(int(user_id), []).append(key)
+            commands: List[Tuple] = [("ZREM", self.exp_key, *members)]
+            for user_id, keys in by_user.items():
+                # 조회 사이에 TTL 없이/더 길게 다시 쓴 키는 남김
+                blobs = self.client.execute("HMGET", self._hash(user_id), *keys)
+                expired = [k for k, blob in zip(keys, blobs) if blob is not None and not _alive(blob, now)]
+                if expired:
+                    commands.append(("HDEL", self._hash(user_id), *expired))
+                    removed += len(expired)
+            self.client.pipeline(commands)
+            if len(members) < batch_size:
+                return removed
+
+
+def create_kv(kind: Optional[str] = None) -> SessionKV:
+    kind = (kind or os.getenv("SESSION_BACKEND", "memory")).lower()
+    if kind == "memory":
+        return MemorySessionKV()
+    if kind == "sqlite":
+        return SQLiteSessionKV(os.getenv("SESSION_SQLITE_PATH", DEFAULT_SQLITE_PATH))
+    if kind == "redis":
+        return RedisSessionKV(RespClient(os.getenv("SESSION_REDIS_URL", DEFAULT_URL)))
+    raise ValueError(f"Unknown SESSION_BACKEND: {kind}")
+
+
+session_kv = create_kv()
+
+
+async def expiry_loop(interval: float = EXPIRE_INTERVAL_SECONDS):
+    while True:
+        try:
+            await asyncio.to_thread(session_kv.expire)
+        except Exception as e:
+            print(f"Session KV expiry error: {e}")
+        await asyncio.sleep(interval)
+
+
+_expiry_task: Optional[asyncio.Task] = None
+
+
+def ensure_expiry_task():
+    """앱 시작 시 만료 키 정리 작업을 시작합니다."""
+    global _expiry_task
+    if _expiry_task is None or _expiry_task.done():
+        _expiry_task = asyncio.get_running_loop().create_task(expiry_loop())
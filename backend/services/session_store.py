@@ -0,0 +1,259 @@
+"""
+TTL 세션 저장소 (인메모리)
+
+- 세션 ID → 세션, user_id → 세션 ID 집합(보조 인덱스)을 함께 유지 → 사용자별 조회는 그 사용자 세션 수에만 비례
+- 만료 시각 min-heap: 백그라운드 작업(session_backends.expiry_loop)이 EXPIRE_INTERVAL_SECONDS 마다 만료된 것만 꺼내 삭제 (O(log n))
+  연장(extend)하면 새 항목을 넣고 이전 항목은 꺼낼 때 만료 시각이 다르면 무시 (lazy deletion)
+- 전체 세션 수는 max_sessions 로 제한하고 넘으면 가장 오래 사용하지 않은 세션부터 제거 (LRU, OrderedDict)
+- 조회 시에도 만료 시각을 확인하므로 정리 주기 사이에 만료된 세션을 돌려주지 않음
+- 한 프로세스 안에서만 공유되므로 워커가 여럿이면 services/session_backends.py 의 SQLite/Redis 백엔드를 사용
+"""
+import heapq
+import secrets
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+DEFAULT_TTL_SECONDS = 24 * 3600
+MAX_SESSIONS = 100000
+
+
+def _iso(ts: float) -> str:
+    return datetime.fromtimestamp(ts).isoformat()
+
+
+class SessionEntry:
+    __slots__ = ("session_id", "user_id", "data", "created_at", "last_activity", "expires_at", "is_active")
+
+    def __init__(self, session_id: str, user_id: int, data: Dict[str, Any], now: float, ttl_seconds: float):
+        self.session_id = session_id
+        self.user_id = user_id
+        self.data = data
+        self.created_at = now
+        self.last_activity = now
+        self.expires_at = now + ttl_seconds
+        self.is_active = True
+
+    def to_dict(self) -> Dict[str, Any]:
+        """API 응답용 세션 데이터 (저장한 데이터 + 메타 정보)"""
+        return {
+            **self.data,
+            "user_id": self.user_id,
+            "created_at": _iso(self.created_at),
+            "last_activity": _iso(self.last_activity),
+            "expires_at": _iso(self.expires_at),
+            "is_active": self.is_active,
+        }
+
+    def to_record(self) -> Dict[str, Any]:
+        """저장용 직렬화 (시각은 epoch 초 그대로)"""
+        return {
+            "session_id": self.session_id,
+            "user_id": self.user_id,
+            "data": self.data,
+            "created_at": self.created_at,
+            "last_activity": self.last_activity,
+            "expires_at": self.expires_at,
+            "is_active": self.is_active,
+        }
+
+    @classmethod
+    def from_record(cls, record: Dict[str, Any]) -> "SessionEntry":
+        entry = cls.__new__(cls)
+        for name in cls.__slots__:
+            setattr(entry, name, record[name])
+        return entry
+
+
+class SessionBackend(ABC):
+    """세션 백엔드 공통 인터페이스 (메모리: SessionStore, 프로세스 간 공유: services/session_backends.py)
+
+    만료된 세션은 get/update/extend 에서 None, user_sessions 에서 제외됩니다.
+    owner 는 만료 여부와 관계없이 저장된 세션의 user_id 입니다. (소유자 확인 후 404/410 구분용)
+    """
+
+    @abstractmethod
+    def create(self, user_id: int, data: Optional[Dict[str, Any]] = None, ttl_seconds: Optional[float] = None,
+               now: Optional[float] = None) -> SessionEntry:
+        ...
+
+    @abstractmethod
+    def get(self, session_id: str, now: Optional[float] = None) -> Optional[SessionEntry]:
+        ...
+
+    @abstractmethod
+    def owner(self, session_id: str) -> Optional[int]:
+        ...
+
+    @abstractmethod
+    def update(self, session_id: str, data: Dict[str, Any], now: Optional[float] = None) -> Optional[SessionEntry]:
+        ...
+
+    @abstractmethod
+    def extend(self, session_id: str, ttl_seconds: float, now: Optional[float] = None) -> Optional[SessionEntry]:
+        ...
+
+    @abstractmethod
+    def delete(self, session_id: str) -> bool:
+        ...
+
+    @abstractmethod
+    def user_sessions(self, user_id: int, now: Optional[float] = None) -> List[SessionEntry]:
+        ...
+
+    @abstractmethod
+    def delete_user(self, user_id: int) -> int:
+        ...
+
+    @abstractmethod
+    def expire(self, now: Optional[float] = None) -> int:
+        ...
+
+    @abstractmethod
+    def stats(self) -> Dict[str, int]:
+        ...
+
+    def close(self):
+        pass
+
+
+def new_session_id(user_id: int) -> str:
+    return f"session_{user_id}_{secrets.token_hex(8)}"
+
+
+def apply_update(entry: SessionEntry, data: Dict[str, Any], now: float) -> int:
+    """update 의 데이터 병합 규칙 (is_active 키는 메타 필드로). 활성 세션 수 변화량을 반환"""
+    data = dict(data)
+    delta = 0
+    if "is_active" in data:
+        is_active = bool(data.pop("is_active"))
+        delta = int(is_active) - int(entry.is_active)
+        entry.is_active = is_active
+    entry.data.update(data)
+    entry.last_activity = now
+    return delta
+
+
+class SessionStore(SessionBackend):
+    def __init__(self, max_sessions: int = MAX_SESSIONS, default_ttl: float = DEFAULT_TTL_SECONDS):
+        self.max_sessions = max_sessions
+        self.default_ttl = default_ttl
+        self._sessions: "OrderedDict[str, SessionEntry]" = OrderedDict()
+        self._by_user: Dict[int, Dict[str, None]] = {}  # 삽입 순서를 유지하는 집합
+        self._heap: List[Tuple[float, str]] = []
+        self._active = 0
+        self._lock = threading.Lock()
+
+    # 내부 함수는 모두 _lock 을 잡은 상태에서 호출
+    def _remove(self, entry: SessionEntry):
+        del self._sessions[entry.session_id]
+        ids = self._by_user.get(entry.user_id)
+        if ids is not None:
+            ids.pop(entry.session_id, None)
+            if not ids:
+                del self._by_user[entry.user_id]
+        if entry.is_active:
+            self._active -= 1
+
+    def _push_expiry(self, entry: SessionEntry):
+        heapq.heappush(self._heap, (entry.expires_at, entry.session_id))
+        # 연장으로 쌓인 이전 항목이 너무 많으면 힙을 다시 만듦 (분할 상환 O(1))
+        if len(self._heap) > 2 * len(self._sessions) + 1024:
+            self._heap = [(e.expires_at, e.session_id) for e in self._sessions.values()]
+            heapq.heapify(self._heap)
+
+    def _live(self, session_id: str, now: float) -> Optional[SessionEntry]:
+        entry = self._sessions.get(session_id)
+        if entry is None:
+            return None
+        if entry.expires_at <= now:
+            self._remove(entry)
+            return None
+        self._sessions.move_to_end(session_id)
+        return entry
+
+    def create(self, user_id: int, data: Optional[Dict[str, Any]] = None, ttl_seconds: Optional[float] = None,
+               now: Optional[float] = None) -> SessionEntry:
+        now = time.time() if now is None else now
+        session_id = new_session_id(user_id)
+        entry = SessionEntry(session_id, user_id, dict(data or {}), now, ttl_seconds or self.default_ttl)
+        with self._lock:
+            self._sessions[session_id] = entry
+            self._by_user.setdefault(user_id, {})[session_id] = None
+            self._active += 1
+            self._push_expiry(entry)
+            while len(self._sessions) > self.max_sessions:
+                self._remove(next(iter(self._sessions.values())))  # 가장 오래 사용하지 않은 세션
+        return entry
+
+    def get(self, session_id: str, now: Optional[float] = None) -> Optional[SessionEntry]:
+        """살아 있는 세션 (만료됐으면 지우고 None)"""
+        with self._lock:
+            return self._live(session_id, time.time() if now is None else now)
+
+    def owner(self, session_id: str) -> Optional[int]:
+        """만료 여부와 관계없이 저장된 세션의 user_id, 없으면 None (만료와 없음을 구분할 때 사용)"""
+        entry = self._sessions.get(session_id)
+        return entry.user_id if entry is not None else None
+
+    def update(self, session_id: str, data: Dict[str, Any], now: Optional[float] = None) -> Optional[SessionEntry]:
+        now = time.time() if now is None else now
+        with self._lock:
+            entry = self._live(session_id, now)
+            if entry is not None:
+                self._active += apply_update(entry, data, now)
+            return entry
+
+    def extend(self, session_id: str, ttl_seconds: float, now: Optional[float] = None) -> Optional[SessionEntry]:
+        """만료 시각을 지금부터 ttl_seconds 뒤로 옮깁니다."""
+        now = time.time() if now is None else now
+        with self._lock:
+            entry = self._live(session_id, now)
+            if entry is not None:
+                entry.last_activity = now
+                entry.expires_at = now + ttl_seconds
+                self._push_expiry(entry)
+            return entry
+
+    def delete(self, session_id: str) -> bool:
+        with self._lock:
+            entry = self._sessions.get(session_id)
+            if entry is None:
+                return False
+            self._remove(entry)
+            return True
+
+    def user_sessions(self, user_id: int, now: Optional[float] = None) -> List[SessionEntry]:
+        """사용자의 살아 있는 세션 (보조 인덱스로 그 사용자 세션만 확인)"""
+        now = time.time() if now is None else now
+        with self._lock:
+            entries = [self._sessions[sid] for sid in self._by_user.get(user_id, ())]
+            return [e for e in entries if e.is_active and e.expires_at > now]
+
+    def delete_user(self, user_id: int) -> int:
+        with self._lock:
+            entries = [self._sessions[sid] for sid in self._by_user.get(user_id, ())]
+            for entry in entries:
+                self._remove(entry)
+            return len(entries)
+
+    def expire(self, now: Optional[float] = None) -> int:
+        """만료 시각이 지난 세션을 힙에서 꺼내 삭제하고 삭제한 수를 반환합니다."""
+        now = time.time() if now is None else now
+        removed = 0
+        with self._lock:
+            while self._heap and self._heap[0][0] <= now:
+                expires_at, session_id = heapq.heappop(self._heap)
+                entry = self._sessions.get(session_id)
+                if entry is not None and entry.expires_at == expires_at:
+                    self._remove(entry)
+                    removed += 1
+        return removed
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"total_sessions": len(self._sessions), "active_sessions": self._active, "users": len(self._by_user)}
+
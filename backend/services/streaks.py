@@ -0,0 +1,131 @@
+"""
+친환경 이동 연속 일수(streak)
+
+user_counters 에 현재 연속 일수, 최장 연속 일수, 마지막 활동일(KST)을 두고
+이동이 기록될 때 사용자 행 하나만 보고 O(1) 로 갱신합니다. (mobility_logs 이력을 다시 읽지 않음)
+- 날짜는 KST(UTC+9) 기준. 이동 시각은 UTC(naive)로 저장되어 있음
+- 마지막 활동일 다음 날이면 +1, 같은 날이면 그대로, 하루 이상 비면 1 부터 다시 시작
+- 마지막 활동일보다 이전 날짜의 늦은 업로드는 연속 일수를 바꾸지 않음 (정확한 값은 업적 백필이 다시 계산)
+- 끊긴 연속 일수는 야간 배치(jobs/reset_streaks.py)가 한 번에 0 으로 초기화하고,
+  그 전에 읽더라도 current_streak() 가 마지막 활동일로 판단해 0 을 돌려줌
+"""
+from datetime import date, datetime, timedelta
+from typing import Any, Dict, List, Optional, Sequence, Set, Tuple
+
+import numpy as np
+from sqlalchemy import update
+from sqlalchemy.orm import Session
+
+from .. import models
+from .scoring import BASELINE_MODE
+
+KST_OFFSET = timedelta(hours=9)
+
+
+def _mode_value(mode: Any) -> str:
+    return getattr(mode, "value", mode)
+
+
+def kst_date(at: datetime) -> date:
+    """UTC(naive) 시각의 KST 날짜"""
+    return (at + KST_OFFSET).date()
+
+
+def today_kst(now: Optional[datetime] = None) -> date:
+    return kst_date(now or datetime.utcnow())
+
+
+def advance(current: int, longest: int, last_day: Optional[date], day: date) -> Tuple[int, int, Optional[date]]:
+    """활동일 하나를 반영한 (현재, 최장, 마지막 활동일)"""
+    if last_day is not None and day <= last_day:
+        return current, longest, last_day
+    if last_day is not None and day == last_day + timedelta(days=1):
+        current += 1
+    else:
+        current = 1
+    return current, max(longest, current), day
+
+
+def current_streak(current: int, last_day: Optional[date], today: date) -> int:
+    """오늘 또는 어제 활동했으면 이어지는 중, 아니면 끊긴 것 (0)"""
+    if last_day is None or last_day < today - timedelta(days=1):
+        return 0
+    return current or 0
+
+
+def apply_trips(db: Session, trips: Sequence[Any]) -> Set[int]:
+    """
+    기록된 이동 중 친환경 이동의 KST 날짜로 연속 일수를 갱신합니다. (커밋은 호출자)
+    user_counters 행은 호출자가 이미 upsert 해 두어야 합니다. 반환값은 현재 연속 일수가 바뀐 user_id 집합입니다.
+    """
+    days: Dict[int, Set[date]] = {}
+    for trip in trips:
+        if _mode_value(trip.mode) != BASELINE_MODE.value:
+            days.setdefault(trip.user_id, set()).add(kst_date(trip.started_at))
+    if not days:
+        return set()
+
+    counter = models.UserCounter
+    rows = db.query(counter.user_id, counter.current_streak, counter.longest_streak, counter.last_active_date).filter(
+        counter.user_id.in_(list(days))
+    ).with_for_update().all()
+
+    updates: List[Dict[str, Any]] = []
+    changed: Set[int] = set()
+    for user_id, current, longest, last_day in rows:
+        state = (current or 0, longest or 0, last_day)
+        for day in sorted(days[user_id]):
+            state = advance(*state, day)
+        if state != (current or 0, longest or 0, last_day):
+            updates.append({
+                "user_id": user_id, "current_streak": state[0], "longest_streak": state[1], "last_active_date": state[2],
+            })
+            if state[0] != current:
+                changed.add(user_id)
+    if updates:
+        db.execute(update(counter), updates)
+    return changed
+
+
+def from_days(rows: np.ndarray, days: np.ndarray, n_users: int, today: date) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    활동 (사용자 행 번호, KST 날짜) 배열로 사용자별 연속 일수를 한 번에 계산합니다. (업적 백필용)
+    반환: (현재 연속 일수, 최장 연속 일수, 마지막 활동일 datetime64[D], 활동이 없으면 NaT)
+    """
+    current = np.zeros(n_users, dtype=np.int64)
+    longest = np.zeros(n_users, dtype=np.int64)
+    last_day = np.full(n_users, np.datetime64("NaT"), dtype="datetime64[D]")
+    if rows.size == 0:
+        return current, longest, last_day
+
+    day_numbers = days.astype("datetime64[D]").astype(np.int64)
+    pairs = np.unique(np.stack([rows.astype(np.int64), day_numbers], axis=1), axis=0)  # (행, 날짜) 정렬·중복 제거
+    r, d = pairs[:, 0], pairs[:, 1]
+    new_run = np.ones(r.size, dtype=bool)
+    new_run[1:] = (r[1:] != r[:-1]) | (d[1:] - d[:-1] != 1)
+    starts = np.flatnonzero(new_run)
+    ends = np.append(starts[1:] - 1, r.size - 1)
+    run_user, run_length, run_end = r[starts], ends - starts + 1, d[ends]
+
+    np.maximum.at(longest, run_user, run_length)
+    is_last = np.append(run_user[1:] != run_user[:-1], True)
+    current[run_user[is_last]] = run_length[is_last]
+    last_day[run_user[is_last]] = run_end[is_last].astype("datetime64[D]")
+    alive = last_day >= np.datetime64(today - timedelta(days=1), "D")
+    current[~alive] = 0
+    return current, longest, last_day
+
+
+def for_user(db: Session, user_id: int, today: Optional[date] = None) -> Dict[str, Any]:
+    """대시보드용 연속 일수 (기본키 한 행)"""
+    row = db.query(
+        models.UserCounter.current_streak, models.UserCounter.longest_streak, models.UserCounter.last_active_date
+    ).filter(models.UserCounter.user_id == user_id).first()
+    if row is None:
+        return {"current": 0, "longest": 0, "last_active_date": None}
+    current, longest, last_day = row
+    return {
+        "current": current_streak(current, last_day, today or today_kst()),
+        "longest": longest or 0,
+        "last_active_date": last_day,
+    }
@@ -0,0 +1,300 @@
+"""
+대중교통 구간 거리 계산 엔진
+
+- 지하철: subway_distances(인접 역 간 거리)로 역 그래프를 만들고, 출발역 기준 Dijkstra
+  결과를 역 단위로 캐시하여 역 이름 → 거리(km) 조회를 마이크로초 단위로 처리합니다.
+- 버스: bus_distances(노선별 연속 정류장 구간)를 노선마다 정류장 순서로 이어 붙이고
+  누적 거리(prefix sum) 배열을 만들어, 정류장 간 거리를 뺄셈 한 번으로 구합니다.
+
+그래프는 처음 조회할 때 로드하며(lazy), 테이블 지문(행 수/최대 id/거리 합)을
+주기적으로 확인해 테이블이 바뀌면 다시 만듭니다.
+"""
+import heapq
+from collections import deque
+import threading
+import time
+from typing import Any, Callable, Deque, Dict, Generic, Iterable, List, Optional, Tuple, TypeVar
+
+import numpy as np
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from .. import models
+
+# 테이블 변경 여부 확인 주기 (초)
+FINGERPRINT_CHECK_SECONDS = 30
+
+T = TypeVar("T")
+
+
+def normalize_station(name: Optional[str]) -> str:
+    """역/정류장 이름 정규화 (공백 제거, '역' 접미사 제거)"""
+    name = (name or "").strip()
+    if len(name) > 1 and name.endswith("역"):
+        name = name[:-1]
+    return name
+
+
+class TableCache(Generic[T]):
+    """테이블 지문이 바뀔 때만 다시 빌드하는 지연 로딩 캐시"""
+
+    def __init__(self, fingerprint: Callable[[Session], tuple], build: Callable[[Session], T]):
+        self._fingerprint = fingerprint
+        self._build = build
+        self._lock = threading.Lock()
+        self._value: Optional[T] = None
+        self._version: Optional[tuple] = None
+        self._checked_at = 0.0
+
+    def get(self, db: Optional[Session] = None) -> Optional[T]:
+        now = time.monotonic()
+        if db is None or (self._value is not None and now - self._checked_at < FINGERPRINT_CHECK_SECONDS):
+            return self._value
+        with self._lock:
+            if self._value is not None and now - self._checked_at < FINGERPRINT_CHECK_SECONDS:
+                return self._value
+            version = tuple(self._fingerprint(db))
+            if self._value is None or version != self._version:
+                self._value = self._build(db)
+                self._version = version
+            self._checked_at = now
+            return self._value
+
+    def invalidate(self):
+        with self._lock:
+            self._value, self._version, self._checked_at = None, None, 0.0
+
+
+# ---------------------------
+# 지하철
+# ---------------------------
+class SubwayGraph:
+    """역 그래프 + 출발역별 최단거리 배열 캐시"""
+
+    def __init__(self, edges: Iterable[Tuple[str, str, float]]):
+        self.index: Dict[str, int] = {}
+        self.names: List[str] = []
+        weights: Dict[Tuple[int, int], float] = {}
+        for start, end, distance_km in edges:
+            if distance_km is None:
+                continue
+            a, b = self._node(start), self._node(end)
+            if a == b:
+                continue
+            key = (min(a, b), max(a, b))
+            weights[key] = min(float(distance_km), weights.get(key, float("inf")))
+
+        self.adjacency: List[List[Tuple[int, float]]] = [[] for _ in self.names]
+        for (a, b), w in weights.items():
+            self.adjacency[a].append((b, w))
+            self.adjacency[b].append((a, w))
+        self._rows: Dict[int, np.ndarray] = {}
+
+    def _node(self, name: str) -> int:
+        name = normalize_station(name)
+        if name not in self.index:
+            self.index[name] = len(self.names)
+            self.names.append(name)
+        return self.index[name]
+
+    @classmethod
+    def from_db(cls, db: Session) -> "SubwayGraph":
+        rows = db.query(
+            models.SubwayDistance.station_start,
+            models.SubwayDistance.station_end,
+            models.SubwayDistance.distance_km,
+        ).all()
+        return cls(rows)
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def _dijkstra(self, source: int) -> np.ndarray:
+        dist = np.full(len(self.names), np.inf)
+        dist[source] = 0.0
+        heap = [(0.0, source)]
+        while heap:
+            d, node = heapq.heappop(heap)
+            if d > dist[node]:
+                continue
+            for neighbor, w in self.adjacency[node]:
+                nd = d + w
+                if nd < dist[neighbor]:
+                    dist[neighbor] = nd
+                    heapq.heappush(heap, (nd, neighbor))
+        return dist
+
+    def distances_from(self, source: int) -> np.ndarray:
+        """출발역 기준 전체 역까지의 최단거리(km) 배열 (캐시)"""
+        row = self._rows.get(source)
+        if row is None:
+            row = self._rows[source] = self._dijkstra(source)
+        return row
+
+    def precompute(self):
+        """모든 역에 대해 최단거리 배열을 미리 계산합니다. (all-pairs)"""
+        for source in range(len(self.names)):
+            self.distances_from(source)
+
+    def distance_km(self, start: str, end: str) -> Optional[float]:
+        """두 역 사이 최단거리(km). 모르는 역이거나 연결되지 않으면 None"""
+        a = self.index.get(normalize_station(start))
+        b = self.index.get(normalize_station(end))
+        if a is None or b is None:
+            return None
+        # 무방향 그래프이므로 이미 계산된 쪽 행을 우선 사용
+        if a not in self._rows and b in self._rows:
+            a, b = b, a
+        d = self.distances_from(a)[b]
+        return None if np.isinf(d) else round(float(d), 3)
+
+
+def _subway_fingerprint(db: Session) -> tuple:
+    return db.query(
+        func.count(models.SubwayDistance.id),
+        func.max(models.SubwayDistance.id),
+        func.sum(models.SubwayDistance.distance_km),
+    ).one()
+
+
+subway_graph_cache: TableCache[SubwayGraph] = TableCache(_subway_fingerprint, SubwayGraph.from_db)
+
+
+def subway_distance_km(db: Optional[Session], start: Optional[str], end: Optional[str]) -> Optional[float]:
+    """역 이름 두 개로 지하철 이동 거리(km)를 구합니다. 계산할 수 없으면 None"""
+    if not start or not end:
+        return None
+    graph = subway_graph_cache.get(db)
+    if graph is None:
+        return None
+    return graph.distance_km(start, end)
+
+
+# ---------------------------
+# 버스
+# ---------------------------
+class BusRoute:
+    """노선 하나의 정류장 순서와 누적 거리(prefix sum)"""
+
+    __slots__ = ("route_id", "stops", "prefix_km", "positions")
+
+    def __init__(self, route_id: str, segments: List[Tuple[str, str, float]]):
+        self.route_id = route_id
+        self.stops = self._order_stops(segments)
+        lengths = {(a, b): d for a, b, d in segments}
+        hops = [lengths.get((a, b), 0.0) for a, b in zip(self.stops, self.stops[1:])]
+        self.prefix_km = np.concatenate(([0.0], np.cumsum(hops)))
+        # 정류장 이름 → 노선 내 위치 목록 (왕복 노선은 같은 정류장이 두 번 나올 수 있음)
+        self.positions: Dict[str, List[int]] = {}
+        for pos, stop in enumerate(self.stops):
+            self.positions.setdefault(stop, []).append(pos)
+
+    @staticmethod
+    def _order_stops(segments: List[Tuple[str, str, float]]) -> List[str]:
+        """연속 구간 목록을 하나의 정류장 순서로 이어 붙입니다."""
+        outgoing: Dict[str, Deque[str]] = {}
+        has_prev = set()
+        for a, b, _ in segments:
+            outgoing.setdefault(a, deque()).append(b)
+            has_prev.add(b)
+        # 기점: 들어오는 구간이 없는 정류장 (순환 노선이면 첫 구간의 출발 정류장)
+        origin = next((a for a, _, _ in segments if a not in has_prev), segments[0][0])
+        # 구간을 한 번씩만 사용하며 따라감 (왕복 노선의 반복 정류장 처리)
+        stops = [origin]
+        while outgoing.get(stops[-1]):
+            stops.append(outgoing[stops[-1]].popleft())
+        return stops
+
+    def distance_km(self, start: str, end: str) -> Optional[float]:
+        """같은 노선 진행 방향으로 start → end 거리. 순서가 맞지 않으면 None"""
+        starts, ends = self.positions.get(start), self.positions.get(end)
+        if not starts or not ends:
+            return None
+        best = None
+        for a in starts:
+            for b in ends:
+                if b > a and (best is None or self.prefix_km[b] - self.prefix_km[a] < best):
+                    best = self.prefix_km[b] - self.prefix_km[a]
+        return None if best is None else round(float(best), 3)
+
+
+class BusNetwork:
+    """노선별 BusRoute 모음 + 정류장 → 노선 색인"""
+
+    def __init__(self, rows: Iterable[Tuple[str, str, str, float]]):
+        segments: Dict[str, List[Tuple[str, str, float]]] = {}
+        for route_id, start, end, distance_km in rows:
+            if route_id is None or distance_km is None:
+                continue
+            segments.setdefault(str(route_id), []).append(
+                (normalize_station(start), normalize_station(end), float(distance_km))
+            )
+        self.routes: Dict[str, BusRoute] = {
+            route_id: BusRoute(route_id, route_segments) for route_id, route_segments in segments.items()
+        }
+        self.stop_routes: Dict[str, List[str]] = {}
+        for route in self.routes.values():
+            for stop in route.positions:
+                self.stop_routes.setdefault(stop, []).append(route.route_id)
+
+    @classmethod
+    def from_db(cls, db: Session) -> "BusNetwork":
+        # id 순서 = 구간 입력 순서 (순환 노선의 기점 결정에 사용)
+        rows = db.query(
+            models.BusDistance.route_id,
+            models.BusDistance.stop_start,
+            models.BusDistance.stop_end,
+            models.BusDistance.distance_km,
+        ).order_by(models.BusDistance.id).all()
+        return cls(rows)
+
+    def distance_km(self, start: str, end: str, route_id: Optional[str] = None) -> Optional[float]:
+        """정류장 간 거리(km). 노선을 지정하지 않으면 두 정류장을 지나는 노선 중 최단 거리"""
+        start, end = normalize_station(start), normalize_station(end)
+        if route_id is not None:
+            route = self.routes.get(str(route_id))
+            return route.distance_km(start, end) if route else None
+        candidates = [
+            d for d in (self.routes[r].distance_km(start, end) for r in self.stop_routes.get(start, ()))
+            if d is not None
+        ]
+        return min(candidates) if candidates else None
+
+
+def _bus_fingerprint(db: Session) -> tuple:
+    return db.query(
+        func.count(models.BusDistance.id),
+        func.max(models.BusDistance.id),
+        func.sum(models.BusDistance.distance_km),
+    ).one()
+
+
+bus_network_cache: TableCache[BusNetwork] = TableCache(_bus_fingerprint, BusNetwork.from_db)
+
+
+def bus_distance_km(
+    db: Optional[Session], start: Optional[str], end: Optional[str], route_id: Optional[str] = None
+) -> Optional[float]:
+    """정류장 이름(및 노선)으로 버스 이동 거리(km)를 구합니다. 계산할 수 없으면 None"""
+    if not start or not end:
+        return None
+    network = bus_network_cache.get(db)
+    if network is None:
+        return None
+    return network.distance_km(start, end, route_id)
+
+
+def resolve_distance_km(
+    db: Optional[Session],
+    mode: Any,
+    start: Optional[str],
+    end: Optional[str],
+    route_id: Optional[str] = None,
+) -> Optional[float]:
+    """지하철/버스 이동이면 역·정류장 이름으로 거리를 계산합니다. 그 외 교통수단은 None"""
+    mode = getattr(mode, "value", mode)
+    if mode == "SUBWAY":
+        return subway_distance_km(db, start, end)
+    if mode == "BUS":
+        return bus_distance_km(db, start, end, route_id)
+    return None
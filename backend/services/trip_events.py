@@ -0,0 +1,45 @@
+"""
+이동 기록 이벤트
+
+이동이 기록되는 모든 경로(crud, /api/mobility/log, 관리자, 활동 기록, 적재 배치)가
+이 모듈 하나를 호출해 파생 집계를 같은 트랜잭션에서 갱신합니다. (커밋은 호출자)
+  - 참여 챌린지 진행률 (services/challenge_progress.py)
+  - 업적 카운터와 업적 부여 (services/achievement_engine.py)
+"""
+from datetime import datetime
+from typing import Any, Dict, NamedTuple, Sequence
+
+from sqlalchemy.orm import Session
+
+from . import achievement_engine, challenge_progress
+
+
+class TripEvent(NamedTuple):
+    user_id: int
+    mode: Any
+    started_at: datetime
+    ended_at: datetime
+    distance_km: float
+    co2_saved_g: float
+    points: int
+
+
+def from_log(log: Any) -> TripEvent:
+    """MobilityLog (또는 같은 속성을 가진 객체)로 이벤트를 만듭니다."""
+    return TripEvent(
+        log.user_id,
+        log.mode,
+        log.started_at,
+        log.ended_at,
+        float(log.distance_km or 0),
+        float(log.co2_saved_g or 0),
+        int(log.points_earned or 0),
+    )
+
+
+def trips_logged(db: Session, trips: Sequence[TripEvent]) -> Dict[str, int]:
+    """반환: 갱신된 챌린지 진행률 행 수, 새로 부여한 업적 수"""
+    return {
+        "challenge_progress": challenge_progress.apply_trips(db, trips),
+        "achievements_granted": len(achievement_engine.on_trips(db, trips)),
+    }
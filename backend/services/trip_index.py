@@ -0,0 +1,215 @@
+"""
+사용자별 이동 시간대 색인 (중복/겹치는 이동 기록 방지)
+
+- 단건 입력: 최근 이동 구간을 사용자별로 시작 시각 정렬 배열에 캐시하고,
+  이분 탐색으로 [started_at, ended_at) 구간 겹침을 확인합니다. (DB 조회 없음)
+  캐시 범위를 벗어난 과거 시각의 이동은 (user_id, started_at) 인덱스로 범위 조회합니다.
+- 일괄 입력: dedupe_trips 로 기존 기록과의 겹침, 배치 내부 겹침을 한 번에 걸러냅니다.
+
+한 번의 이동은 MAX_TRIP_DURATION 을 넘지 않으므로(입력 단계에서 거부) 탐색 범위를 그만큼으로 제한합니다.
+"""
+import bisect
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Any, List, Optional
+
+import numpy as np
+from sqlalchemy.orm import Session
+
+from .. import models
+from ..schemas import MAX_TRIP_DURATION  # 이보다 긴 이동은 입력 단계(스키마, ingest_adapters)에서 거부
+
+CACHE_WINDOW = timedelta(days=3)  # 사용자별로 캐시하는 최근 이동 범위
+CACHE_TTL_SECONDS = 300           # 다른 워커의 입력을 반영하기 위한 재로딩 주기
+MAX_CACHED_USERS = 10000
+MIN_TRIP_DURATION = timedelta(seconds=1)  # 시작 = 종료인 기록도 같은 시각 재입력을 막기 위해 1초로 간주
+
+_USER_KEY_SHIFT = np.int64(1 << 33)  # (사용자, epoch 초) 복합 정렬 키
+
+
+def _normalize(started_at: datetime, ended_at: datetime):
+    return started_at, max(ended_at, started_at + MIN_TRIP_DURATION)
+
+
+class UserTripIndex:
+    """한 사용자의 최근 이동 구간 (시작 시각 정렬)"""
+
+    __slots__ = ("horizon", "starts", "ends", "log_ids", "loaded_at")
+
+    def __init__(self, horizon: datetime, rows: List[Any]):
+        self.horizon = horizon
+        self.starts: List[datetime] = []
+        self.ends: List[datetime] = []
+        self.log_ids: List[int] = []
+        self.loaded_at = time.monotonic()
+        for log_id, started_at, ended_at in rows:
+            self.add(log_id, started_at, ended_at)
+
+    def covers(self, started_at: datetime) -> bool:
+        """이 시각에 시작하는 이동과 겹칠 수 있는 기록이 모두 캐시 범위 안에 있는지"""
+        return started_at - MAX_TRIP_DURATION >= self.horizon
+
+    def find_overlap(self, started_at: datetime, ended_at: datetime) -> Optional[int]:
+        started_at, ended_at = _normalize(started_at, ended_at)
+        lo = bisect.bisect_left(self.starts, started_at - MAX_TRIP_DURATION)
+        hi = bisect.bisect_left(self.starts, ended_at)
+        for i in range(lo, hi):
+            if self.ends[i] > started_at:
+                return self.log_ids[i]
+        return None
+
+    def add(self, log_id: int, started_at: datetime, ended_at: datetime):
+        started_at, ended_at = _normalize(started_at, ended_at)
+        pos = bisect.bisect_right(self.starts, started_at)
+        self.starts.insert(pos, started_at)
+        self.ends.insert(pos, ended_at)
+        self.log_ids.insert(pos, log_id)
+
+
+def find_overlap_in_db(db: Session, user_id: int, started_at: datetime, ended_at: datetime) -> Optional[int]:
+    """(user_id, started_at) 인덱스 범위 조회로 겹치는 기록의 log_id 를 찾습니다."""
+    started_at, ended_at = _normalize(started_at, ended_at)
+    row = db.query(models.MobilityLog.log_id).filter(
+        models.MobilityLog.user_id == user_id,
+        models.MobilityLog.started_at > started_at - MAX_TRIP_DURATION,
+        models.MobilityLog.started_at < ended_at,
+        models.MobilityLog.ended_at > started_at,
+    ).first()
+    return row[0] if row else None
+
+
+class TripIndexCache:
+    """사용자별 UserTripIndex 의 LRU 캐시"""
+
+    def __init__(self, max_users: int = MAX_CACHED_USERS):
+        self.max_users = max_users
+        self._users: "OrderedDict[int, UserTripIndex]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _get(self, db: Session, user_id: int) -> UserTripIndex:
+        with self._lock:
+            index = self._users.get(user_id)
+            if index is not None and time.monotonic() - index.loaded_at < CACHE_TTL_SECONDS:
+                self._users.move_to_end(user_id)
+                return index
+
+        horizon = datetime.utcnow() - CACHE_WINDOW
+        rows = db.query(
+            models.MobilityLog.log_id,
+            models.MobilityLog.started_at,
+            models.MobilityLog.ended_at,
+        ).filter(
+            models.MobilityLog.user_id == user_id,
+            models.MobilityLog.started_at >= horizon,
+        ).all()
+        index = UserTripIndex(horizon, rows)
+        with self._lock:
+            self._users[user_id] = index
+            self._users.move_to_end(user_id)
+            while len(self._users) > self.max_users:
+                self._users.popitem(last=False)
+        return index
+
+    def find_overlap(self, db: Session, user_id: int, started_at: datetime, ended_at: datetime) -> Optional[int]:
+        """겹치는 기존 이동의 log_id (없으면 None)"""
+        index = self._get(db, user_id)
+        if index.covers(started_at):
+            return index.find_overlap(started_at, ended_at)
+        return find_overlap_in_db(db, user_id, started_at, ended_at)
+
+    def record(self, user_id: int, log_id: int, started_at: datetime, ended_at: datetime):
+        """커밋된 이동을 캐시에 반영합니다."""
+        with self._lock:
+            index = self._users.get(user_id)
+            if index is not None and started_at >= index.horizon:
+                index.add(log_id, started_at, ended_at)
+
+    def invalidate(self, user_id: Optional[int] = None):
+        with self._lock:
+            if user_id is None:
+                self._users.clear()
+            else:
+                self._users.pop(user_id, None)
+
+
+trip_cache = TripIndexCache()
+
+
+def find_overlap(db: Session, user_id: int, started_at: datetime, ended_at: datetime) -> Optional[int]:
+    """새 이동과 겹치는 기존 이동의 log_id (없으면 None)"""
+    return trip_cache.find_overlap(db, user_id, started_at, ended_at)
+
+
+def record_trip(user_id: int, log_id: int, started_at: datetime, ended_at: datetime):
+    """커밋된 이동을 색인에 추가합니다."""
+    trip_cache.record(user_id, log_id, started_at, ended_at)
+
+
+def dedupe_trips(db: Optional[Session], user_ids: Any, started_at: Any, ended_at: Any) -> np.ndarray:
+    """
+    일괄 입력용 중복 제거. 입력 순서대로 남길 행이면 True 인 bool 배열을 반환합니다.
+    - 기존 mobility_logs 와 겹치는 행 제거 (사용자 묶음별 범위 조회, 벡터 연산으로 판정)
+    - 배치 안에서 서로 겹치는 행은 시작 시각이 빠른 것만 남김
+    """
+    users = np.asarray(user_ids, dtype=np.int64)
+    starts = np.asarray(started_at, dtype="datetime64[s]").astype(np.int64)
+    ends = np.asarray(ended_at, dtype="datetime64[s]").astype(np.int64)
+    ends = np.maximum(ends, starts + int(MIN_TRIP_DURATION.total_seconds()))
+    keep = np.ones(users.shape[0], dtype=bool)
+    if users.size == 0:
+        return keep
+
+    unique_users, user_idx = np.unique(users, return_inverse=True)
+    user_idx = user_idx.astype(np.int64).reshape(-1)
+    new_start_key = user_idx * _USER_KEY_SHIFT + starts
+    new_end_key = user_idx * _USER_KEY_SHIFT + ends
+
+    # 1) 기존 기록과의 겹침
+    if db is not None:
+        window_start = datetime.utcfromtimestamp(int(starts.min())) - MAX_TRIP_DURATION
+        window_end = datetime.utcfromtimestamp(int(ends.max()))
+        existing = []
+        for i in range(0, unique_users.size, 1000):
+            existing.extend(db.query(
+                models.MobilityLog.user_id,
+                models.MobilityLog.started_at,
+                models.MobilityLog.ended_at,
+            ).filter(
+                models.MobilityLog.user_id.in_(unique_users[i:i + 1000].tolist()),
+                models.MobilityLog.started_at > window_start,
+                models.MobilityLog.started_at < window_end,
+            ).all())
+        if existing:
+            ex_users, ex_starts, ex_ends = zip(*existing)
+            ex_idx = np.searchsorted(unique_users, np.array(ex_users, dtype=np.int64))
+            ex_start = np.array(ex_starts, dtype="datetime64[s]").astype(np.int64)
+            ex_end = np.maximum(
+                np.array(ex_ends, dtype="datetime64[s]").astype(np.int64),
+                ex_start + int(MIN_TRIP_DURATION.total_seconds()),
+            )
+            ex_start_key = ex_idx * _USER_KEY_SHIFT + ex_start
+            ex_end_key = ex_idx * _USER_KEY_SHIFT + ex_end
+            order = np.argsort(ex_start_key, kind="stable")
+            ex_start_key = ex_start_key[order]
+            # 사용자 오프셋이 커서 누적 최댓값이 다른 사용자로 넘어가지 않음
+            ex_max_end = np.maximum.accumulate(ex_end_key[order])
+            # 새 구간 종료 전에 시작한 기존 구간 중 가장 늦게 끝나는 것이 새 구간 시작 이후면 겹침
+            pos = np.searchsorted(ex_start_key, new_end_key, side="left") - 1
+            has_prev = pos >= 0
+            keep &= ~(has_prev & (ex_max_end[np.maximum(pos, 0)] > new_start_key))
+
+    # 2) 배치 내부 겹침 (사용자, 시작 시각 순으로 한 번 훑음)
+    order = np.lexsort((starts, user_idx))
+    prev_user, max_end = -1, None
+    for i, u, s, e in zip(order.tolist(), user_idx[order].tolist(), starts[order].tolist(), ends[order].tolist()):
+        if u != prev_user:
+            prev_user, max_end = u, None
+        if not keep[i]:
+            continue
+        if max_end is not None and s < max_end:
+            keep[i] = False
+            continue
+        max_end = e if max_end is None else max(max_end, e)
+    return keep
@@ -0,0 +1,68 @@
+"""
+방언별 bulk INSERT 보조 함수 (MySQL / SQLite / PostgreSQL)
+
+- insert_ignore: 유니크 키가 겹치는 행은 건너뜀
+- upsert: 키가 겹치면 숫자 컬럼을 더하거나(카운터) 덮어씀
+"""
+from typing import Any, Dict, List, Sequence, Tuple
+
+from sqlalchemy import insert
+from sqlalchemy.dialects import mysql, postgresql, sqlite
+from sqlalchemy.orm import Session
+
+
+def insert_ignore(db: Session, model, key_columns: Sequence[str]):
+    """
+    유니크 키가 겹치는 행은 건너뛰는 bulk INSERT 문
+    MySQL: ON DUPLICATE KEY UPDATE (같은 값으로 갱신 = no-op), SQLite/PostgreSQL: ON CONFLICT DO NOTHING
+    """
+    dialect = db.get_bind().dialect.name
+    if dialect == "mysql":
+        stmt = mysql.insert(model)
+        return stmt.on_duplicate_key_update({key_columns[-1]: stmt.inserted[key_columns[-1]]})
+    if dialect == "sqlite":
+        return sqlite.insert(model).on_conflict_do_nothing(index_elements=list(key_columns))
+    if dialect == "postgresql":
+        return postgresql.insert(model).on_conflict_do_nothing(index_elements=list(key_columns))
+    return insert(model)
+
+
+def upsert(db: Session, model, key_columns: Tuple[str, ...], rows: List[Dict[str, Any]], accumulate: bool):
+    """
+    key_columns 기준 bulk upsert (커밋은 호출자)
+    accumulate=True 면 키 외 숫자 컬럼을 기존 값에 더하고, False 면 덮어씁니다. updated_at 은 항상 덮어씀
+    """
+    if not rows:
+        return
+    table = model.__table__
+    fields = [k for k in rows[0] if k not in key_columns and k != "updated_at"]
+    dialect = db.get_bind().dialect.name
+    if dialect == "mysql":
+        stmt = mysql.insert(table)
+        new = stmt.inserted
+    elif dialect in ("sqlite", "postgresql"):
+        stmt = (sqlite if dialect == "sqlite" else postgresql).insert(table)
+        new = stmt.excluded
+    else:
+        # upsert 를 지원하지 않는 DB 는 행 단위로 처리
+        for row in rows:
+            current = db.get(model, tuple(row[k] for k in key_columns))
+            if current is None:
+                db.execute(insert(table), [row])
+                continue
+            for field in fields:
+                value = float(getattr(current, field) or 0) + row[field] if accumulate else row[field]
+                setattr(current, field, value)
+            current.updated_at = row["updated_at"]
+        return
+
+    if accumulate:
+        values = {field: table.c[field] + new[field] for field in fields}
+    else:
+        values = {field: new[field] for field in fields}
+    values["updated_at"] = new.updated_at
+    if dialect == "mysql":
+        stmt = stmt.on_duplicate_key_update(values)
+    else:
+        stmt = stmt.on_conflict_do_update(index_elements=list(key_columns), set_=values)
+    db.execute(stmt, rows)
@@ -0,0 +1,178 @@
+"""
+WebSocket 연결 관리와 팬아웃 (/ws/*)
+
+- 연결마다 크기 제한이 있는 송신 큐와 전송 전용 writer 작업 하나
+  → broadcast / send_to_user 는 큐에 넣기만 하고 바로 반환 (느린 클라이언트가 다른 연결을 막지 않음)
+- 큐가 가득 차면: 같은 key 의 메시지가 큐에 있으면 그중 가장 오래된 것을 버리고(coalesce), 없으면 가장 오래된 메시지를 버림
+  (key 는 최신 상태만 의미 있는 메시지용. 예: "leaderboard", "statistics")
+- 전송 하나가 SEND_TIMEOUT_SECONDS 를 넘기면 멈춘 클라이언트로 보고 연결을 닫음
+  (전송마다 타이머를 만들지 않고 감시 작업 하나가 WATCHDOG_INTERVAL_SECONDS 마다 전송 시작 시각을 확인)
+- 사용자 한 명이 여러 기기로 접속 가능 (user_id → 연결 집합)
+- 응답 메시지도 같은 큐로 보내므로 한 소켓에 동시에 두 작업이 쓰지 않음
+- 이 프로세스의 연결만 관리. 다른 워커로 보내는 메시지는 services/pubsub.py 의 bus 를 거침
+  (사용자의 첫 기기 연결/마지막 기기 종료 때 on_user_added/on_user_removed 로 구독 갱신)
+"""
+import asyncio
+from collections import deque
+from typing import Callable, Deque, Dict, List, Optional, Tuple
+
+from fastapi import WebSocket
+
+MAX_QUEUE = 64
+SEND_TIMEOUT_SECONDS = 10.0
+WATCHDOG_INTERVAL_SECONDS = 1.0
+
+
+class Connection:
+    __slots__ = ("websocket", "user_id", "max_queue", "queue", "dropped", "coalesced", "sent",
+                 "sending_since", "closed", "_ready", "_writer", "_hub")
+
+    def __init__(self, hub: "ConnectionManager", websocket: WebSocket, user_id: Optional[int], max_queue: int):
+        self.websocket = websocket
+        self.user_id = user_id
+        self.max_queue = max_queue
+        self.queue: Deque[Tuple[Optional[str], str]] = deque()
+        self.dropped = 0
+        self.coalesced = 0
+        self.sent = 0
+        self.sending_since = 0.0  # 진행 중인 전송의 시작 시각 (loop.time(), 0 이면 전송 중 아님)
+        self.closed = False
+        self._ready = asyncio.Event()
+        self._writer: Optional[asyncio.Task] = None
+        self._hub = hub
+
+    def send(self, message: str, key: Optional[str] = None) -> bool:
+        """송신 큐에 넣습니다. (대기 없음) 닫힌 연결이면 False"""
+        if self.closed:
+            return False
+        if len(self.queue) >= self.max_queue:
+            if key is not None:
+                # 같은 key 의 가장 오래된 메시지를 빼고 새 메시지를 뒤에 붙임 (순서 유지)
+                for i, (queued_key, _) in enumerate(self.queue):
+                    if queued_key == key:
+                        del self.queue[i]
+                        self.coalesced += 1
+                        break
+                else:
+                    self.queue.popleft()
+                    self.dropped += 1
+            else:
+                self.queue.popleft()
+                self.dropped += 1
+        self.queue.append((key, message))
+        self._ready.set()
+        return True
+
+    def start(self):
+        self._writer = asyncio.get_running_loop().create_task(self._write_loop())
+
+    async def _write_loop(self):
+        queue, ready, websocket = self.queue, self._ready, self.websocket
+        clock = asyncio.get_running_loop().time
+        try:
+            while True:
+                if not queue:
+                    ready.clear()
+                    await ready.wait()
+                    continue
+                _, message = queue.popleft()
+                self.sending_since = clock()
+                await websocket.send_text(message)
+                self.sending_since = 0.0
+                self.sent += 1
+        except asyncio.CancelledError:
+            if not self.closed:
+                raise
+        except Exception:
+            # 전송 실패 → 연결 정리 (수신 루프는 close 로 끝남)
+            self._hub.disconnect(websocket)
+        if self.sending_since:
+            # 전송 도중 끊긴 경우 (감시 작업의 시간 초과 등) 소켓도 닫음
+            try:
+                await websocket.close()
+            except Exception:
+                pass
+
+    def close(self):
+        self.closed = True
+        self.queue.clear()
+        if self._writer is not None and self._writer is not asyncio.current_task():
+            self._writer.cancel()
+
+
+class ConnectionManager:
+    def __init__(self, max_queue: int = MAX_QUEUE):
+        self.max_queue = max_queue
+        self.connections: Dict[WebSocket, Connection] = {}
+        self.user_connections: Dict[int, Dict[Connection, None]] = {}  # 기기별 연결 (삽입 순서 유지 집합)
+        self.timed_out = 0
+        self.on_user_added: Optional[Callable[[int], None]] = None
+        self.on_user_removed: Optional[Callable[[int], None]] = None
+        self._watchdog: Optional[asyncio.Task] = None
+
+    async def connect(self, websocket: WebSocket, user_id: Optional[int] = None) -> Connection:
+        await websocket.accept()
+        return self.register(websocket, user_id)
+
+    def register(self, websocket: WebSocket, user_id: Optional[int] = None) -> Connection:
+        """이미 수락한 소켓을 등록하고 writer 작업을 시작합니다."""
+        conn = Connection(self, websocket, user_id, self.max_queue)
+        self.connections[websocket] = conn
+        if user_id is not None:
+            devices = self.user_connections.get(user_id)
+            if devices is None:
+                devices = self.user_connections[user_id] = {}
+                if self.on_user_added is not None:
+                    self.on_user_added(user_id)
+            devices[conn] = None
+        conn.start()
+        if self._watchdog is None or self._watchdog.done():
+            self._watchdog = asyncio.get_running_loop().create_task(self._watchdog_loop())
+        return conn
+
+    async def _watchdog_loop(self):
+        loop = asyncio.get_running_loop()
+        while self.connections:
+            await asyncio.sleep(WATCHDOG_INTERVAL_SECONDS)
+            deadline = loop.time() - SEND_TIMEOUT_SECONDS
+            stuck = [ws for ws, conn in self.connections.items() if 0 < conn.sending_since <= deadline]
+            for websocket in stuck:
+                self.timed_out += 1
+                self.disconnect(websocket)
+
+    def disconnect(self, websocket: WebSocket, user_id: Optional[int] = None):
+        """연결을 제거합니다. (여러 번 호출해도 안전, user_id 는 예전 호출 형태 호환용)"""
+        conn = self.connections.pop(websocket, None)
+        if conn is None:
+            return
+        conn.close()
+        devices = self.user_connections.get(conn.user_id)
+        if devices is not None:
+            devices.pop(conn, None)
+            if not devices:
+                del self.user_connections[conn.user_id]
+                if self.on_user_removed is not None:
+                    self.on_user_removed(conn.user_id)
+
+    def send_to_user(self, user_id: int, message: str, key: Optional[str] = None) -> int:
+        """사용자의 모든 기기에 보내고 큐에 넣은 연결 수를 반환합니다."""
+        return sum(conn.send(message, key) for conn in list(self.user_connections.get(user_id, ())))
+
+    def broadcast(self, message: str, key: Optional[str] = None, connections: Optional[List[Connection]] = None) -> int:
+        """모든(또는 주어진) 연결의 큐에 같은 문자열을 넣습니다. 직렬화는 호출하는 쪽에서 한 번만"""
+        targets = list(self.connections.values()) if connections is None else connections
+        return sum(conn.send(message, key) for conn in targets)
+
+    def stats(self) -> Dict[str, int]:
+        conns = self.connections.values()
+        return {
+            "connections": len(self.connections),
+            "users": len(self.user_connections),
+            "queued": sum(len(c.queue) for c in conns),
+            "dropped": sum(c.dropped for c in conns),
+            "coalesced": sum(c.coalesced for c in conns),
+            "timed_out": self.timed_out,
+        }
+
+
+manager = ConnectionManager()
@@ -1,7 +1,7 @@
 import React, { createContext, useContext, useState, useEffect, ReactNode } from 'react';
 import { creditService, CreditBalance, GardenStatus } from '../services/creditService';
-import { dashboardService, DashboardStats, MobilityLog, DailyStats } from '../services/dashboardService';
-import { sessionService } from '../services/sessionService';
+import { applyDashboardDelta, dashboardService, DashboardStats, MobilityLog, DailyStats } from '../services/dashboardService';
+import { sessionService, SessionData } from '../services/sessionService';
 import { dataService, DatabaseSummary, UserCompleteData, DatabaseStatus } from '../services/dataService';
 import { useLoading } from './LoadingContext';
 
@@ -21,6 +21,9 @@ interface AppDataContextType {
   recentActivities: MobilityLog[];
   dailyStats: DailyStats[];
   
+  // 세션 상태 (페이지 로드 시 한 번에 복원한 키-값)
+  sessionStates: SessionData;
+  
   // 로딩 상태
   isLoading: boolean;
   isRefreshing: boolean;
@@ -35,6 +38,8 @@ interface AppDataContextType {
   updateGardenStatus: (newStatus: GardenStatus) => void;
   updateDashboardStats: (newStats: DashboardStats) => void;
   addRecentActivity: (activity: MobilityLog) => void;
+  logActivity: (activityType: string, distanceKm: number, description?: string) => Promise<void>;
+  saveSessionStates: (values: SessionData, ttls?: { [key: string]: number }) => Promise<boolean>;
   
   // 실시간 업데이트
   startRealTimeUpdates: () => void;
@@ -78,6 +83,9 @@ export const AppDataProvider: React.FC<AppDataProviderProps> = ({ children }) =>
   const [recentActivities, setRecentActivities] = useState<MobilityLog[]>([]);
   const [dailyStats, setDailyStats] = useState<DailyStats[]>([]);
   
+  // 세션 상태
+  const [sessionStates, setSessionStates] = useState<SessionData>({});
+  
   // 로딩 상태
   const [isLoading, setIsLoading] = useState<boolean>(false);
   const [isRefreshing, setIsRefreshing] = useState<boolean>(false);
@@ -162,6 +170,34 @@ export const AppDataProvider: React.FC<AppDataProviderProps> = ({ children }) =>
     setRecentActivities(prev => [activity, ...prev.slice(0, 9)]); // 최대 10개 유지
   };
 
+  // 활동 기록: 서버가 돌려준 delta 만 합치고 대시보드는 다시 조회하지 않음
+  const logActivity = async (activityType: string, distanceKm: number, description?: string) => {
+    const delta = await dashboardService.logActivity({
+      activity_type: activityType,
+      distance_km: distanceKm,
+      description,
+    });
+    const merged = applyDashboardDelta(dashboardStats, dailyStats, delta);
+    setDashboardStats(merged.stats);
+    setDailyStats(merged.dailyStats);
+    setTotalPoints(prev => delta.values ? delta.values.total_points : prev + delta.increments.total_points);
+  };
+
+  // 세션 상태 복원: 키마다 요청하지 않고 사용자의 모든 키를 한 번에 조회 (로그인한 경우만)
+  const restoreSessionStates = async () => {
+    if (!localStorage.getItem('access_token')) return;
+    setSessionStates(await sessionService.getSessionStates());
+  };
+
+  // 세션 상태 저장: 바뀐 키들을 한 번에 저장하고 성공하면 복원본에도 반영
+  const saveSessionStates = async (values: SessionData, ttls?: { [key: string]: number }) => {
+    const saved = await sessionService.saveSessionStates(values, ttls);
+    if (saved) {
+      setSessionStates(prev => ({ ...prev, ...values }));
+    }
+    return saved;
+  };
+
   // 실시간 업데이트 시작
   const startRealTimeUpdates = () => {
     if (realTimeInterval) return; // 이미 실행 중이면 무시
@@ -239,7 +275,7 @@ export const AppDataProvider: React.FC<AppDataProviderProps> = ({ children }) =>
     const initializeData = async () => {
       try {
         setIsLoading(true);
-        await refreshAllData();
+        await Promise.all([refreshAllData(), restoreSessionStates()]);
         
         // 실시간 업데이트 시작
         startRealTimeUpdates();
@@ -303,6 +339,9 @@ export const AppDataProvider: React.FC<AppDataProviderProps> = ({ children }) =>
     recentActivities,
     dailyStats,
     
+    // 세션 상태
+    sessionStates,
+    
     // 로딩 상태
     isLoading,
     isRefreshing,
@@ -317,6 +356,8 @@ export const AppDataProvider: React.FC<AppDataProviderProps> = ({ children }) =>
     updateGardenStatus,
     updateDashboardStats,
     addRecentActivity,
+    logActivity,
+    saveSessionStates,
     
     // 실시간 업데이트
     startRealTimeUpdates,
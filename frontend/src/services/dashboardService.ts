@@ -30,6 +30,67 @@ export interface DailyStats {
   activities_count: number;
 }
 
+// POST /activity/log 응답: 방금 기록한 활동만큼의 대시보드 변경분
+export interface DashboardDelta {
+  type: 'dashboard_delta';
+  user_id: number;
+  log: {
+    mode: string;
+    distance_km: number | null;
+    co2_saved_g: number;
+    points_earned: number;
+    created_at: string;
+  };
+  increments: {
+    co2_saved_today: number;
+    eco_credits_earned: number;
+    total_saved: number; // kg
+    total_points: number;
+  };
+  day: { date: string; delta_g: number; saved_g: number | null };
+  mode: { mode: string; delta_g: number; saved_g: number | null };
+  values: {
+    co2_saved_today: number;
+    eco_credits_earned: number;
+    total_saved: number;
+    total_points: number;
+    garden_level: number;
+  } | null;
+}
+
+// 대시보드를 다시 조회하지 않고 delta 를 현재 상태에 합침 (서버 캐시 값이 있으면 그 값, 없으면 증가분)
+export const applyDashboardDelta = (
+  stats: DashboardStats | null,
+  dailyStats: DailyStats[],
+  delta: DashboardDelta
+): { stats: DashboardStats | null; dailyStats: DailyStats[] } => {
+  const nextStats = stats && {
+    ...stats,
+    total_points: delta.values ? delta.values.total_points : stats.total_points + delta.increments.total_points,
+    total_co2_saved: delta.values ? delta.values.total_saved : stats.total_co2_saved + delta.increments.total_saved,
+    garden_level: delta.values ? delta.values.garden_level : stats.garden_level,
+    recent_activities: stats.recent_activities + 1,
+  };
+
+  const savedKg = delta.log.co2_saved_g / 1000;
+  const exists = dailyStats.some(day => day.date === delta.day.date);
+  const nextDaily = exists
+    ? dailyStats.map(day => day.date !== delta.day.date ? day : {
+        ...day,
+        co2_saved: delta.day.saved_g !== null ? delta.day.saved_g / 1000 : day.co2_saved + savedKg,
+        points_earned: day.points_earned + delta.log.points_earned,
+        activities_count: day.activities_count + 1,
+      })
+    : [...dailyStats, {
+        date: delta.day.date,
+        co2_saved: savedKg,
+        points_earned: delta.log.points_earned,
+        activities_count: 1,
+      }];
+
+  return { stats: nextStats, dailyStats: nextDaily };
+};
+
 class DashboardService {
   private userId: string;
 
@@ -98,19 +159,19 @@ class DashboardService {
     }
   }
 
-  // 활동 기록 (이동 로그 생성)
+  // 활동 기록 → 대시보드 delta 반환 (applyDashboardDelta 로 합침)
   async logActivity(activityData: {
-    mode: string;
+    activity_type: string; // "subway", "bike", "bus", "walk"
     distance_km: number;
-    start_point?: string;
-    end_point?: string;
     description?: string;
-  }): Promise<MobilityLog> {
+  }): Promise<DashboardDelta> {
     try {
-      const response = await fetch(`${API_URL}/api/dashboard/log-activity`, {
+      const token = localStorage.getItem('access_token');
+      const response = await fetch(`${API_URL}/activity/log`, {
         method: 'POST',
         headers: {
           'Content-Type': 'application/json',
+          ...(token && { 'Authorization': `Bearer ${token}` }),
         },
         body: JSON.stringify({
           user_id: parseInt(this.userId),
@@ -12,10 +12,15 @@ export interface SessionData {
 }
 
 class SessionService {
-  private userId: string;
+  // 로그인/로그아웃 후에도 맞는 사용자로 요청하도록 매번 읽음 (서버는 토큰 사용자와 다르면 403)
+  private get userId(): string {
+    return localStorage.getItem('userId') || '1';
+  }
 
-  constructor() {
-    this.userId = localStorage.getItem('userId') || '1';
+  // 세션 상태 API 는 로그인한 본인만 접근 가능
+  private authHeaders(): HeadersInit {
+    const token = localStorage.getItem('access_token');
+    return token ? { 'Authorization': `Bearer ${token}` } : {};
   }
 
   // 세션 상태 저장
@@ -25,6 +30,7 @@ class SessionService {
         method: 'POST',
         headers: {
           'Content-Type': 'application/json',
+          ...this.authHeaders(),
         },
         body: JSON.stringify(data),
       });
@@ -43,7 +49,9 @@ class SessionService {
   // 세션 상태 조회
   async getSessionState(sessionKey: string): Promise<SessionData | null> {
     try {
-      const response = await fetch(`${API_URL}/api/session/${this.userId}/${sessionKey}`);
+      const response = await fetch(`${API_URL}/api/session/${this.userId}/${sessionKey}`, {
+        headers: this.authHeaders(),
+      });
       
       if (!response.ok) {
         throw new Error(`HTTP error! status: ${response.status}`);
@@ -62,6 +70,7 @@ class SessionService {
     try {
       const response = await fetch(`${API_URL}/api/session/${this.userId}/${sessionKey}`, {
         method: 'DELETE',
+        headers: this.authHeaders(),
       });
 
       if (!response.ok) {
@@ -80,6 +89,7 @@ class SessionService {
     try {
       const response = await fetch(`${API_URL}/api/session/${this.userId}`, {
         method: 'DELETE',
+        headers: this.authHeaders(),
       });
 
       if (!response.ok) {
@@ -93,6 +103,49 @@ class SessionService {
     }
   }
 
+  // 모든 세션 상태 한 번에 조회 (페이지 로드 시 복원용, keys 를 주면 그 키만)
+  async getSessionStates(keys?: string[]): Promise<SessionData> {
+    try {
+      const query = keys && keys.length ? `?keys=${encodeURIComponent(keys.join(','))}` : '';
+      const response = await fetch(`${API_URL}/api/session/${this.userId}${query}`, {
+        headers: this.authHeaders(),
+      });
+
+      if (!response.ok) {
+        throw new Error(`HTTP error! status: ${response.status}`);
+      }
+
+      const result = await response.json();
+      return result.data || {};
+    } catch (error) {
+      console.error('세션 상태 일괄 조회 실패:', error);
+      return {};
+    }
+  }
+
+  // 여러 세션 상태 한 번에 저장 (ttls: 키별 만료 초)
+  async saveSessionStates(values: SessionData, ttls?: { [key: string]: number }): Promise<boolean> {
+    try {
+      const response = await fetch(`${API_URL}/api/session/${this.userId}`, {
+        method: 'POST',
+        headers: {
+          'Content-Type': 'application/json',
+          ...this.authHeaders(),
+        },
+        body: JSON.stringify({ values, ttls: ttls || {} }),
+      });
+
+      if (!response.ok) {
+        throw new Error(`HTTP error! status: ${response.status}`);
+      }
+
+      return true;
+    } catch (error) {
+      console.error('세션 상태 일괄 저장 실패:', error);
+      return false;
+    }
+  }
+
   // 채팅 메시지 저장
   async saveChatMessages(messages: ChatMessage[]): Promise<boolean> {
     const chatData = {